@@ -4,6 +4,8 @@ from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, System
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
 from chains.rag_chain import *
+from utils import deadline
+from utils import metrics as pipeline_metrics
 
 
 class GradeQuestion(BaseModel):
@@ -11,15 +13,27 @@ class GradeQuestion(BaseModel):
         description="Question is about the specified topics? If yes -> 'Yes' if not -> 'No'"
     )
 
-def query_enhancer(state: AgentState):
-    print(f"Entering question_rewriter with following state: {state}")
+# Words that tie a follow-up to earlier turns ("what diet should I follow for it?")
+REFERRING_WORDS = {"it", "its", "this", "that", "these", "those", "they", "them", "their", "he", "she",
+                   "same", "above", "again", "also", "more", "else", "instead", "then"}
+
+
+def is_standalone(question):
+    """Cheap check that a question can be retrieved on without the conversation."""
+    words = [w.strip("?,.!'\"").lower() for w in str(question).split()]
+    return len(words) > 3 and not any(w in REFERRING_WORDS for w in words)
+
 
-    # Reset state variables except for 'question' and 'messages'
+def _reset_turn(state):
+    """Reset state variables except for 'question' and 'messages'; adds the question to the history."""
     state["documents"] = []
     state["on_topic"] = ""
     state["enhanced_query"] = ""
     state["proceed_to_generate"] = False
     state["rephrase_count"] = 0
+    state["retrieval_query"] = ""
+    state["answer_lang"] = ""
+    state["best_documents"] = []
 
     if "messages" not in state or state["messages"] is None:
         state["messages"] = []
@@ -27,7 +41,17 @@ def query_enhancer(state: AgentState):
     if state["question"] not in state["messages"]:
         state["messages"].append(state["question"])
 
-    if len(state["messages"]) > 1:
+
+def query_enhancer(state: AgentState, rephrase="always"):
+    print(f"Entering question_rewriter with following state: {state}")
+    _reset_turn(state)
+
+    if len(state["messages"]) > 1 and rephrase == "when_needed" and is_standalone(state["question"].content):
+        # Lean profile (utils/load_control.py): no LLM call for a self-contained question
+        print("query_enhancer: standalone question, skipping rephrase")
+        pipeline_metrics.incr("load.rephrase_skipped")
+        state["enhanced_query"] = state["question"].content
+    elif len(state["messages"]) > 1:
         conversation = state["messages"][:-1]
         current_question = state["question"].content
         messages = [
@@ -40,7 +64,9 @@ def query_enhancer(state: AgentState):
         rephrase_prompt = ChatPromptTemplate.from_messages(messages)
         prompt = rephrase_prompt.format()
         try:
-            response = llm.invoke(prompt)
+            deadline.require("enhance")
+            with guard("llm", "enhance", prompt):
+                response = llm.invoke(prompt)
             better_question = response.content.strip()
         except Exception as e:
             # Fallback: if the LLM fails, keep the original question as-is
@@ -52,6 +78,19 @@ def query_enhancer(state: AgentState):
         state["enhanced_query"] = state["question"].content
     return state
 
+def query_enhancer_lean(state: AgentState):
+    return query_enhancer(state, rephrase="when_needed")
+
+
+def query_passthrough(state: AgentState):
+    """Minimal profile: the question goes to retrieval as asked, without enhancer or classifier."""
+    print("Entering query_passthrough")
+    _reset_turn(state)
+    state["enhanced_query"] = state["question"].content
+    state["on_topic"] = "Yes"
+    return state
+
+
 def query_classifier(state: AgentState):
     print("Entering question_classifier")
     system_message = SystemMessage(
@@ -81,7 +120,9 @@ def query_classifier(state: AgentState):
     prompt = grade_prompt.format_messages()
     structured_llm = llm.with_structured_output(GradeQuestion)
     try:
-        result = structured_llm.invoke(prompt)
+        deadline.require("classify")
+        with guard("llm", "classify", prompt):
+            result = structured_llm.invoke(prompt)
         state["on_topic"] = result.score.strip()
     except Exception as e:
         # Heuristic fallback classifier when LLM is unavailable
@@ -132,7 +173,8 @@ Provide a slightly adjusted version of the question."""
     refine_prompt = ChatPromptTemplate.from_messages([system_message, human_message])
     prompt = refine_prompt.format()
     try:
-        response = llm.invoke(prompt)
+        with guard("llm", "refine", prompt):
+            response = llm.invoke(prompt)
         refined_question = response.content.strip()
         print(f"refine_question: Refined question: {refined_question}")
         state["enhanced_query"] = refined_question
@@ -1,6 +1,8 @@
 from .state import AgentState
 from langchain_core.messages import AIMessage
 from chains.rag_chain import *
+from utils import context_packer, kannada_mode, traffic_capture, turn_stream
+from utils import metrics as pipeline_metrics
 
 def generate_answer(state: AgentState) -> AgentState:
     """
@@ -15,17 +17,48 @@ def generate_answer(state: AgentState) -> AgentState:
     history = state["messages"]
     documents = state.get("documents", [])
     rephrased_query = state.get("enhanced_query", "")
+    # Native Kannada turns answer in Kannada directly, so /chat skips the
+    # EN->KN translation of the whole reply
+    native = kannada_mode.node_mode("generate_answer", state.get("lang")) == "native"
+    chain = rag_chain_kn if native else rag_chain
+
+    # Best sentences of the graded documents within a token budget, with source labels
+    context = documents
+    if context_packer.CONTEXT_PACKER_ENABLED:
+        history = context_packer.trim_history(history)
+        if documents:
+            # Sentences are scored against the (English) query retrieval ran with
+            packed = context_packer.pack(documents, state.get("retrieval_query") or rephrased_query)
+            if packed.text:
+                context = packed.text
+                pipeline_metrics.incr("context.tokens_before", packed.tokens_before)
+                pipeline_metrics.incr("context.tokens_packed", packed.tokens)
+                traffic_capture.annotate(context=packed.stats())
 
     if llm is None:
         generation = "I'm sorry, but the AI service is not properly configured. Please check the API keys and try again later."
     else:
         try:
-            response = rag_chain.invoke({
+            inputs = {
                 "history": history,
-                "context": documents,
+                "context": context,
                 "question": rephrased_query
-            })
-            generation = response.content.strip()
+            }
+            with guard("llm", "generate", (history, context, rephrased_query)):
+                # A live client (/ws/voice) gets the answer as it is written,
+                # unless /chat still has to translate it
+                if turn_stream.active() and (native or state.get("lang", "en") == "en"):
+                    parts = []
+                    for chunk in chain.stream(inputs):
+                        text = getattr(chunk, "content", chunk)
+                        if text:
+                            parts.append(text)
+                            turn_stream.emit("token", text=text, lang=state.get("lang", "en"))
+                    generation = "".join(parts).strip()
+                else:
+                    generation = chain.invoke(inputs).content.strip()
+            if native:
+                state["answer_lang"] = state["lang"]
         except Exception as e:
             # Fallback: if retrieval documents exist, summarize or return top snippets
             print(f"rag_chain.invoke failed: {e}")
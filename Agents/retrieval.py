@@ -4,6 +4,12 @@ from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from langchain_core.documents import Document
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils import context_packer, deadline, dedup, kannada_mode, traffic_capture, translation, web_cache
+from utils import metrics as pipeline_metrics
 
 class GradeDocument(BaseModel):
     score: str = Field(
@@ -16,27 +22,91 @@ class GradeDocument(BaseModel):
     )
 
 
+def _written_back_documents(query):
+    """Unexpired web documents written back by websearch (empty when unavailable)."""
+    if websearch_store is None or web_cache.WEBSEARCH_LOCAL_K <= 0:
+        return []
+    try:
+        with guard("embeddings"), guard("pinecone"):
+            return websearch_store.similarity_search(
+                query, k=web_cache.WEBSEARCH_LOCAL_K, filter={"expires_at": {"$gt": time.time()}}
+            )
+    except Overloaded:
+        raise
+    except Exception as e:
+        print(f"web namespace lookup failed - {e}")
+        return []
+
+
+def _to_english(query):
+    """Translates a short Kannada query for the English index and web search."""
+    with pipeline_metrics.timed("translate.query_kn_to_en"):
+        translated = translation.translate_text(query, target="en", source="kn")
+    pipeline_metrics.incr("kannada.query_translations")
+    return translated or query
+
+
+def retrieval_query(state):
+    """The query retrieval ran with: English for a translated Kannada turn, else enhanced_query."""
+    return state.get("retrieval_query") or state["enhanced_query"]
+
+
 def retrieve(state: AgentState):
     print("Entering retrieve")
-    if retriever is None:
+    if not state.get("rephrase_count"):
+        # One count per turn that reaches retrieval: the fallback rate's denominator
+        pipeline_metrics.incr("retrieval.turns")
+        web_cache.count("turns")
+
+    # Native Kannada turns: the multilingual index takes the Kannada query as
+    # is; without one only the query (not the answer) is translated
+    active_retriever, query = retriever, state["enhanced_query"]
+    mode = kannada_mode.node_mode("retrieve", state.get("lang"))
+    if mode == "native" and multilingual_retriever is not None:
+        active_retriever = multilingual_retriever
+        pipeline_metrics.incr("kannada.native_retrievals")
+    elif mode is not None:
+        query = _to_english(query)
+    state["retrieval_query"] = query
+
+    if active_retriever is None:
         print("Retriever not available, skipping retrieval")
         state["documents"] = []
         return state
     
+    traffic_capture.note("retrieval_queries", query)
     try:
-        documents = retriever.invoke(state["enhanced_query"])
+        with guard("embeddings"), guard("pinecone"):
+            documents = active_retriever.invoke(query)
         print(f"✓ PINECONE: Retrieved {len(documents)} documents from Pinecone vector database")
+        if dedup.RETRIEVAL_DEDUP and documents:
+            # Each document costs a grader call: skip near-duplicates of better
+            # ranked ones and diversify the rest down to RETRIEVER_K
+            candidates = len(documents)
+            documents, skipped = dedup.mmr_select(query, documents, RETRIEVER_K)
+            saved = sum(1 for i in skipped if i < RETRIEVER_K)
+            pipeline_metrics.incr("retrieval.candidates", candidates)
+            pipeline_metrics.incr("retrieval.duplicates_dropped", len(skipped))
+            pipeline_metrics.incr("retrieval.grader_calls_saved", saved)
+            traffic_capture.annotate(dedup={"candidates": candidates, "duplicates": len(skipped), "grader_calls_saved": saved})
+        else:
+            # Every document costs a grader call: never grade more than RETRIEVER_K
+            documents = documents[:RETRIEVER_K]
+        web_documents = _written_back_documents(query)
+        if web_documents:
+            print(f"✓ PINECONE: {len(web_documents)} written-back web documents")
+            documents = documents + web_documents
         if documents:
             print(f"✓ PINECONE: First document preview: {documents[0].page_content[:100]}...")
         state["documents"] = documents
+    except Overloaded:
+        raise
     except Exception as e:
         print(f"✗ PINECONE ERROR: Failed to retrieve from Pinecone - {e}")
         state["documents"] = []
     return state
 
-def retrieval_grader(state: AgentState):
-    print("Entering retrieval_grader")
-    system_message = SystemMessage(
+GRADER_SYSTEM_MESSAGE = SystemMessage(
     content="""
     You are a grader assessing the relevance of a retrieved document to a user question.
     Respond only with 'Yes' or 'No'.
@@ -52,41 +122,197 @@ def retrieval_grader(state: AgentState):
     """
 )
 
+
+def grade_documents(query, documents):
+    """
+    Grades each document against query with one LLM call per document.
+    Returns (relevant, ungraded): documents graded 'Yes', and documents kept
+    without a grade because grading was shed for quota.
+    """
     structured_llm = llm.with_structured_output(GradeDocument)
 
-    relevant_docs = []
-    for doc in state["documents"]:
+    relevant_docs, ungraded = [], []
+    for doc in documents:
         human_message = HumanMessage(
-            content=f"User question: {state['enhanced_query']}\n\nRetrieved document:\n{doc.page_content}"
+            content=f"User question: {query}\n\nRetrieved document:\n{doc.page_content}"
         )
-        grade_prompt = ChatPromptTemplate.from_messages([system_message, human_message])
+        grade_prompt = ChatPromptTemplate.from_messages([GRADER_SYSTEM_MESSAGE, human_message])
         grader_llm = grade_prompt | structured_llm
-        result = grader_llm.invoke({})
+        try:
+            deadline.require("grade_document")
+            with guard("llm", "grade", human_message.content):
+                result = grader_llm.invoke({})
+        except (RateLimited, DeadlineExceeded) as e:
+            # Grading is the lowest-priority Gemini call: when quota or time is
+            # short keep the retrieved document ungraded rather than failing the turn
+            print(f"retrieval_grader: grading shed ({e}), keeping document")
+            ungraded.append(doc)
+            continue
         # print(
         #     f"Grading document: {doc.page_content[:30]}... Result: {result.score.strip()}"
         # )
         if result.score.strip().lower() == "yes":
             relevant_docs.append(doc)
+    return relevant_docs, ungraded
+
+
+def retrieval_grader(state: AgentState):
+    print("Entering retrieval_grader")
+    relevant, ungraded = grade_documents(retrieval_query(state), state["documents"])
+    relevant_docs = relevant + ungraded
+    if not relevant_docs:
+        # What the retriever ranked highest, in case the budget ends the search here
+        state["best_documents"] = state.get("best_documents") or state["documents"][:2]
+    if any(d.metadata.get("source_type") == "websearch" for d in relevant):
+        # A corpus gap answered from written-back web results instead of Tavily
+        pipeline_metrics.incr("websearch.local_hits")
+        web_cache.count("local_hits")
     state["documents"] = relevant_docs
     state["proceed_to_generate"] = len(relevant_docs) > 0
     print(f"retrieval_grader: proceed_to_generate = {state['proceed_to_generate']}")
     return state
 
+
+# Lean profile: share of the query's terms a document must contain to pass
+LOCAL_GRADE_MIN_OVERLAP = float(os.getenv("LOCAL_GRADE_MIN_OVERLAP", "0.3"))
+
+
+def local_grader(state: AgentState):
+    """
+    Lean profile (utils/load_control.py): grades by query-term overlap instead
+    of one LLM call per document. Queries with no Latin-script terms (native
+    Kannada against the multilingual index) keep every retrieved document.
+    """
+    print("Entering local_grader")
+    query = retrieval_query(state)
+    terms = set(context_packer._words(query))
+    documents = state["documents"]
+    if terms and kannada_mode.kannada_ratio(query) < 0.5:
+        relevant = [d for d in documents
+                    if len(terms & set(context_packer._words(d.page_content))) / len(terms) >= LOCAL_GRADE_MIN_OVERLAP]
+    else:
+        relevant = list(documents)
+    pipeline_metrics.incr("load.local_grades", len(documents))
+    if not relevant:
+        state["best_documents"] = state.get("best_documents") or documents[:2]
+    state["documents"] = relevant
+    state["proceed_to_generate"] = len(relevant) > 0
+    print(f"local_grader: {len(relevant)}/{len(documents)} documents kept")
+    return state
+
+
+def best_documents(state: AgentState):
+    """Answers from the top retrieved documents when refine/websearch no longer fit the budget."""
+    print("Entering best_documents")
+    state["documents"] = state.get("best_documents") or []
+    state["proceed_to_generate"] = True
+    return state
+
+
+def _write_back(query, documents):
+    """Upserts graded web documents into the websearch namespace with an expiry."""
+    cache = web_cache.get_cache()
+    if websearch_store is None or not documents:
+        return
+    now = time.time()
+    expires = now + web_cache.WEBSEARCH_WRITEBACK_TTL
+    docs, ids = [], []
+    for doc in documents:
+        url = doc.metadata.get("source", "")
+        ids.append(web_cache.document_id(url, doc.page_content))
+        docs.append(Document(page_content=doc.page_content, metadata={
+            "source": url, "source_type": "websearch", "query_hash": web_cache.query_hash(query),
+            "fetched_at": now, "expires_at": expires,
+        }))
+    try:
+        with guard("embeddings"), guard("pinecone"):
+            websearch_store.add_documents(docs, ids=ids)
+            expired = cache.take_expired(now) if cache is not None else []
+            if expired:
+                websearch_store.delete(ids=expired)
+        if cache is not None:
+            cache.record_writeback(ids, [d.metadata["source"] for d in docs], web_cache.query_hash(query), expires)
+            if expired:
+                cache.forget(expired)
+                print(f"web_search: pruned {len(expired)} expired written-back documents")
+        pipeline_metrics.incr("websearch.written_back", len(docs))
+        web_cache.count("writebacks", len(docs))
+        print(f"web_search: wrote {len(docs)} graded documents to namespace '{web_cache.WEBSEARCH_NAMESPACE}'")
+    except Overloaded as e:
+        print(f"web_search: write-back skipped ({e})")
+    except Exception as e:
+        print(f"web_search: write-back failed - {e}")
+
+
+# Grading and writing back web results (one LLM call per result, then the
+# embedding and upsert) runs on one background thread, off the request path;
+# while WEBSEARCH_WRITEBACK_PENDING batches wait, further ones are dropped.
+_writeback_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="web-writeback")
+_writeback_slots = threading.BoundedSemaphore(web_cache.WEBSEARCH_WRITEBACK_PENDING)
+
+
+def _schedule_write_back(query, documents):
+    if not _writeback_slots.acquire(blocking=False):
+        pipeline_metrics.incr("websearch.writeback_dropped")
+        return
+
+    def job():
+        try:
+            # Only what the grader accepts goes into the knowledge base
+            relevant, _ = grade_documents(query, documents)
+            _write_back(query, relevant)
+        except Exception as e:
+            print(f"web_search: write-back failed - {e}")
+        finally:
+            _writeback_slots.release()
+
+    _writeback_pool.submit(job)
+
+
+def wait_for_write_backs(timeout=60):
+    """Blocks until the write-backs scheduled so far are done (scripts and benchmarks)."""
+    _writeback_pool.submit(lambda: None).result(timeout=timeout)
+
+
 def websearch(state: AgentState):
     print("⚠ WEB SEARCH: Pinecone data insufficient, falling back to web search")
     
+    query = retrieval_query(state)
+    if kannada_mode.node_mode("websearch", state.get("lang")) == "translate" and kannada_mode.kannada_ratio(query) > 0.5:
+        # Native retrieval kept the Kannada query; Tavily does better in English
+        query = _to_english(query)
+    cache = web_cache.get_cache()
+    # Keyed on the standalone retrieval query only: the raw question of a
+    # follow-up ("is it safe?") means something else in every conversation
+    cached = cache.get(query) if cache is not None else None
+    if cached is not None:
+        print(f"✓ WEB SEARCH: {len(cached)} cached results")
+        pipeline_metrics.incr("websearch.cache_hits")
+        web_cache.count("cache_hits")
+        docs = [
+            Document(page_content=r["content"], metadata={"source": r["url"], "source_type": "websearch"})
+            for r in cached
+        ]
+        state["documents"] = docs
+        state["proceed_to_generate"] = len(docs) > 0
+        return state
+
     if tavily_search is None:
         print("✗ WEB SEARCH: Tavily search not available")
         state["documents"] = []
         state["proceed_to_generate"] = False
         return state
     
+
     # Force Ayurvedic context in web search
-    ayurvedic_query = f"Ayurvedic treatment remedy {state['enhanced_query']}"
+    ayurvedic_query = f"Ayurvedic treatment remedy {query}"
     print(f"✓ WEB SEARCH: Searching web for: {ayurvedic_query}")
     
     try:
-        results = tavily_search.invoke({"query": ayurvedic_query})
+        with guard("web"):
+            results = tavily_search.invoke({"query": ayurvedic_query})
+        pipeline_metrics.incr("websearch.tavily_calls")
+        web_cache.count("tavily_calls")
     except Exception as e:
         print(f"web_search: Tavily API failed - {e}")
         state["documents"] = []
@@ -110,6 +336,11 @@ def websearch(state: AgentState):
     print(f"From the websearch")
     # print(docs)
 
+    if web_cache.WEBSEARCH_WRITEBACK and websearch_store is not None and docs:
+        _schedule_write_back(query, docs)
+    if cache is not None and docs:
+        cache.put([{"url": d.metadata["source"], "content": d.page_content} for d in docs], query)
+
     state["documents"] = docs
     state["proceed_to_generate"] = len(docs) > 0
     return state
@@ -1,5 +1,6 @@
 from .state import AgentState
 from chains.rag_chain import *
+from utils import deadline
 
 def on_topic_router(state: AgentState):
     print("Entering on_topic_router")
@@ -22,9 +23,29 @@ def proceed_router(state: AgentState):
         print("Relevant documents found. Routing to generate_answer.")
         return "generate_answer"
     
-    if rephrase_count >= 2:
+    # Cheaper paths as the turn's budget shrinks: skip the refine loop, then
+    # web search, and answer from the best retrieved documents
+    budget = state.get("deadline")
+    if rephrase_count < 2:
+        if deadline.allows("refine", "retrieve", "grade", deadline=budget):
+            print("No relevant docs. Will try refining the query.")
+            return "refine_query"
+        deadline.degrade("skip_refine", budget)
+
+    if deadline.allows("web", deadline=budget):
         print("No relevant docs and rephrased 2 times. Routing to websearch.")
         return "websearch"
-    
-    print("No relevant docs. Will try refining the query.")
-    return "refine_query"
+    deadline.degrade("skip_websearch", budget)
+    print("No relevant docs and no time left for web search. Routing to best_documents.")
+    return "best_documents"
+
+
+def proceed_router_lean(state: AgentState):
+    """Lean profile: no refine loop; a corpus miss goes straight to web search (budget permitting)."""
+    print("Entering proceed_router_lean")
+    if state.get("proceed_to_generate", False):
+        return "generate_answer"
+    if deadline.allows("web", deadline=state.get("deadline")):
+        return "websearch"
+    deadline.degrade("skip_websearch", state.get("deadline"))
+    return "best_documents"
@@ -9,4 +9,13 @@ class AgentState(TypedDict):
     enhanced_query: str
     proceed_to_generate: bool
     rephrase_count: int
-    question: HumanMessage
\ No newline at end of file
+    question: HumanMessage
+    # Native Kannada turns (utils/kannada_mode.py): request language, the query
+    # retrieval actually ran with, and the language generate_answer replied in
+    lang: str
+    retrieval_query: str
+    answer_lang: str
+    # Absolute end of the turn's budget (utils/deadline.py) and the retrieved
+    # documents to answer from when the budget rules out refine/websearch
+    deadline: float
+    best_documents: List[Document]
\ No newline at end of file
@@ -1,5 +1,4 @@
 from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from pinecone.grpc import PineconeGRPC as Pinecone
 from pinecone import ServerlessSpec
@@ -7,8 +6,12 @@ from langchain_pinecone import PineconeVectorStore
 
 import os
 from dotenv import load_dotenv
+from utils import ingestion_config
 load_dotenv()
 
+# Same chunking and embedding model as scripts/setup_database.py
+config = ingestion_config.load()
+
 
 PINECONE_API_KEY=os.environ.get('PINECONE_API_KEY')
 # GOOGLE_API_KEY=os.environ.get('GOOGLE_API_KEY')
@@ -25,7 +28,7 @@ extracted_data=load_pdf_file(data='Data/')
 
 #text splitting into chunks
 def text_split(extracted_data):
-    text_splitter=RecursiveCharacterTextSplitter(chunk_size=500,chunk_overlap=20)
+    text_splitter=RecursiveCharacterTextSplitter(chunk_size=config["chunk_size"],chunk_overlap=config["chunk_overlap"])
     text_chunks=text_splitter.split_documents(extracted_data)
     return text_chunks
 
@@ -36,7 +39,7 @@ text_chunks=text_split(extracted_data)
 #embedding models to convert to embeddings from the huggingface note the dimension of the vector model need in pinnecone
 #384 dimension vector
 def download_hugging_face_embeddings():
-    embeddings=HuggingFaceEmbeddings(model_name='sentence-transformers/all-MiniLM-L6-v2')
+    embeddings=ingestion_config.build_embeddings(config)
     return embeddings
 
 embeddings=download_hugging_face_embeddings()
@@ -1,19 +1,37 @@
 """
 AyurWell - Ayurvedic Health Assistant with Responsive Design
 """
-from flask import Flask, request, jsonify, render_template, send_file
+from flask import Flask, Request, request, jsonify, render_template, send_file, Response
+from werkzeug.exceptions import RequestEntityTooLarge
 from flask_cors import CORS
-from werkzeug.utils import secure_filename
 import os
-from utils.image_desc import describe_image
-from workflow.graph import build_workflow
+from utils.image_desc import describe_image_bytes, read_upload, ImageTooLarge, IMAGE_MAX_UPLOAD_BYTES
+from utils.image_cache import cache_stats as image_cache_stats
+from workflow.graph import build_workflows
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 import sys
-import requests
+import importlib
+import time
 import base64
 import io
+import json
+import queue
+import threading
 from dotenv import load_dotenv
 from edge_tts_helper import text_to_speech_edge # Use Edge TTS
+from gemini_tts_helper import text_to_speech_gemini, gemini_tts_available, GeminiTTSError
+from utils.tts_orchestrator import TTSOrchestrator, TTSProvider, TTSUnavailable, order_from_env
+from utils.http_clients import get_client, get_genai_client, pool_stats as http_pool_stats
+from utils.translation import translate_text, translate_reply
+from utils.admission import admit, limit, Overloaded, snapshot as admission_stats
+from utils.rate_limiter import snapshot as rate_limit_stats
+from utils import metrics as pipeline_metrics
+from utils import traffic_capture
+from utils.traffic_capture import captured
+from utils import answer_store, audio_cache, audio_format, deadline, kannada_mode, langdetect, load_control, tts_prefetch, web_cache
+from utils.admission import get_bulkhead
+from utils import batch_jobs, delivery, voice_session
+from workflow import batch
 
 try:
     # Optional dependency: google genai SDK for Gemini translation
@@ -23,6 +41,12 @@ except Exception:
     genai = None
     types = None
 
+try:
+    # Optional dependency: WebSocket voice sessions (/ws/voice)
+    from flask_sock import Sock
+except Exception:
+    Sock = None
+
 # Load .env automatically if present so GOOGLE_API_KEY and others are available to the app
 load_dotenv()
 
@@ -36,8 +60,20 @@ except Exception:
     # best-effort — continue if not supported
     pass
 
+class InMemoryUploadRequest(Request):
+    """Multipart file parts stay in memory instead of werkzeug's temp file for bodies over 500 KB."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
+
 app = Flask(__name__)
+app.request_class = InMemoryUploadRequest
+# Bodies are cut off while they stream in (413) past one image upload plus
+# room for the form fields, so no upload is read whole before it is refused
+app.config["MAX_CONTENT_LENGTH"] = int(os.getenv("MAX_CONTENT_LENGTH", str(IMAGE_MAX_UPLOAD_BYTES + 1024 * 1024)))
 CORS(app)
+delivery.init_app(app)
 # Compatibility shim: some versions of the google generative client don't accept
 # a `max_retries` kwarg while the langchain-google-genai adapter may pass it.
 # Patch GenerativeServiceClient.generate_content at runtime to silently drop
@@ -59,16 +95,17 @@ except Exception as _patch_e:
     app.logger.warning(f"Could not apply generative client patch: {_patch_e}")
 
 try:
-    chatbot = build_workflow()
+    # One compiled graph per load profile (utils/load_control.py), sharing conversation state
+    chatbots = build_workflows()
+    chatbot = chatbots["full"]
     print("Workflow built successfully")
 except Exception as e:
     print(f"Error building workflow: {e}")
+    chatbots = {}
     chatbot = None
 
-# Setup image upload path
-UPLOAD_FOLDER = 'uploads'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Stored FAQ answers need the corpus hashed first; do it off the request path
+answer_store.warm_up()
 
 
 @app.route("/")
@@ -81,10 +118,83 @@ def health_check():
     return jsonify({"status": "ok"})
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Per-process cache and pipeline counters (JSON)."""
+    return jsonify({
+        "pid": os.getpid(),
+        "image_cache": image_cache_stats(),
+        "http_clients": http_pool_stats(),
+        "tts": tts_orchestrator.snapshot(),
+        "admission": admission_stats(),
+        "rate_limits": rate_limit_stats(),
+        "pipeline": pipeline_metrics.snapshot(),
+        "answer_store": answer_store.snapshot(),
+        "audio_cache": audio_cache.snapshot(),
+        "web_cache": web_cache.snapshot(),
+        "langdetect": langdetect.estimated_savings(),
+        "load_control": load_control.snapshot(),
+        "tts_prefetch": tts_prefetcher.snapshot(),
+        "conversations": {"threads": chatbot.checkpointer.thread_count() if chatbot is not None else 0},
+    })
+
+
+@app.route('/admin/load-profile', methods=['GET', 'POST'])
+def admin_load_profile():
+    """
+    Shows the load controller, or pins a graph profile: POST {"profile": "full|lean|minimal|auto"}.
+    Needs the X-Admin-Token header when ADMIN_TOKEN is set; loopback clients only otherwise.
+    """
+    token = os.getenv("ADMIN_TOKEN")
+    if token:
+        if request.headers.get("X-Admin-Token") != token:
+            return jsonify({"error": "forbidden"}), 403
+    elif request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"error": "set ADMIN_TOKEN to manage the load profile remotely"}), 403
+    controller = load_control.get_controller()
+    if request.method == 'GET':
+        return jsonify(controller.snapshot())
+    profile = ((request.get_json(silent=True) or {}).get("profile") or "").strip().lower()
+    try:
+        state = controller.set_override(profile)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    app.logger.warning(f"Load profile set to {profile or 'auto'} by {request.remote_addr}")
+    return jsonify(state)
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    limit_mb = app.config["MAX_CONTENT_LENGTH"] // (1024 * 1024)
+    return jsonify({"reply": f"Image processing error: the upload exceeds the {limit_mb} MB limit",
+                    "error": "too_large"}), 413
+
+
+@app.errorhandler(Overloaded)
+def overloaded(e):
+    """Fail fast when a bulkhead is saturated so threads are not tied up waiting."""
+    app.logger.warning(f"Rejecting {request.path}: {e}")
+    response = jsonify({
+        "reply": "The assistant is busy right now. Please try again in a few seconds.",
+        "error": "overloaded",
+        "upstream": e.name,
+    })
+    response.status_code = 429
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response
+
+
 @app.route("/chat", methods=["POST"])
+@captured("chat")
+@admit("chat")
 def chat():
+    # End-to-end budget for the turn; the graph degrades as it runs out
+    turn_deadline = deadline.new()
     text_input = request.form.get("message", "").strip()
     lang = request.form.get("lang", "en").strip() or "en"
+    # Conversation thread for the graph checkpointer; clients that send no
+    # session_id share the legacy default thread
+    session_id = request.form.get("session_id", "").strip() or 3
     image_file = request.files.get("image")
     
     final_query = ""
@@ -92,29 +202,27 @@ def chat():
     # If image is provided
     if image_file:
         try:
-            filename = secure_filename(image_file.filename)
-            if not filename:
-                return jsonify({"reply": "Invalid filename. Please upload a valid image."})
-            
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            image_file.save(filepath)
-
-            image_result = describe_image(filepath)
-
-            # Clean up uploaded file after processing
+            # Read the upload in memory (bounded while streaming); nothing touches disk
             try:
-                os.remove(filepath)
-            except Exception:
-                pass
+                image_bytes = read_upload(image_file.stream)
+            except ImageTooLarge as too_large:
+                return jsonify({"reply": f"Image processing error: {too_large}"}), 413
+            if not image_bytes:
+                return jsonify({"reply": "Empty upload. Please upload a valid image."})
+
+            image_result = describe_image_bytes(image_bytes)
 
             if "description" in image_result:
                 final_query = image_result["description"]
+                app.logger.info(f"Image intake metrics: {image_result.get('metrics')}")
             else:
                 error_msg = image_result.get('error', 'Unknown error')
                 app.logger.error(f"Image processing failed: {error_msg}")
                 return jsonify({"reply": f"Image processing error: {error_msg}"})
         except Exception as img_error:
             app.logger.exception("Image upload/processing failed")
+            if isinstance(img_error, Overloaded):
+                raise
             return jsonify({"reply": f"Failed to process image: {str(img_error)}"})
     
     # If text is provided (use either or both)
@@ -124,79 +232,101 @@ def chat():
     if not final_query:
         return jsonify({"reply": "Please provide a question or an image."})
 
+    payload, profile = _answer_turn(final_query, text_input, lang, session_id, turn_deadline, has_image=bool(image_file))
+    if profile is not None:
+        # Speak-ready audio: synthesize the reply in the background while the user reads it
+        audio_id = tts_prefetcher.submit(audio_cache.strip_markdown(payload["reply"]), payload["lang"], profile=profile)
+        if audio_id:
+            payload["audio_id"] = audio_id
+    response = jsonify(payload)
+    if profile is not None:
+        response.headers["X-Graph-Profile"] = profile
+    return response
+
+
+def _answer_turn(final_query, text_input, lang, session_id, turn_deadline, has_image=False):
+    """
+    Answers one chat turn (shared by /chat and the /ws/voice session):
+    language detection, FAQ answers, KN<->EN translation and the graph run
+    under the turn's deadline and load profile. Returns (payload, profile);
+    profile is None when the graph did not produce the reply. Raises
+    Overloaded when a bulkhead sheds the turn.
+    """
+    # The client sends its UI language; what the user typed decides the turn
+    # (image descriptions are English, so only the typed text counts)
+    client_lang, source_lang = lang, 'kn'
+    if text_input:
+        lang, detected = langdetect.request_language(text_input, client_lang)
+        if lang != client_lang:
+            app.logger.info(f"/chat: client lang={client_lang}, detected {detected}; answering in {lang}")
+            pipeline_metrics.incr("langdetect.lang_overrides")
+            if client_lang == 'kn':
+                # Neither the question nor the reply needs translating
+                pipeline_metrics.incr("langdetect.calls_avoided", 2)
+        elif detected is not None and detected.lang == 'kn' and detected.script == 'latin':
+            # Kanglish is not Kannada script; let the translator detect it
+            source_lang = 'auto'
+
+    traffic_capture.annotate(
+        lang=lang,
+        session=traffic_capture.text_hash(session_id),
+        question=final_query,
+        question_hash=traffic_capture.text_hash(final_query),
+        has_image=has_image,
+    )
+
+    # Precomputed FAQ answers (scripts/precompute_faq.py) are served before the graph runs
+    if not has_image:
+        precomputed = _precomputed_reply(final_query, lang, session_id)
+        if precomputed is not None:
+            return precomputed, None
+
     if chatbot is None:
-        return jsonify({"reply": "Sorry, the chatbot is not properly initialized. Please check the configuration and try again later."})
+        return {"reply": "Sorry, the chatbot is not properly initialized. Please check the configuration and try again later."}, None
 
-    input_data = {"question": HumanMessage(content=final_query)}
     # If the incoming language is Kannada, translate it to English for retrieval
-    translator = None
+    # (KANNADA_MODE=native: the graph takes the Kannada question as is)
     translated_query = final_query
+    native = kannada_mode.native(lang)
     try:
         app.logger.info(f"/chat received. lang={lang}, original_query={final_query[:200]}")
-        # Prefer Google GenAI for translation if available
-        if lang == 'kn':
-            if genai is not None:
-                try:
-                    # use GenAI to translate Kannada -> English
-                    client = genai.Client(api_key=os.getenv('GOOGLE_GENAI_API_KEY') or os.getenv('GOOGLE_API_KEY'))
-                    prompt = f"Translate the following Kannada text to English, return only the translated text:\n\n{final_query}"
-                    resp = client.models.generate_content(model="text-bison-001", contents=prompt, config=types.GenerateContentConfig())
-                    # attempt to extract textual content from response
-                    translated_query = None
-                    try:
-                        cand = resp.candidates[0]
-                        # candidate.content may be a list of content blocks
-                        c0 = cand.content[0]
-                        if hasattr(c0, 'text') and c0.text:
-                            translated_query = c0.text
-                        else:
-                            # try parts
-                            if hasattr(c0, 'parts') and c0.parts:
-                                for p in c0.parts:
-                                    if hasattr(p, 'text') and p.text:
-                                        translated_query = p.text
-                                        break
-                    except Exception:
-                        translated_query = None
-                    if translated_query:
-                        app.logger.info(f"Translated KN->EN via GenAI: {translated_query[:200]}")
-                    else:
-                        app.logger.warning("GenAI translation returned no text, falling back to original query")
-                        translated_query = final_query
-                except Exception as te:
-                    app.logger.warning(f"GenAI KN->EN translation failed: {te}")
-                    translated_query = final_query
-            else:
-                # Fallback to deep_translator (safer) then googletrans if available
-                try:
-                    from deep_translator import GoogleTranslator
-                    translated_query = GoogleTranslator(source='auto', target='en').translate(final_query)
-                    app.logger.info(f"Translated KN->EN via deep_translator: {translated_query[:200]}")
-                except Exception as de:
-                    app.logger.debug(f"deep_translator KN->EN failed: {de}")
-                    try:
-                        from googletrans import Translator
-                        translator = Translator()
-                        translated_query = translator.translate(final_query, dest='en').text
-                        app.logger.info(f"Translated KN->EN via googletrans: {translated_query[:200]}")
-                    except Exception as te:
-                        app.logger.warning(f"Failed to translate KN->EN with googletrans: {te}")
-                        translated_query = final_query
-
-        # Call chatbot with the (possibly translated) query
-        input_data = {"question": HumanMessage(content=translated_query)}
-        result = chatbot.invoke(input=input_data, config={"configurable": {"thread_id": 3}})
+        if lang == 'kn' and native:
+            pipeline_metrics.incr("kannada.native_turns")
+        elif lang == 'kn':
+            with pipeline_metrics.timed("translate.kn_to_en"):
+                translated_query = translate_text(final_query, target='en', source=source_lang) or final_query
+            if not has_image and translated_query != final_query:
+                precomputed = _precomputed_reply(translated_query, lang, session_id)
+                if precomputed is not None:
+                    return precomputed, None
+
+        # Call chatbot with the (possibly translated) query; the graph's budget
+        # leaves time to translate the reply back
+        graph_deadline = turn_deadline - (deadline.REPLY_RESERVE_S if lang == 'kn' and not native else 0)
+        input_data = {"question": HumanMessage(content=translated_query), "lang": lang, "deadline": graph_deadline}
+        # Leaner graphs while the process is saturated
+        controller = load_control.get_controller()
+        profile = controller.profile()
+        result = chatbots.get(profile, chatbot).invoke(input=input_data, config={"configurable": {"thread_id": session_id}})
+        if traffic_capture.is_capturing():
+            traffic_capture.annotate(
+                enhanced_query=result.get("enhanced_query", ""),
+                on_topic=result.get("on_topic", ""),
+                rephrase_count=result.get("rephrase_count", 0),
+                docs=traffic_capture.describe_documents(result.get("documents")),
+                turn=sum(1 for m in result.get("messages", []) if isinstance(m, HumanMessage)),
+            )
+    except Overloaded:
+        load_control.get_controller().observe(failed=True)
+        raise
     except Exception as e:
-        # Log traceback and return a friendly fallback message
-        import traceback
+        # The traceback goes to the log only; clients get a friendly fallback message
         app.logger.exception("Chatbot workflow failed")
-        tb = traceback.format_exc()
-        # Return the exception details to help debugging (temporary)
-        return jsonify({
+        load_control.get_controller().observe(failed=True)
+        return {
             "reply": "Sorry, I'm having trouble answering right now. Please try again later.",
-            "error": str(e),
-            "trace": tb,
-        })
+            "error": type(e).__name__,
+        }, None
 
     # Safely extract reply
     try:
@@ -207,102 +337,224 @@ def chat():
     app.logger.info(f"Chatbot reply (pre-translate): {reply[:200]}")
 
     # If original request was Kannada, translate the reply back to Kannada before returning
-    if lang == 'kn':
-        # Prefer GenAI for translation back to Kannada
-        if genai is not None:
-            try:
-                client = genai.Client(api_key=os.getenv('GOOGLE_GENAI_API_KEY') or os.getenv('GOOGLE_API_KEY'))
-                prompt = f"Translate the following English text to Kannada. Return only the translated Kannada text:\n\n{reply}"
-                resp = client.models.generate_content(model="text-bison-001", contents=prompt, config=types.GenerateContentConfig())
-                translated_reply = None
-                try:
-                    cand = resp.candidates[0]
-                    c0 = cand.content[0]
-                    if hasattr(c0, 'text') and c0.text:
-                        translated_reply = c0.text
-                    else:
-                        if hasattr(c0, 'parts') and c0.parts:
-                            for p in c0.parts:
-                                if hasattr(p, 'text') and p.text:
-                                    translated_reply = p.text
-                                    break
-                except Exception:
-                    translated_reply = None
-                if translated_reply:
-                    app.logger.info(f"Translated EN->KN via GenAI: {translated_reply[:200]}")
-                    reply = translated_reply
-                else:
-                    app.logger.warning("GenAI EN->KN translation returned no text; keeping English reply")
-            except Exception as te:
-                app.logger.warning(f"GenAI EN->KN translation failed: {te}")
-                # fallback to deep_translator then googletrans
-                try:
-                    from deep_translator import GoogleTranslator
-                    translated_reply = GoogleTranslator(source='auto', target='kn').translate(reply)
-                    reply = translated_reply
-                    app.logger.info(f"Translated EN->KN via deep_translator: {translated_reply[:200]}")
-                except Exception as de:
-                    app.logger.debug(f"deep_translator EN->KN failed: {de}")
-                    try:
-                        from googletrans import Translator
-                        translator = Translator()
-                        translated_reply = translator.translate(reply, dest='kn').text
-                        reply = translated_reply
-                        app.logger.info(f"Translated EN->KN via googletrans: {translated_reply[:200]}")
-                    except Exception as e:
-                        app.logger.warning(f"googletrans EN->KN failed: {e}")
+    if lang == 'kn' and result.get("answer_lang") == lang:
+        # Answered directly in Kannada (KANNADA_MODE=native)
+        pipeline_metrics.incr("kannada.reply_translations_skipped")
+    elif lang == 'kn':
+        with pipeline_metrics.timed("translate.en_to_kn"):
+            # Sentences the graph already wrote in Kannada pass through
+            translated_reply = translate_reply(reply, target='kn', source='en')
+        if translated_reply:
+            reply = translated_reply
         else:
-            # genai not available: use deep_translator then googletrans if possible
+            app.logger.warning("EN->KN translation failed with every provider; keeping English reply")
+
+    left = deadline.remaining(turn_deadline)
+    pipeline_metrics.incr("deadline.turns")
+    if left < 0:
+        pipeline_metrics.incr("deadline.misses")
+        app.logger.warning(f"/chat finished {-left:.1f}s past its {deadline.REQUEST_DEADLINE_S:.0f}s deadline")
+    controller.observe(failed=left < 0)
+    traffic_capture.annotate(reply=reply, reply_chars=len(reply), deadline_left_s=round(left, 2), profile=profile)
+    return {"reply": reply, "lang": lang}, profile
+
+
+def _precomputed_reply(question, lang, session_id):
+    """
+    Payload for a stored FAQ answer in the requested language, or None.
+    The turn is still written to the conversation thread so follow-up
+    questions keep their context.
+    """
+    hit = answer_store.lookup(question, lang)
+    if hit is None:
+        return None
+    pipeline_metrics.incr("answer_store.hit")
+    traffic_capture.annotate(answer_source="answer_store", reply_chars=len(hit["answer"]))
+    app.logger.info(f"/chat served from answer store: {question[:100]}")
+    if chatbot is not None:
+        try:
+            config = {"configurable": {"thread_id": session_id}}
+            history = chatbot.get_state(config).values.get("messages") or []
+            turn = [HumanMessage(content=question), AIMessage(content=hit["answer"])]
+            chatbot.update_state(config, {"messages": history + turn}, as_node="generate_answer")
+        except Exception:
+            app.logger.exception("Could not record precomputed answer in conversation history")
+    return {"reply": hit["answer"], "lang": lang}
+
+
+# --- TTS providers -----------------------------------------------------------
+# Each provider is fn(text, lang, cancel_event, **options) -> (audio_bytes, mimetype).
+# The orchestrator races them per language (see utils/tts_orchestrator.py).
+EDGE_VOICES = {
+    'kn': "kn-IN-SapnaNeural",   # Kannada Female
+    'en': "en-IN-NeerjaNeural",  # Indian English Female (clear voice)
+}
+
+
+def _tts_edge(text, lang, cancel_event, voice=None, **_):
+    voice = voice or EDGE_VOICES.get(lang, EDGE_VOICES['en'])
+    return text_to_speech_edge(text, voice, cancel_event=cancel_event), 'audio/mpeg'
+
+
+def _tts_gemini(text, lang, cancel_event, gemini_voice='Kore', **_):
+    return audio_format.pcm_to_wav(text_to_speech_gemini(text, gemini_voice)), 'audio/wav'
+
+
+def _tts_libre(text, lang, cancel_event, **_):
+    # Free, open-source alternative via a public LibreTranslate instance (may be unstable).
+    # The API expects 'voice' in 'lang_code#speaker_id' format.
+    voice_id = 'kn#upen' if lang == 'kn' else 'en#ljspeech'
+    lt_resp = get_client('libretranslate_tts').post(
+        'https://lt.vern.cc/api/v1/tts',
+        json={'text': text, 'voice': voice_id},
+    )
+    if lt_resp.status_code != 200:
+        raise RuntimeError(f'LibreTranslate TTS failed with status {lt_resp.status_code}')
+    return lt_resp.content, 'audio/wav'
+
+
+def _tts_gtts(text, lang, cancel_event, humanize=True, phase='medium', **_):
+    import text_gtt
+    return text_gtt.text_to_speech_gtts(
+        text, lang=lang, humanize=humanize, phase=phase, cancel_event=cancel_event
+    ), 'audio/mpeg'
+
+
+tts_orchestrator = TTSOrchestrator(
+    [
+        TTSProvider('edge', _tts_edge),
+        TTSProvider('gemini', _tts_gemini, available=gemini_tts_available),
+        TTSProvider('libre', _tts_libre),
+        TTSProvider('gtts', _tts_gtts),
+    ],
+    order=order_from_env((os.getenv('PREFERRED_TTS') or '').strip().lower() or None),
+)
+
+# Background synthesis of /chat replies into the audio cache (utils/tts_prefetch.py)
+tts_prefetcher = tts_prefetch.Prefetcher(lambda text, lang: tts_orchestrator.synthesize(text, lang))
+
+
+def _requested_audio_format():
+    payload = request.get_json(force=True, silent=True) or {}
+    return request.args.get('format') or payload.get('format')
+
+
+def _stream_transcoded(bulkhead, audio_bytes, fmt, lang, text, fmt_variant):
+    """Streaming response for one ffmpeg transcode holding a bulkhead slot, or None if ffmpeg produced nothing."""
+    started = time.monotonic()
+    released = []
+
+    def release():
+        if not released:
+            released.append(True)
+            bulkhead.release(time.monotonic() - started)
+
+    out_mimetype, ext, _ = audio_format.FORMATS[fmt]
+    on_complete = (lambda out: audio_cache.put(text, lang, out, out_mimetype, fmt_variant)) if text else None
+    stream = audio_format.transcode_stream(audio_bytes, fmt, on_complete)
+    try:
+        # Wait for the first chunk so an undecodable source falls back to the original bytes
+        first = next(stream, None)
+    except Exception:
+        app.logger.exception(f'audio transcode to {fmt} failed')
+        first = None
+    if first is None:
+        release()
+        return None
+
+    def body():
+        try:
+            yield first
+            yield from stream
+        finally:
+            release()
+
+    response = Response(body(), mimetype=out_mimetype)
+    response.call_on_close(release)
+    response.headers['Content-Disposition'] = f'inline; filename=speech_{lang}.{ext}'
+    response.headers['Vary'] = 'Accept'
+    traffic_capture.annotate(audio_format=fmt)
+    return response
+
+
+def _send_audio(audio_bytes, mimetype, lang, text=None, variant=''):
+    """
+    Sends synthesized speech in the format negotiated from the Accept header
+    or a "format" parameter (see utils/audio_format.py). Transcoded output is
+    streamed while ffmpeg encodes it and cached under text/lang/variant.
+    """
+    fmt = audio_format.negotiate(request.headers.get('Accept'), _requested_audio_format())
+    if audio_format.needs_transcode(fmt, mimetype, audio_bytes):
+        fmt_variant = audio_format.cache_variant(variant, fmt)
+        cached = audio_cache.get(text, lang, fmt_variant) if text else None
+        if cached is not None:
+            audio_bytes, mimetype = cached
+        else:
+            # Encoders are CPU-bound: past the transcode bulkhead, send the original instead of queueing
+            bulkhead = get_bulkhead('transcode')
             try:
-                from deep_translator import GoogleTranslator
-                translated_reply = GoogleTranslator(source='auto', target='kn').translate(reply)
-                reply = translated_reply
-                app.logger.info(f"Translated EN->KN via deep_translator: {translated_reply[:200]}")
-            except Exception as de:
-                app.logger.debug(f"deep_translator EN->KN failed: {de}")
-                try:
-                    from googletrans import Translator
-                    translator = Translator()
-                    translated_reply = translator.translate(reply, dest='kn').text
-                    reply = translated_reply
-                    app.logger.info(f"Translated EN->KN via googletrans: {translated_reply[:200]}")
-                except Exception as e:
-                    app.logger.warning(f"googletrans EN->KN failed: {e}")
-
-    return jsonify({"reply": reply})
+                bulkhead.acquire(timeout=0)
+            except Overloaded:
+                pipeline_metrics.incr('audio.transcode.skipped_overloaded')
+            else:
+                response = _stream_transcoded(bulkhead, audio_bytes, fmt, lang, text, fmt_variant)
+                if response is not None:
+                    return response
+    ext = audio_cache.EXTENSIONS.get(mimetype, 'mp3')
+    response = send_file(io.BytesIO(audio_bytes), mimetype=mimetype, as_attachment=False, download_name=f'speech_{lang}.{ext}')
+    response.headers['Vary'] = 'Accept'
+    return response
 
 
 @app.route('/tts', methods=['POST'])
+@captured("tts")
+@admit("tts")
 def tts_edge():
     """
-    Unified TTS endpoint using gTTS for English and Edge TTS for Kannada.
-    Accepts JSON: {"text": "...", "lang": "en|kn"}
-    Returns audio/mpeg MP3 bytes.
+    Unified TTS endpoint. Edge TTS is preferred for both English and Kannada;
+    the orchestrator hedges to the next provider if Edge is slow or failing.
+    Accepts JSON: {"text": "...", "lang": "en|kn"}, optionally with the
+    "audio_id" /chat returned (text may then be omitted): a reply synthesized
+    in the background is served from the cache or as soon as it finishes.
+    Returns audio bytes (audio/mpeg for Edge/gTTS), or Opus/WebM, Opus/Ogg,
+    32 kbps MP3 or WAV when asked for via Accept or {"format": "opus|ogg|mp3|wav"}.
     """
     payload = request.get_json(force=True, silent=True) or {}
     text = payload.get('text') or payload.get('message')
     lang = (payload.get('lang') or 'en').strip().lower()
+    audio_id = payload.get('audio_id')
 
+    if not text and audio_id:
+        prefetched = tts_prefetcher.lookup(audio_id)
+        if prefetched is None:
+            return jsonify({'error': 'Unknown or expired audio_id; send the text instead.'}), 404
+        text, lang = prefetched
     if not text:
         return jsonify({'error': 'No text provided.'}), 400
 
-    # Define voices using Edge TTS for both languages
-    if lang == 'kn':
-        voice = "kn-IN-SapnaNeural"  # Kannada Female
-    else:
-        voice = "en-IN-NeerjaNeural"   # Indian English Female (clear voice)
+    app.logger.info(f"Generating TTS for lang='{lang}' with voice='{EDGE_VOICES.get(lang, EDGE_VOICES['en'])}'")
+    traffic_capture.annotate(lang=lang, text=text, text_hash=traffic_capture.text_hash(text), text_chars=len(text))
+
+    # Waits for the reply's background synthesis when it is still running
+    prefetched = tts_prefetcher.fetch(text, lang)
+    if prefetched is not None:
+        traffic_capture.annotate(provider="prefetch", audio_bytes=len(prefetched[0]), mimetype=prefetched[1])
+        return _send_audio(prefetched[0], prefetched[1], lang, text)
 
-    app.logger.info(f"Generating TTS for lang='{lang}' with voice='{voice}'")
+    cached = audio_cache.get(text, lang)
+    if cached is not None:
+        traffic_capture.annotate(provider="cache", audio_bytes=len(cached[0]), mimetype=cached[1])
+        return _send_audio(cached[0], cached[1], lang, text)
 
     try:
-        # Use Edge TTS for both English and Kannada
-        audio_bytes = text_to_speech_edge(text, voice)
-        return send_file(
-            io.BytesIO(audio_bytes),
-            mimetype='audio/mpeg',
-            as_attachment=False,
-            download_name=f'speech_{lang}.mp3'
-        )
+        audio_bytes, mimetype, provider = tts_orchestrator.synthesize(text, lang)
+        app.logger.info(f"TTS served by provider '{provider}'")
+        traffic_capture.annotate(provider=provider, audio_bytes=len(audio_bytes), mimetype=mimetype)
+        audio_cache.put(text, lang, audio_bytes, mimetype)
+        return _send_audio(audio_bytes, mimetype, lang, text)
+    except TTSUnavailable as e:
+        app.logger.error(f'TTS generation failed: {e}')
+        return jsonify({'error': 'TTS generation failed', 'details': str(e)}), 502
     except Exception as e:
         app.logger.exception('Edge TTS generation failed')
         return jsonify({'error': 'Edge TTS generation failed', 'details': str(e)}), 500
@@ -310,6 +562,192 @@ def tts_edge():
 
 
 
+# --- Voice sessions ----------------------------------------------------------
+# One WebSocket per user carrying progress, answer tokens and per-sentence
+# audio for each turn (protocol in utils/voice_session.py). Every session
+# holds a gunicorn thread for its lifetime, so run with enough --threads and
+# keep ADMISSION_VOICE_LIMIT below them.
+
+def _forget_thread(session_id):
+    """Drops a finished conversation from the checkpointer shared by every graph profile."""
+    if chatbot is None:
+        return
+    try:
+        chatbot.checkpointer.delete_thread(session_id)
+    except Exception:
+        app.logger.exception(f"Could not delete conversation thread {session_id}")
+
+
+def _voice_answer(text, image_b64, lang, session_id):
+    """One /ws/voice turn through the /chat pipeline; the turn takes a "chat" slot like POST /chat."""
+    with limit("chat"):
+        turn_deadline = deadline.new()
+        final_query = ""
+        if image_b64:
+            try:
+                image_bytes = read_upload(io.BytesIO(base64.b64decode(image_b64)))
+            except ImageTooLarge as too_large:
+                return {"reply": f"Image processing error: {too_large}"}, None
+            except ValueError:
+                return {"reply": "Invalid image data."}, None
+            image_result = describe_image_bytes(image_bytes)
+            if "description" not in image_result:
+                return {"reply": f"Image processing error: {image_result.get('error', 'Unknown error')}"}, None
+            final_query = image_result["description"]
+        if text:
+            final_query = f"{text}. " + final_query if final_query else text
+        if not final_query:
+            return {"reply": "Please provide a question or an image."}, None
+        return _answer_turn(final_query, text, lang, session_id, turn_deadline, has_image=bool(image_b64))
+
+
+if Sock is not None:
+    sock = Sock(app)
+
+    @sock.route('/ws/voice')
+    def ws_voice(ws):
+        """
+        Full-duplex voice chat. The conversation thread is issued by the server
+        (sent in "ready") and lives as long as the socket: a client cannot
+        attach to another user's thread, and closed sessions leave nothing in
+        the checkpointer.
+        """
+        bulkhead = get_bulkhead("voice")
+        try:
+            bulkhead.acquire(timeout=0)
+        except Overloaded as e:
+            ws.send(json.dumps({"type": "error", "error": "overloaded", "retry_after": e.retry_after}))
+            return
+        started = time.monotonic()
+        session_id = f"ws-{os.urandom(12).hex()}"
+        try:
+            synthesize = lambda text, lang: tts_orchestrator.synthesize(text, lang)
+            voice_session.VoiceSession(ws, _voice_answer, synthesize, session_id).run()
+        finally:
+            _forget_thread(session_id)
+            bulkhead.release(time.monotonic() - started)
+else:
+    app.logger.warning("flask-sock not installed; /ws/voice is disabled")
+
+
+# --- Batch answering -----------------------------------------------------------
+# Partner integrations post many questions at once; they run stage by stage
+# through the full graph (workflow/batch.py) on one "batch" slot per worker,
+# next to interactive traffic. Results stream back as NDJSON, or are kept in
+# the job store (utils/batch_jobs.py) for polling.
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
+
+
+def _batch_authorized():
+    """X-Batch-Token must match BATCH_API_TOKEN when set; loopback clients only otherwise."""
+    token = os.getenv("BATCH_API_TOKEN")
+    if token:
+        return request.headers.get("X-Batch-Token") == token
+    return request.remote_addr in ("127.0.0.1", "::1")
+
+
+def _start_batch(items, on_result, on_done):
+    """Runs items in a background thread holding a "batch" slot (raises Overloaded when none is free)."""
+    bulkhead = get_bulkhead("batch")
+    bulkhead.acquire(timeout=0)
+    started = time.monotonic()
+    try:
+        # Same load profile as /chat would use right now
+        profile = load_control.get_controller().profile()
+        run = batch.BatchRun(items, on_result, graph=chatbots.get(profile, chatbot), profile=profile)
+
+        def worker():
+            summary = dict(run.summary, error="internal")
+            try:
+                summary = run.run()
+            except Exception:
+                app.logger.exception("Batch run failed")
+            finally:
+                bulkhead.release(time.monotonic() - started)
+                on_done(summary)
+
+        threading.Thread(target=worker, name="batch-run", daemon=True).start()
+    except BaseException:
+        # The worker never started, so nothing else will free the slot
+        bulkhead.release(time.monotonic() - started)
+        raise
+    return run
+
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """
+    POST {"questions": [{"id", "text", "lang", "session_id"} | "text", ...], "mode": "stream" | "job"}.
+    stream (default): NDJSON, one {"type": "result"} line per question as it
+    finishes and a final {"type": "summary"} line. job: 202 with a job_id to
+    poll at GET /chat/batch/<job_id>.
+    """
+    if not _batch_authorized():
+        return jsonify({"error": "forbidden"}), 403
+    if chatbot is None:
+        return jsonify({"error": "the chatbot is not initialized"}), 503
+    body = request.get_json(silent=True) or {}
+    raw = body.get("questions")
+    if not isinstance(raw, list) or not raw:
+        return jsonify({"error": "questions must be a non-empty list"}), 400
+    if len(raw) > BATCH_MAX_QUESTIONS:
+        return jsonify({"error": f"at most {BATCH_MAX_QUESTIONS} questions per batch"}), 413
+    items, invalid = batch.parse_questions(raw)
+    rejected = [{"index": i, "id": raw[i].get("id") if isinstance(raw[i], dict) else None, "error": "no question text"}
+                for i in invalid]
+    app.logger.info(f"/chat/batch: {len(items)} questions ({len(invalid)} invalid) from {request.remote_addr}")
+
+    if (body.get("mode") or "stream") == "job":
+        store = batch_jobs.get_store()
+        job_id = store.create(len(raw))
+        for result in rejected:
+            store.add_result(job_id, result)
+        try:
+            _start_batch(items, lambda result: store.add_result(job_id, result),
+                         lambda summary: store.finish(job_id, dict(summary, invalid=len(invalid))))
+        except Overloaded:
+            store.finish(job_id, {"error": "overloaded"}, status="rejected")
+            raise
+        except Exception:
+            store.finish(job_id, {"error": "internal"}, status="failed")
+            raise
+        return jsonify({"job_id": job_id, "status_url": f"/chat/batch/{job_id}", "total": len(raw)}), 202
+
+    results = queue.Queue()
+    run = _start_batch(items, lambda result: results.put(("result", result)),
+                       lambda summary: results.put(("summary", dict(summary, invalid=len(invalid)))))
+
+    def stream():
+        try:
+            for result in rejected:
+                yield json.dumps(dict(result, type="result"), ensure_ascii=False) + "\n"
+            while True:
+                kind, data = results.get()
+                yield json.dumps(dict(data, type=kind), ensure_ascii=False) + "\n"
+                if kind == "summary":
+                    return
+        finally:
+            # Client went away: questions not yet started are dropped
+            run.cancelled.set()
+
+    return Response(stream(), mimetype="application/x-ndjson")
+
+
+@app.route('/chat/batch/<job_id>', methods=['GET'])
+def chat_batch_job(job_id):
+    """Job status and results from position ?after=N (pass back "next" to continue)."""
+    if not _batch_authorized():
+        return jsonify({"error": "forbidden"}), 403
+    try:
+        after = max(0, int(request.args.get("after", 0)))
+    except ValueError:
+        return jsonify({"error": "after must be an integer"}), 400
+    job = batch_jobs.get_store().get(job_id, after=after)
+    if job is None:
+        return jsonify({"error": "unknown or expired job"}), 404
+    return jsonify(job)
+
+
 # All old TTS endpoints have been removed and replaced by the new /tts endpoint above.
 
 if __name__ == "__main__":
@@ -325,97 +763,49 @@ if __name__ == "__main__":
 
 
 @app.route('/tts_local', methods=['POST'])
+@captured("tts_local")
+@admit("tts")
 def tts_local():
-    """Local server-side TTS using gTTS for multilingual output (MP3).
-    Accepts JSON: {"text": "...", "lang": "en"}
-    Returns audio/mpeg MP3 bytes.
+    """Server-side TTS with hedged provider selection (Edge, Gemini, gTTS, LibreTranslate).
+    Accepts JSON: {"text": "...", "lang": "en", "phase": "medium", "humanize": true}
+    Provider order per language comes from TTS_ORDER_EN / TTS_ORDER_KN;
+    PREFERRED_TTS moves one provider to the front.
+    Returns audio/mpeg or audio/wav bytes depending on the winning provider.
     """
     payload = request.get_json(force=True, silent=True) or {}
     text = payload.get('text') or payload.get('message')
     lang = (payload.get('lang') or 'en').strip()
     if not text:
         return jsonify({'error': 'No text provided.'}), 400
-    # Allow explicit override of backend via env var PREFERRED_TTS: 'gemini'|'google'|'gtts'
-    preferred = (os.getenv('PREFERRED_TTS') or '').strip().lower()
 
     # Optional tuning parameters for gTTS post-processing
     phase = (payload.get('phase') or payload.get('pace') or 'medium').strip().lower()
     humanize = bool(payload.get('humanize', True))
+    traffic_capture.annotate(lang=lang, text=text, text_hash=traffic_capture.text_hash(text), text_chars=len(text),
+                             phase=phase, humanize=humanize)
 
-    # Helper: decide whether to try Gemini
-    def _can_use_gemini():
-        return genai is not None and types is not None and (os.getenv('GOOGLE_GENAI_API_KEY') or os.getenv('GOOGLE_API_KEY'))
+    variant = f"local-{phase}-{int(humanize)}"
+    cached = audio_cache.get(text, lang, variant)
+    if cached is not None:
+        traffic_capture.annotate(provider="cache", audio_bytes=len(cached[0]), mimetype=cached[1])
+        return _send_audio(cached[0], cached[1], lang, text, variant)
 
     try:
-        # 1) If user explicitly requested gTTS, skip cloud providers
-        if preferred == 'gtts':
-            app.logger.info('PREFERRED_TTS=gtts — using gTTS fallback')
-        else:
-            # 2) If preferred is 'gemini', try Gemini first (may fail if no credentials)
-            if preferred == 'gemini' and _can_use_gemini():
-                app.logger.info('PREFERRED_TTS=gemini — using Gemini TTS')
-                return tts_gemini()
-
-            # 3) If Gemini is available (and not explicitly disabled), use it
-            if preferred != 'gtts' and _can_use_gemini():
-                app.logger.info('Using Gemini TTS (genai) for high-quality speech')
-                return tts_gemini()
-
-            # 4) If user explicitly requested Google Cloud TTS, try it
-            if preferred == 'google' and os.getenv('GOOGLE_API_KEY'):
-                app.logger.info('PREFERRED_TTS=google — using Google Cloud TTS')
-                return tts()
-
-            # 5) Next preference: Google Cloud Text-to-Speech via REST (requires GOOGLE_API_KEY)
-            if preferred != 'gtts' and os.getenv('GOOGLE_API_KEY'):
-                app.logger.info('Using Google Cloud Text-to-Speech for speech')
-                return tts()
-
-            # 5.5) Next, try a free, open-source alternative via a public LibreTranslate instance
-            if preferred not in ['gtts', 'google', 'gemini']:
-                app.logger.info('Attempting free TTS via public LibreTranslate instance.')
-                try:
-                    # This public instance might be unstable.
-                    lt_tts_url = 'https://lt.vern.cc/api/v1/tts'
-                    # The API expects 'voice' in 'lang_code#speaker_id' format.
-                    voice_id = 'kn#upen' if lang == 'kn' else 'en#ljspeech'
-                    
-                    lt_resp = requests.post(
-                        lt_tts_url,
-                        json={'text': text, 'voice': voice_id},
-                        timeout=25,
-                        stream=True
-                    )
-
-                    if lt_resp.status_code == 200:
-                        app.logger.info(f'Successfully streaming audio from LibreTranslate TTS with voice {voice_id}.')
-                        # Stream the response directly to the client.
-                        return send_file(io.BytesIO(lt_resp.content), mimetype='audio/wav', as_attachment=False, download_name=f'speech_{lang}.wav')
-                    else:
-                        app.logger.warning(f'LibreTranslate TTS failed with status {lt_resp.status_code}. Falling back.')
-                except Exception as lt_e:
-                    app.logger.warning(f'LibreTranslate TTS request failed: {lt_e}. Falling back.')
-
-        # 6) Fallback: gTTS (uses Google Translate TTS endpoints) — works for Kannada and English
-        app.logger.info('Falling back to gTTS for speech synthesis.')
-        try:
-            text_gtt = importlib.import_module('text_gtt')
-        except Exception as e:
-            app.logger.exception('Could not import text_gtt module')
-            return jsonify({'error': 'Server misconfiguration: text_gtt module not found', 'details': str(e)}), 500
-
-        try:
-            mp3_bytes = text_gtt.text_to_speech_gtts(text, lang=lang, humanize=humanize, phase=phase)
-            return send_file(io.BytesIO(mp3_bytes), mimetype='audio/mpeg', as_attachment=False, download_name=f'speech_{lang}.mp3')
-        except Exception as e:
-            app.logger.exception('gTTS generation failed in tts_local')
-            return jsonify({'error': 'gTTS generation failed', 'details': str(e)}), 500
+        audio_bytes, mimetype, provider = tts_orchestrator.synthesize(text, lang, humanize=humanize, phase=phase)
+        app.logger.info(f"tts_local served by provider '{provider}'")
+        traffic_capture.annotate(provider=provider, audio_bytes=len(audio_bytes), mimetype=mimetype)
+        audio_cache.put(text, lang, audio_bytes, mimetype, variant)
+        return _send_audio(audio_bytes, mimetype, lang, text, variant)
+    except TTSUnavailable as e:
+        app.logger.error(f'tts_local: {e}')
+        return jsonify({'error': 'TTS generation failed', 'details': str(e)}), 502
     except Exception as e:
         app.logger.exception('tts_local routing failed')
         return jsonify({'error': 'tts_local routing failed', 'details': str(e)}), 500
 
 
 @app.route('/tts_gtts', methods=['POST'])
+@admit("tts")
 def tts_gtts():
     """Generate MP3 using gTTS. Accepts JSON: {"text": "...", "lang": "en"}
     Returns audio/mpeg binary on success.
@@ -435,13 +825,14 @@ def tts_gtts():
 
     try:
         mp3_bytes = text_gtt.text_to_speech_gtts(text, lang=lang)
-        return send_file(io.BytesIO(mp3_bytes), mimetype='audio/mpeg', as_attachment=False, download_name=f'speech_{lang}.mp3')
+        return _send_audio(mp3_bytes, 'audio/mpeg', lang)
     except Exception as e:
         app.logger.exception('gTTS generation failed')
         return jsonify({'error': 'gTTS generation failed', 'details': str(e)}), 500
 
 
 @app.route('/tts_gemini', methods=['POST'])
+@admit("tts")
 def tts_gemini():
     """Generate speech using Google Gemini TTS (generative models).
     Expects JSON: {"text": "...", "voice": "Kore" (optional)}
@@ -451,8 +842,7 @@ def tts_gemini():
     if genai is None or types is None:
         return jsonify({'error': 'google-genai SDK not installed on server.'}), 500
 
-    api_key = os.getenv('GOOGLE_GENAI_API_KEY') or os.getenv('GOOGLE_API_KEY')
-    if not api_key:
+    if get_genai_client() is None:
         return jsonify({'error': 'Google GenAI API key not configured on server.'}), 400
 
     payload = request.get_json(force=True, silent=True) or {}
@@ -462,58 +852,11 @@ def tts_gemini():
         return jsonify({'error': 'No text provided.'}), 400
 
     try:
-        # Initialize client with explicit api_key so it doesn't rely on application-default creds
-        client = genai.Client(api_key=api_key)
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-preview-tts",
-            contents=text,
-            config=types.GenerateContentConfig(
-                response_modalities=["AUDIO"],
-                speech_config=types.SpeechConfig(
-                    voice_config=types.VoiceConfig(
-                        prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                            voice_name=voice_name,
-                        )
-                    )
-                ),
-            )
-        )
-
-        # The SDK stores the audio bytes in the candidate content parts inline_data
-        candidate = None
-        if hasattr(response, 'candidates') and response.candidates:
-            candidate = response.candidates[0]
-        if not candidate:
-            return jsonify({'error': 'No audio candidate returned.'}), 502
-
-        # Drill into the content parts for inline_data
-        try:
-            part = candidate.content.parts[0]
-            data = part.inline_data.data
-        except Exception:
-            # Fallback: try to read .content[0] or similar shapes
-            data = None
-
-        if data is None:
-            return jsonify({'error': 'No inline audio data found in provider response.'}), 502
-
-        # If the SDK returns a base64 string, decode it; if bytes, use directly
-        audio_bytes = None
-        if isinstance(data, (bytes, bytearray)):
-            audio_bytes = bytes(data)
-        else:
-            # assume base64-encoded string
-            try:
-                import base64 as _base64
-                audio_bytes = _base64.b64decode(data)
-            except Exception:
-                # as last resort, try to convert str->bytes
-                try:
-                    audio_bytes = str(data).encode('utf-8')
-                except Exception:
-                    return jsonify({'error': 'Could not decode audio data'}), 502
-
-        return send_file(io.BytesIO(audio_bytes), mimetype='audio/wav', as_attachment=False, download_name='speech.wav')
+        audio_bytes = audio_format.pcm_to_wav(text_to_speech_gemini(text, voice_name))
+        return _send_audio(audio_bytes, 'audio/wav', (payload.get('lang') or 'en').strip())
+    except GeminiTTSError as e:
+        app.logger.warning(f'Gemini TTS returned no audio: {e}')
+        return jsonify({'error': str(e)}), 502
     except Exception as e:
         app.logger.exception('Gemini TTS request failed')
         return jsonify({'error': 'Gemini TTS request failed', 'details': str(e)}), 500
@@ -575,6 +918,7 @@ def tts_check():
 
 
 @app.route('/translate', methods=['POST'])
+@captured("translate")
 def translate():
     """Simple server-side proxy to LibreTranslate for client-side translation.
     Expects JSON: {"text": "...", "target": "kn"}
@@ -585,11 +929,12 @@ def translate():
     target = payload.get('target', 'kn')
     if not text:
         return jsonify({'error': 'No text provided.'}), 400
+    traffic_capture.annotate(lang=target, text=text, text_hash=traffic_capture.text_hash(text), text_chars=len(text))
     # LibreTranslate public instance (rate-limited). If you have another translator, replace this.
     try:
         lt_url = 'https://libretranslate.de/translate'
         body = {'q': text, 'source': 'en', 'target': target, 'format': 'text'}
-        r = requests.post(lt_url, data=body, timeout=15)
+        r = get_client('libretranslate').post(lt_url, data=body)
         if r.status_code != 200:
             app.logger.error(f'LibreTranslate failed: {r.status_code} {r.text}')
             return jsonify({'error': 'Translation provider error', 'details': r.text}), 502
@@ -0,0 +1,344 @@
+"""
+Deterministic local stand-ins for every upstream provider the app talks to:
+Gemini (chat, structured output, translation), Pinecone retrieval, Tavily,
+Groq vision and Edge TTS. Each fake sleeps according to a configurable
+latency distribution so the real Flask app and LangGraph workflow can be
+load-tested offline.
+
+Latency specs:  fixed:<s> | uniform:<lo>:<hi> | lognormal:<p50>:<p95>
+"""
+import math
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+
+DEFAULT_LATENCY = {
+    "llm": "lognormal:0.6:1.8",        # enhance / classify / refine / generate
+    "llm_grade": "lognormal:0.3:0.8",  # one grader call per retrieved document
+    "retriever": "lognormal:0.25:0.6", # embeddings + Pinecone query
+    "tavily": "lognormal:1.2:3.0",
+    "groq": "lognormal:1.0:2.5",
+    "edge_tts": "lognormal:0.8:2.0",
+    "translate": "lognormal:0.5:1.2",
+}
+# Delay between streamed answer words after the "llm" time to first token
+# (0 keeps invoke() timings comparable with earlier benchmark results)
+TOKEN_INTERVAL_S = 0.0
+
+CORPUS = {
+    "cold": "For common cold (Pratishyaya), Ayurveda recommends Tulsi and ginger tea with honey to pacify Kapha.",
+    "cough": "Dry cough is linked to Vata; licorice (Yashtimadhu) with warm water soothes the throat.",
+    "acidity": "Acidity (Amlapitta) is a Pitta disorder; amla powder and cold milk in the evening reduce burning.",
+    "diabetes": "Madhumeha is managed with bitter gourd, fenugreek seeds soaked overnight and regular walking.",
+    "hair": "Hair fall is treated with Bhringraj oil massage and a Pitta-pacifying diet rich in amla.",
+    "joint": "Joint pain (Sandhivata) responds to warm sesame oil massage, turmeric milk and Guggulu preparations.",
+    "sleep": "For insomnia, Ashwagandha with warm milk and a fixed bedtime routine (Dinacharya) calm Vata.",
+    "digestion": "Triphala at bedtime and cumin-coriander-fennel tea improve Agni and digestion.",
+}
+
+
+class Latency:
+    """Samples delays from a latency spec string."""
+
+    def __init__(self, spec, seed=None):
+        self.spec = spec
+        parts = spec.split(":")
+        self.kind = parts[0]
+        self.args = [float(x) for x in parts[1:]]
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        if self.kind == "lognormal":
+            p50, p95 = self.args
+            self._mu = math.log(p50)
+            self._sigma = max(1e-6, (math.log(p95) - math.log(p50)) / 1.645)
+
+    def sample(self):
+        with self._lock:
+            if self.kind == "fixed":
+                return self.args[0]
+            if self.kind == "uniform":
+                return self._rng.uniform(*self.args)
+            if self.kind == "lognormal":
+                return self._rng.lognormvariate(self._mu, self._sigma)
+        raise ValueError(f"unknown latency spec {self.spec}")
+
+    def sleep(self, scale=1.0):
+        time.sleep(self.sample() * scale)
+
+
+def _text_of(value):
+    if hasattr(value, "to_string"):
+        return value.to_string()
+    if isinstance(value, list):
+        return "\n".join(getattr(m, "content", str(m)) for m in value)
+    return str(value)
+
+
+def _last_human_line(text):
+    for marker in ("Human:", "User question:", "Original question:"):
+        if marker in text:
+            text = text.rsplit(marker, 1)[1]
+    return text.strip().splitlines()[0].strip() if text.strip() else text
+
+
+class FakeChatModel:
+    """Gemini stand-in supporting invoke(), with_structured_output() and use inside rag_chain."""
+
+    GREETINGS = ("hello", "hi ", "hey", "good morning", "namaskara")
+    OFF_TOPIC = ("cricket", "movie", "weather", "stock", "football")
+
+    def __init__(self, latency, grade_latency, grade_yes_rate=0.6, seed=0, web_grade_yes_rate=None):
+        self.latency = latency
+        self.grade_latency = grade_latency
+        self.grade_yes_rate = grade_yes_rate
+        # Grader pass rate for FakeTavily results (default: same as corpus documents)
+        self.web_grade_yes_rate = grade_yes_rate if web_grade_yes_rate is None else web_grade_yes_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt, config=None, **kwargs):
+        from langchain_core.messages import AIMessage
+
+        self.latency.sleep()
+        return AIMessage(content=_last_human_line(_text_of(prompt)))
+
+    def with_structured_output(self, schema, **kwargs):
+        from langchain_core.runnables import RunnableLambda
+
+        def structured(value):
+            text = _text_of(value)
+            if schema.__name__ == "GradeDocument":
+                self.grade_latency.sleep()
+                rate = self.web_grade_yes_rate if "Web result" in text else self.grade_yes_rate
+                with self._lock:
+                    yes = self._rng.random() < rate
+                return schema(score="Yes" if yes else "No")
+            self.latency.sleep(0.5)
+            question = _last_human_line(text).lower()
+            if any(g in question + " " for g in self.GREETINGS):
+                return schema(score="greeting")
+            if any(o in question for o in self.OFF_TOPIC):
+                return schema(score="No")
+            return schema(score="Yes")
+
+        return RunnableLambda(structured)
+
+    def answer_runnable(self):
+        """
+        Stand-in for the model half of `rag_prompt | llm`. stream() yields the
+        answer word by word after the sampled time to first token, like Gemini.
+        """
+        from langchain_core.messages import AIMessageChunk
+        from langchain_core.runnables import RunnableGenerator
+
+        def answer(prompt_values):
+            for prompt_value in prompt_values:
+                self.latency.sleep()
+                for word in re.findall(r"\S+\s*", _answer_text(prompt_value)):
+                    time.sleep(TOKEN_INTERVAL_S)
+                    yield AIMessageChunk(content=word)
+
+        return RunnableGenerator(answer)
+
+
+def _answer_text(prompt_value):
+    """Canned answer built from CORPUS for the question in a rag_prompt(_kn) prompt."""
+    text = _text_of(prompt_value)
+    question = text.rsplit("Question:", 1)[-1].strip().splitlines()[0] if "Question:" in text else ""
+    body = " ".join(sentence for key, sentence in CORPUS.items() if key in question.lower()) or CORPUS["digestion"]
+    answer = (
+        f"According to Ayurveda, {question.rstrip('?')} relates to a dosha imbalance. {body} "
+        "Follow a warm, freshly cooked diet, keep a regular Dinacharya and consult an Ayurvedic physician "
+        "if symptoms persist."
+    )
+    # rag_prompt_kn: tagged like the fake translation so replies show which path wrote them
+    return f"[kn] {answer}" if "Respond in Kannada" in text else answer
+
+
+class FakeRetriever:
+    def __init__(self, latency, k=5):
+        self.latency = latency
+        self.k = k
+
+    def invoke(self, query, config=None, **kwargs):
+        from langchain_core.documents import Document
+
+        self.latency.sleep()
+        q = str(query).lower()
+        ranked = sorted(CORPUS.items(), key=lambda kv: kv[0] not in q)
+        return [
+            Document(page_content=text, metadata={"source": f"Data/fake_{key}.pdf", "page": i})
+            for i, (key, text) in enumerate(ranked[: self.k])
+        ]
+
+
+class FakeTavily:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def invoke(self, payload, config=None, **kwargs):
+        self.latency.sleep()
+        query = payload.get("query", "") if isinstance(payload, dict) else str(payload)
+        return [
+            {"url": f"https://example.org/ayurveda/{i}", "content": f"Web result {i} for {query}: {CORPUS['digestion']}"}
+            for i in range(3)
+        ]
+
+
+class FakeVectorStore:
+    """In-memory stand-in for the Pinecone websearch namespace (same-query match, metadata $gt filter)."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.docs = {}
+
+    def add_documents(self, documents, ids=None, **kwargs):
+        self.latency.sleep()
+        ids = ids or [str(len(self.docs) + i) for i in range(len(documents))]
+        self.docs.update(zip(ids, documents))
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        for i in ids or []:
+            self.docs.pop(i, None)
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        from utils.web_cache import query_hash
+
+        self.latency.sleep()
+        matches = []
+        for doc in self.docs.values():
+            if any(doc.metadata.get(field, 0) <= cond.get("$gt", float("-inf")) for field, cond in (filter or {}).items()):
+                continue
+            # Stands in for embedding similarity: documents fetched for the same normalized query
+            if doc.metadata.get("query_hash") == query_hash(query):
+                matches.append(doc)
+        return matches[:k]
+
+
+class _FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self._payload = payload
+        self.status_code = status_code
+        self.content = b""
+        self.text = ""
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeGroqClient:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def post(self, url, **kwargs):
+        self.latency.sleep()
+        return _FakeResponse({"choices": [{"message": {"content": "person has a problem with joint pain in the knee"}}]})
+
+
+SPEECH_SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "edge_english_test.mp3")
+_speech_frames = None
+
+
+def speech_frames():
+    """MP3 frames of the Edge sample in the repo root (decodable, so format transcoding is exercised)."""
+    global _speech_frames
+    if _speech_frames is None:
+        from utils import mp3_frames
+
+        try:
+            with open(SPEECH_SAMPLE, "rb") as f:
+                data = f.read()
+            _speech_frames = [data[o:o + h["length"]] for o, h in mp3_frames.iter_frames(data)]
+        except (OSError, mp3_frames.MP3FormatError):
+            _speech_frames = []
+    return _speech_frames
+
+
+def make_fake_edge_tts(latency):
+    def text_to_speech_edge(text, voice, cancel_event=None):
+        # ~48 kbps MP3: 6 KB per second of speech, ~15 characters per second
+        latency.sleep(max(0.3, len(text) / 300))
+        frames = speech_frames()
+        if not frames:
+            return b"\xff\xf3" * (len(text) * 200)
+        count = max(1, int(len(text) / 15 / 0.024))
+        return b"".join(frames[i % len(frames)] for i in range(count))
+    return text_to_speech_edge
+
+
+def make_fake_translate(latency):
+    def translate_text(text, target, source="auto"):
+        latency.sleep(max(0.5, len(text) / 600))
+        return f"[{target}] {text}"
+    return translate_text
+
+
+def prepare_env():
+    """Call before importing app: dummy keys and no network at import time."""
+    for key in ("GOOGLE_API_KEY", "PINECONE_API_KEY", "GROQ_API_KEY", "TAVILY_API_KEY"):
+        os.environ.setdefault(key, "bench-fake")
+    # Fresh quota buckets per run so runs stay comparable; the real GEMINI_RPM
+    # still applies (override with --env GEMINI_RPM=...)
+    os.environ.setdefault("RATE_LIMIT_URL", os.path.join(tempfile.mkdtemp(prefix="ayurwell-bench-"), "rate_limit.sqlite3"))
+    os.environ.setdefault("IMAGE_CACHE_ENABLED", "0")
+    os.environ.setdefault("WEB_CACHE_PATH", os.path.join(tempfile.mkdtemp(prefix="ayurwell-bench-"), "web_cache.sqlite3"))
+    try:
+        from langchain_pinecone import PineconeVectorStore
+
+        def _offline(*args, **kwargs):
+            raise RuntimeError("Pinecone disabled for offline benchmark")
+
+        PineconeVectorStore.from_existing_index = staticmethod(_offline)
+    except Exception:
+        pass
+
+
+def install(app_module, latency=None, seed=0, grade_yes_rate=0.6, web_grade_yes_rate=None):
+    """Replaces every upstream used by the imported app with a fake. Returns the fakes."""
+    from Agents import query_processing, retrieval, response_generation
+    from chains.prompt_templates import rag_prompt, rag_prompt_kn
+    from utils import image_desc, translation
+
+    specs = dict(DEFAULT_LATENCY, **(latency or {}))
+    lat = {name: Latency(spec, seed=seed + i) for i, (name, spec) in enumerate(sorted(specs.items()))}
+
+    llm = FakeChatModel(lat["llm"], lat["llm_grade"], grade_yes_rate=grade_yes_rate, seed=seed,
+                        web_grade_yes_rate=web_grade_yes_rate)
+    rag_chain = rag_prompt | llm.answer_runnable()
+    retriever = FakeRetriever(lat["retriever"])
+    tavily = FakeTavily(lat["tavily"])
+
+    for module in (query_processing, retrieval, response_generation):
+        module.llm = llm
+    response_generation.rag_chain = rag_chain
+    response_generation.rag_chain_kn = rag_prompt_kn | llm.answer_runnable()
+    retrieval.retriever = retriever
+    # Same fake for the multilingual index (only latency matters offline)
+    retrieval.multilingual_retriever = FakeRetriever(lat["retriever"])
+    retrieval.tavily_search = tavily
+    web_store = FakeVectorStore(lat["retriever"])
+    retrieval.websearch_store = web_store
+
+    groq = FakeGroqClient(lat["groq"])
+    image_desc.GROQ_API_KEY = "bench-fake"
+    image_desc.get_client = lambda name: groq
+
+    app_module.text_to_speech_edge = make_fake_edge_tts(lat["edge_tts"])
+    app_module.translate_text = make_fake_translate(lat["translate"])
+    translation.translate_text = app_module.translate_text
+
+    # Hedge targets: gTTS is faked with the Edge distribution, the rest are skipped
+    fake_gtts = make_fake_edge_tts(lat["edge_tts"])
+    providers = app_module.tts_orchestrator.providers
+    providers["gtts"].fn = lambda text, lang, cancel_event, **_: (fake_gtts(text, lang), "audio/mpeg")
+    for name in ("gemini", "libre"):
+        providers[name].available = lambda: False
+    return {"llm": llm, "retriever": retriever, "tavily": tavily, "web_store": web_store, "groq": groq, "latency": specs}
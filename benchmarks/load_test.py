@@ -0,0 +1,317 @@
+"""
+Offline load test: runs the real Flask app and LangGraph workflow in-process
+against the fakes in benchmarks/fakes.py and drives mixed traffic at it.
+
+    python -m benchmarks.load_test --requests 200 --concurrency 8
+    python -m benchmarks.load_test --duration 60 --mix chat_en=5,chat_kn=2,image=1,tts=2,multi_turn=1 \
+        --latency llm=lognormal:0.8:2.5 --compare benchmarks/results/<previous>.json
+
+Reports throughput plus p50/p95/p99 per endpoint, per scenario and per graph
+node (from /metrics) and writes everything to benchmarks/results/*.json.
+Admission limits and the Gemini quota (GEMINI_RPM) stay in force, so a busy
+run measures shedding and quota waits too; lift them with e.g.
+--env GEMINI_RPM=100000 --env ADMISSION_CHAT_LIMIT=16 to time the pipeline alone.
+--profile pins the /chat graph profile (full, lean, minimal); the default
+"auto" lets utils/load_control.py switch profiles as the run loads the app.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+DEFAULT_MIX = "chat_en=50,chat_kn=15,image=10,tts=15,multi_turn=10"
+
+EN_QUESTIONS = [
+    "What is the Ayurvedic remedy for cold and cough?",
+    "How can I reduce acidity naturally?",
+    "Which herbs help with diabetes?",
+    "How do I stop hair fall according to Ayurveda?",
+    "What should I eat for better digestion?",
+    "Home remedies for joint pain in winter?",
+    "How to sleep better without medicines?",
+    "Hello, who are you?",
+    "Who won the cricket match yesterday?",
+]
+KN_QUESTIONS = [
+    "ಶೀತ ಮತ್ತು ಕೆಮ್ಮಿಗೆ ಆಯುರ್ವೇದ ಪರಿಹಾರ ಏನು?",
+    "ಆಮ್ಲೀಯತೆಯನ್ನು ಕಡಿಮೆ ಮಾಡುವುದು ಹೇಗೆ?",
+    "ಮಧುಮೇಹಕ್ಕೆ ಯಾವ ಗಿಡಮೂಲಿಕೆಗಳು ಸಹಾಯ ಮಾಡುತ್ತವೆ?",
+    "ಕೂದಲು ಉದುರುವುದನ್ನು ತಡೆಯುವುದು ಹೇಗೆ?",
+]
+FOLLOW_UPS = [
+    "What diet should I follow for it?",
+    "How long will it take to see results?",
+    "Are there any yoga practices that help?",
+]
+TTS_TEXTS = [
+    ("For common cold, Ayurveda recommends Tulsi and ginger tea with honey to pacify Kapha dosha.", "en"),
+    ("Triphala at bedtime and cumin-coriander-fennel tea improve Agni and digestion. Eat warm, freshly cooked food.", "en"),
+    ("ಶೀತಕ್ಕೆ ತುಳಸಿ ಮತ್ತು ಶುಂಠಿ ಚಹಾ ಜೇನುತುಪ್ಪದೊಂದಿಗೆ ಸೇವಿಸಿ.", "kn"),
+]
+
+
+def parse_pairs(spec, cast=str):
+    out = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            key, value = part.split("=", 1)
+            out[key.strip()] = cast(value.strip())
+    return out
+
+
+def make_image(seed, size=(1600, 1200)):
+    """A photo-sized noisy JPEG so the resize/encode path does real work."""
+    from PIL import Image
+
+    rng = random.Random(seed)
+    img = Image.effect_noise(size, 40).convert("RGB")
+    img = Image.blend(img, Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3))), 0.5)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=92)
+    return buf.getvalue()
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_endpoint = defaultdict(list)
+        self.by_scenario = defaultdict(list)
+        self.status = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    def add(self, endpoint, scenario, seconds, status):
+        with self.lock:
+            self.by_endpoint[endpoint].append(seconds)
+            self.status[endpoint][str(status)] += 1
+            if scenario:
+                self.by_scenario[scenario].append(seconds)
+
+    def error(self, endpoint, exc):
+        with self.lock:
+            self.errors[f"{endpoint}: {type(exc).__name__}"] += 1
+
+
+class Client:
+    def __init__(self, base_url, recorder, timeout):
+        import requests
+
+        self.base_url = base_url
+        self.recorder = recorder
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def call(self, endpoint, scenario=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            resp = self.session.post(self.base_url + endpoint, timeout=self.timeout, **kwargs)
+            resp.content
+        except Exception as e:
+            self.recorder.error(endpoint, e)
+            return None
+        self.recorder.add(endpoint, scenario, time.perf_counter() - start, resp.status_code)
+        return resp
+
+
+def run_scenario(name, client, rng, image_bytes, worker_id, seq):
+    session_id = f"bench-{worker_id}-{seq}"
+    if name == "chat_en":
+        client.call("/chat", name, data={"message": rng.choice(EN_QUESTIONS), "lang": "en", "session_id": session_id})
+    elif name == "chat_kn":
+        client.call("/chat", name, data={"message": rng.choice(KN_QUESTIONS), "lang": "kn", "session_id": session_id})
+    elif name == "image":
+        files = {"image": ("photo.jpg", image_bytes, "image/jpeg")}
+        client.call("/chat", name, data={"message": "What is this?", "lang": "en", "session_id": session_id}, files=files)
+    elif name == "tts":
+        text, lang = rng.choice(TTS_TEXTS)
+        client.call("/tts", name, json={"text": text, "lang": lang})
+    elif name == "multi_turn":
+        start = time.perf_counter()
+        questions = [rng.choice(EN_QUESTIONS[:7])] + rng.sample(FOLLOW_UPS, 2)
+        for question in questions:
+            client.call("/chat", None, data={"message": question, "lang": "en", "session_id": session_id})
+        with client.recorder.lock:
+            client.recorder.by_scenario[name].append(time.perf_counter() - start)
+    else:
+        raise ValueError(f"unknown scenario {name}")
+
+
+def start_server(app):
+    import logging
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def summarize_all(recorder, wall):
+    from utils.metrics import summarize
+
+    endpoints = {}
+    for endpoint, samples in sorted(recorder.by_endpoint.items()):
+        endpoints[endpoint] = dict(summarize(samples), status=dict(recorder.status[endpoint]),
+                                   throughput_rps=round(len(samples) / wall, 3))
+    scenarios = {name: summarize(samples) for name, samples in sorted(recorder.by_scenario.items())}
+    return endpoints, scenarios
+
+
+def print_table(title, rows):
+    print(f"\n{title}")
+    print(f"  {'name':<28}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in rows.items():
+        if not row.get("count"):
+            continue
+        print(f"  {name:<28}{row['count']:>7}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+
+
+def compare(previous_path, result):
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+    print(f"\nCompared with {previous_path}")
+    print(f"  throughput: {previous['throughput_rps']} -> {result['throughput_rps']} req/s")
+    for section in ("endpoints", "scenarios", "nodes"):
+        for name, row in result[section].items():
+            old = previous.get(section, {}).get(name, {})
+            if row.get("p95_ms") is not None and old.get("p95_ms"):
+                change = 100.0 * (row["p95_ms"] - old["p95_ms"]) / old["p95_ms"]
+                print(f"  {section[:-1]} {name:<30} p95 {old['p95_ms']:>9} -> {row['p95_ms']:>9} ms ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test with stubbed upstream providers")
+    parser.add_argument("--requests", type=int, default=100, help="total scenarios to run (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=0, help="run for this many seconds instead")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario weights, e.g. chat_en=5,tts=2")
+    parser.add_argument("--latency", default="", help="override fake latencies, e.g. llm=fixed:0.2,tavily=uniform:1:2")
+    parser.add_argument("--grade-yes-rate", type=float, default=0.6, help="share of documents the fake grader keeps")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE set before the app is imported")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/bench-<timestamp>.json)")
+    parser.add_argument("--compare", help="previous result file to diff p95s against")
+    parser.add_argument("--profile", default="auto", choices=("auto", "full", "lean", "minimal"),
+                        help="graph profile for /chat (auto: load controller decides)")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    for pair in args.env:
+        key, value = pair.split("=", 1)
+        os.environ[key] = value
+    if args.profile != "auto":
+        os.environ["LOAD_PROFILE"] = args.profile
+
+    from benchmarks import fakes
+
+    fakes.prepare_env()
+    import app as app_module
+
+    installed = fakes.install(app_module, parse_pairs(args.latency), seed=args.seed, grade_yes_rate=args.grade_yes_rate)
+    mix = parse_pairs(args.mix, float)
+    names, weights = list(mix), list(mix.values())
+    image_bytes = make_image(args.seed)
+
+    server, base_url = start_server(app_module.app)
+    recorder = Recorder()
+    counter = iter(range(10 ** 9))
+    counter_lock = threading.Lock()
+    stop_at = time.monotonic() + args.duration if args.duration else None
+
+    def next_seq():
+        with counter_lock:
+            seq = next(counter)
+        if stop_at is not None:
+            return seq if time.monotonic() < stop_at else None
+        return seq if seq < args.requests else None
+
+    def worker(worker_id):
+        rng = random.Random(args.seed * 1000 + worker_id)
+        client = Client(base_url, recorder, args.timeout)
+        while True:
+            seq = next_seq()
+            if seq is None:
+                return
+            run_scenario(rng.choices(names, weights)[0], client, rng, image_bytes, worker_id, seq)
+
+    print(f"Load test against {base_url}: concurrency={args.concurrency} mix={mix}")
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    import requests
+    server_metrics = requests.get(base_url + "/metrics", timeout=10).json()
+    server.shutdown()
+
+    endpoints, scenarios = summarize_all(recorder, wall)
+    total = sum(len(s) for s in recorder.by_endpoint.values())
+    nodes = {
+        name[len("node."):]: row
+        for name, row in server_metrics.get("pipeline", {}).get("latency", {}).items() if name.startswith("node.")
+    }
+    result = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "duration": args.duration,
+            "mix": mix,
+            "latency": installed["latency"],
+            "grade_yes_rate": args.grade_yes_rate,
+            "seed": args.seed,
+            "env": args.env,
+            "profile": args.profile,
+        },
+        "wall_s": round(wall, 3),
+        "http_requests": total,
+        "throughput_rps": round(total / wall, 3),
+        "endpoints": endpoints,
+        "scenarios": scenarios,
+        "nodes": nodes,
+        "client_errors": dict(recorder.errors),
+        "server_metrics": server_metrics,
+    }
+
+    print(f"\n{total} HTTP requests in {wall:.1f}s -> {result['throughput_rps']} req/s")
+    print_table("Per endpoint", endpoints)
+    for endpoint, row in endpoints.items():
+        print(f"  {endpoint} status codes: {row['status']}")
+    print_table("Per scenario", scenarios)
+    print_table("Per graph node (server side)", nodes)
+    if recorder.errors:
+        print(f"\nClient errors: {dict(recorder.errors)}")
+    control = server_metrics.get("load_control", {})
+    counters = server_metrics.get("pipeline", {}).get("counters", {})
+    served = {k[len("load.requests."):]: v for k, v in counters.items() if k.startswith("load.requests.")}
+    print(f"\nGraph profile ({control.get('mode')}): /chat turns per profile {served}, "
+          f"seconds per profile {control.get('seconds_in_profile')}")
+    for switch in control.get("switches", []):
+        print(f"  {switch['from']} -> {switch['to']} ({switch['reason']}) {switch['signals']}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False, default=str)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(args.compare, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Offline stand-in for the Pinecone index: the Data/ PDFs split the way
+scripts/setup_database.py ingests them (chunking from config/ingestion.json),
+searched with BM25. Evaluation scripts use it to get realistic chunks (PDF
+debris included) without network access. Chunks are cached in
+tmp/local_corpus.json keyed by the corpus fingerprint.
+"""
+import json
+import math
+import os
+import re
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, "Data")
+CACHE_PATH = os.path.join(ROOT, "tmp", "local_corpus.json")
+
+
+def load_chunks(data_dir=DATA_DIR, chunk_size=None, chunk_overlap=None, cache_path=CACHE_PATH):
+    """[{"text", "source", "page"}] for every chunk of every PDF under data_dir."""
+    from utils import ingestion_config
+    from utils.answer_store import corpus_fingerprint
+
+    config = ingestion_config.load()
+    chunk_size = config["chunk_size"] if chunk_size is None else chunk_size
+    chunk_overlap = config["chunk_overlap"] if chunk_overlap is None else chunk_overlap
+
+    key = f"{corpus_fingerprint(data_dir)}:{chunk_size}:{chunk_overlap}"
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("key") == key:
+            return cached["chunks"]
+    except (OSError, ValueError):
+        pass
+
+    from pypdf import PdfReader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = []
+    for name in sorted(os.listdir(data_dir)):
+        if not name.lower().endswith(".pdf"):
+            continue
+        path = os.path.join(data_dir, name)
+        try:
+            reader = PdfReader(path)
+        except Exception as e:
+            print(f"  skipping {name}: {e}")
+            continue
+        for page_number, page in enumerate(reader.pages):
+            try:
+                text = page.extract_text() or ""
+            except Exception:
+                continue
+            for piece in splitter.split_text(text):
+                chunks.append({"text": piece, "source": f"Data/{name}", "page": page_number})
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump({"key": key, "chunks": chunks}, f)
+    return chunks
+
+
+def _terms(text):
+    from utils.context_packer import STOPWORDS
+
+    return [t for t in re.findall(r"[a-z]{2,}", str(text).lower()) if t not in STOPWORDS]
+
+
+class LocalRetriever:
+    """BM25 over the chunks; invoke(query) -> top-k Documents like the Pinecone retriever."""
+
+    def __init__(self, chunks=None, k=5, k1=1.2, b=0.75):
+        self.chunks = chunks if chunks is not None else load_chunks()
+        self.k = k
+        self.k1 = k1
+        self.b = b
+        self._tf = [Counter(_terms(c["text"])) for c in self.chunks]
+        self._len = [sum(tf.values()) for tf in self._tf]
+        self._avg = sum(self._len) / max(1, len(self._len))
+        df = Counter()
+        for tf in self._tf:
+            df.update(tf.keys())
+        n = len(self.chunks)
+        self._idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+        self._postings = {}
+        for i, tf in enumerate(self._tf):
+            for t in tf:
+                self._postings.setdefault(t, []).append(i)
+
+    def scores(self, query):
+        scores = Counter()
+        for term in set(_terms(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for i in self._postings[term]:
+                f = self._tf[i][term]
+                norm = self.k1 * (1 - self.b + self.b * self._len[i] / self._avg)
+                scores[i] += idf * f * (self.k1 + 1) / (f + norm)
+        return scores
+
+    def search(self, query, k=None):
+        """[(chunk index, score)] best first."""
+        return self.scores(query).most_common(k or self.k)
+
+    def invoke(self, query, config=None, **kwargs):
+        from langchain_core.documents import Document
+
+        return [
+            Document(page_content=self.chunks[i]["text"],
+                     metadata={"source": self.chunks[i]["source"], "page": self.chunks[i]["page"]})
+            for i, _ in self.search(query)
+        ]
@@ -1,7 +1,13 @@
 import os
+from contextlib import contextmanager, ExitStack
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from langchain_pinecone import PineconeVectorStore
-from .prompt_templates import rag_prompt
+from .prompt_templates import rag_prompt, rag_prompt_kn
+from utils.admission import limit, get_bulkhead, Overloaded
+from utils.rate_limiter import gemini_quota, RateLimited
+from utils import dedup, deadline, ingestion_config
+from utils.deadline import DeadlineExceeded
+from utils.web_cache import WEBSEARCH_NAMESPACE
 try:
     from langchain_tavily import TavilySearchResults
 except ImportError:
@@ -17,19 +23,59 @@ if env_model and "gemini-1.5" in env_model:
 # (confirmed via REST model list): gemini-2.0-flash-001
 model = "gemini-2.0-flash-001"
 
-# Use Google's embeddings (lightweight, cloud-friendly)
-embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+# Queries are embedded with the model the index was built with (config/ingestion.json)
+try:
+    embeddings = ingestion_config.build_embeddings()
+except Exception as e:
+    print(f"Error initializing embeddings ({ingestion_config.embedding_model()}): {e}")
+    embeddings = None
+
+# Documents graded per query (config/ingestion.json, chosen by
+# scripts/eval_retrieval.py), and candidates fetched so near-duplicates can be
+# dropped (utils/dedup.mmr_select in Agents/retrieval.py) without coming up
+# short; without dedup there is nothing to drop, so only RETRIEVER_K are fetched
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", ingestion_config.load()["retriever_k"]))
+RETRIEVER_FETCH_K = max(RETRIEVER_K, int(os.getenv("RETRIEVER_FETCH_K", "10"))) if dedup.RETRIEVAL_DEDUP else RETRIEVER_K
 
 # Initialize Pinecone retriever from existing index
 try:
+    if embeddings is None:
+        raise RuntimeError("no query embeddings")
     docsearch = PineconeVectorStore.from_existing_index(index_name=index_name, embedding=embeddings)
-    retriever = docsearch.as_retriever(search_type="similarity", search_kwargs={"k": 5})
+    retriever = docsearch.as_retriever(search_type="similarity", search_kwargs={"k": RETRIEVER_FETCH_K})
     print(f"Pinecone retriever initialized with index: {index_name}")
 except Exception as e:
     print(f"Error initializing Pinecone: {e}")
     print("Please check your PINECONE_API_KEY and ensure the index exists")
     retriever = None
 
+# Native Kannada retrieval (utils/kannada_mode.py): an index built by
+# scripts/setup_database.py --multilingual with a multilingual embedding model,
+# so Kannada queries match the English corpus without translation
+MULTILINGUAL_INDEX_NAME = os.getenv("MULTILINGUAL_INDEX_NAME", "")
+MULTILINGUAL_EMBEDDING_MODEL = os.getenv("MULTILINGUAL_EMBEDDING_MODEL", "models/gemini-embedding-001")
+multilingual_retriever = None
+if MULTILINGUAL_INDEX_NAME:
+    try:
+        multilingual_embeddings = GoogleGenerativeAIEmbeddings(model=MULTILINGUAL_EMBEDDING_MODEL)
+        multilingual_retriever = PineconeVectorStore.from_existing_index(
+            index_name=MULTILINGUAL_INDEX_NAME, embedding=multilingual_embeddings
+        ).as_retriever(search_type="similarity", search_kwargs={"k": RETRIEVER_FETCH_K})
+        print(f"Multilingual retriever initialized with index: {MULTILINGUAL_INDEX_NAME}")
+    except Exception as e:
+        print(f"Multilingual retriever not available: {e}")
+        multilingual_retriever = None
+
+# Graded web search results written back by Agents/retrieval.websearch
+# (same index, separate namespace; see utils/web_cache.py)
+try:
+    websearch_store = PineconeVectorStore.from_existing_index(
+        index_name=index_name, embedding=embeddings, namespace=WEBSEARCH_NAMESPACE
+    ) if retriever is not None else None
+except Exception as e:
+    print(f"Web search namespace not available: {e}")
+    websearch_store = None
+
 # Initialize Tavily search (with fallback if API key is missing)
 try:
     tavily_search = TavilySearchResults(max_results=3)
@@ -46,5 +92,24 @@ except Exception as e:
     llm = None
 
 rag_chain = rag_prompt | llm
+rag_chain_kn = rag_prompt_kn | llm
+
+
+@contextmanager
+def guard(upstream, stage=None, prompt=""):
+    """
+    Slot in the per-upstream bulkhead ('llm', 'embeddings', 'pinecone', 'web')
+    to hold around a call made from a graph node. LLM calls first take Gemini
+    quota at the stage's priority (see utils/rate_limiter.STAGES).
+    Raises Overloaded (or its subclass RateLimited) when saturated, and
+    DeadlineExceeded once the turn's budget (utils/deadline.py) is spent.
+    """
+    deadline.check(stage or upstream)
+    with ExitStack() as stack:
+        if upstream == "llm" and stage:
+            stack.enter_context(gemini_quota(stage, prompt))
+        stack.enter_context(limit(upstream, timeout=deadline.wait_timeout(get_bulkhead(upstream).max_wait)))
+        yield
+
 
-__all__ = ["llm", "retriever", "rag_chain", "tavily_search"]
+__all__ = ["llm", "retriever", "RETRIEVER_K", "websearch_store", "multilingual_retriever", "rag_chain", "rag_chain_kn", "tavily_search", "guard", "Overloaded", "RateLimited", "DeadlineExceeded"]
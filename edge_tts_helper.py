@@ -2,19 +2,26 @@ import asyncio
 import io
 from edge_tts import Communicate
 
-async def _text_to_speech_edge_async(text: str, voice: str) -> bytes:
+class SynthesisCancelled(Exception):
+    """Raised when a caller cancels an in-progress synthesis (e.g. a losing hedged request)."""
+
+
+async def _text_to_speech_edge_async(text: str, voice: str, cancel_event=None) -> bytes:
     """
     Asynchronously generates speech from text using edge-tts and returns MP3 bytes.
+    If cancel_event (a threading.Event) gets set, streaming stops at the next chunk.
     """
     communicate = Communicate(text, voice)
     buffer = io.BytesIO()
     async for chunk in communicate.stream():
+        if cancel_event is not None and cancel_event.is_set():
+            raise SynthesisCancelled(f"edge-tts synthesis for voice {voice} cancelled")
         if chunk["type"] == "audio":
             buffer.write(chunk["data"])
     buffer.seek(0)
     return buffer.read()
 
-def text_to_speech_edge(text: str, voice: str) -> bytes:
+def text_to_speech_edge(text: str, voice: str, cancel_event=None) -> bytes:
     """
     Synchronous wrapper for generating speech with edge-tts.
     This handles the asyncio event loop to make it callable from a synchronous context like Flask.
@@ -27,7 +34,7 @@ def text_to_speech_edge(text: str, voice: str) -> bytes:
         asyncio.set_event_loop(loop)
 
     # Run the async function and return the result
-    return loop.run_until_complete(_text_to_speech_edge_async(text, voice))
+    return loop.run_until_complete(_text_to_speech_edge_async(text, voice, cancel_event))
 
 if __name__ == '__main__':
     # A simple test to verify the helper works.
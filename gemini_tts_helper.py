@@ -0,0 +1,61 @@
+import base64
+
+from utils.http_clients import get_genai_client
+
+try:
+    from google.genai import types
+except Exception:
+    types = None
+
+GEMINI_TTS_MODEL = "gemini-2.5-flash-preview-tts"
+
+
+class GeminiTTSError(RuntimeError):
+    """Raised when Gemini TTS is unavailable or returns no usable audio."""
+
+
+def gemini_tts_available() -> bool:
+    return types is not None and get_genai_client() is not None
+
+
+def text_to_speech_gemini(text: str, voice_name: str = "Kore") -> bytes:
+    """
+    Generates speech with Gemini TTS and returns the raw audio bytes from the
+    provider (16-bit mono PCM). Raises GeminiTTSError on any failure.
+    """
+    client = get_genai_client()
+    if types is None or client is None:
+        raise GeminiTTSError("Gemini TTS is not configured (google-genai SDK or API key missing).")
+
+    response = client.models.generate_content(
+        model=GEMINI_TTS_MODEL,
+        contents=text,
+        config=types.GenerateContentConfig(
+            response_modalities=["AUDIO"],
+            speech_config=types.SpeechConfig(
+                voice_config=types.VoiceConfig(
+                    prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                        voice_name=voice_name,
+                    )
+                )
+            ),
+        )
+    )
+
+    # The SDK stores the audio bytes in the candidate content parts inline_data
+    if not getattr(response, 'candidates', None):
+        raise GeminiTTSError("No audio candidate returned.")
+    try:
+        data = response.candidates[0].content.parts[0].inline_data.data
+    except Exception:
+        data = None
+    if data is None:
+        raise GeminiTTSError("No inline audio data found in provider response.")
+
+    # If the SDK returns a base64 string, decode it; if bytes, use directly
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data)
+    try:
+        return base64.b64decode(data)
+    except Exception:
+        raise GeminiTTSError("Could not decode audio data")
@@ -0,0 +1,222 @@
+"""
+Answer a file of questions offline through build_workflow(), for
+pre-generating content and for latency regression runs on thousands of
+questions without going through the Flask app.
+
+Input is CSV (a question or text column, optional id and lang columns) or
+JSONL (objects with the same keys, or plain strings). Rows without an id
+are numbered row-1, row-2, ... in file order. Every answered row is
+appended to the output JSONL as soon as it finishes; that file is also the
+checkpoint. Run the same command again after a crash or Ctrl-C and rows
+already answered are skipped. Rows that failed are retried, and the last
+line for an id wins.
+
+    python -m scripts.batch_answer questions.csv
+    python -m scripts.batch_answer questions.jsonl -o answers.jsonl --workers 8 --profile lean
+    python -m scripts.batch_answer questions.csv --fakes --workers 16   # offline latency of the pipeline itself
+
+Each output line has the reply, the route (graph nodes in the order they
+ran), seconds per node, translation and total seconds, and the tokens the
+LLM calls reported (input/output/total per model, via LangChain usage
+metadata). Kannada rows are translated like /chat turns unless
+KANNADA_MODE makes the graph answer them natively.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dotenv import load_dotenv
+
+
+def read_rows(path, default_lang):
+    """[(id, question, lang)] from a CSV or JSONL file; rows without text are reported and left out."""
+    rows, seen, skipped = [], set(), 0
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith((".jsonl", ".ndjson", ".json")):
+            records = []
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                records.append({"question": record} if isinstance(record, str) else record)
+        else:
+            records = list(csv.DictReader(f))
+    for n, record in enumerate(records, 1):
+        if not isinstance(record, dict):
+            skipped += 1
+            continue
+        record = {str(k).strip().lower(): v for k, v in record.items() if k is not None}
+        question = " ".join(str(record.get("question") or record.get("text") or "").split())
+        row_id = str(record.get("id") or "").strip() or f"row-{n}"
+        if not question or row_id in seen:
+            skipped += 1
+            continue
+        seen.add(row_id)
+        rows.append((row_id, question, (str(record.get("lang") or "").strip().lower() or default_lang)))
+    if skipped:
+        print(f"Skipped {skipped} input rows without a question or with a repeated id")
+    return rows
+
+
+def completed_ids(path):
+    """Ids already answered in an earlier run's output; drops a line cut off by a crash."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[: data.rfind(b"\n") + 1]
+    done = {}
+    for line in data.decode("utf-8").splitlines():
+        try:
+            result = json.loads(line)
+        except ValueError:
+            continue
+        done[result.get("id")] = "error" not in result
+    return {row_id for row_id, ok in done.items() if ok}
+
+
+def answer_row(graph, translation, kannada_mode, row_id, question, lang, run_id):
+    from langchain_core.callbacks import UsageMetadataCallbackHandler
+    from langchain_core.messages import HumanMessage
+
+    result = {"id": row_id, "question": question, "lang": lang}
+    usage = UsageMetadataCallbackHandler()
+    thread_id = f"batch-{run_id}-{row_id}"
+    config = {"configurable": {"thread_id": thread_id}, "callbacks": [usage]}
+    start = time.perf_counter()
+    translate_s = 0.0
+    try:
+        query = question
+        if lang == "kn" and not kannada_mode.native(lang):
+            t = time.perf_counter()
+            query = translation.translate_text(question, target="en", source="kn") or question
+            translate_s += time.perf_counter() - t
+        route, nodes = [], {}
+        mark = time.perf_counter()
+        # One update per node as it finishes, so the route and per-node times come for free
+        for update in graph.stream({"question": HumanMessage(content=query), "lang": lang}, config,
+                                   stream_mode="updates"):
+            now = time.perf_counter()
+            for node in update:
+                route.append(node)
+                nodes[node] = round(nodes.get(node, 0.0) + now - mark, 3)
+            mark = now
+        state = graph.get_state(config).values
+        messages = state.get("messages") or []
+        reply = messages[-1].content if messages else ""
+        if lang == "kn" and state.get("answer_lang") != lang:
+            t = time.perf_counter()
+            reply = translation.translate_reply(reply, target="kn", source="en") or reply
+            translate_s += time.perf_counter() - t
+        result.update(reply=reply, route=route, on_topic=state.get("on_topic"),
+                      rephrase_count=state.get("rephrase_count", 0), node_s=nodes)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        try:
+            # Rows are single turns: keep thousands of them out of the in-memory checkpointer
+            graph.checkpointer.delete_thread(thread_id)
+        except Exception:
+            pass
+    result["translate_s"] = round(translate_s, 3)
+    result["elapsed_s"] = round(time.perf_counter() - start, 3)
+    result["tokens"] = {model: dict(counts) for model, counts in usage.usage_metadata.items()}
+    return result
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Answer a CSV/JSONL of questions through the graph, resumably")
+    parser.add_argument("input", help="questions (.csv or .jsonl)")
+    parser.add_argument("-o", "--output", help="results JSONL, also the checkpoint (default: <input>.answers.jsonl)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--profile", default="full", help="graph profile: full, lean or minimal")
+    parser.add_argument("--lang", default="en", help="language of rows without a lang column")
+    parser.add_argument("--limit", type=int, default=0, help="answer at most this many rows (0 = all)")
+    parser.add_argument("--fakes", action="store_true", help="use the benchmark fakes instead of real providers")
+    args = parser.parse_args()
+    output = args.output or os.path.splitext(args.input)[0] + ".answers.jsonl"
+
+    rows = read_rows(args.input, args.lang)
+    done = completed_ids(output)
+    todo = [row for row in rows if row[0] not in done]
+    if args.limit:
+        todo = todo[: args.limit]
+    print(f"{len(rows)} questions, {len(rows) - len(todo)} already answered in {output}, {len(todo)} to go")
+    if not todo:
+        return
+
+    if args.fakes:
+        from benchmarks import fakes
+
+        fakes.prepare_env()
+    import app as app_module
+    from utils import kannada_mode, translation
+    from utils.metrics import summarize
+    from workflow.graph import build_workflow
+
+    if args.fakes:
+        fakes.install(app_module)
+    graph = build_workflow(args.profile)
+    run_id = uuid.uuid4().hex[:8]
+
+    lock = threading.Lock()
+    elapsed, routes, tokens, errors = [], Counter(), Counter(), 0
+    started = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=args.workers)
+    futures = [pool.submit(answer_row, graph, translation, kannada_mode, row_id, question, lang, run_id)
+               for row_id, question, lang in todo]
+    try:
+        with open(output, "a", encoding="utf-8") as out:
+            for i, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                with lock:
+                    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    out.flush()
+                    os.fsync(out.fileno())
+                if "error" in result:
+                    errors += 1
+                    print(f"  error {result['id']}: {result['error']}")
+                else:
+                    elapsed.append(result["elapsed_s"])
+                    routes[" > ".join(result["route"])] += 1
+                    for counts in result["tokens"].values():
+                        tokens.update({k: counts.get(k, 0) for k in ("input_tokens", "output_tokens", "total_tokens")})
+                if i % 50 == 0 or i == len(futures):
+                    rate = i / (time.perf_counter() - started)
+                    print(f"  {i}/{len(futures)} done, {errors} errors, {rate:.1f} rows/s")
+    except KeyboardInterrupt:
+        print("Interrupted; answered rows are saved, run the same command to resume")
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise SystemExit(130)
+    pool.shutdown()
+
+    stats = summarize(elapsed)
+    print(f"\nAnswered {len(elapsed)} rows ({errors} errors) in {time.perf_counter() - started:.1f}s -> {output}")
+    if elapsed:
+        print(f"  per row: p50 {stats['p50_ms'] / 1000:.2f}s, p95 {stats['p95_ms'] / 1000:.2f}s, "
+              f"mean {stats['mean_ms'] / 1000:.2f}s")
+    print(f"  tokens: {tokens.get('input_tokens', 0)} in, {tokens.get('output_tokens', 0)} out, "
+          f"{tokens.get('total_tokens', 0)} total")
+    for route, n in routes.most_common(5):
+        print(f"  {n:>6}  {route}")
+
+
+if __name__ == "__main__":
+    main()
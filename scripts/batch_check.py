@@ -0,0 +1,130 @@
+"""
+/chat/batch (workflow/batch.py) against the same questions posted one by
+one to /chat, with the benchmark fakes. The question list repeats each
+question --repeat times in different spellings so deduplication has
+something to do, and ends with a three-turn session.
+
+    python -m scripts.batch_check
+    python -m scripts.batch_check --questions 60 --repeat 3
+
+Prints wall time, graph node runs and errors for serial /chat, a streamed batch
+and a polled batch job, then disconnects from a streamed batch after its
+first result and checks that the batch slot is freed. Ends with the route
+the first few questions took.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUESTIONS = [
+    "What is the Ayurvedic remedy for a common cold?",
+    "How can I treat a dry cough at home?",
+    "Which foods should I avoid for acidity?",
+    "Which herbs help control blood sugar?",
+    "What causes hair fall and how do I stop it?",
+    "How should a fever be managed with diet?",
+    "Is turmeric milk good for sleep?",
+    "Can you suggest a diet plan for pitta dosha?",
+    "Who won the football match yesterday?",
+    "Hello there!",
+]
+SESSION = ["What is good for joint pain?", "How often should I take it?", "Any foods to avoid with that?"]
+
+
+def build_questions(n, repeat):
+    questions = []
+    for i in range(n):
+        base = f"{QUESTIONS[i % len(QUESTIONS)]} (case {i})"
+        for r in range(repeat):
+            # Same question as a partner would resend it: case, spacing and punctuation vary
+            questions.append({"id": f"q{i}-{r}", "text": base.upper() if r % 2 else f"  {base.rstrip('?')}  ",
+                              "lang": "en"})
+    questions += [{"id": f"s{t}", "text": text, "lang": "en", "session_id": "batch-check-session"}
+                  for t, text in enumerate(SESSION)]
+    return questions
+
+
+def node_runs(metrics):
+    return sum(s["count"] for s in metrics.snapshot("node.")["latency"].values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare /chat/batch with serial /chat")
+    parser.add_argument("--questions", type=int, default=30, help="distinct questions")
+    parser.add_argument("--repeat", type=int, default=2, help="copies of each question")
+    args = parser.parse_args()
+
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    os.environ.setdefault("ANSWER_STORE_ENABLED", "0")
+    os.environ.setdefault("GEMINI_RPM", "100000")
+    os.environ.setdefault("BATCH_JOBS_PATH", os.path.join(tempfile.mkdtemp(prefix="ayurwell-batch-"), "jobs.sqlite3"))
+    from benchmarks import fakes
+
+    fakes.prepare_env()
+    import app as app_module
+    from utils import metrics
+    from utils.admission import get_bulkhead
+
+    fakes.install(app_module, latency={"llm": "fixed:0.3", "llm_grade": "fixed:0.1", "retriever": "fixed:0.1"},
+                  grade_yes_rate=0.7)
+    client = app_module.app.test_client()
+    questions = build_questions(args.questions, args.repeat)
+    print(f"{len(questions)} questions ({args.questions} distinct x {args.repeat}, plus a {len(SESSION)}-turn session)")
+    print(f"{'run':<10}{'wall s':>8}{'node runs':>11}{'errors':>8}{'answered':>10}")
+
+    metrics.reset()
+    start = time.perf_counter()
+    errors = 0
+    for q in questions:
+        data = client.post("/chat", data={"message": q["text"], "lang": q["lang"],
+                                          "session_id": q.get("session_id") or f"serial-{q['id']}"}).get_json() or {}
+        errors += "error" in data
+    print(f"{'serial':<10}{time.perf_counter() - start:>8.1f}{node_runs(metrics):>11}{errors:>8}{len(questions):>10}")
+
+    metrics.reset()
+    start = time.perf_counter()
+    r = client.post("/chat/batch", json={"questions": questions})
+    lines = [json.loads(line) for line in r.get_data(as_text=True).splitlines() if line.strip()]
+    results = [line for line in lines if line["type"] == "result"]
+    summary = lines[-1] if lines and lines[-1]["type"] == "summary" else {}
+    print(f"{'stream':<10}{time.perf_counter() - start:>8.1f}{node_runs(metrics):>11}"
+          f"{sum('error' in x for x in results):>8}{len(results):>10}   {summary}")
+
+    metrics.reset()
+    start = time.perf_counter()
+    job = client.post("/chat/batch", json={"questions": questions, "mode": "job"}).get_json()
+    polled, after, status = [], 0, "running"
+    while status == "running":
+        time.sleep(0.2)
+        page = client.get(f"/chat/batch/{job['job_id']}?after={after}").get_json()
+        polled += page["results"]
+        after, status = page["next"], page["status"]
+    print(f"{'job':<10}{time.perf_counter() - start:>8.1f}{node_runs(metrics):>11}"
+          f"{sum('error' in x for x in polled):>8}{len(polled):>10}   status={status}")
+
+    # A client that goes away after the first result: the rest is abandoned and the batch slot freed
+    bulkhead = get_bulkhead("batch")
+    r = client.post("/chat/batch", json={"questions": questions}, buffered=False)
+    next(iter(r.response))
+    r.close()
+    start = time.perf_counter()
+    while bulkhead.snapshot()["in_flight"] and time.perf_counter() - start < 60:
+        time.sleep(0.1)
+    held = bulkhead.snapshot()["in_flight"]
+    status = client.post("/chat/batch", json={"questions": QUESTIONS[:1]}).status_code
+    print(f"{'cancel':<10}{time.perf_counter() - start:>8.1f}   slot {'STILL HELD' if held else 'released'}, "
+          f"next batch HTTP {status}")
+
+    print("routes:")
+    for x in sorted(results, key=lambda x: x["index"])[:4] + [x for x in results if x["id"] and x["id"].startswith("s")]:
+        print(f"  {x['id']:<6} {x['elapsed_s']:>6.2f}s {'dup of ' + str(x['duplicate_of']) if 'duplicate_of' in x else ''} "
+              f"{' > '.join(x['route'])}")
+
+
+if __name__ == "__main__":
+    main()
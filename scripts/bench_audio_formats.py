@@ -0,0 +1,95 @@
+"""
+Bytes per second of speech and encode CPU cost for every negotiable TTS
+output format (utils/audio_format.py), measured on the provider samples in
+the repo root: Edge and gTTS MP3 plus Gemini-style bare PCM (decoded from one
+of the MP3s and wrapped with pcm_to_wav, as the Gemini provider now is).
+
+    python -m scripts.bench_audio_formats --runs 5
+    python -m scripts.bench_audio_formats --input answer.mp3
+
+Needs ffmpeg with libopus and libmp3lame (FFMPEG_BINARY or PATH).
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils import audio_format
+from scripts.bench_post_process import cpu_seconds
+
+DEFAULT_INPUTS = ["edge_english_test.mp3", "edge_kannada_female_test.mp3", "tts_en.mp3", "tts_kn.mp3"]
+
+
+def decode_pcm(data, rate):
+    """16-bit mono PCM via ffmpeg (works for every container we produce)."""
+    return subprocess.run(
+        [audio_format.FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+         "-f", "s16le", "-ac", "1", "-ar", str(rate), "pipe:1"],
+        input=data, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True,
+    ).stdout
+
+
+def duration_seconds(data):
+    return len(decode_pcm(data, 8000)) / 2 / 8000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Size and encode cost of the TTS output formats")
+    parser.add_argument("--input", action="append", help="audio file(s) to encode")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if not audio_format.available():
+        raise SystemExit("ffmpeg not found: set FFMPEG_BINARY or add it to PATH")
+
+    clips = {}
+    for path in args.input or [os.path.join(ROOT, p) for p in DEFAULT_INPUTS]:
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                clips[os.path.basename(path)] = f.read()
+    if not clips:
+        raise SystemExit("no input audio files found")
+    if not args.input:
+        source = next(iter(clips.values()))
+        pcm = decode_pcm(source, audio_format.GEMINI_PCM_RATE)
+        clips["gemini-style PCM (as wav)"] = audio_format.pcm_to_wav(pcm)
+
+    print(f"{'clip':<30}{'format':<10}{'KB':>8}{'bytes/s':>10}{'vs source':>10}{'cpu ms/audio s':>16}")
+    totals = {}
+    for name, data in clips.items():
+        try:
+            seconds = duration_seconds(data)
+        except subprocess.CalledProcessError:
+            print(f"{name:<30}skipped: ffmpeg cannot decode it")
+            continue
+        print(f"{name:<30}{'source':<10}{len(data) / 1024:>8.1f}{len(data) / seconds:>10.0f}{'':>10}{'':>16}")
+        for fmt in audio_format.FORMATS:
+            audio_format.transcode(data, fmt)  # warm-up
+            cpu0 = cpu_seconds()
+            start = time.perf_counter()
+            for _ in range(args.runs):
+                out = audio_format.transcode(data, fmt)
+            cpu = (cpu_seconds() - cpu0) / args.runs
+            wall = (time.perf_counter() - start) / args.runs
+            rate = len(out) / seconds
+            total = totals.setdefault(fmt, [0, 0.0, 0.0, 0.0])
+            total[0] += len(out)
+            total[1] += seconds
+            total[2] += cpu
+            total[3] += wall
+            print(f"{'':<30}{fmt:<10}{len(out) / 1024:>8.1f}{rate:>10.0f}{len(out) / len(data):>9.0%}"
+                  f"{cpu * 1000 / seconds:>16.1f}")
+
+    print()
+    print(f"{'format':<10}{'bytes per audio s':>18}{'kbps':>7}{'cpu ms per audio s':>20}{'wall ms per audio s':>21}")
+    for fmt, (size, seconds, cpu, wall) in totals.items():
+        print(f"{fmt:<10}{size / seconds:>18.0f}{size * 8 / seconds / 1000:>7.1f}"
+              f"{cpu * 1000 / seconds:>20.1f}{wall * 1000 / seconds:>21.1f}")
+
+
+if __name__ == "__main__":
+    main()
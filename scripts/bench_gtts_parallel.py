@@ -0,0 +1,163 @@
+"""
+Latency of gTTS synthesis for answer-length text: the original serial
+gTTS.write_to_fp against text_gtt's parallel sentence mode, both pointed at a
+local stub of the Google Translate batchexecute endpoint.
+
+The stub answers in the same framing as the real endpoint (one "jQ1olc" line
+with base64 MP3) after a configurable delay, with an amount of audio
+proportional to the text length, so results depend only on round-trips.
+
+    python -m scripts.bench_gtts_parallel --delay-ms 180 --workers 4
+    python -m scripts.bench_gtts_parallel --serve 8765   # just run the stub
+
+With --serve, start the app with the GTTS_URL it prints to use the stub.
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SAMPLE_ANSWER = (
+    "Ayurveda views the common cold as an imbalance of Kapha and Vata dosha. "
+    "Drink warm water through the day and avoid cold, heavy and oily foods. "
+    "A decoction of ginger, tulsi and black pepper, taken twice daily, helps clear congestion. "
+    "Steam inhalation with a few drops of eucalyptus oil relieves a blocked nose. "
+    "Gargling with warm salt water and turmeric soothes a sore throat. "
+    "Rest well and keep yourself warm, especially at night.\n"
+    "Please consult a qualified Ayurvedic practitioner before starting any treatment."
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    frames = []        # MP3 frames handed out, ~24 ms each
+    delay_s = 0.15
+    jitter_s = 0.03
+    calls = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = urllib.parse.parse_qs(self.rfile.read(length).decode("utf-8"))
+        text = json.loads(json.loads(form["f.req"][0])[0][0][1])[0]
+        with StubHandler.lock:
+            StubHandler.calls += 1
+        time.sleep(max(0.0, random.gauss(self.delay_s, self.jitter_s)))
+        # ~14 characters per second of speech
+        count = max(1, int(len(text) / 14 / 0.024))
+        audio = b"".join(self.frames[i % len(self.frames)] for i in range(count))
+        line = json.dumps([["wrb.fr", "jQ1olc", json.dumps([base64.b64encode(audio).decode("ascii")]),
+                            None, None, None, "generic"]], separators=(",", ":"))
+        body = f")]}}'\n\n{len(line)}\n{line}\n".encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(port=0, delay_ms=150, jitter_ms=30, sample="tts_en.mp3"):
+    from utils import mp3_frames
+
+    with open(os.path.join(ROOT, sample), "rb") as f:
+        data = f.read()
+    StubHandler.frames = [data[o:o + h["length"]] for o, h in mp3_frames.iter_frames(data)]
+    StubHandler.delay_s = delay_ms / 1000
+    StubHandler.jitter_s = jitter_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/_/TranslateWebserverUi/data/batchexecute"
+
+
+def _time(fn, runs):
+    samples, out = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare serial and parallel gTTS synthesis against a local stub")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--delay-ms", type=float, default=150, help="stub latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=30)
+    parser.add_argument("--workers", type=int, default=4, help="GTTS_PARALLEL_WORKERS for the parallel mode")
+    parser.add_argument("--text", default=None, help="text to synthesize (default: a ~550 character answer)")
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--serve", type=int, default=None, metavar="PORT", help="only run the stub on PORT")
+    args = parser.parse_args()
+
+    server, url = start_stub(args.serve or 0, args.delay_ms, args.jitter_ms)
+    if args.serve is not None:
+        print(f"gTTS stub listening: GTTS_URL={url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            return
+
+    os.environ["AUDIO_CACHE_DIR"] = tempfile.mkdtemp(prefix="gtts-bench-")
+    import gtts.tts
+    from gtts import gTTS
+    import text_gtt
+    from utils import mp3_frames
+
+    text = args.text or SAMPLE_ANSWER
+    text_gtt.GTTS_URL = url
+    text_gtt.GTTS_PARALLEL_WORKERS = args.workers
+    original_url = gtts.tts._translate_url
+    stub_base = url.split("/_/")[0] + "/"
+
+    def serial():
+        gtts.tts._translate_url = lambda tld="com", path="": stub_base + path
+        try:
+            buf = io.BytesIO()
+            gTTS(text=text, lang=args.lang, slow=False).write_to_fp(buf)
+            return buf.getvalue()
+        finally:
+            gtts.tts._translate_url = original_url
+
+    def parallel(cache):
+        def run():
+            text_gtt.GTTS_SEGMENT_CACHE = cache
+            return text_gtt._synthesize_parallel(text, args.lang)
+        return run
+
+    sentences = text_gtt.split_sentences(text)
+    print(f"{len(text)} characters, {len(sentences)} sentences, stub delay {args.delay_ms:.0f}±{args.jitter_ms:.0f} ms\n")
+    print(f"{'mode':<28}{'requests':>9}{'p50 ms':>9}{'mean ms':>9}{'audio s':>9}")
+    parallel(True)()  # fill the segment cache for the warm run
+    modes = [
+        ("serial (gTTS.write_to_fp)", serial),
+        (f"parallel x{args.workers}, cold cache", parallel(False)),
+        (f"parallel x{args.workers}, warm cache", parallel(True)),
+    ]
+    for name, fn in modes:
+        calls = StubHandler.calls
+        samples, out = _time(fn, args.runs)
+        seconds = mp3_frames.info(out)["duration"]
+        print(f"{name:<28}{(StubHandler.calls - calls) / args.runs:>9.1f}{statistics.median(samples):>9.0f}"
+              f"{statistics.mean(samples):>9.0f}{seconds:>9.1f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
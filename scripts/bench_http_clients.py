@@ -0,0 +1,98 @@
+"""
+Per-call cost of a fresh connection vs the pooled provider clients.
+
+Starts a local HTTPS stub (self-signed cert via the openssl CLI) and times
+N POSTs with plain requests.post (new DNS/TCP/TLS per call, as before) and
+with utils.http_clients.get_client (keep-alive pool).
+
+    python -m scripts.bench_http_clients --calls 200
+"""
+import argparse
+import json
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import statistics
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from utils import http_clients
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        body = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_stub(tmpdir):
+    cert, key = os.path.join(tmpdir, "cert.pem"), os.path.join(tmpdir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(cert, key)
+    server.socket = ctx.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"https://localhost:{server.server_address[1]}/v1/chat"
+
+
+def _time_calls(fn, calls):
+    samples = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {
+        "mean_ms": round(statistics.mean(samples), 3),
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(sorted(samples)[int(0.95 * (len(samples) - 1))], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    payload = {"model": "stub", "messages": [{"role": "user", "content": "hi"}]}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        server, url = _start_stub(tmpdir)
+        try:
+            fresh = _time_calls(lambda: requests.post(url, json=payload, timeout=5, verify=False).json(), args.calls)
+            client = http_clients.get_client("bench")
+            client.post(url, json=payload, verify=False)  # warm the pool
+            pooled = _time_calls(lambda: client.post(url, json=payload, verify=False).json(), args.calls)
+        finally:
+            server.shutdown()
+
+    saved = fresh["mean_ms"] - pooled["mean_ms"]
+    print(json.dumps({"calls": args.calls, "fresh_connection": fresh, "pooled": pooled,
+                      "saved_per_call_ms": round(saved, 3)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
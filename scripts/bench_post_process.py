@@ -0,0 +1,105 @@
+"""
+CPU cost of text_gtt humanize post-processing per second of audio: the
+original pydub chain (ffprobe + decode + per-effect passes + 192 kbps
+re-encode) against the numpy engine (one decode with the speed change,
+vectorized effects, one encode).
+
+    python -m scripts.bench_post_process --runs 5
+    python -m scripts.bench_post_process --input tts_en.mp3 --input tts_kn.mp3
+
+Without --input it uses the gTTS samples in the repo root plus a longer clip
+built by concatenating them. Needs ffmpeg (FFMPEG_BINARY or PATH); the pydub
+engine also needs ffprobe.
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import text_gtt
+from utils import mp3_frames
+
+DEFAULT_INPUTS = ["tts_en.mp3", "tts_kn.mp3", "kannada_test.mp3"]
+
+
+def cpu_seconds():
+    """User+system time of this process and every child it has waited for (the ffmpeg runs)."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def measure(fn, data, runs):
+    fn(data)  # warm-up: imports, kernel cache, page cache for the ffmpeg binary
+    cpu0, wall0 = cpu_seconds(), time.perf_counter()
+    for _ in range(runs):
+        out = fn(data)
+    return (cpu_seconds() - cpu0) / runs, (time.perf_counter() - wall0) / runs, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text_gtt post-processing engines")
+    parser.add_argument("--input", action="append", help="MP3 file(s) to process")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--phase", default="medium")
+    parser.add_argument("--legacy-bitrate", default="192k", help="bitrate of the original pydub export")
+    args = parser.parse_args()
+
+    if not text_gtt.FFMPEG_BINARY:
+        raise SystemExit("ffmpeg not found: set FFMPEG_BINARY or add it to PATH")
+
+    clips = {}
+    for path in args.input or [os.path.join(ROOT, p) for p in DEFAULT_INPUTS]:
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                clips[os.path.basename(path)] = f.read()
+    if not clips:
+        raise SystemExit("no input MP3 files found")
+    if not args.input:
+        # A ~30 s answer-length clip made of the short samples
+        joined = b"".join(mp3_frames.audio_frames(d) for d in clips.values())
+        clips["long_answer (joined x3)"] = joined * 3
+
+    def legacy(data):
+        bitrate, text_gtt.TTS_POSTPROCESS_BITRATE = text_gtt.TTS_POSTPROCESS_BITRATE, args.legacy_bitrate
+        try:
+            return text_gtt._post_process_mp3_pydub(data, args.phase)
+        finally:
+            text_gtt.TTS_POSTPROCESS_BITRATE = bitrate
+
+    engines = {"numpy": lambda data: text_gtt._post_process_mp3_numpy(data, args.phase)}
+    if text_gtt.PYDUB_AVAILABLE:
+        engines = {"pydub (original)": legacy, **engines}
+    else:
+        print("pydub not installed: only the numpy engine is measured")
+
+    print(f"{'clip':<26}{'audio s':>8}  {'engine':<18}{'cpu ms':>9}{'cpu ms/audio s':>16}{'wall ms':>9}{'out KB':>8}")
+    totals = {}
+    for name, data in clips.items():
+        seconds = mp3_frames.info(data)["duration"]
+        for engine, fn in engines.items():
+            try:
+                cpu, wall, out = measure(fn, data, args.runs)
+            except Exception as e:
+                print(f"{name:<26}{seconds:>8.1f}  {engine:<18} failed: {e}")
+                continue
+            if out is data:
+                print(f"{name:<26}{seconds:>8.1f}  {engine:<18} returned the input unchanged (decoder missing?)")
+                continue
+            total = totals.setdefault(engine, [0.0, 0.0])
+            total[0] += cpu
+            total[1] += seconds
+            print(f"{name:<26}{seconds:>8.1f}  {engine:<18}{cpu * 1000:>9.1f}{cpu * 1000 / seconds:>16.1f}"
+                  f"{wall * 1000:>9.1f}{len(out) / 1024:>8.1f}")
+
+    print()
+    for engine, (cpu, seconds) in totals.items():
+        print(f"{engine:<18} {cpu * 1000 / seconds:8.1f} ms CPU per second of audio")
+
+
+if __name__ == "__main__":
+    main()
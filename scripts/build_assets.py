@@ -0,0 +1,120 @@
+"""
+Deploy-time asset build: copies every file under static/ to
+static/dist/<name>.<hash>.<ext>, writes maximum-level .gz and .br siblings
+for text assets and a manifest.json that utils/delivery.py serves from
+(/assets/... with immutable caching).
+
+    python -m scripts.build_assets            # build + size table
+    python -m scripts.build_assets --report   # also page-load transfer before/after
+
+.br files need the optional brotli package; without it only .gz is written.
+"""
+import argparse
+import json
+import mimetypes
+import os
+import re
+import shutil
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils import delivery
+
+
+def build(static_dir, clean=True):
+    dist = os.path.join(static_dir, "dist")
+    if clean and os.path.isdir(dist):
+        shutil.rmtree(dist)
+    os.makedirs(dist, exist_ok=True)
+    manifest = {"assets": {}}
+    for logical, (_, data) in sorted(delivery.scan_static(static_dir).items()):
+        digest = delivery.content_hash(data)
+        hashed = delivery.hashed_name(logical, digest)
+        target = os.path.join(dist, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+        entry = {"file": hashed, "hash": digest, "size": len(data)}
+        if delivery.compressible(mimetypes.guess_type(logical)[0]):
+            encodings = [("gzip", "gz")] + ([("br", "br")] if delivery.brotli is not None else [])
+            for encoding, ext in encodings:
+                encoded = delivery.compress(data, encoding, best=True)
+                if len(encoded) < len(data):
+                    with open(f"{target}.{ext}", "wb") as f:
+                        f.write(encoded)
+                    entry[encoding] = len(encoded)
+        manifest["assets"][logical] = entry
+    with open(os.path.join(dist, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def report():
+    """Page-load transfer through the real Flask app (benchmark fakes, no network)."""
+    from benchmarks import fakes
+
+    fakes.prepare_env()
+    import app as app_module
+
+    fakes.install(app_module)
+    client = app_module.app.test_client()
+
+    def transfer(path, headers):
+        r = client.get(path, headers=headers)
+        size = len(r.get_data())
+        r.close()
+        return r, size
+
+    plain = {"Accept-Encoding": "identity"}
+    browser = {"Accept-Encoding": "gzip, deflate, br"}
+    page, html_plain = transfer("/", plain)
+    html = page.get_data(as_text=True)
+    urls = re.findall(r'(?:href|src)="(/(?:assets|static)/[^"]+)"', html)
+    urls += re.findall(r'"(/(?:assets|static)/[^"]+\.png)"', html)
+    urls = sorted(set(urls))
+
+    # Before: HTML and assets uncompressed, every asset refetched or revalidated per visit
+    before_assets = 0
+    for url in urls:
+        entry = delivery.assets.by_hashed.get(url.rsplit("/", 1)[1])
+        before_assets += os.path.getsize(entry["path"]) if entry else transfer(url, plain)[1]
+    page_c, html_after = transfer("/", browser)
+    after_assets = sum(transfer(u, browser)[1] for u in urls)
+    etag = page_c.headers.get("ETag")
+    repeat, html_repeat = transfer("/", dict(browser, **{"If-None-Match": etag or ""}))
+
+    sample = json.dumps({"reply": " ".join(fakes.CORPUS.values())}).encode()
+    chat_c = len(delivery.compress(sample, delivery.choose_encoding(browser["Accept-Encoding"])))
+
+    print(f"\nAssets referenced by /: {', '.join(urls)}")
+    print(f"{'':<34}{'before':>10}{'after':>10}")
+    print(f"{'first visit: HTML':<34}{html_plain:>10}{html_after:>10}")
+    print(f"{'first visit: assets':<34}{before_assets:>10}{after_assets:>10}")
+    print(f"{'first visit: total':<34}{html_plain + before_assets:>10}{html_after + after_assets:>10}")
+    print(f"{'repeat visit: total':<34}{html_plain + before_assets:>10}{html_repeat:>10}"
+          f"   (HTML {repeat.status_code}, assets immutable in cache)")
+    print(f"{'/chat reply JSON':<34}{len(sample):>10}{chat_c:>10}")
+    print("Before = Flask defaults: no compression, assets re-requested on every visit "
+          "(a 304 still costs a round-trip per asset).")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build hashed, precompressed static assets")
+    parser.add_argument("--static", default=delivery.STATIC_DIR)
+    parser.add_argument("--report", action="store_true", help="measure page-load transfer before/after")
+    args = parser.parse_args()
+
+    manifest = build(args.static)
+    print(f"{'asset':<20}{'hashed file':<34}{'bytes':>8}{'gzip':>8}{'br':>8}")
+    for logical, entry in manifest["assets"].items():
+        print(f"{logical:<20}{entry['file']:<34}{entry['size']:>8}{entry.get('gzip', '-'):>8}{entry.get('br', '-'):>8}")
+    if delivery.brotli is None:
+        print("brotli not installed: .br files skipped")
+    if args.report:
+        report()
+
+
+if __name__ == "__main__":
+    main()
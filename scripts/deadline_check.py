@@ -0,0 +1,78 @@
+"""
+Request deadlines (utils/deadline.py) through the real /chat graph with the
+benchmark fakes. Every corpus document is graded irrelevant, so an
+unbounded turn runs enhance, classify, three retrieve+grade rounds, web
+search and generate; with a budget the router skips the refine loop and web
+search as time runs out and answers from the best retrieved documents.
+
+    python -m scripts.deadline_check
+    python -m scripts.deadline_check --budgets 0,20,10,6 --reserve 1.5
+
+Budget 0 means no deadline. Prints per budget: p50/max /chat latency,
+deadline misses and the degraded paths taken.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUESTIONS = [
+    "How do I treat a migraine headache naturally?",
+    "What helps with a sprained ankle?",
+    "Which herbs are good for kidney stones?",
+    "How can I reduce dark circles under my eyes?",
+    "What should I eat for anemia?",
+    "Is there an Ayurvedic remedy for tinnitus?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure /chat under request deadlines")
+    parser.add_argument("--budgets", default="0,12,6", help="comma-separated REQUEST_DEADLINE_S values (0 = none)")
+    parser.add_argument("--reserve", type=float, default=1.5, help="DEADLINE_GENERATE_RESERVE_S")
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE set before importing the app")
+    args = parser.parse_args()
+    for item in args.env:
+        key, _, value = item.partition("=")
+        os.environ[key] = value
+
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    os.environ.setdefault("ANSWER_STORE_ENABLED", "0")
+    # Every budget must see the same corpus gaps: no cached or written-back web results
+    os.environ.setdefault("WEB_CACHE_ENABLED", "0")
+    os.environ.setdefault("WEBSEARCH_WRITEBACK", "0")
+    from benchmarks import fakes
+
+    fakes.prepare_env()
+    import app as app_module
+    from utils import deadline, metrics
+
+    fakes.install(app_module, latency={"llm": "fixed:0.8", "llm_grade": "fixed:0.3", "retriever": "fixed:0.3",
+                                       "tavily": "fixed:2.5"},
+                  grade_yes_rate=0.0, web_grade_yes_rate=1.0)
+    deadline.GENERATE_RESERVE_S = args.reserve
+    client = app_module.app.test_client()
+
+    print(f"{'budget s':<10}{'p50 s':>8}{'max s':>8}{'misses':>8}  degraded paths")
+    for budget in [float(b) for b in args.budgets.split(",") if b.strip()]:
+        deadline.REQUEST_DEADLINE_S = budget if budget > 0 else 1e9
+        # Keep node latencies from earlier budgets: expected() uses their p95
+        metrics.reset("deadline.")
+        latencies = []
+        for i, question in enumerate(QUESTIONS):
+            start = time.perf_counter()
+            r = client.post("/chat", data={"message": question, "session_id": f"deadline-{budget}-{i}"})
+            latencies.append(time.perf_counter() - start)
+            if r.status_code != 200:
+                print(f"  {question!r}: HTTP {r.status_code}")
+        counters = metrics.snapshot("deadline.")["counters"]
+        paths = {k.split("deadline.degraded.", 1)[1]: v for k, v in counters.items() if k.startswith("deadline.degraded.")}
+        print(f"{budget or 'none':<10}{statistics.median(latencies):>8.2f}{max(latencies):>8.2f}"
+              f"{counters.get('deadline.misses', 0):>8}  {paths or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Prompt tokens and answer latency of generate_answer's prompt with the raw
+graded documents vs the packed context (utils/context_packer.py), on the
+fixed question set in benchmarks/eval/questions.json.
+
+    python -m scripts.eval_context_packer              # live: Pinecone + Gemini (needs keys)
+    python -m scripts.eval_context_packer --offline    # Data/ PDFs + BM25, modeled latency
+    python -m scripts.eval_context_packer --offline --budget 300
+
+Live runs read prompt tokens from the model's usage metadata when present
+(else the packer's estimate) and time rag_chain.invoke. Offline runs retrieve
+from benchmarks/local_corpus.py and model latency as a fixed part plus a
+per-prompt-token prefill cost (--base-ms, --ms-per-token) instead of calling
+an LLM. "coverage" is the share of query terms that appear in the context,
+a cheap check that packing keeps the relevant material.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dotenv import load_dotenv
+
+QUESTIONS_PATH = os.path.join(ROOT, "benchmarks", "eval", "questions.json")
+
+
+def coverage(query, context):
+    from utils.context_packer import _words
+
+    terms = set(_words(query))
+    text = str(context).lower()
+    return sum(1 for t in terms if t in text) / max(1, len(terms))
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Evaluate the context packer on a fixed question set")
+    parser.add_argument("--questions", default=QUESTIONS_PATH)
+    parser.add_argument("--offline", action="store_true", help="local corpus + modeled latency, no network")
+    parser.add_argument("--budget", type=int, default=None, help="CONTEXT_TOKEN_BUDGET override")
+    parser.add_argument("--k", type=int, default=5, help="documents per question (offline)")
+    parser.add_argument("--base-ms", type=float, default=450.0, help="offline: fixed latency per call")
+    parser.add_argument("--ms-per-token", type=float, default=0.35, help="offline: prefill cost per prompt token")
+    parser.add_argument("--output", default=None, help="write per-question results as JSON")
+    args = parser.parse_args()
+
+    from langchain_core.messages import HumanMessage
+    from chains.prompt_templates import rag_prompt
+    from utils import context_packer
+
+    with open(args.questions, encoding="utf-8") as f:
+        questions = json.load(f)
+
+    if args.offline:
+        from benchmarks.local_corpus import LocalRetriever
+
+        retriever, llm = LocalRetriever(k=args.k), None
+    else:
+        from chains.rag_chain import retriever, llm
+        if retriever is None or llm is None:
+            raise SystemExit("retriever/LLM not configured; use --offline")
+    chain = None if llm is None else rag_prompt | llm
+
+    rows = []
+    for q in questions:
+        question = q["question"]
+        documents = retriever.invoke(question)
+        history = [HumanMessage(content=question)]
+        packed = context_packer.pack(documents, question, budget=args.budget)
+        variants = {"raw": documents, "packed": packed.text or documents}
+        row = {"id": q["id"], "documents": len(documents), "sentences": f"{packed.sentences_kept}/{packed.sentences_total}"}
+        for name, context in variants.items():
+            inputs = {"history": history, "context": context, "question": question}
+            tokens = context_packer.estimate_tokens(rag_prompt.format(**inputs))
+            if chain is None:
+                latency = (args.base_ms + args.ms_per_token * tokens) / 1000
+            else:
+                start = time.perf_counter()
+                response = chain.invoke(inputs)
+                latency = time.perf_counter() - start
+                usage = getattr(response, "usage_metadata", None) or {}
+                tokens = usage.get("input_tokens") or tokens
+            row[name] = {"prompt_tokens": tokens, "latency_s": round(latency, 3),
+                         "coverage": round(coverage(question, context), 2)}
+        rows.append(row)
+        print(f"{q['id']:<16} docs {row['documents']}  sentences {row['sentences']:>6}  "
+              f"tokens {row['raw']['prompt_tokens']:>5} -> {row['packed']['prompt_tokens']:>5}  "
+              f"latency {row['raw']['latency_s']:.2f}s -> {row['packed']['latency_s']:.2f}s  "
+              f"coverage {row['raw']['coverage']:.2f} -> {row['packed']['coverage']:.2f}")
+
+    print(f"\n{'':<10}{'tokens mean':>12}{'tokens max':>11}{'latency p50':>12}{'latency p95':>12}{'coverage':>10}")
+    for name in ("raw", "packed"):
+        tokens = [r[name]["prompt_tokens"] for r in rows]
+        latency = sorted(r[name]["latency_s"] for r in rows)
+        p95 = latency[min(len(latency) - 1, int(round(0.95 * (len(latency) - 1))))]
+        print(f"{name:<10}{statistics.mean(tokens):>12.0f}{max(tokens):>11}{statistics.median(latency):>11.2f}s"
+              f"{p95:>11.2f}s{statistics.mean(r[name]['coverage'] for r in rows):>10.2f}")
+    print(f"\nbudget {args.budget or context_packer.CONTEXT_TOKEN_BUDGET} tokens, "
+          f"{'offline (modeled latency)' if chain is None else 'live'}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
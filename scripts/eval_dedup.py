@@ -0,0 +1,119 @@
+"""
+Near-duplicate detection (utils/dedup.py) on the Data/ corpus: how much
+smaller the index gets when setup_database.py collapses duplicate chunks,
+and how many grader calls per query retrieve() saves by dropping
+near-duplicates from the candidates before retrieval_grader.
+
+    python -m scripts.eval_dedup
+    python -m scripts.eval_dedup --thresholds 0.5,0.7,0.9 --k 5 --fetch-k 10
+    python -m scripts.eval_dedup --also-overlap 20   # index also loaded by Pinecone_load.py
+
+Runs offline: chunks come from benchmarks/local_corpus.py (split like
+setup_database.py) and queries use its BM25 retriever in place of Pinecone.
+"Grader calls saved" counts top-k documents that nearly duplicate a better
+ranked one, i.e. LLM calls that would have graded the same passage twice.
+--also-overlap N adds a second split of the same PDFs with that chunk
+overlap, as in an index that both Pinecone_load.py (20) and
+setup_database.py (50) have written to.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+QUESTIONS_PATH = os.path.join(ROOT, "benchmarks", "eval", "questions.json")
+
+
+def _documents(chunks):
+    from langchain_core.documents import Document
+
+    return [Document(page_content=c["text"], metadata={"source": c["source"], "page": c["page"]}) for c in chunks]
+
+
+def index_report(chunks, thresholds):
+    from utils import dedup
+
+    total_chars = sum(len(c["text"]) for c in chunks)
+    print(f"{'threshold':<11}{'chunks':>8}{'dropped':>9}{'index size':>12}{'chars saved':>13}{'time':>8}")
+    print(f"{'off':<11}{len(chunks):>8}{0:>9}{'100.0%':>12}{0:>13}{'-':>8}")
+    kept_at = {}
+    for threshold in thresholds:
+        start = time.perf_counter()
+        kept, dropped = dedup.collapse_documents(_documents(chunks), threshold=threshold)
+        elapsed = time.perf_counter() - start
+        saved = sum(len(d.page_content) for d in dropped)
+        print(f"{threshold:<11}{len(kept):>8}{len(dropped):>9}{len(kept) / len(chunks):>12.1%}{saved:>13}{elapsed:>7.1f}s")
+        kept_at[threshold] = (kept, dropped)
+    print(f"({total_chars} characters in {len(chunks)} chunks; containment threshold {dedup.DEDUP_CONTAINMENT})")
+    return kept_at
+
+
+def query_report(chunks, questions, k, fetch_k, label):
+    from benchmarks.local_corpus import LocalRetriever
+    from utils import dedup
+
+    retriever = LocalRetriever(chunks, k=fetch_k)
+    rows = []
+    for q in questions:
+        candidates = retriever.invoke(q["question"])
+        selected, skipped = dedup.mmr_select(q["question"], candidates, k)
+        saved = sum(1 for i in skipped if i < k)
+        new_material = len({d.page_content for d in selected} - {d.page_content for d in candidates[:k]})
+        rows.append({"id": q["id"], "candidates": len(candidates), "graded": len(selected),
+                     "duplicates": len(skipped), "saved": saved, "new": new_material})
+    print(f"\n{label}: top-{k} of {fetch_k} candidates per query")
+    print(f"{'question':<18}{'candidates':>11}{'duplicates':>11}{'graded':>8}{'saved':>7}{'backfilled':>12}")
+    for r in rows:
+        print(f"{r['id']:<18}{r['candidates']:>11}{r['duplicates']:>11}{r['graded']:>8}{r['saved']:>7}{r['new']:>12}")
+    print(f"{'mean':<18}{statistics.mean(r['candidates'] for r in rows):>11.1f}"
+          f"{statistics.mean(r['duplicates'] for r in rows):>11.2f}{statistics.mean(r['graded'] for r in rows):>8.2f}"
+          f"{statistics.mean(r['saved'] for r in rows):>7.2f}{statistics.mean(r['new'] for r in rows):>12.2f}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report index size reduction and grader calls saved by dedup")
+    parser.add_argument("--questions", default=QUESTIONS_PATH)
+    parser.add_argument("--thresholds", default="0.5,0.7,0.9", help="comma-separated Jaccard thresholds")
+    parser.add_argument("--k", type=int, default=5, help="documents graded per query (RETRIEVER_K)")
+    parser.add_argument("--fetch-k", type=int, default=10, help="candidates fetched per query (RETRIEVER_FETCH_K)")
+    parser.add_argument("--also-overlap", type=int, default=None,
+                        help="add a second split of Data/ with this chunk overlap (index loaded twice)")
+    parser.add_argument("--output", default=None, help="write the per-question results as JSON")
+    args = parser.parse_args()
+
+    from benchmarks.local_corpus import load_chunks
+    from utils import dedup
+
+    chunks = load_chunks()
+    if args.also_overlap is not None:
+        cache_path = os.path.join(ROOT, "tmp", f"local_corpus_overlap{args.also_overlap}.json")
+        chunks = chunks + load_chunks(chunk_overlap=args.also_overlap, cache_path=cache_path)
+    with open(args.questions, encoding="utf-8") as f:
+        questions = json.load(f)
+    thresholds = [float(t) for t in args.thresholds.split(",") if t.strip()]
+    if dedup.DEDUP_THRESHOLD not in thresholds:
+        thresholds.append(dedup.DEDUP_THRESHOLD)
+
+    print("Index (setup_database.py collapse)")
+    kept_at = index_report(chunks, thresholds)
+    kept, _ = kept_at[dedup.DEDUP_THRESHOLD]
+    kept_chunks = [{"text": d.page_content, "source": d.metadata["source"], "page": d.metadata["page"]} for d in kept]
+
+    results = {
+        "full index": query_report(chunks, questions, args.k, args.fetch_k, "Full index"),
+        "collapsed index": query_report(kept_chunks, questions, args.k, args.fetch_k,
+                                        f"Collapsed index (threshold {dedup.DEDUP_THRESHOLD})"),
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Kannada /chat turns with the translate sandwich (KN->EN question, EN->KN
+reply) vs the native pipeline (utils/kannada_mode.py), on the Kannada
+versions of the fixed question set in benchmarks/eval/questions_kn.json.
+
+    python -m scripts.eval_kannada --offline                 # benchmark fakes, modeled latency
+    python -m scripts.eval_kannada                           # live: Gemini, Pinecone, translation (needs keys)
+    python -m scripts.eval_kannada --judge                   # live, plus an LLM quality score per reply
+    python -m scripts.eval_kannada --modes translate,native,native:retrieve=translate
+
+A mode is "translate" or "native", optionally with KANNADA_NODE_MODES after a
+colon. Each question goes through the real /chat route (fresh session) and is
+timed end to end. Reported per mode: latency p50/p95, translation calls per
+turn (question, reply and query-only translations), reply tokens, the share of
+reply letters in Kannada script, and with --judge the mean 1-5 score Gemini
+gives each reply for correctness and natural Kannada. Offline, native answers
+come from the fake model tagged "[kn]" like the fake translation, so script
+ratio and judge scores are only meaningful live.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dotenv import load_dotenv
+
+QUESTIONS_PATH = os.path.join(ROOT, "benchmarks", "eval", "questions_kn.json")
+
+JUDGE_PROMPT = """You are grading an Ayurvedic health assistant's answer to a question asked in Kannada.
+Score 1-5: 5 = correct, relevant Ayurvedic advice written in natural, fluent Kannada;
+3 = relevant but awkward or partly English; 1 = wrong, off-topic or not Kannada.
+Reply with the number only.
+
+Question: {question}
+
+Answer: {answer}"""
+
+
+def _p95(values):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))]
+
+
+def _configure(mode):
+    """Points utils.kannada_mode at a mode spec like 'native:retrieve=translate'."""
+    from utils import kannada_mode
+
+    name, _, nodes = mode.partition(":")
+    kannada_mode.KANNADA_MODE = name
+    kannada_mode.NODE_MODES = dict(kannada_mode.DEFAULT_NODE_MODES, **kannada_mode._parse(nodes))
+
+
+def _judge(llm, question, answer):
+    try:
+        response = llm.invoke(JUDGE_PROMPT.format(question=question, answer=answer))
+        match = re.search(r"[1-5]", str(response.content))
+        return int(match.group()) if match else None
+    except Exception as e:
+        print(f"  judge failed: {e}")
+        return None
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Compare the Kannada translate sandwich with the native pipeline")
+    parser.add_argument("--questions", default=QUESTIONS_PATH)
+    parser.add_argument("--modes", default="translate,native")
+    parser.add_argument("--offline", action="store_true", help="benchmark fakes instead of the real providers")
+    parser.add_argument("--judge", action="store_true", help="live only: score each reply 1-5 with the LLM")
+    parser.add_argument("--output", default=None, help="write per-question results as JSON")
+    args = parser.parse_args()
+
+    # Stored FAQ answers and shed grading calls would hide the pipeline under test
+    os.environ.setdefault("ANSWER_STORE_ENABLED", "0")
+    if args.offline:
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+        from benchmarks import fakes
+
+        fakes.prepare_env()
+    import app as app_module
+    from utils import context_packer, kannada_mode, metrics
+
+    if args.offline:
+        fakes.install(app_module, latency={"llm": "fixed:0.3", "llm_grade": "fixed:0.1",
+                                           "retriever": "fixed:0.1", "translate": "fixed:0.5"},
+                      grade_yes_rate=1.0)
+    judge_llm = None
+    if args.judge and not args.offline:
+        from chains.rag_chain import llm as judge_llm
+
+    with open(args.questions, encoding="utf-8") as f:
+        questions = json.load(f)
+    client = app_module.app.test_client()
+
+    rows, summary = [], {}
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        _configure(mode)
+        metrics.reset()
+        latencies, tokens, ratios, scores = [], [], [], []
+        for q in questions:
+            start = time.perf_counter()
+            r = client.post("/chat", data={"message": q["question"], "lang": "kn",
+                                           "session_id": f"kn-eval-{mode}-{q['id']}"})
+            latency = time.perf_counter() - start
+            reply = (r.get_json() or {}).get("reply", "") if r.status_code == 200 else ""
+            score = _judge(judge_llm, q["question"], reply) if judge_llm is not None and reply else None
+            latencies.append(latency)
+            tokens.append(context_packer.estimate_tokens(reply))
+            ratios.append(kannada_mode.kannada_ratio(reply))
+            if score is not None:
+                scores.append(score)
+            rows.append({"mode": mode, "id": q["id"], "status": r.status_code, "latency_s": round(latency, 3),
+                         "reply_tokens": tokens[-1], "kannada_ratio": round(ratios[-1], 3), "judge": score,
+                         "reply": reply})
+        translations = sum(v.get("count", 0) for v in metrics.snapshot("translate.")["latency"].values())
+        summary[mode] = {
+            "p50_s": statistics.median(latencies), "p95_s": _p95(latencies),
+            "translations_per_turn": translations / len(questions),
+            "reply_tokens": statistics.mean(tokens), "kannada_ratio": statistics.mean(ratios),
+            "judge": statistics.mean(scores) if scores else None,
+            "counters": metrics.snapshot("kannada.")["counters"],
+        }
+
+    print(f"{'mode':<32}{'p50 s':>8}{'p95 s':>8}{'translations':>14}{'reply tok':>11}{'kn script':>11}{'judge':>7}")
+    for mode, s in summary.items():
+        judge = f"{s['judge']:.2f}" if s["judge"] is not None else "-"
+        print(f"{mode:<32}{s['p50_s']:>8.2f}{s['p95_s']:>8.2f}{s['translations_per_turn']:>14.2f}"
+              f"{s['reply_tokens']:>11.0f}{s['kannada_ratio']:>11.2f}{judge:>7}")
+    for mode, s in summary.items():
+        if s["counters"]:
+            print(f"  {mode}: {s['counters']}")
+    print(f"\n{len(questions)} questions, {'offline (benchmark fakes)' if args.offline else 'live'}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "rows": rows}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Local language detection (utils/langdetect.py): accuracy and cost of the
+detector on labeled samples, then the translation calls and /chat latency it
+saves for a Kannada-UI user who types a mix of English, Kanglish and Kannada.
+
+    python -m scripts.eval_langdetect                  # benchmark fakes (translation latency modeled)
+    python -m scripts.eval_langdetect --detector-only
+
+The /chat part runs each question in benchmarks/eval/langdetect_samples.json
+through the real route with lang=kn twice, detection off (the client's lang
+is trusted: every turn pays KN->EN and EN->KN) and on, and counts translation
+calls from the translate.* latency series.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SAMPLES_PATH = os.path.join(ROOT, "benchmarks", "eval", "langdetect_samples.json")
+
+
+def evaluate_detector(samples):
+    from utils import langdetect
+
+    by_kind = {}
+    start = time.perf_counter()
+    for _ in range(20):
+        results = [langdetect.detect(s["text"]) for s in samples]
+    per_call_us = (time.perf_counter() - start) / (20 * len(samples)) * 1e6
+    for sample, d in zip(samples, results):
+        kind = f"{sample['lang']}/{sample['script']}"
+        ok = d.lang == sample["lang"] and d.script == sample["script"]
+        by_kind.setdefault(kind, []).append(ok)
+        if not ok:
+            print(f"  miss: {sample['text']!r} -> {d}")
+    print(f"{'kind':<14}{'samples':>8}{'accuracy':>10}")
+    for kind, oks in sorted(by_kind.items()):
+        print(f"{kind:<14}{len(oks):>8}{sum(oks) / len(oks):>10.2f}")
+    total = [ok for oks in by_kind.values() for ok in oks]
+    print(f"{'all':<14}{len(total):>8}{sum(total) / len(total):>10.2f}   {per_call_us:.0f} us per detection\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate local language detection and the translation calls it saves")
+    parser.add_argument("--samples", default=SAMPLES_PATH)
+    parser.add_argument("--detector-only", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.samples, encoding="utf-8") as f:
+        samples = json.load(f)
+    evaluate_detector(samples)
+    if args.detector_only:
+        return
+
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    os.environ.setdefault("ANSWER_STORE_ENABLED", "0")
+    from benchmarks import fakes
+
+    fakes.prepare_env()
+    import app as app_module
+    from utils import langdetect, metrics
+
+    fakes.install(app_module, latency={"llm": "fixed:0.2", "llm_grade": "fixed:0.05",
+                                       "retriever": "fixed:0.05", "translate": "fixed:0.5"},
+                  grade_yes_rate=1.0)
+    client = app_module.app.test_client()
+
+    print(f"{'detection':<11}{'translations':>14}{'per turn':>10}{'p50 s':>8}{'mean s':>8}{'replies en/kn':>15}")
+    for enabled in (False, True):
+        langdetect.LANGDETECT_ENABLED = enabled
+        metrics.reset()
+        latencies, reply_langs = [], []
+        for i, sample in enumerate(samples):
+            start = time.perf_counter()
+            r = client.post("/chat", data={"message": sample["text"], "lang": "kn",
+                                           "session_id": f"langdetect-{enabled}-{i}"})
+            latencies.append(time.perf_counter() - start)
+            reply_langs.append((r.get_json() or {}).get("lang", "kn"))
+        calls = sum(v.get("count", 0) for v in metrics.snapshot("translate.")["latency"].values())
+        print(f"{'on' if enabled else 'off':<11}{calls:>14}{calls / len(samples):>10.2f}"
+              f"{statistics.median(latencies):>8.2f}{statistics.mean(latencies):>8.2f}"
+              f"{reply_langs.count('en'):>8}/{reply_langs.count('kn')}")
+    print(f"\n/metrics langdetect: {json.dumps(langdetect.estimated_savings())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Offline retrieval evaluation over the Data/ PDFs: builds a local index for
+every combination of chunk size, chunk overlap and embedding model, runs the
+golden questions in benchmarks/eval/golden.json against it and reports
+recall@k, hit@k, MRR, index size, build time and query latency per k.
+
+    python -m scripts.eval_retrieval                                   # default grid
+    python -m scripts.eval_retrieval --chunk-sizes 500 --overlaps 20,50 --k 5
+    python -m scripts.eval_retrieval --embeddings bm25,hashed,sentence-transformers/all-MiniLM-L6-v2
+    python -m scripts.eval_retrieval --export                          # write the winner to config/ingestion.json
+
+Golden answers are page ranges of the source PDFs, so relevance does not
+depend on the chunking under test: a retrieved chunk is relevant when its
+(source, page) falls in a range. recall@k is the share of relevant pages
+covered by the top k chunks, hit@k whether any of them is relevant, MRR the
+mean reciprocal rank of the first relevant chunk (within the top 10).
+
+Embedding backends: "bm25" (lexical, what benchmarks/local_corpus.py uses),
+"hashed" (1024-d hashed character trigrams, a dense stand-in that needs no
+model), any sentence-transformers model name (needs sentence-transformers,
+see requirements-dev.txt) and "google:models/embedding-001" (the query
+embedding chains/rag_chain.py uses; needs GOOGLE_API_KEY). Chunkings and
+embeddings are cached under tmp/eval_retrieval/.
+
+The winner is the best recall@k with k <= --max-k (ties: MRR, then the
+smaller index). --export writes its chunking and k, and its embedding model
+when it is a real one, to config/ingestion.json, which the ingestion scripts
+and chains/rag_chain.py read.
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+import zlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from dotenv import load_dotenv
+
+GOLDEN_PATH = os.path.join(ROOT, "benchmarks", "eval", "golden.json")
+CACHE_DIR = os.path.join(ROOT, "tmp", "eval_retrieval")
+HASHED_DIMENSIONS = 1024
+MRR_DEPTH = 10
+LEXICAL = ("bm25", "hashed")
+
+
+def _hashed_vector(text):
+    from utils.context_packer import _words
+
+    vector = np.zeros(HASHED_DIMENSIONS, dtype=np.float32)
+    for word in _words(text):
+        padded = f"#{word}#"
+        for i in range(max(1, len(padded) - 2)):
+            vector[zlib.crc32(padded[i:i + 3].encode("utf-8")) % HASHED_DIMENSIONS] += 1
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _embedder(name):
+    """(embed_documents, embed_query) for a model name."""
+    if name == "hashed":
+        return (lambda texts: np.stack([_hashed_vector(t) for t in texts]), _hashed_vector)
+    if name.startswith("google:"):
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        model = GoogleGenerativeAIEmbeddings(model=name.split(":", 1)[1])
+    else:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        model = HuggingFaceEmbeddings(model_name=name)
+    return (lambda texts: np.asarray(model.embed_documents(texts), dtype=np.float32),
+            lambda text: np.asarray(model.embed_query(text), dtype=np.float32))
+
+
+class DenseIndex:
+    """Cosine search over cached chunk embeddings."""
+
+    def __init__(self, name, chunks, chunk_key):
+        self.embed_documents, self.embed_query = _embedder(name)
+        digest = hashlib.sha1(f"{name}:{chunk_key}".encode()).hexdigest()[:16]
+        path = os.path.join(CACHE_DIR, f"vectors-{digest}.npy")
+        meta_path = path[:-4] + ".json"
+        if os.path.exists(path) and os.path.exists(meta_path):
+            self.vectors = np.load(path)
+            with open(meta_path, encoding="utf-8") as f:
+                self.build_s = json.load(f)["build_s"]
+        else:
+            start = time.perf_counter()
+            self.vectors = self.embed_documents([c["text"] for c in chunks])
+            self.build_s = time.perf_counter() - start
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            np.save(path, self.vectors)
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"build_s": self.build_s}, f)
+        norms = np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        self.vectors = self.vectors / np.where(norms == 0, 1, norms)
+        self.bytes = self.vectors.shape[0] * self.vectors.shape[1] * 4
+
+    def search(self, query, k):
+        q = self.embed_query(query)
+        scores = self.vectors @ (q / (np.linalg.norm(q) or 1))
+        top = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+        return sorted(top.tolist(), key=lambda i: -scores[i])
+
+
+class LexicalIndex:
+    def __init__(self, chunks):
+        from benchmarks.local_corpus import LocalRetriever
+
+        start = time.perf_counter()
+        self.retriever = LocalRetriever(chunks)
+        self.build_s = time.perf_counter() - start
+        self.bytes = sum(len(p) for p in self.retriever._postings.values()) * 8
+
+    def search(self, query, k):
+        return [i for i, _ in self.retriever.search(query, k)]
+
+
+def _relevant_pages(item):
+    return {(r["source"], page) for r in item["relevant"] for page in range(r["pages"][0], r["pages"][1] + 1)}
+
+
+def evaluate(chunks, index, golden, ks):
+    depth = max(max(ks), MRR_DEPTH)
+    per_k = {k: {"recall": [], "hit": []} for k in ks}
+    reciprocal, latencies = [], []
+    for item in golden:
+        relevant = _relevant_pages(item)
+        start = time.perf_counter()
+        ranked = index.search(item["question"], depth)
+        latencies.append((time.perf_counter() - start) * 1000)
+        pages = [(chunks[i]["source"], chunks[i]["page"]) for i in ranked]
+        first = next((rank for rank, page in enumerate(pages, 1) if page in relevant), None)
+        reciprocal.append(1 / first if first else 0.0)
+        for k in ks:
+            found = set(pages[:k]) & relevant
+            per_k[k]["recall"].append(len(found) / len(relevant))
+            per_k[k]["hit"].append(1.0 if found else 0.0)
+    latencies.sort()
+    return {
+        "mrr": statistics.mean(reciprocal),
+        "latency_p50_ms": statistics.median(latencies),
+        "latency_p95_ms": latencies[min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))],
+        "by_k": {k: {m: statistics.mean(v) for m, v in values.items()} for k, values in per_k.items()},
+    }
+
+
+def _ints(text):
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Sweep chunking, k and embeddings against the golden question set")
+    parser.add_argument("--golden", default=GOLDEN_PATH)
+    parser.add_argument("--chunk-sizes", default="300,500,800")
+    parser.add_argument("--overlaps", default="20,50,100")
+    parser.add_argument("--k", default="3,5,8", help="retriever k values to score")
+    parser.add_argument("--embeddings", default="bm25,hashed", help="comma-separated backends (see module docstring)")
+    parser.add_argument("--max-k", type=int, default=5, help="largest k the winner may use (each document is a grader call)")
+    parser.add_argument("--export", action="store_true", help="write the winning config to config/ingestion.json")
+    parser.add_argument("--output", default=None, help="write every result row as JSON")
+    args = parser.parse_args()
+
+    from benchmarks.local_corpus import load_chunks
+    from utils import ingestion_config
+
+    with open(args.golden, encoding="utf-8") as f:
+        golden = json.load(f)
+    ks = sorted(set(_ints(args.k)))
+    embeddings = [e.strip() for e in args.embeddings.split(",") if e.strip()]
+
+    rows, unavailable = [], set()
+    for chunk_size in _ints(args.chunk_sizes):
+        for overlap in _ints(args.overlaps):
+            if overlap >= chunk_size:
+                continue
+            start = time.perf_counter()
+            chunks = load_chunks(chunk_size=chunk_size, chunk_overlap=overlap,
+                                 cache_path=os.path.join(CACHE_DIR, f"chunks-{chunk_size}-{overlap}.json"))
+            split_s = time.perf_counter() - start
+            text_bytes = sum(len(c["text"].encode("utf-8")) for c in chunks)
+            for name in embeddings:
+                if name in unavailable:
+                    continue
+                try:
+                    index = LexicalIndex(chunks) if name == "bm25" else DenseIndex(name, chunks, f"{chunk_size}:{overlap}:{len(chunks)}")
+                except ImportError as e:
+                    print(f"  skipping {name}: {e}")
+                    unavailable.add(name)
+                    continue
+                except Exception as e:
+                    print(f"  skipping {name} at {chunk_size}/{overlap}: {type(e).__name__}: {e}")
+                    continue
+                result = evaluate(chunks, index, golden, ks)
+                for k in ks:
+                    rows.append({
+                        "chunk_size": chunk_size, "chunk_overlap": overlap, "embedding": name, "k": k,
+                        "recall": result["by_k"][k]["recall"], "hit": result["by_k"][k]["hit"], "mrr": result["mrr"],
+                        "chunks": len(chunks), "index_mb": (text_bytes + index.bytes) / 1e6,
+                        "build_s": index.build_s, "split_s": split_s,
+                        "latency_p50_ms": result["latency_p50_ms"], "latency_p95_ms": result["latency_p95_ms"],
+                    })
+            print(f"  {chunk_size}/{overlap}: {len(chunks)} chunks")
+    if not rows:
+        raise SystemExit("no configuration could be evaluated")
+
+    header = (f"{'size':>5}{'overlap':>8}{'embedding':>12}{'k':>3}{'recall@k':>10}{'hit@k':>7}{'MRR':>6}"
+              f"{'chunks':>8}{'index MB':>9}{'build s':>8}{'p50 ms':>8}{'p95 ms':>8}")
+    print("\n" + header)
+    for r in rows:
+        print(f"{r['chunk_size']:>5}{r['chunk_overlap']:>8}{r['embedding'][-12:]:>12}{r['k']:>3}{r['recall']:>10.3f}"
+              f"{r['hit']:>7.2f}{r['mrr']:>6.2f}{r['chunks']:>8}{r['index_mb']:>9.2f}{r['build_s']:>8.2f}"
+              f"{r['latency_p50_ms']:>8.1f}{r['latency_p95_ms']:>8.1f}")
+
+    current = ingestion_config.load()
+    baseline = [r for r in rows if r["chunk_size"] == current["chunk_size"]
+                and r["chunk_overlap"] == current["chunk_overlap"] and r["k"] == current["retriever_k"]]
+    eligible = [r for r in rows if r["k"] <= args.max_k] or rows
+    best = max(eligible, key=lambda r: (round(r["recall"], 3), round(r["mrr"], 3), -r["chunks"], -r["k"]))
+    print(f"\nbest (k <= {args.max_k}): {best['chunk_size']}/{best['chunk_overlap']} {best['embedding']} k={best['k']}  "
+          f"recall@k {best['recall']:.3f}  MRR {best['mrr']:.2f}  {best['chunks']} chunks")
+    for r in baseline:
+        print(f"current config ({r['chunk_size']}/{r['chunk_overlap']} {r['embedding']} k={r['k']}): "
+              f"recall@k {r['recall']:.3f}  MRR {r['mrr']:.2f}  {r['chunks']} chunks")
+
+    if args.export:
+        values = dict(current, chunk_size=best["chunk_size"], chunk_overlap=best["chunk_overlap"], retriever_k=best["k"])
+        if best["embedding"] not in LEXICAL:
+            values["embedding_model"] = best["embedding"]
+        else:
+            print(f"embedding_model left at {current['embedding_model']} ({best['embedding']} is an offline proxy)")
+        evaluation = {k: round(best[k], 4) if isinstance(best[k], float) else best[k]
+                      for k in ("embedding", "recall", "hit", "mrr", "chunks")}
+        evaluation["golden"] = os.path.relpath(args.golden, ROOT)
+        ingestion_config.save(values, evaluation=evaluation)
+        print(f"wrote {ingestion_config.INGESTION_CONFIG_PATH}; re-run scripts/setup_database.py to rebuild the index")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
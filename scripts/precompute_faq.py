@@ -0,0 +1,259 @@
+"""
+Precompute answers for the most frequent questions and store them in the
+versioned answer store (utils/answer_store.py) that /chat consults before
+running the graph.
+
+Questions come from two places:
+  * captured traffic (TRAFFIC_CAPTURE=1 -> logs/requests.jsonl): first-turn,
+    text-only questions asked at least --min-count times
+  * seed topics: conditions from SEED_CONDITIONS that actually occur in the
+    Data/ corpus, expanded with QUESTION_TEMPLATES
+
+Each question runs through the full build_workflow() graph (in parallel, one
+thread_id per question). Answers are stored in English and Kannada, and with
+--tts the speech for both is put in the shared audio cache.
+
+    python -m scripts.precompute_faq --dry-run
+    python -m scripts.precompute_faq --workers 4 --tts --purge
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dotenv import load_dotenv
+
+SEED_CONDITIONS = {
+    # topic -> words that count as a mention in the corpus
+    "cold": ["common cold", "pratishyaya", "coryza"],
+    "cough": ["cough", "kasa"],
+    "acidity": ["acidity", "amlapitta", "hyperacidity", "heartburn"],
+    "diabetes": ["diabetes", "madhumeha", "prameha"],
+    "hair fall": ["hair fall", "hair loss", "alopecia", "khalitya"],
+    "joint pain": ["joint pain", "arthritis", "sandhivata", "amavata"],
+    "constipation": ["constipation", "vibandha"],
+    "indigestion": ["indigestion", "ajirna", "dyspepsia"],
+    "headache": ["headache", "shirashoola", "migraine"],
+    "insomnia": ["insomnia", "anidra", "sleeplessness"],
+    "fever": ["fever", "jwara"],
+    "obesity": ["obesity", "sthaulya"],
+    "high blood pressure": ["hypertension", "high blood pressure"],
+    "asthma": ["asthma", "tamaka shwasa"],
+    "skin allergy": ["urticaria", "sheetapitta", "skin allergy", "eczema"],
+    "anxiety": ["anxiety", "stress"],
+    "piles": ["piles", "haemorrhoids", "hemorrhoids", "arsha"],
+    "anemia": ["anemia", "anaemia", "pandu"],
+}
+
+QUESTION_TEMPLATES = [
+    "What is the Ayurvedic remedy for {topic}?",
+    "How can I treat {topic} naturally?",
+    "What diet should I follow for {topic}?",
+]
+
+FALLBACK_PREFIXES = (
+    "I couldn't generate",
+    "I'm sorry, but the AI service",
+    "I'm sorry! I am a health assistant",
+    "Sorry,",
+)
+
+
+def corpus_topics(corpus_dir, max_pages, min_mentions):
+    """Seed conditions ordered by how often the corpus mentions them."""
+    from pypdf import PdfReader
+
+    counts = Counter()
+    for root, _, files in os.walk(corpus_dir):
+        for name in sorted(files):
+            if not name.lower().endswith(".pdf"):
+                continue
+            try:
+                reader = PdfReader(os.path.join(root, name))
+                pages = reader.pages[:max_pages] if max_pages else reader.pages
+                text = " ".join((page.extract_text() or "") for page in pages).lower()
+            except Exception as e:
+                print(f"  skipping {name}: {e}")
+                continue
+            for topic, words in SEED_CONDITIONS.items():
+                counts[topic] += sum(len(re.findall(r"\b" + re.escape(w) + r"\b", text)) for w in words)
+    return [(topic, n) for topic, n in counts.most_common() if n >= min_mentions]
+
+
+def traffic_questions(path, min_count, top):
+    """Most frequent first-turn text questions from a traffic capture: [(question, lang, count)]."""
+    if not path or not os.path.exists(path):
+        return []
+    from utils.answer_store import normalize_question
+
+    counts = Counter()
+    latest = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                e = json.loads(line)
+            except ValueError:
+                continue
+            if e.get("endpoint") != "chat" or e.get("status") != 200 or e.get("has_image") or e.get("turn", 1) > 1:
+                continue
+            question = e.get("question") or ""
+            # Scrubbed questions (<NAME>, <PHONE>, ...) are personal, not FAQs
+            if not question or "<" in question:
+                continue
+            key = (e.get("lang", "en"), normalize_question(question))
+            counts[key] += 1
+            latest[key] = question
+    return [(latest[key], key[0], n) for key, n in counts.most_common(top) if n >= min_count]
+
+
+def answer_question(graph, question, run_id, index):
+    config = {"configurable": {"thread_id": f"faq-{run_id}-{index}"}}
+    from langchain_core.messages import HumanMessage
+
+    start = time.perf_counter()
+    result = graph.invoke({"question": HumanMessage(content=question)}, config)
+    elapsed = time.perf_counter() - start
+    answer = result["messages"][-1].content.strip() if result.get("messages") else ""
+    if (result.get("on_topic") or "").strip().lower() != "yes":
+        return None, f"classified as '{result.get('on_topic')}'", elapsed
+    if not answer or answer.startswith(FALLBACK_PREFIXES):
+        return None, "fallback answer", elapsed
+    return answer, None, elapsed
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Precompute FAQ answers into the versioned answer store")
+    parser.add_argument("--traffic", default=None, help="traffic capture JSONL (default: TRAFFIC_CAPTURE_PATH)")
+    parser.add_argument("--min-count", type=int, default=3, help="min times a captured question was asked")
+    parser.add_argument("--top", type=int, default=200, help="max questions taken from traffic")
+    parser.add_argument("--corpus", default=None, help="corpus directory for seed topics (default: ANSWER_STORE_CORPUS_DIR)")
+    parser.add_argument("--topics", type=int, default=12, help="max seed topics taken from the corpus")
+    parser.add_argument("--min-mentions", type=int, default=5)
+    parser.add_argument("--max-pages", type=int, default=300, help="pages read per PDF when mining topics (0 = all)")
+    parser.add_argument("--no-seed", action="store_true", help="only use captured traffic")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--no-kannada", action="store_true")
+    parser.add_argument("--tts", action="store_true", help="also synthesize answers into the audio cache")
+    parser.add_argument("--purge", action="store_true", help="delete answers stored for older versions")
+    parser.add_argument("--dry-run", action="store_true", help="list the questions and exit")
+    parser.add_argument("--fakes", action="store_true", help="use the benchmark fakes instead of real providers")
+    args = parser.parse_args()
+    os.chdir(ROOT)
+
+    from utils import answer_store, audio_cache
+    from utils.traffic_capture import TRAFFIC_CAPTURE_PATH
+
+    questions = []  # (question, lang, origin)
+    for question, lang, n in traffic_questions(args.traffic or TRAFFIC_CAPTURE_PATH, args.min_count, args.top):
+        questions.append((question, lang, f"traffic x{n}"))
+    if not args.no_seed:
+        topics = corpus_topics(args.corpus or answer_store.ANSWER_STORE_CORPUS_DIR, args.max_pages, args.min_mentions)
+        for topic, mentions in topics[: args.topics]:
+            for template in QUESTION_TEMPLATES:
+                questions.append((template.format(topic=topic), "en", f"corpus x{mentions}"))
+
+    seen, unique = set(), []
+    for question, lang, origin in questions:
+        key = (lang, answer_store.normalize_question(question))
+        if key not in seen:
+            seen.add(key)
+            unique.append((question, lang, origin))
+    print(f"{len(unique)} questions to precompute")
+    for question, lang, origin in unique:
+        print(f"  [{lang}] {question}  ({origin})")
+    if args.dry_run or not unique:
+        return
+
+    if args.fakes:
+        from benchmarks import fakes
+
+        fakes.prepare_env()
+    import app as app_module
+    from workflow.graph import build_workflow
+
+    if args.fakes:
+        fakes.install(app_module)
+    translate = app_module.translate_text
+
+    store = answer_store.get_store()
+    if store is None:
+        raise SystemExit("answer store is disabled (ANSWER_STORE_ENABLED=0) or unusable")
+    print(f"Answer store {answer_store.ANSWER_STORE_PATH}, version {store.version}")
+
+    # Kannada questions are answered from their English translation
+    jobs = []
+    for question, lang, origin in unique:
+        english = question
+        if lang == "kn":
+            english = translate(question, target="en", source="kn")
+            if not english:
+                print(f"  skip (translation failed): {question}")
+                continue
+        jobs.append((question, lang, english))
+
+    graph = build_workflow()
+    run_id = uuid.uuid4().hex[:8]
+    rows, skipped, timings = [], defaultdict(list), []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(answer_question, graph, english, run_id, i): (question, lang, english)
+                   for i, (question, lang, english) in enumerate(jobs)}
+        for future in as_completed(futures):
+            question, lang, english = futures[future]
+            try:
+                answer_en, reason, elapsed = future.result()
+            except Exception as e:
+                answer_en, reason, elapsed = None, f"{type(e).__name__}: {e}", 0.0
+            if answer_en is None:
+                skipped[reason].append(english)
+                continue
+            timings.append(elapsed)
+            answers = {"en": answer_en}
+            if not args.no_kannada:
+                answer_kn = translate(answer_en, target="kn", source="en")
+                if answer_kn:
+                    answers["kn"] = answer_kn
+            for answer_lang, answer in answers.items():
+                key = audio_cache.audio_key(audio_cache.strip_markdown(answer), answer_lang)
+                rows.append((answer_lang, english, answer, key))
+                if lang == "kn" and question != english:
+                    rows.append((answer_lang, question, answer, key))
+            print(f"  ok {elapsed:5.1f}s [{'/'.join(answers)}] {english}")
+
+    store.put_many(rows)
+    print(f"\nStored {len(rows)} answers in {time.perf_counter() - started:.1f}s "
+          f"(graph time avg {sum(timings) / max(1, len(timings)):.1f}s)")
+    for reason, items in skipped.items():
+        print(f"  skipped {len(items)}: {reason}")
+
+    if args.tts:
+        texts = {(audio_cache.strip_markdown(answer), lang) for lang, _, answer, _ in rows}
+        done = 0
+        for text, lang in sorted(texts):
+            if audio_cache.get(text, lang) is not None:
+                done += 1
+                continue
+            try:
+                audio, mimetype, provider = app_module.tts_orchestrator.synthesize(text, lang)
+            except Exception as e:
+                print(f"  tts failed [{lang}]: {e}")
+                continue
+            audio_cache.put(text, lang, audio, mimetype)
+            done += 1
+        print(f"Audio cached for {done}/{len(texts)} answers")
+
+    if args.purge:
+        print(f"Purged {store.purge_stale()} answers from older versions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Simulated-quota check for the shared Gemini rate limiter.
+
+Several processes (standing in for gunicorn workers, each with a few
+threads) share one sqlite bucket store and fire a /chat-like mix of calls: per turn 2 normal (enhance,
+classify), 5 low (grade) and 1 high (generate). With a quota well below the
+offered load, high-priority calls should almost all be admitted while
+low-priority ones are shed first, and the admitted rate should not exceed
+the quota.
+
+    python -m scripts.rate_limit_check --workers 2 --threads 4 --rpm 30 --period 3 --seconds 9
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.rate_limiter import QuotaLimiter, SqliteBucketStore, RateLimited, STAGES, estimate_tokens
+
+TURN = ["enhance", "classify"] + ["grade"] * 5 + ["generate"]
+
+
+def _worker(store_path, rpm, tpm, period, seconds, threads, results):
+    limiter = QuotaLimiter("gemini", rpm, tpm, period=period, store=SqliteBucketStore(store_path))
+    deadline = time.monotonic() + seconds
+    admitted_at = []
+
+    def turns():
+        while time.monotonic() < deadline:
+            for stage in TURN:
+                priority, output_tokens = STAGES[stage]
+                try:
+                    limiter.acquire(priority, estimate_tokens("x" * 2000, output_tokens))
+                    admitted_at.append(time.time())
+                except RateLimited:
+                    pass
+
+    pool = [threading.Thread(target=turns) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    results.put((limiter.snapshot()["priorities"], admitted_at))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared Gemini quota under a simulated burst")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4, help="concurrent turns per worker (gunicorn --threads)")
+    parser.add_argument("--rpm", type=float, default=60, help="requests allowed per period")
+    parser.add_argument("--tpm", type=float, default=1_000_000, help="tokens allowed per period")
+    parser.add_argument("--period", type=float, default=5.0, help="quota window in seconds (shortened for the test)")
+    parser.add_argument("--seconds", type=float, default=15.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store_path = os.path.join(tmpdir, "buckets.sqlite3")
+        SqliteBucketStore(store_path)
+        results = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=_worker, args=(store_path, args.rpm, args.tpm, args.period, args.seconds, args.threads, results))
+            for _ in range(args.workers)
+        ]
+        start = time.time()
+        for p in procs:
+            p.start()
+        collected = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+    totals = {}
+    admitted_at = []
+    for priorities, times in collected:
+        admitted_at += times
+        for priority, stats in priorities.items():
+            agg = totals.setdefault(priority, {"admitted": 0, "shed": 0})
+            agg["admitted"] += stats["admitted"]
+            agg["shed"] += stats["shed"]
+    for priority, agg in totals.items():
+        offered = agg["admitted"] + agg["shed"]
+        rate = agg["admitted"] / offered if offered else 0.0
+        print(f"{priority:7s} admitted={agg['admitted']:5d} shed={agg['shed']:5d} admit_rate={rate:.2%}")
+
+    elapsed = max(admitted_at) - start if admitted_at else args.seconds
+    allowed = args.rpm + args.rpm * elapsed / args.period  # initial burst + refill
+    print(f"total admitted={len(admitted_at)} allowed<={allowed:.0f} over {elapsed:.1f}s "
+          f"({'OK' if len(admitted_at) <= allowed + 1 else 'QUOTA EXCEEDED'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Offline tools for traffic captured with TRAFFIC_CAPTURE=1 (logs/requests.jsonl).
+
+Simulate answer / embedding / TTS caches of several sizes and predict hit
+rates and latency savings:
+
+    python -m scripts.replay_traffic simulate --sizes 50,200,1000 --ttl-hours 24
+
+Re-drive the captured traffic against a running build (original pacing scaled
+by --speed; 0 = as fast as possible), or against an in-process build wired to
+the benchmark fakes:
+
+    python -m scripts.replay_traffic replay --url http://localhost:8080 --speed 2
+    python -m scripts.replay_traffic replay --fakes --speed 0 --concurrency 8
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.metrics import summarize
+from utils.traffic_capture import TRAFFIC_CAPTURE_PATH, text_hash
+
+
+def load_entries(path):
+    entries, bad = [], 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                bad += 1
+    if bad:
+        print(f"Skipped {bad} malformed lines")
+    entries.sort(key=lambda e: e.get("ts", 0))
+    return entries
+
+
+class LRU:
+    def __init__(self, size, ttl=None):
+        self.size = size
+        self.ttl = ttl
+        self.items = OrderedDict()
+
+    def lookup(self, key, now):
+        """True on hit; on miss the key is inserted (the miss fills the cache)."""
+        stored = self.items.get(key)
+        if stored is not None and (self.ttl is None or now - stored <= self.ttl):
+            self.items.move_to_end(key)
+            return True
+        self.items[key] = now
+        self.items.move_to_end(key)
+        if self.size is not None and len(self.items) > self.size:
+            self.items.popitem(last=False)
+        return False
+
+
+def answer_lookups(entries):
+    """(ts, key, ms) for chat turns whose answer does not depend on history or an image."""
+    for e in entries:
+        if e.get("endpoint") != "chat" or e.get("status") != 200 or e.get("has_image"):
+            continue
+        if e.get("turn", 1) > 1 or not e.get("question_hash"):
+            continue
+        yield e["ts"], (e.get("lang", "en"), e["question_hash"]), e.get("total_ms", 0.0)
+
+
+def embedding_lookups(entries, share):
+    """
+    (ts, key, ms) per retrieval query. Embedding time is not captured on its
+    own, so a hit is credited `share` of that request's retrieve time per query.
+    """
+    for e in entries:
+        queries = e.get("retrieval_queries") or []
+        if not queries:
+            continue
+        per_query = e.get("timings_ms", {}).get("node.retrieve", 0.0) / len(queries)
+        for q in queries:
+            yield e["ts"], text_hash(q), per_query * share
+
+
+def tts_lookups(entries):
+    for e in entries:
+        if e.get("endpoint") in ("tts", "tts_local") and e.get("status") == 200 and e.get("text_hash"):
+            yield e["ts"], (e.get("endpoint"), e.get("lang", "en"), e["text_hash"]), e.get("total_ms", 0.0)
+
+
+def simulate_cache(lookups, size, ttl, hit_ms):
+    cache = LRU(size, ttl)
+    before, after = [], []
+    hits = saved = 0.0
+    for ts, key, ms in lookups:
+        before.append(ms / 1000)
+        if cache.lookup(key, ts):
+            hits += 1
+            saved += max(0.0, ms - hit_ms)
+            after.append(hit_ms / 1000)
+        else:
+            after.append(ms / 1000)
+    n = len(before)
+    return {
+        "size": size if size is not None else "unbounded",
+        "lookups": n,
+        "hits": int(hits),
+        "hit_rate": round(hits / n, 4) if n else 0.0,
+        "saved_s": round(saved / 1000, 2),
+        "saved_ms_per_lookup": round(saved / n, 1) if n else 0.0,
+        "before": summarize(before),
+        "after": summarize(after),
+    }
+
+
+def cmd_simulate(args):
+    entries = load_entries(args.log)
+    print(f"{len(entries)} captured requests from {args.log}")
+    counts = defaultdict(int)
+    for e in entries:
+        counts[e.get("endpoint")] += 1
+    print("  by endpoint: " + ", ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+
+    ttl = args.ttl_hours * 3600 if args.ttl_hours else None
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()] + [None]
+    caches = {
+        "answer": lambda: answer_lookups(entries),
+        "embedding": lambda: embedding_lookups(entries, args.embedding_share),
+        "tts": lambda: tts_lookups(entries),
+    }
+    report = {}
+    for name, lookups in caches.items():
+        rows = report[name] = [simulate_cache(lookups(), size, ttl, args.hit_ms) for size in sizes]
+        print(f"\n{name} cache (ttl={'none' if ttl is None else f'{args.ttl_hours}h'})")
+        print(f"  {'size':>10}{'lookups':>9}{'hit rate':>10}{'saved s':>10}{'p50 ms':>16}{'p95 ms':>18}")
+        for row in rows:
+            before, after = row["before"], row["after"]
+            if not row["lookups"]:
+                print(f"  {row['size']:>10}{0:>9}  (no eligible requests)")
+                continue
+            print(
+                f"  {row['size']:>10}{row['lookups']:>9}{row['hit_rate']:>10.1%}{row['saved_s']:>10}"
+                f"{before['p50_ms']:>8}->{after['p50_ms']:<7}{before['p95_ms']:>9}->{after['p95_ms']:<8}"
+            )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"log": args.log, "ttl_hours": args.ttl_hours, "caches": report}, f, indent=2)
+        print(f"\nWritten to {args.output}")
+
+
+def _request_for(entry):
+    """(method, path, kwargs) that re-creates a captured request, or None when it cannot be replayed."""
+    endpoint = entry.get("endpoint")
+    if endpoint == "chat":
+        if entry.get("has_image") or not entry.get("question"):
+            return None
+        data = {"message": entry["question"], "lang": entry.get("lang", "en"),
+                "session_id": f"replay-{entry.get('session', 'default')}"}
+        return "/chat", {"data": data}
+    if endpoint in ("tts", "tts_local") and entry.get("text"):
+        payload = {"text": entry["text"], "lang": entry.get("lang", "en")}
+        if endpoint == "tts_local":
+            payload.update(phase=entry.get("phase", "medium"), humanize=entry.get("humanize", True))
+        return f"/{endpoint}", {"json": payload}
+    if endpoint == "translate" and entry.get("text"):
+        return "/translate", {"json": {"text": entry["text"], "target": entry.get("lang", "kn")}}
+    return None
+
+
+def cmd_replay(args):
+    import requests
+
+    entries = load_entries(args.log)
+    if args.limit:
+        entries = entries[: args.limit]
+
+    server = None
+    base_url = args.url.rstrip("/") if args.url else None
+    if args.fakes:
+        from benchmarks import fakes
+        from benchmarks.load_test import start_server
+
+        fakes.prepare_env()
+        import app as app_module
+
+        fakes.install(app_module)
+        server, base_url = start_server(app_module.app)
+    if not base_url:
+        raise SystemExit("give --url or --fakes")
+
+    local = threading.local()
+    lock = threading.Lock()
+    replayed = defaultdict(list)
+    captured_ms = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    skipped = defaultdict(int)
+
+    def send(entry, path, kwargs):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            resp = session.post(base_url + path, timeout=args.timeout, **kwargs)
+            status = resp.status_code
+        except Exception as e:
+            status = type(e).__name__
+        with lock:
+            replayed[path].append(time.perf_counter() - start)
+            captured_ms[path].append(entry.get("total_ms", 0.0) / 1000)
+            statuses[path][str(status)] += 1
+
+    # Requests of one session stay in order so multi-turn context is rebuilt
+    pool = ThreadPoolExecutor(max_workers=args.concurrency)
+    session_tail = {}
+    first_ts = entries[0].get("ts", 0) if entries else 0
+    started = time.monotonic()
+    for entry in entries:
+        built = _request_for(entry)
+        if built is None:
+            skipped[entry.get("endpoint")] += 1
+            continue
+        if args.speed > 0:
+            delay = (entry.get("ts", first_ts) - first_ts) / args.speed - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+        path, kwargs = built
+        key = entry.get("session") if path == "/chat" else None
+        previous = session_tail.get(key)
+
+        def task(entry=entry, path=path, kwargs=kwargs, previous=previous):
+            if previous is not None:
+                previous.result()
+            send(entry, path, kwargs)
+
+        future = pool.submit(task)
+        if key is not None:
+            session_tail[key] = future
+    pool.shutdown(wait=True)
+    wall = time.monotonic() - started
+    if server is not None:
+        server.shutdown()
+
+    total = sum(len(v) for v in replayed.values())
+    print(f"Replayed {total} requests in {wall:.1f}s ({total / wall if wall else 0:.2f} req/s) against {base_url}")
+    if skipped:
+        print(f"  not replayable: {dict(skipped)}")
+    print(f"\n  {'endpoint':<14}{'count':>7}{'captured p50/p95 ms':>24}{'replayed p50/p95 ms':>24}  status")
+    for path in sorted(replayed):
+        was, now = summarize(captured_ms[path]), summarize(replayed[path])
+        print(
+            f"  {path:<14}{now['count']:>7}{was['p50_ms']:>12}/{was['p95_ms']:<11}"
+            f"{now['p50_ms']:>12}/{now['p95_ms']:<11}  {dict(statuses[path])}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sim = sub.add_parser("simulate", help="offline cache hit-rate and latency-saving estimates")
+    sim.add_argument("--log", default=TRAFFIC_CAPTURE_PATH)
+    sim.add_argument("--sizes", default="50,200,1000,5000", help="cache sizes (entries) to try; unbounded is always added")
+    sim.add_argument("--ttl-hours", type=float, default=0, help="entry lifetime; 0 = no expiry")
+    sim.add_argument("--hit-ms", type=float, default=5.0, help="assumed latency of a cache hit")
+    sim.add_argument("--embedding-share", type=float, default=0.5,
+                     help="share of retrieve time assumed to be the query embedding")
+    sim.add_argument("--output", help="write the report as JSON")
+    sim.set_defaults(func=cmd_simulate)
+
+    rep = sub.add_parser("replay", help="re-drive captured traffic against a build")
+    rep.add_argument("--log", default=TRAFFIC_CAPTURE_PATH)
+    rep.add_argument("--url", help="base URL of the build under test")
+    rep.add_argument("--fakes", action="store_true", help="replay against an in-process app with benchmark fakes")
+    rep.add_argument("--speed", type=float, default=1.0, help="pacing multiplier; 0 sends as fast as possible")
+    rep.add_argument("--concurrency", type=int, default=8)
+    rep.add_argument("--limit", type=int, default=0)
+    rep.add_argument("--timeout", type=float, default=120)
+    rep.set_defaults(func=cmd_replay)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,41 @@
 import os
+import sys
 import argparse
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 def main():
     load_dotenv()
     parser = argparse.ArgumentParser(description="Create and populate Pinecone index from documents")
     parser.add_argument("--source-dir", required=True, help="Directory containing documents (pdf, txt)")
     parser.add_argument("--index-name", default=os.getenv("index_name", os.getenv("PINECONE_INDEX_NAME", "ayurwell")), help="Pinecone index name")
+    parser.add_argument("--no-dedup", action="store_true", help="upload every chunk, even near-duplicates")
+    parser.add_argument("--dedup-threshold", type=float, default=None, help="MinHash Jaccard for near-duplicates (DEDUP_THRESHOLD)")
+    parser.add_argument("--config", default=None, help="chunking/embedding config (default config/ingestion.json)")
+    parser.add_argument("--multilingual", action="store_true",
+                        help="build the native Kannada index: MULTILINGUAL_EMBEDDING_MODEL into MULTILINGUAL_INDEX_NAME")
     args = parser.parse_args()
 
+    from utils import ingestion_config
+
+    config = ingestion_config.load(args.config)
+
     # Lazy import heavy libraries
     try:
         from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
         from langchain.text_splitter import RecursiveCharacterTextSplitter
         from langchain_pinecone import PineconeVectorStore
-        from langchain.embeddings import HuggingFaceEmbeddings
     except Exception as e:
         print(f"Missing libraries: {e}")
         raise
 
     source_dir = args.source_dir
     index_name = args.index_name
+    if args.multilingual:
+        # Same chunks, embedded with a model that places Kannada queries next to
+        # the English text (read by chains/rag_chain.py, see utils/kannada_mode.py)
+        index_name = os.getenv("MULTILINGUAL_INDEX_NAME") or f"{args.index_name}-multilingual"
 
     print(f"Loading documents from {source_dir}")
     loader = DirectoryLoader(source_dir, glob="**/*.pdf", loader_cls=PyPDFLoader)
@@ -28,12 +43,26 @@ def main():
     print(f"Loaded {len(documents)} documents")
 
     print("Splitting documents into chunks...")
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=config["chunk_size"], chunk_overlap=config["chunk_overlap"])
     docs = text_splitter.split_documents(documents)
     print(f"Created {len(docs)} chunks")
 
+    if not args.no_dedup:
+        from utils import dedup
+
+        index = dedup.NearDuplicateIndex(args.dedup_threshold)
+        docs, dropped = dedup.collapse_documents(docs, index)
+        print(f"Collapsed {len(dropped)} near-duplicate chunks ({len(dropped) / max(1, len(docs) + len(dropped)):.1%} of the index)")
+
     print("Initializing embeddings and Pinecone vector store...")
-    embeddings = HuggingFaceEmbeddings(model_name=os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"))
+    if args.multilingual:
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        embeddings = GoogleGenerativeAIEmbeddings(
+            model=os.getenv("MULTILINGUAL_EMBEDDING_MODEL", "models/gemini-embedding-001")
+        )
+    else:
+        embeddings = ingestion_config.build_embeddings(config)
 
     # Ensure Pinecone index exists (create if missing)
     try:
@@ -140,6 +169,9 @@ def main():
     # Create or use existing index and upload
     vectordb = PineconeVectorStore.from_documents(documents=docs, index_name=index_name, embedding=embeddings)
     print(f"Uploaded {len(docs)} chunks to Pinecone index '{index_name}'")
+    if not args.no_dedup and not args.multilingual:
+        # update_database.py checks new chunks against these
+        index.save(dedup.DEDUP_INDEX_PATH)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,71 @@
+"""
+Exercise the TTS orchestrator with local fake providers (no network).
+
+Each fake has an injectable latency distribution and failure rate, so the
+hedging, cancellation and circuit-breaker behaviour can be checked quickly:
+
+    python -m scripts.tts_hedge_check
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.tts_orchestrator import TTSOrchestrator, TTSProvider, TTSUnavailable
+
+
+class FakeProvider:
+    def __init__(self, name, latency=(0.05, 0.1), fail_rate=0.0, seed=0):
+        self.name = name
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.calls = 0
+        self.cancelled = 0
+        self._rng = random.Random(seed)
+
+    def __call__(self, text, lang, cancel_event, **_):
+        self.calls += 1
+        delay = self._rng.uniform(*self.latency)
+        # Sleep in small steps so cancellation is observed like a streaming provider
+        end = time.monotonic() + delay
+        while time.monotonic() < end:
+            if cancel_event.is_set():
+                self.cancelled += 1
+                raise RuntimeError(f"{self.name} cancelled")
+            time.sleep(0.005)
+        if self._rng.random() < self.fail_rate:
+            raise RuntimeError(f"{self.name} injected failure")
+        return f"{self.name}:{text}".encode(), "audio/mpeg"
+
+
+def run(title, fakes, order, requests=20):
+    orchestrator = TTSOrchestrator([TTSProvider(f.name, f) for f in fakes], order={"en": order})
+    wins, latencies, failures = {}, [], 0
+    for i in range(requests):
+        t0 = time.monotonic()
+        try:
+            _, _, name = orchestrator.synthesize(f"sentence {i}", "en", timeout=5)
+            wins[name] = wins.get(name, 0) + 1
+        except TTSUnavailable:
+            failures += 1
+        latencies.append(time.monotonic() - t0)
+    latencies.sort()
+    print(f"\n== {title}")
+    print(f"wins={wins} failures={failures} "
+          f"p50={latencies[len(latencies) // 2] * 1000:.0f}ms p95={latencies[int(0.95 * (len(latencies) - 1))] * 1000:.0f}ms")
+    for f in fakes:
+        print(f"  {f.name}: calls={f.calls} cancelled={f.cancelled}")
+    for name, stats in orchestrator.snapshot()["providers"].items():
+        print(f"  {name}: {stats}")
+    return orchestrator
+
+
+if __name__ == "__main__":
+    # Healthy primary: the backup should rarely start
+    run("healthy primary", [FakeProvider("edge", (0.05, 0.08)), FakeProvider("gtts", (0.1, 0.2))], "edge,gtts")
+    # Slow tail on the primary (like the 25 s LibreTranslate timeout): hedging caps latency
+    run("slow tail", [FakeProvider("libre", (0.05, 3.0), seed=1), FakeProvider("gtts", (0.1, 0.2))], "libre,gtts")
+    # Hard-down primary: breaker opens after a few failures and it is skipped
+    run("primary down", [FakeProvider("gemini", (0.01, 0.02), fail_rate=1.0), FakeProvider("edge", (0.05, 0.08))], "gemini,edge")
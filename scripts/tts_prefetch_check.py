@@ -0,0 +1,104 @@
+"""
+Speculative TTS (utils/tts_prefetch.py) through the real /chat and /tts
+routes with the benchmark fakes. Each turn posts a question, "reads" the
+reply for --read seconds, then taps the speaker icon (/tts with the reply's
+audio_id) with probability --listen-rate.
+
+    python -m scripts.tts_prefetch_check
+    python -m scripts.tts_prefetch_check --read 0.5 --listen-rate 0.3 --turns 40
+
+Prints per run the /tts p50/max latency and how many syntheses were
+prefetched, served from a prefetch and wasted. In the "2-workers" run /tts
+is handled by a second Prefetcher, as when gunicorn routes it to another
+worker: it should still be served from the prefetch (through the markers in
+the shared audio cache) and nothing should count as wasted. The last run
+listens to nothing, so the waste policy has to throttle prefetching.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUESTIONS = [
+    "What is the Ayurvedic remedy for a common cold?",
+    "How can I treat a dry cough at home?",
+    "Which foods should I avoid for acidity?",
+    "Which herbs help control blood sugar?",
+    "What causes hair fall and how do I stop it?",
+    "How should a fever be managed with diet?",
+    "Is turmeric milk good for sleep?",
+    "Can you suggest a diet plan for pitta dosha?",
+]
+
+
+def run(client, app_module, tts_prefetch, metrics, label, enabled, turns, read, listen_rate, seed, other_worker=False):
+    rng = random.Random(seed)
+    chat_worker = tts_prefetch.Prefetcher(app_module.tts_prefetcher.synthesize, enabled=enabled)
+    tts_worker = tts_prefetch.Prefetcher(chat_worker.synthesize, enabled=enabled) if other_worker else chat_worker
+    app_module.tts_prefetcher = chat_worker
+    metrics.reset("tts_prefetch.")
+    latencies = []
+    for i in range(turns):
+        question = f"{QUESTIONS[i % len(QUESTIONS)]} ({label} {i})"  # distinct replies, no audio cache hits
+        data = client.post("/chat", data={"message": question, "session_id": f"prefetch-{label}-{i}"}).get_json() or {}
+        time.sleep(read)
+        if rng.random() >= listen_rate:
+            continue
+        start = time.perf_counter()
+        app_module.tts_prefetcher = tts_worker
+        r = client.post("/tts", json={"text": tts_prefetch.audio_cache.strip_markdown(data.get("reply", "")),
+                                      "lang": data.get("lang", "en"), "audio_id": data.get("audio_id")})
+        app_module.tts_prefetcher = chat_worker
+        latencies.append(time.perf_counter() - start)
+        if r.status_code != 200:
+            print(f"  /tts HTTP {r.status_code}")
+    # Let the last prefetches finish and settle
+    time.sleep(tts_prefetch.TTS_PREFETCH_WINDOW_S + 2.5)
+    snap = app_module.tts_prefetcher.snapshot()
+    c = snap["counters"]
+    served = sum(c.get(f"tts_prefetch.{k}", 0) for k in ("ready", "attached", "ready_elsewhere", "attached_elsewhere"))
+    skipped = sum(v for k, v in c.items() if k.startswith("tts_prefetch.skipped."))
+    p50 = f"{statistics.median(latencies):.2f}" if latencies else "-"
+    worst = f"{max(latencies):.2f}" if latencies else "-"
+    print(f"{label:<12}{len(latencies):>7}{p50:>8}{worst:>8}{c.get('tts_prefetch.submitted', 0):>11}"
+          f"{served:>8}{c.get('tts_prefetch.wasted', 0):>8}{skipped:>9}  waste={snap['waste_ratio']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure /tts latency with background TTS prefetch")
+    parser.add_argument("--turns", type=int, default=24)
+    parser.add_argument("--read", type=float, default=1.0, help="seconds between the reply and the speaker tap")
+    parser.add_argument("--listen-rate", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    os.environ.setdefault("ANSWER_STORE_ENABLED", "0")
+    os.environ.setdefault("AUDIO_CACHE_DIR", tempfile.mkdtemp(prefix="ayurwell-prefetch-"))
+    from benchmarks import fakes
+
+    fakes.prepare_env()
+    import app as app_module
+    from utils import metrics, tts_prefetch
+
+    fakes.install(app_module, latency={"llm": "fixed:0.2", "llm_grade": "fixed:0.05", "retriever": "fixed:0.05",
+                                       "edge_tts": "lognormal:1.5:0.3"}, grade_yes_rate=1.0)
+    # Settle unfetched prefetches quickly so the waste policy reacts within one run
+    tts_prefetch.TTS_PREFETCH_WINDOW_S = 1.0
+    client = app_module.app.test_client()
+
+    print(f"{'run':<12}{'listens':>7}{'p50 s':>8}{'max s':>8}{'prefetched':>11}{'served':>8}{'wasted':>8}{'skipped':>9}")
+    run(client, app_module, tts_prefetch, metrics, "off", False, args.turns, args.read, args.listen_rate, args.seed)
+    run(client, app_module, tts_prefetch, metrics, "on", True, args.turns, args.read, args.listen_rate, args.seed)
+    run(client, app_module, tts_prefetch, metrics, "2-workers", True, args.turns, args.read, args.listen_rate,
+        args.seed, other_worker=True)
+    run(client, app_module, tts_prefetch, metrics, "no-listen", True, args.turns * 2, 0.0, 0.0, args.seed)
+
+
+if __name__ == "__main__":
+    main()
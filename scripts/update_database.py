@@ -1,19 +1,28 @@
 import os
+import sys
 import argparse
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 def main():
     load_dotenv()
     parser = argparse.ArgumentParser(description="Add new documents to Pinecone index")
     parser.add_argument("--new-docs", required=True, help="Directory containing new documents to index")
     parser.add_argument("--index-name", default=os.getenv("index_name", os.getenv("PINECONE_INDEX_NAME", "AyurWell")), help="Pinecone index name")
+    parser.add_argument("--no-dedup", action="store_true", help="upsert every chunk, even near-duplicates")
+    parser.add_argument("--dedup-threshold", type=float, default=None, help="MinHash Jaccard for near-duplicates (DEDUP_THRESHOLD)")
+    parser.add_argument("--config", default=None, help="chunking/embedding config (default config/ingestion.json)")
     args = parser.parse_args()
 
+    from utils import ingestion_config
+
+    config = ingestion_config.load(args.config)
+
     try:
         from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
         from langchain.text_splitter import RecursiveCharacterTextSplitter
         from langchain_pinecone import PineconeVectorStore
-        from langchain.embeddings import HuggingFaceEmbeddings
     except Exception as e:
         print(f"Missing libraries: {e}")
         raise
@@ -22,13 +31,27 @@ def main():
     docs = loader.load()
     print(f"Loaded {len(docs)} new documents")
 
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=config["chunk_size"], chunk_overlap=config["chunk_overlap"])
     chunks = text_splitter.split_documents(docs)
     print(f"Split into {len(chunks)} chunks")
 
-    embeddings = HuggingFaceEmbeddings(model_name=os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"))
+    if not args.no_dedup:
+        from utils import dedup
+
+        # Signatures of what setup_database.py / earlier updates already indexed
+        index = dedup.NearDuplicateIndex.load(dedup.DEDUP_INDEX_PATH, args.dedup_threshold)
+        known = len(index)
+        chunks, dropped = dedup.collapse_documents(chunks, index)
+        print(f"Skipped {len(dropped)} near-duplicate chunks ({known} indexed signatures checked)")
+        if not chunks:
+            print("Nothing new to upsert")
+            return
+
+    embeddings = ingestion_config.build_embeddings(config)
     vectordb = PineconeVectorStore.from_documents(documents=chunks, index_name=args.index_name, embedding=embeddings)
     print(f"Upserted {len(chunks)} chunks to Pinecone index '{args.index_name}'")
+    if not args.no_dedup:
+        index.save(dedup.DEDUP_INDEX_PATH)
 
 
 if __name__ == "__main__":
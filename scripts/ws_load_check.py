@@ -0,0 +1,262 @@
+"""
+/ws/voice sessions (utils/voice_session.py) under many concurrent clients,
+with the benchmark fakes. flask-sock is not needed: each simulated client
+gets an in-process socket whose "network" holds --wire-bytes, drained by
+the client at its read rate, so a slow reader pushes back on the server the
+way a full TCP window does.
+
+    python -m scripts.ws_load_check
+    python -m scripts.ws_load_check --clients 40 --slow 0.25 --stalled 0.1 --turns 3
+    python -m scripts.ws_load_check --url ws://localhost:8080/ws/voice --clients 10   # real server
+
+Client kinds: fast (reads at once), slow (--slow-rate bytes/s) and stalled
+(sends every question but never reads). Prints per kind: turns completed,
+p50 seconds to the first progress / token / audio frame and to the reply,
+audio frames received and dropped, sessions the server closed as too slow,
+and the largest send queue one session held (bounded by --queue-bytes).
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import resource
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUESTIONS = [
+    "What is the Ayurvedic remedy for a common cold?",
+    "How can I treat a dry cough at home?",
+    "Which foods should I avoid for acidity?",
+    "Which herbs help control blood sugar?",
+    "What causes hair fall and how do I stop it?",
+    "Is there anything for joint pain in the morning?",
+]
+
+
+class SimulatedSocket:
+    """Server end of one in-process connection (the send/receive/close flask-sock offers)."""
+
+    def __init__(self, wire_bytes):
+        self.wire_bytes = wire_bytes
+        self.inbox = queue.Queue()
+        self.closed = False
+        self._wire = deque()
+        self._on_wire = 0
+        self._cond = threading.Condition()
+
+    # server side
+    def receive(self, timeout=None):
+        end = None if timeout is None else time.monotonic() + timeout
+        while not self.closed:
+            try:
+                return self.inbox.get(timeout=0.1)
+            except queue.Empty:
+                if end is not None and time.monotonic() >= end:
+                    return None
+        raise ConnectionError("closed")
+
+    def send(self, frame):
+        with self._cond:
+            self._cond.wait_for(lambda: self.closed or self._on_wire < self.wire_bytes)
+            if self.closed:
+                raise ConnectionError("closed")
+            self._wire.append(frame)
+            self._on_wire += len(frame)
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    # client side
+    def take(self, timeout):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._wire or self.closed, timeout=timeout) or not self._wire:
+                return None
+            frame = self._wire.popleft()
+            self._on_wire -= len(frame)
+            self._cond.notify_all()
+            return frame
+
+
+class LocalConnection:
+    def __init__(self, sock):
+        self.sock = sock
+
+    def send_json(self, message):
+        self.sock.inbox.put(json.dumps(message))
+
+    def take(self, timeout):
+        return self.sock.take(timeout)
+
+    @property
+    def closed(self):
+        return self.sock.closed
+
+    def close(self):
+        self.sock.inbox.put(json.dumps({"type": "close"}))
+
+
+class RemoteConnection:
+    def __init__(self, url):
+        from websockets.sync.client import connect
+
+        self.ws = connect(url, max_size=None)
+        self.closed = False
+
+    def send_json(self, message):
+        self.ws.send(json.dumps(message))
+
+    def take(self, timeout):
+        try:
+            return self.ws.recv(timeout=timeout)
+        except TimeoutError:
+            return None
+        except Exception:
+            self.closed = True
+            return None
+
+    def close(self):
+        self.ws.close()
+
+
+def run_client(conn, kind, turns, read_rate, seed, result, stall_wait=15.0):
+    rng = random.Random(seed)
+    if kind == "stalled":
+        for i in range(turns):
+            conn.send_json({"type": "message", "text": rng.choice(QUESTIONS), "lang": "en"})
+            time.sleep(2.0)
+        # Never read; wait for the run to end or the server to give up on us
+        end = time.monotonic() + stall_wait
+        while not conn.closed and time.monotonic() < end:
+            time.sleep(0.2)
+        result["closed_by_server"] = conn.closed
+        conn.close()
+        return
+    for turn in range(turns):
+        conn.send_json({"type": "message", "text": rng.choice(QUESTIONS), "lang": "en"})
+        start = time.perf_counter()
+        marks = {}
+        while True:
+            frame = conn.take(timeout=120)
+            if frame is None:
+                result["closed_by_server"] = True
+                return
+            if read_rate:
+                time.sleep(len(frame) / read_rate)
+            if isinstance(frame, bytes):
+                marks.setdefault("audio", time.perf_counter() - start)
+                result["audio_frames"] += 1
+                continue
+            event = json.loads(frame)
+            kind_ = event.get("type")
+            if kind_ in ("progress", "token", "reply"):
+                marks.setdefault(kind_, time.perf_counter() - start)
+            elif kind_ == "audio_end":
+                result["dropped"] += event.get("dropped", 0)
+                break
+            elif kind_ == "error" and event.get("turn") is not None:
+                result["errors"] += 1
+                break
+        result["turns"] += 1
+        for name, seconds in marks.items():
+            result.setdefault(name, []).append(seconds)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent /ws/voice sessions with simulated clients")
+    parser.add_argument("--clients", type=int, default=24)
+    parser.add_argument("--turns", type=int, default=2)
+    parser.add_argument("--slow", type=float, default=0.25, help="share of slow readers")
+    parser.add_argument("--stalled", type=float, default=0.1, help="share of clients that never read")
+    parser.add_argument("--slow-rate", type=float, default=8000, help="bytes/s a slow client reads")
+    parser.add_argument("--wire-bytes", type=int, default=64 * 1024, help="bytes in flight per simulated connection")
+    parser.add_argument("--queue-bytes", type=int, default=None, help="WS_SEND_QUEUE_BYTES")
+    parser.add_argument("--send-timeout", type=float, default=5.0, help="WS_SEND_TIMEOUT_S")
+    parser.add_argument("--url", help="ws:// URL of a running server instead of in-process sessions")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    kinds = []
+    for i in range(args.clients):
+        x = (i + 0.5) / args.clients
+        kinds.append("stalled" if x < args.stalled else "slow" if x < args.stalled + args.slow else "fast")
+
+    sessions = []
+    if args.url:
+        connect = lambda i: RemoteConnection(args.url)
+    else:
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+        os.environ.setdefault("ANSWER_STORE_ENABLED", "0")
+        os.environ.setdefault("AUDIO_CACHE_ENABLED", "0")  # every sentence is synthesized
+        os.environ.setdefault("GEMINI_RPM", "100000")
+        for name, value in (("LIMIT", args.clients), ("QUEUE", args.clients), ("WAIT", 120)):
+            os.environ.setdefault(f"ADMISSION_CHAT_{name}", str(value))
+            os.environ.setdefault(f"ADMISSION_LLM_{name}", str(value))
+            os.environ.setdefault(f"ADMISSION_TTS_{name}", str(value))
+        from benchmarks import fakes
+
+        fakes.prepare_env()
+        import app as app_module
+        from utils import voice_session
+
+        fakes.install(app_module, latency={"llm": "lognormal:0.4:1.0", "llm_grade": "fixed:0.05",
+                                           "retriever": "fixed:0.05", "edge_tts": "lognormal:0.6:1.2"},
+                      grade_yes_rate=1.0)
+        fakes.TOKEN_INTERVAL_S = 0.02
+        queue_bytes = args.queue_bytes or voice_session.WS_SEND_QUEUE_BYTES
+        synthesize = lambda text, lang: app_module.tts_orchestrator.synthesize(text, lang)
+
+        def connect(i):
+            sock = SimulatedSocket(args.wire_bytes)
+            session = voice_session.VoiceSession(sock, app_module._voice_answer, synthesize, f"wsload-{i}",
+                                                 max_bytes=queue_bytes, max_wait=args.send_timeout)
+            sessions.append(session)
+            threading.Thread(target=session.run, daemon=True).start()
+            return LocalConnection(sock)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results = [{"kind": kind, "turns": 0, "audio_frames": 0, "dropped": 0, "errors": 0, "closed_by_server": False}
+               for kind in kinds]
+    threads = [threading.Thread(target=run_client, args=(connect(i), kinds[i], args.turns,
+                                                         args.slow_rate if kinds[i] == "slow" else 0,
+                                                         args.seed + i, results[i], args.send_timeout + 10))
+               for i in range(args.clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    def p50(values):
+        return f"{statistics.median(values):.2f}" if values else "-"
+
+    print(f"{args.clients} clients x {args.turns} turns in {elapsed:.1f}s")
+    print(f"{'kind':<9}{'clients':>8}{'turns':>7}{'progress':>10}{'token':>7}{'audio':>7}{'reply':>7}"
+          f"{'frames':>8}{'dropped':>9}{'closed':>8}")
+    for kind in ("fast", "slow", "stalled"):
+        rows = [r for r in results if r["kind"] == kind]
+        if not rows:
+            continue
+        pick = lambda name: [v for r in rows for v in r.get(name, [])]
+        print(f"{kind:<9}{len(rows):>8}{sum(r['turns'] for r in rows):>7}{p50(pick('progress')):>10}"
+              f"{p50(pick('token')):>7}{p50(pick('audio')):>7}{p50(pick('reply')):>7}"
+              f"{sum(r['audio_frames'] for r in rows):>8}{sum(r['dropped'] for r in rows):>9}"
+              f"{sum(r['closed_by_server'] for r in rows):>8}")
+    if sessions:
+        peak = max(s.outbox.peak_bytes for s in sessions)
+        print(f"largest send queue: {peak} bytes (limit {queue_bytes}, one frame may exceed it); "
+              f"max RSS grew {(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
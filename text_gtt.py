@@ -1,44 +1,139 @@
+import gtts
 from gtts import gTTS
+from gtts.tts import gTTSError
 import io
+import os
+import re
+import time
+import base64
+import shutil
 import logging
+import platform
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from utils import mp3_frames
+from utils import metrics as pipeline_metrics
 
 # Optional post-processing using pydub to make gTTS output sound more natural.
 # pydub requires ffmpeg to be installed on the system (not a Python package).
 try:
     from pydub import AudioSegment, effects
     PYDUB_AVAILABLE = True
+except Exception:
+    PYDUB_AVAILABLE = False
+
+try:
+    import numpy as np
+except Exception:
+    np = None
 
+# ffmpeg binary: FFMPEG_BINARY, then PATH, then the winget install location on Windows
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY") or shutil.which("ffmpeg")
+if not FFMPEG_BINARY and platform.system() == "Windows":
     # Hard-coded fallback for when ffmpeg is not in PATH, common on Windows.
     # This makes the app more portable without requiring users to edit system PATH.
-    import platform
-    import os
-    if platform.system() == "Windows":
-        # The path discovered on the user's system via winget
-        ffmpeg_path = r"C:\Users\santo\AppData\Local\Microsoft\WinGet\Packages\Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe\ffmpeg-8.0-full_build\bin\ffmpeg.exe"
-        if os.path.exists(ffmpeg_path):
-            try:
-                AudioSegment.converter = ffmpeg_path
-                logging.info(f"pydub: Explicitly set ffmpeg converter to {ffmpeg_path}")
-            except Exception as e:
-                logging.warning(f"pydub: Failed to set ffmpeg converter: {e}")
-except Exception:
-    PYDUB_AVAILABLE = False
+    ffmpeg_path = r"C:\Users\santo\AppData\Local\Microsoft\WinGet\Packages\Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe\ffmpeg-8.0-full_build\bin\ffmpeg.exe"
+    if os.path.exists(ffmpeg_path):
+        FFMPEG_BINARY = ffmpeg_path
+if PYDUB_AVAILABLE and FFMPEG_BINARY:
+    try:
+        AudioSegment.converter = FFMPEG_BINARY
+        logging.info(f"pydub: Explicitly set ffmpeg converter to {FFMPEG_BINARY}")
+    except Exception as e:
+        logging.warning(f"pydub: Failed to set ffmpeg converter: {e}")
 
+# 'numpy': one ffmpeg decode (with the speed change), vectorized fades /
+# normalize / low-pass on the PCM array, one ffmpeg encode, all over pipes.
+# 'pydub': the original per-effect pydub chain. 'off': no post-processing.
+TTS_POSTPROCESS_ENGINE = os.getenv("TTS_POSTPROCESS_ENGINE", "numpy").strip().lower()
+# gTTS returns 24 kHz mono ~64 kbps MP3, so a higher output bitrate only adds bytes
+TTS_POSTPROCESS_BITRATE = os.getenv("TTS_POSTPROCESS_BITRATE", "64k")
 
-def _post_process_mp3(mp3_bytes: bytes, phase: str = 'medium') -> bytes:
-    """Lightweight post-processing to improve perceived naturalness.
+# Map phase to a mild speed factor (values close to 1.0)
+PHASE_SPEED = {
+    'low': 0.99,     # barely slower
+    'medium': 0.98,  # slightly slower - more natural cadence
+    'high': 0.96     # noticeably slower - for dramatic effect
+}
+FADE_IN_MS = 30
+FADE_OUT_MS = 80
+NORMALIZE_HEADROOM_DB = 0.1
+LOW_PASS_CUTOFF = 8000
 
-    Effects applied when pydub/ffmpeg are available:
-    - slight tempo adjustment (phase: low|medium|high)
-    - normalize
-    - short fade-in/fade-out
-    - gentle low-pass filter to smooth sibilance
 
-    If pydub/ffmpeg are not available, returns the original bytes unchanged.
+def _speed_factor(phase):
+    return PHASE_SPEED.get((phase or 'medium').lower(), 0.98)
+
+
+def post_process_available():
+    if TTS_POSTPROCESS_ENGINE == 'numpy' and np is not None and FFMPEG_BINARY:
+        return True
+    return TTS_POSTPROCESS_ENGINE != 'off' and PYDUB_AVAILABLE
+
+
+def _ffmpeg(args, data, timeout=30):
+    cmd = [FFMPEG_BINARY, '-hide_banner', '-loglevel', 'error', '-threads', '1'] + args
+    result = subprocess.run(cmd, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode('utf-8', 'replace').strip()[:300]}")
+    return result.stdout
+
+
+@lru_cache(maxsize=8)
+def _low_pass_kernel(sample_rate, cutoff, tolerance=1e-4):
     """
-    if not PYDUB_AVAILABLE:
+    FIR taps of pydub's one-pole RC low-pass, y += alpha * (x - y), truncated
+    once the impulse response decays below `tolerance` (~12 taps at 24 kHz).
+    """
+    rc = 1.0 / (cutoff * 2 * np.pi)
+    dt = 1.0 / sample_rate
+    alpha = dt / (rc + dt)
+    taps = max(1, int(np.ceil(np.log(tolerance) / np.log(1 - alpha)))) if alpha < 1 else 1
+    return (alpha * (1 - alpha) ** np.arange(taps)).astype(np.float32)
+
+
+def _post_process_mp3_numpy(mp3_bytes, phase='medium'):
+    clip = mp3_frames.info(mp3_bytes)
+    rate, channels = clip['sample_rate'], clip['channels']
+    factor = _speed_factor(phase)
+
+    # Decode and change speed (pitch and tempo, like pydub's frame-rate trick) in one process
+    pcm = _ffmpeg([
+        '-f', 'mp3', '-i', 'pipe:0',
+        '-af', f'asetrate={int(rate * factor)},aresample={rate}',
+        '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', str(channels), '-ar', str(rate), 'pipe:1',
+    ], mp3_bytes)
+    samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, channels).astype(np.float32)
+    n = len(samples)
+    if n == 0:
         return mp3_bytes
 
+    fade_in = min(n, int(rate * FADE_IN_MS / 1000))
+    fade_out = min(n, int(rate * FADE_OUT_MS / 1000))
+    samples[:fade_in] *= np.linspace(0.0, 1.0, fade_in, dtype=np.float32)[:, None]
+    samples[n - fade_out:] *= np.linspace(1.0, 0.0, fade_out, dtype=np.float32)[:, None]
+
+    peak = float(np.abs(samples).max())
+    if peak > 0:
+        samples *= (32768 * 10 ** (-NORMALIZE_HEADROOM_DB / 20)) / peak
+
+    kernel = _low_pass_kernel(rate, LOW_PASS_CUTOFF)
+    for ch in range(channels):
+        samples[:, ch] = np.convolve(samples[:, ch], kernel)[:n]
+
+    out = np.clip(samples, -32768, 32767).astype(np.int16).tobytes()
+    return _ffmpeg([
+        '-f', 's16le', '-ar', str(rate), '-ac', str(channels), '-i', 'pipe:0',
+        '-c:a', 'libmp3lame', '-b:a', TTS_POSTPROCESS_BITRATE,
+        '-id3v2_version', '0', '-write_xing', '0', '-f', 'mp3', 'pipe:1',
+    ], out)
+
+
+def _post_process_mp3_pydub(mp3_bytes: bytes, phase: str = 'medium') -> bytes:
+    """Original pydub chain, kept as a fallback when numpy is unavailable."""
     try:
         buf = io.BytesIO(mp3_bytes)
         seg = AudioSegment.from_file(buf, format='mp3')
@@ -46,13 +141,7 @@ def _post_process_mp3(mp3_bytes: bytes, phase: str = 'medium') -> bytes:
         # If decoding fails (ffmpeg not present), return original bytes
         return mp3_bytes
 
-    # Map phase to a mild speed factor (values close to 1.0)
-    phase_map = {
-        'low': 0.99,     # barely slower
-        'medium': 0.98,  # slightly slower - more natural cadence
-        'high': 0.96     # noticeably slower - for dramatic effect
-    }
-    factor = phase_map.get((phase or 'medium').lower(), 0.98)
+    factor = _speed_factor(phase)
 
     # Change speed by altering frame_rate then resetting to original rate.
     new_frame_rate = int(seg.frame_rate * factor)
@@ -60,46 +149,197 @@ def _post_process_mp3(mp3_bytes: bytes, phase: str = 'medium') -> bytes:
     seg_speed = seg_speed.set_frame_rate(seg.frame_rate)
 
     # Small fades and normalization to reduce artifacts on chunk boundaries
-    seg_proc = seg_speed.fade_in(30).fade_out(80)
+    seg_proc = seg_speed.fade_in(FADE_IN_MS).fade_out(FADE_OUT_MS)
     try:
-        seg_proc = effects.normalize(seg_proc)
+        seg_proc = effects.normalize(seg_proc, headroom=NORMALIZE_HEADROOM_DB)
     except Exception:
         pass
 
     # Gentle low-pass to smooth high-frequency artifacts (cutoff ~8kHz)
     try:
-        seg_proc = seg_proc.low_pass_filter(8000)
+        seg_proc = seg_proc.low_pass_filter(LOW_PASS_CUTOFF)
     except Exception:
         pass
 
     out_buf = io.BytesIO()
-    seg_proc.export(out_buf, format='mp3', bitrate='192k')
+    seg_proc.export(out_buf, format='mp3', bitrate=TTS_POSTPROCESS_BITRATE)
     out_buf.seek(0)
     return out_buf.read()
 
 
-def text_to_speech_gtts(text, lang='kn', save_path=None, humanize=True, phase='medium'):
+def _post_process_mp3(mp3_bytes: bytes, phase: str = 'medium') -> bytes:
+    """Lightweight post-processing to improve perceived naturalness.
+
+    Effects, in order:
+    - slight tempo adjustment (phase: low|medium|high)
+    - short fade-in/fade-out
+    - normalize
+    - gentle low-pass filter to smooth sibilance
+
+    Uses the engine picked by TTS_POSTPROCESS_ENGINE and falls back to pydub,
+    then to the original bytes when neither numpy+ffmpeg nor pydub work.
+    """
+    if TTS_POSTPROCESS_ENGINE == 'off':
+        return mp3_bytes
+    if TTS_POSTPROCESS_ENGINE == 'numpy' and np is not None and FFMPEG_BINARY:
+        try:
+            return _post_process_mp3_numpy(mp3_bytes, phase=phase)
+        except Exception as e:
+            logging.warning(f"numpy post-processing failed, trying pydub: {e}")
+    if not PYDUB_AVAILABLE:
+        return mp3_bytes
+    return _post_process_mp3_pydub(mp3_bytes, phase=phase)
+
+
+# Parallel synthesis: split the text at sentence boundaries, fetch every
+# gTTS request of every sentence concurrently over one keep-alive session
+# (at most GTTS_PARALLEL_WORKERS in flight per process) and join the MP3
+# frames in order. gTTS itself fetches ~100-char parts one after another
+# with a new connection each. 0 or 1 keeps the original serial write_to_fp.
+GTTS_PARALLEL_WORKERS = int(os.getenv("GTTS_PARALLEL_WORKERS", "4"))
+# Each sentence's raw frames go to the shared audio cache, so sentences that
+# recur across answers (disclaimers, greetings) are fetched once.
+GTTS_SEGMENT_CACHE = os.getenv("GTTS_SEGMENT_CACHE", "1").strip().lower() not in ("0", "false", "no")
+# Overrides the batchexecute endpoint, e.g. a local stub (scripts/bench_gtts_parallel.py)
+GTTS_URL = os.getenv("GTTS_URL", "").strip()
+# The parallel mode builds requests with gTTS's private _prepare_requests() and
+# parses the batchexecute reply itself, as gTTS.stream() does in this release
+# (pinned in requirements.txt). Any other gTTS version, or a reply the parser
+# does not recognize, switches this process to the public write_to_fp.
+GTTS_TESTED_VERSION = "2.5.4"
+_parallel_supported = gtts.__version__ == GTTS_TESTED_VERSION and hasattr(gTTS, "_prepare_requests")
+if GTTS_PARALLEL_WORKERS > 1 and not _parallel_supported:
+    logging.warning(f"gTTS {gtts.__version__} is not {GTTS_TESTED_VERSION}: parallel synthesis disabled")
+
+SEGMENT_VARIANT = "gtts-segment"
+_SENTENCE_END = re.compile(r"(?<=[.!?।॥])\s+|\n+")
+_AUDIO_RE = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+class _UnexpectedResponse(gTTSError):
+    """A batchexecute reply without the audio framing _fetch_part parses."""
+
+
+def split_sentences(text):
+    """Sentences of text in order (split after . ! ? । ॥ and at line breaks)."""
+    return [s.strip() for s in _SENTENCE_END.split(text or "") if s and s.strip()]
+
+
+def _segment_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(max_workers=max(1, GTTS_PARALLEL_WORKERS), thread_name_prefix="gtts")
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _segment_requests(sentence, lang):
+    """Prepared batchexecute requests for one sentence ([] if it has nothing speakable)."""
+    tts = gTTS(text=sentence, lang=lang, slow=False, lang_check=False)
+    try:
+        requests_ = tts._prepare_requests()
+    except AssertionError:
+        return []
+    if GTTS_URL:
+        for pr in requests_:
+            pr.url = GTTS_URL
+    return requests_
+
+
+def _fetch_part(prepared):
+    from utils.http_clients import get_client
+
+    start = time.perf_counter()
+    client = get_client("gtts")
+    try:
+        resp = client.session.send(prepared, timeout=client.timeout)
+        resp.raise_for_status()
+    except Exception as e:
+        raise gTTSError(f"gTTS request failed: {e}")
+    for line in resp.text.splitlines():
+        if "jQ1olc" in line:
+            match = _AUDIO_RE.search(line)
+            if match:
+                pipeline_metrics.record("tts.gtts.part", time.perf_counter() - start)
+                return base64.b64decode(match.group(1).encode("ascii"))
+    raise _UnexpectedResponse("No audio stream in gTTS response")
+
+
+def _synthesize_parallel(text, lang, cancel_event=None):
+    """MP3 frames for text, sentences fetched concurrently and joined in order."""
+    from utils import audio_cache
+
+    sentences = split_sentences(text)
+    audio = [None] * len(sentences)
+    pending = {}  # sentence index -> futures of its gTTS parts
+    pool = _segment_pool()
+    for i, sentence in enumerate(sentences):
+        if GTTS_SEGMENT_CACHE:
+            hit = audio_cache.get(sentence, lang, SEGMENT_VARIANT)
+            if hit is not None:
+                audio[i] = hit[0]
+                pipeline_metrics.incr("tts.gtts.segment_cache_hits")
+                continue
+        pending[i] = [pool.submit(_fetch_part, pr) for pr in _segment_requests(sentence, lang)]
+        pipeline_metrics.incr("tts.gtts.segments_fetched")
+
+    try:
+        for i, futures in pending.items():
+            if cancel_event is not None and cancel_event.is_set():
+                raise gTTSError("gTTS synthesis cancelled")
+            frames = b"".join(mp3_frames.audio_frames(f.result()) for f in futures)
+            audio[i] = frames
+            if GTTS_SEGMENT_CACHE and frames:
+                audio_cache.put(sentences[i], lang, frames, "audio/mpeg", SEGMENT_VARIANT)
+    finally:
+        # Failed or cancelled: do not leave queued parts occupying the shared pool
+        for futures in pending.values():
+            for f in futures:
+                f.cancel()
+
+    joined = b"".join(a for a in audio if a)
+    if not joined:
+        raise gTTSError("No audio returned by gTTS")
+    return joined
+
+
+def _synthesize(text, lang, cancel_event=None):
+    global _parallel_supported
+    if GTTS_PARALLEL_WORKERS > 1 and _parallel_supported:
+        try:
+            return _synthesize_parallel(text, lang, cancel_event)
+        except _UnexpectedResponse as e:
+            _parallel_supported = False
+            pipeline_metrics.incr("tts.gtts.parallel_disabled")
+            logging.warning(f"gTTS: {e}; parallel synthesis disabled, using write_to_fp")
+    buf = io.BytesIO()
+    gTTS(text=text, lang=lang, slow=False).write_to_fp(buf)
+    return buf.getvalue()
+
+
+def text_to_speech_gtts(text, lang='kn', save_path=None, humanize=True, phase='medium', cancel_event=None):
     """Generate speech MP3 using gTTS and optionally post-process it.
 
     Args:
         text (str): Text to synthesize.
         lang (str): Language code (e.g., 'en' or 'kn').
         save_path (str|None): If provided, save MP3 to this path and return the path.
-        humanize (bool): Whether to apply pydub post-processing (requires ffmpeg/pydub).
+        humanize (bool): Whether to apply post-processing (requires ffmpeg with numpy, or pydub).
         phase (str): One of 'low'|'medium'|'high' controlling mild tempo/pacing.
+        cancel_event (threading.Event|None): Stops waiting on remaining sentences once set.
 
     Returns:
         bytes|str: If save_path is None, returns MP3 bytes; otherwise returns the saved file path.
     """
-    tts = gTTS(text=text, lang=lang, slow=False)
-
     # If the user requested a direct save, we still post-process before saving when possible
     if save_path:
-        tmp_buf = io.BytesIO()
-        tts.write_to_fp(tmp_buf)
-        tmp_buf.seek(0)
-        out_bytes = tmp_buf.read()
-        if humanize and phase and PYDUB_AVAILABLE:
+        out_bytes = _synthesize(text, lang, cancel_event)
+        if humanize and phase and post_process_available():
             try:
                 out_bytes = _post_process_mp3(out_bytes, phase=phase)
             except Exception:
@@ -110,11 +350,8 @@ def text_to_speech_gtts(text, lang='kn', save_path=None, humanize=True, phase='m
         logging.info(f"✅ Audio saved: {save_path}")
         return save_path
 
-    # return bytes
-    buf = io.BytesIO()
-    tts.write_to_fp(buf)
-    buf.seek(0)
-    mp3_bytes = buf.read()
+    # return bytes; post-processing runs once on the joined clip
+    mp3_bytes = _synthesize(text, lang, cancel_event)
 
     if humanize and phase:
         try:
@@ -0,0 +1,143 @@
+import os
+import time
+import threading
+import functools
+from contextlib import contextmanager
+
+# Bulkheads: every upstream gets its own bounded concurrency limit and a
+# bounded wait queue. When both are full we fail fast (HTTP 429) instead of
+# letting requests pile up on gunicorn threads. Limits are per process; with
+# `--workers 2 --threads 4` keep chat limit + queue below the thread count so
+# /health, /metrics and /tts always find a free thread.
+#
+# Override any default with ADMISSION_<NAME>_LIMIT / _QUEUE / _WAIT.
+DEFAULTS = {
+    # (limit, queue, max wait seconds)
+    # endpoint gates; "tts" also bounds the TTS providers each request races
+    "chat": (2, 1, 5.0),
+    "tts": (2, 2, 5.0),
+    # ffmpeg encodes for negotiated audio formats; when full the original bytes are sent
+    "transcode": (2, 0, 0.0),
+    # open /ws/voice sessions (each holds a thread); extra sessions are refused at once
+    "voice": (2, 0, 0.0),
+    # /chat/batch runs per worker; a second batch is refused at once
+    "batch": (1, 0, 0.0),
+    # upstream gates
+    "llm": (4, 8, 10.0),
+    "embeddings": (4, 8, 5.0),
+    "pinecone": (4, 8, 5.0),
+    "web": (2, 4, 5.0),
+    "vision": (2, 2, 10.0),
+}
+
+
+class Overloaded(Exception):
+    """Raised when a bulkhead is saturated; carries a Retry-After hint in seconds."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} is saturated, retry after {retry_after}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class Bulkhead:
+    def __init__(self, name, limit, queue, max_wait):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.waiting = 0
+        self.counts = {"admitted": 0, "rejected_full": 0, "rejected_timeout": 0}
+        self.avg_hold = 1.0  # EWMA of seconds a slot is held, for Retry-After
+        self._cond = threading.Condition()
+
+    def retry_after(self):
+        backlog = (self.waiting + 1) / max(1, self.limit)
+        return max(1, int(round(self.avg_hold * backlog)))
+
+    def acquire(self, timeout=None):
+        timeout = self.max_wait if timeout is None else timeout
+        with self._cond:
+            if self.in_flight < self.limit and self.waiting == 0:
+                self.in_flight += 1
+                self.counts["admitted"] += 1
+                return
+            if self.waiting >= self.queue:
+                self.counts["rejected_full"] += 1
+                raise Overloaded(self.name, self.retry_after())
+            self.waiting += 1
+            try:
+                admitted = self._cond.wait_for(lambda: self.in_flight < self.limit, timeout=timeout)
+            finally:
+                self.waiting -= 1
+            if not admitted:
+                self.counts["rejected_timeout"] += 1
+                raise Overloaded(self.name, self.retry_after())
+            self.in_flight += 1
+            self.counts["admitted"] += 1
+
+    def release(self, held_for):
+        with self._cond:
+            self.in_flight -= 1
+            self.avg_hold = 0.8 * self.avg_hold + 0.2 * held_for
+            self._cond.notify()
+
+    def snapshot(self):
+        with self._cond:
+            return dict(
+                self.counts,
+                limit=self.limit,
+                queue_limit=self.queue,
+                in_flight=self.in_flight,
+                queue_depth=self.waiting,
+                avg_hold_s=round(self.avg_hold, 3),
+            )
+
+
+_bulkheads = {}
+_lock = threading.Lock()
+
+
+def get_bulkhead(name):
+    with _lock:
+        bulkhead = _bulkheads.get(name)
+        if bulkhead is None:
+            size, queue, max_wait = DEFAULTS.get(name, (4, 4, 5.0))
+            prefix = f"ADMISSION_{name.upper()}"
+            bulkhead = _bulkheads[name] = Bulkhead(
+                name,
+                int(os.getenv(f"{prefix}_LIMIT", size)),
+                int(os.getenv(f"{prefix}_QUEUE", queue)),
+                float(os.getenv(f"{prefix}_WAIT", max_wait)),
+            )
+        return bulkhead
+
+
+@contextmanager
+def limit(name, timeout=None):
+    """Holds one slot of the named bulkhead for the duration of the block; raises Overloaded."""
+    bulkhead = get_bulkhead(name)
+    bulkhead.acquire(timeout)
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        bulkhead.release(time.monotonic() - start)
+
+
+def admit(name):
+    """Route decorator: the whole request holds a slot of the named endpoint gate."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with limit(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    with _lock:
+        names = list(_bulkheads)
+    return {name: get_bulkhead(name).snapshot() for name in names}
@@ -0,0 +1,213 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Precomputed answers for frequent questions (built by scripts/precompute_faq.py)
+# served by /chat before the graph runs. Every row carries the store version:
+# a hash of the corpus in ANSWER_STORE_CORPUS_DIR, the RAG prompts (English
+# and native Kannada) and the model / index names. When any of them changes the
+# version changes and old rows are simply never matched again
+# (precompute_faq.py --purge deletes them). Hashing the corpus reads all of
+# Data/, so app.py calls warm_up() at startup; lookups made before it is done
+# are misses instead of waits.
+ANSWER_STORE_ENABLED = os.getenv("ANSWER_STORE_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+ANSWER_STORE_PATH = os.getenv("ANSWER_STORE_PATH", os.path.join("tmp", "answer_store.sqlite3"))
+ANSWER_STORE_CORPUS_DIR = os.getenv("ANSWER_STORE_CORPUS_DIR", "Data")
+# Set to the ingestion run id when the deployed image does not ship Data/
+ANSWER_STORE_CORPUS_VERSION = os.getenv("ANSWER_STORE_CORPUS_VERSION", "")
+# How often (seconds) a serving process checks the file for a newer build
+ANSWER_STORE_RELOAD_INTERVAL = float(os.getenv("ANSWER_STORE_RELOAD_INTERVAL", "30"))
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "am", "was", "be", "do", "does", "can", "could", "would", "should",
+    "please", "tell", "me", "i", "my", "you", "your", "we", "our", "some", "any", "of", "for", "to",
+    "in", "on", "with", "about", "according", "ayurveda", "ayurvedic",
+}
+
+
+def normalize_question(text):
+    """Lookup key: lowercase words without punctuation and filler words (keeps Kannada vowel signs)."""
+    cleaned = "".join(" " if unicodedata.category(ch)[0] in "PS" else ch for ch in str(text).lower())
+    return " ".join(w for w in cleaned.split() if w not in STOPWORDS)
+
+
+def corpus_fingerprint(corpus_dir=None):
+    """Hash of every file (name, size, content) under the corpus directory."""
+    if ANSWER_STORE_CORPUS_VERSION:
+        return ANSWER_STORE_CORPUS_VERSION
+    corpus_dir = corpus_dir or ANSWER_STORE_CORPUS_DIR
+    digest = hashlib.sha256()
+    if not os.path.isdir(corpus_dir):
+        return "no-corpus"
+    for root, _, files in sorted(os.walk(corpus_dir)):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, corpus_dir).encode("utf-8"))
+            digest.update(str(os.path.getsize(path)).encode())
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def prompt_fingerprint():
+    from chains.prompt_templates import rag_prompt, rag_prompt_kn
+
+    parts = [m.prompt.template for prompt in (rag_prompt, rag_prompt_kn) for m in prompt.messages
+             if hasattr(m, "prompt")]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+_version = None
+_version_lock = threading.Lock()
+
+
+def current_version():
+    """Store version for the running code and corpus (computed once per process)."""
+    global _version
+    with _version_lock:
+        if _version is None:
+            from chains import rag_chain
+
+            parts = [
+                corpus_fingerprint(),
+                prompt_fingerprint(),
+                str(getattr(rag_chain, "model", "")),
+                str(getattr(rag_chain, "index_name", "")),
+            ]
+            _version = hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+        return _version
+
+
+class AnswerStore:
+    """sqlite rows (version, lang, key) -> answer, mirrored in memory for the current version."""
+
+    def __init__(self, path, version):
+        self.path = path
+        self.version = version
+        self._lock = threading.Lock()
+        self._answers = {}
+        self._loaded_mtime = None
+        self._checked_at = 0.0
+        self.stats = {"hits": 0, "misses": 0}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " version TEXT NOT NULL, lang TEXT NOT NULL, key TEXT NOT NULL,"
+                " question TEXT, answer TEXT NOT NULL, audio_key TEXT, created REAL,"
+                " PRIMARY KEY (version, lang, key))"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if self._loaded_mtime is not None and now - self._checked_at < ANSWER_STORE_RELOAD_INTERVAL:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT lang, key, answer, audio_key FROM answers WHERE version = ?", (self.version,)
+            ).fetchall()
+        self._answers = {(lang, key): {"answer": answer, "audio_key": audio_key} for lang, key, answer, audio_key in rows}
+        self._loaded_mtime = mtime
+        logger.info(f"answer store: {len(self._answers)} answers loaded for version {self.version}")
+
+    def lookup(self, question, lang="en"):
+        """Returns {"answer", "audio_key"} for a precomputed question, else None."""
+        key = normalize_question(question)
+        if not key:
+            return None
+        with self._lock:
+            self._maybe_reload()
+            hit = self._answers.get((lang, key))
+            self.stats["hits" if hit else "misses"] += 1
+        return hit
+
+    def put_many(self, rows):
+        """rows: iterable of (lang, question, answer, audio_key) for the current version."""
+        now = time.time()
+        with self._connect() as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO answers (version, lang, key, question, answer, audio_key, created)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(self.version, lang, normalize_question(q), q, a, audio, now) for lang, q, a, audio in rows],
+            )
+        with self._lock:
+            self._loaded_mtime = None
+
+    def purge_stale(self):
+        with self._connect() as db:
+            return db.execute("DELETE FROM answers WHERE version != ?", (self.version,)).rowcount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, version=self.version, answers=len(self._answers))
+
+
+_store = None
+_store_lock = threading.Lock()
+_warm_up_pid = None
+
+
+def get_store():
+    """Process-wide store for the current version, or None when disabled or unusable."""
+    global _store
+    if not ANSWER_STORE_ENABLED:
+        return None
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = AnswerStore(ANSWER_STORE_PATH, current_version())
+            except Exception as e:
+                logger.warning(f"answer store disabled: {e}")
+                return None
+        return _store
+
+
+def warm_up():
+    """Builds the store (and hashes the corpus for its version) in a background thread, once per process."""
+    global _warm_up_pid
+    if not ANSWER_STORE_ENABLED:
+        return
+    with _store_lock:
+        if _store is not None or _warm_up_pid == os.getpid():
+            return
+        _warm_up_pid = os.getpid()
+    threading.Thread(target=get_store, name="answer-store-warm-up", daemon=True).start()
+
+
+def lookup(question, lang="en"):
+    store = _store
+    if store is None:
+        if _warm_up_pid == os.getpid():
+            # Still warming up: answer through the graph rather than wait for the corpus hash
+            return None
+        store = get_store()
+    if store is None:
+        return None
+    try:
+        return store.lookup(question, lang)
+    except Exception as e:
+        logger.warning(f"answer store lookup failed: {e}")
+        return None
+
+
+def snapshot():
+    store = _store
+    return store.snapshot() if store is not None else {"enabled": ANSWER_STORE_ENABLED}
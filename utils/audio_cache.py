@@ -0,0 +1,190 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Synthesized speech keyed by (text, lang, variant). Hot entries stay in an
+# in-memory LRU bounded by bytes; every entry is also written to
+# AUDIO_CACHE_DIR so all gunicorn workers (and precomputed FAQ audio from
+# scripts/precompute_faq.py) share it. The disk copy is pruned oldest-first
+# once it grows past AUDIO_CACHE_DISK_BYTES. Background synthesis
+# (utils/tts_prefetch.py) also leaves small marker files there so the other
+# workers can find a reply that is being prefetched.
+AUDIO_CACHE_ENABLED = os.getenv("AUDIO_CACHE_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", os.path.join("tmp", "audio_cache"))
+AUDIO_CACHE_MEMORY_BYTES = int(os.getenv("AUDIO_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+AUDIO_CACHE_DISK_BYTES = int(os.getenv("AUDIO_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
+
+EXTENSIONS = {"audio/mpeg": "mp3", "audio/wav": "wav", "audio/ogg": "ogg", "audio/webm": "webm"}
+MIMETYPES = {ext: mime for mime, ext in EXTENSIONS.items()}
+
+
+def strip_markdown(text):
+    """Same cleanup templates/ui.html applies before calling /tts, so precomputed keys match."""
+    text = re.sub(r"\*\*(.*?)\*\*", r"\1", text or "")
+    return re.sub(r"^[\*\-]\s+", "", text, flags=re.M)
+
+
+def audio_key(text, lang="en", variant=""):
+    normalized = " ".join(str(text).split())
+    return hashlib.sha1(f"{lang}|{variant}|{normalized}".encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    def __init__(self, directory, memory_bytes, disk_bytes):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()  # key -> (audio, mimetype)
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        self._puts_since_prune = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "puts": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, mimetype):
+        return os.path.join(self.directory, f"{key}.{EXTENSIONS.get(mimetype, 'bin')}")
+
+    def _remember(self, key, audio, mimetype):
+        if len(audio) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_used -= len(old[0])
+        self._memory[key] = (audio, mimetype)
+        self._memory_used += len(audio)
+        while self._memory_used > self.memory_bytes:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted)
+
+    def get(self, key):
+        """Returns (audio_bytes, mimetype) or None."""
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return hit
+        for ext, mimetype in MIMETYPES.items():
+            path = os.path.join(self.directory, f"{key}.{ext}")
+            try:
+                with open(path, "rb") as f:
+                    audio = f.read()
+            except OSError:
+                continue
+            with self._lock:
+                self._remember(key, audio, mimetype)
+                self.stats["disk_hits"] += 1
+            return audio, mimetype
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, key, audio, mimetype):
+        if not audio:
+            return
+        path = self._path(key, mimetype)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"audio cache write failed: {e}")
+        with self._lock:
+            self._remember(key, audio, mimetype)
+            self.stats["puts"] += 1
+            self._puts_since_prune += 1
+            prune = self._puts_since_prune >= 50
+            if prune:
+                self._puts_since_prune = 0
+        if prune:
+            self.prune()
+
+    def _marker_path(self, key, kind):
+        return os.path.join(self.directory, f"{key}.{kind}")
+
+    def write_marker(self, key, kind, data=None):
+        """Small JSON side file next to an entry ("prefetch", "fetched"), visible to every worker."""
+        path = self._marker_path(key, kind)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(dict(data or {}, written=time.time()), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.debug(f"audio cache marker write failed: {e}")
+
+    def read_marker(self, key, kind):
+        try:
+            with open(self._marker_path(key, kind), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def remove_markers(self, key, *kinds):
+        for kind in kinds:
+            try:
+                os.remove(self._marker_path(key, kind))
+            except OSError:
+                pass
+
+    def prune(self):
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.is_file() and not e.name.endswith(".tmp")]
+        except OSError:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        total = sum(e.stat().st_size for e in entries)
+        for entry in entries:
+            if total <= self.disk_bytes:
+                break
+            try:
+                total -= entry.stat().st_size
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, memory_entries=len(self._memory), memory_bytes=self._memory_used)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if not AUDIO_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = AudioCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MEMORY_BYTES, AUDIO_CACHE_DISK_BYTES)
+            except Exception as e:
+                logger.warning(f"audio cache disabled: {e}")
+                return None
+        return _cache
+
+
+def get(text, lang="en", variant=""):
+    cache = get_cache()
+    return cache.get(audio_key(text, lang, variant)) if cache is not None else None
+
+
+def put(text, lang, audio, mimetype, variant=""):
+    cache = get_cache()
+    if cache is not None:
+        cache.put(audio_key(text, lang, variant), audio, mimetype)
+
+
+def snapshot():
+    cache = _cache
+    return cache.snapshot() if cache is not None else {"enabled": AUDIO_CACHE_ENABLED}
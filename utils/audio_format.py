@@ -0,0 +1,199 @@
+import io
+import os
+import time
+import wave
+import shutil
+import logging
+import threading
+import subprocess
+
+from utils import metrics
+from utils import mp3_frames
+
+logger = logging.getLogger(__name__)
+
+# Output formats the TTS endpoints can negotiate (Accept header or a "format"
+# parameter). Speech needs little bandwidth: mono 24 kHz Opus at 24 kbps is
+# half of Edge's 48 kbps MP3 and a third of gTTS's 64 kbps, and a speech-tuned
+# 32 kbps MP3 plays everywhere. Transcoding streams through one ffmpeg process
+# per response; finished outputs are cached by the caller.
+AUDIO_FORMAT_DEFAULT = os.getenv("AUDIO_FORMAT_DEFAULT", "original").strip().lower()
+AUDIO_OPUS_BITRATE = os.getenv("AUDIO_OPUS_BITRATE", "24k")
+# libopus complexity 0-10; 5 halves the encode CPU of the default 10 for ~1% more bytes on speech
+AUDIO_OPUS_COMPLEXITY = os.getenv("AUDIO_OPUS_COMPLEXITY", "5")
+AUDIO_MP3_BITRATE = os.getenv("AUDIO_MP3_BITRATE", "32k")
+AUDIO_SAMPLE_RATE = int(os.getenv("AUDIO_SAMPLE_RATE", "24000"))
+# Gemini TTS returns bare 16-bit mono PCM at this rate
+GEMINI_PCM_RATE = int(os.getenv("GEMINI_PCM_RATE", "24000"))
+CHUNK_SIZE = 16 * 1024
+
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY") or shutil.which("ffmpeg")
+
+_speech = ["-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE)]
+_opus = ["-c:a", "libopus", "-b:a", AUDIO_OPUS_BITRATE, "-application", "voip",
+         "-compression_level", AUDIO_OPUS_COMPLEXITY]
+FORMATS = {
+    # name -> (mimetype, file extension, ffmpeg output options)
+    "opus": ("audio/webm", "webm", _speech + _opus + ["-f", "webm"]),
+    "ogg": ("audio/ogg", "ogg", _speech + _opus + ["-f", "ogg"]),
+    "mp3": ("audio/mpeg", "mp3", _speech + [
+        "-c:a", "libmp3lame", "-b:a", AUDIO_MP3_BITRATE, "-id3v2_version", "0", "-write_xing", "0", "-f", "mp3"]),
+    "wav": ("audio/wav", "wav", _speech + ["-c:a", "pcm_s16le", "-f", "wav"]),
+}
+ACCEPT_TYPES = {
+    "audio/webm": "opus",
+    "audio/ogg": "ogg",
+    "audio/opus": "ogg",
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+    "audio/wav": "wav",
+    "audio/wave": "wav",
+    "audio/x-wav": "wav",
+}
+
+
+def available():
+    return bool(FFMPEG_BINARY)
+
+
+def _parse_accept(header):
+    """[(mimetype, q)] in preference order (higher q first, then header order)."""
+    entries = []
+    for index, part in enumerate((header or "").split(",")):
+        fields = [f.strip() for f in part.split(";")]
+        if not fields[0]:
+            continue
+        q = 1.0
+        for field in fields[1:]:
+            if field.startswith("q="):
+                try:
+                    q = float(field[2:])
+                except ValueError:
+                    q = 0.0
+        entries.append((-q, index, fields[0].lower()))
+    return [(mimetype, -q) for q, _, mimetype in sorted(entries)]
+
+
+def negotiate(accept=None, requested=None):
+    """
+    Output format name for a request, or None to send the provider's bytes as
+    they are. An explicit "format" parameter wins over the Accept header;
+    wildcards fall back to AUDIO_FORMAT_DEFAULT.
+    """
+    requested = (requested or "").strip().lower()
+    if requested in FORMATS:
+        return requested
+    if requested == "original":
+        return None
+    for mimetype, q in _parse_accept(accept):
+        if q <= 0:
+            continue
+        if mimetype in ACCEPT_TYPES:
+            return ACCEPT_TYPES[mimetype]
+        if mimetype in ("*/*", "audio/*"):
+            break
+    return AUDIO_FORMAT_DEFAULT if AUDIO_FORMAT_DEFAULT in FORMATS else None
+
+
+def needs_transcode(fmt, mimetype, audio):
+    """False when the source already is what fmt would produce (or fmt is None)."""
+    if fmt is None or not available():
+        return False
+    if fmt == "wav":
+        return mimetype != "audio/wav"
+    if fmt == "mp3" and mimetype == "audio/mpeg":
+        try:
+            return mp3_frames.info(audio)["bitrate"] > _kbps(AUDIO_MP3_BITRATE) * 1000
+        except mp3_frames.MP3FormatError:
+            return True
+    return True
+
+
+def _kbps(bitrate):
+    return int(str(bitrate).lower().rstrip("k"))
+
+
+def cache_variant(variant, fmt):
+    return f"{variant}|{fmt}" if variant else fmt
+
+
+def pcm_to_wav(pcm, rate=None, channels=1, sample_width=2):
+    """Wraps bare PCM in a WAV header; bytes that already are RIFF/WAV are returned as they are."""
+    if pcm[:4] == b"RIFF":
+        return pcm
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(sample_width)
+        w.setframerate(rate or GEMINI_PCM_RATE)
+        w.writeframes(pcm)
+    return buf.getvalue()
+
+
+def transcode_stream(audio, fmt, on_complete=None):
+    """
+    Yields the encoded output of one ffmpeg process in chunks while it is still
+    encoding. on_complete(output_bytes) runs once the whole output was produced
+    (not when the client went away first).
+    """
+    _, _, options = FORMATS[fmt]
+    cmd = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-threads", "1",
+           "-i", "pipe:0", "-vn"] + options + ["pipe:1"]
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def feed():
+        try:
+            proc.stdin.write(audio)
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    chunks = []
+    finished = False
+    try:
+        while True:
+            chunk = proc.stdout.read1(CHUNK_SIZE)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            yield chunk
+        proc.wait(timeout=30)
+        finished = True
+    finally:
+        if not finished:
+            proc.kill()
+            proc.wait()
+        writer.join(timeout=1)
+        stderr = proc.stderr.read().decode("utf-8", "replace").strip()
+        proc.stdout.close()
+        proc.stderr.close()
+    if proc.returncode != 0:
+        # Headers are already sent, so all we can do is log and leave the cache alone
+        logger.warning(f"audio transcode to {fmt} failed: {stderr[:300]}")
+        metrics.incr(f"audio.transcode.{fmt}.failed")
+        return
+    output = b"".join(chunks)
+    metrics.record(f"audio.transcode.{fmt}", time.perf_counter() - start)
+    metrics.incr(f"audio.transcode.{fmt}.bytes_in", len(audio))
+    metrics.incr(f"audio.transcode.{fmt}.bytes_out", len(output))
+    if on_complete is not None:
+        try:
+            on_complete(output)
+        except Exception as e:
+            logger.warning(f"audio transcode callback failed: {e}")
+
+
+def transcode(audio, fmt):
+    """Whole-buffer transcode (scripts, precomputation); raises RuntimeError on failure."""
+    result = []
+    output = b"".join(transcode_stream(audio, fmt, on_complete=result.append))
+    if not result:
+        raise RuntimeError(f"transcode to {fmt} failed")
+    return output
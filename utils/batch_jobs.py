@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Results of /chat/batch jobs (app.py), written as each question finishes so
+# a partner can poll GET /chat/batch/<job_id>?after=N from any worker. A job
+# runs in the worker that accepted it; one still "running" without a result
+# for BATCH_JOB_STALL_S (its worker restarted) is reported as "stalled".
+# Jobs and their results are deleted BATCH_JOB_TTL after they were created.
+BATCH_JOBS_PATH = os.getenv("BATCH_JOBS_PATH", os.path.join("tmp", "batch_jobs.sqlite3"))
+BATCH_JOB_TTL = float(os.getenv("BATCH_JOB_TTL", str(24 * 3600)))
+BATCH_JOB_STALL_S = float(os.getenv("BATCH_JOB_STALL_S", "600"))
+PRUNE_INTERVAL = 3600
+
+
+class BatchJobStore:
+    def __init__(self, path=BATCH_JOBS_PATH, ttl=BATCH_JOB_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS batch_jobs ("
+            " id TEXT PRIMARY KEY, status TEXT NOT NULL, total INTEGER NOT NULL,"
+            " done INTEGER NOT NULL DEFAULT 0, summary TEXT, created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS batch_results ("
+            " job_id TEXT NOT NULL, seq INTEGER NOT NULL, result TEXT NOT NULL, PRIMARY KEY (job_id, seq))"
+        )
+        self._db.commit()
+
+    def create(self, total):
+        """Registers a running job and returns its id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            self._db.execute("INSERT INTO batch_jobs (id, status, total, created, updated) VALUES (?, 'running', ?, ?, ?)",
+                             (job_id, total, now, now))
+            self._db.commit()
+        return job_id
+
+    def add_result(self, job_id, result):
+        """Appends one result; results are numbered in the order they finished."""
+        with self._lock:
+            (seq,) = self._db.execute("SELECT done FROM batch_jobs WHERE id = ?", (job_id,)).fetchone() or (None,)
+            if seq is None:
+                return
+            self._db.execute("INSERT INTO batch_results (job_id, seq, result) VALUES (?, ?, ?)",
+                             (job_id, seq, json.dumps(result, ensure_ascii=False)))
+            self._db.execute("UPDATE batch_jobs SET done = done + 1, updated = ? WHERE id = ?", (time.time(), job_id))
+            self._db.commit()
+
+    def finish(self, job_id, summary, status="done"):
+        with self._lock:
+            self._db.execute("UPDATE batch_jobs SET status = ?, summary = ?, updated = ? WHERE id = ?",
+                             (status, json.dumps(summary), time.time(), job_id))
+            self._db.commit()
+
+    def get(self, job_id, after=0, limit=500):
+        """Job status with up to limit results from position after, or None when unknown or expired."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, total, done, summary, created, updated FROM batch_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            results = self._db.execute(
+                "SELECT seq, result FROM batch_results WHERE job_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+                (job_id, after, limit),
+            ).fetchall()
+        status, total, done, summary, created, updated = row
+        if status == "running" and time.time() - updated > BATCH_JOB_STALL_S:
+            status = "stalled"
+        return {
+            "job_id": job_id,
+            "status": status,
+            "total": total,
+            "done": done,
+            "results": [json.loads(result) for _, result in results],
+            "next": results[-1][0] + 1 if results else after,
+            "summary": json.loads(summary) if summary else None,
+        }
+
+    def _prune(self, now):
+        if now - self._last_prune < PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        try:
+            expired = [r[0] for r in self._db.execute("SELECT id FROM batch_jobs WHERE created < ?", (now - self.ttl,))]
+            for job_id in expired:
+                self._db.execute("DELETE FROM batch_results WHERE job_id = ?", (job_id,))
+                self._db.execute("DELETE FROM batch_jobs WHERE id = ?", (job_id,))
+            if expired:
+                logger.info(f"batch_jobs: pruned {len(expired)} expired jobs")
+        except sqlite3.Error as e:
+            logger.warning(f"batch_jobs: prune failed: {e}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BatchJobStore()
+        return _store
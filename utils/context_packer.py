@@ -0,0 +1,199 @@
+import os
+import re
+import math
+import zlib
+import unicodedata
+from collections import Counter
+
+# Context packer for generate_answer: instead of pasting every graded chunk
+# (or whole Tavily pages) into {context}, split the documents into sentences,
+# score each against the enhanced query in-process (BM25 over the candidate
+# sentences + cosine of hashed character-trigram vectors, which catches
+# "digestion"/"digestive" style matches), drop duplicates and greedily keep
+# the best sentences that fit CONTEXT_TOKEN_BUDGET. Kept sentences are
+# rendered per source, in document order, with a [n] (source, page) header.
+CONTEXT_PACKER_ENABLED = os.getenv("CONTEXT_PACKER_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "450"))
+# Most recent chat messages kept for {history}, within this many tokens
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "600"))
+CONTEXT_LEXICAL_WEIGHT = float(os.getenv("CONTEXT_LEXICAL_WEIGHT", "0.6"))
+# Sentences scoring below this fraction of the best one are left out even if budget remains
+CONTEXT_MIN_RELATIVE_SCORE = float(os.getenv("CONTEXT_MIN_RELATIVE_SCORE", "0.25"))
+# Sentences at least this similar (trigram cosine) to a kept one are duplicates
+CONTEXT_DUPLICATE_SIMILARITY = float(os.getenv("CONTEXT_DUPLICATE_SIMILARITY", "0.85"))
+MIN_SENTENCE_CHARS = 25
+HASH_DIMENSIONS = 1 << 18
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "been", "of", "for", "to", "in", "on", "at", "by",
+    "with", "and", "or", "it", "its", "this", "that", "these", "those", "as", "from", "can", "may", "should",
+    "what", "which", "how", "why", "when", "who", "do", "does", "i", "my", "me", "you", "your", "we", "our",
+    "according", "ayurveda", "ayurvedic", "please", "tell", "about", "some", "any", "also", "such", "into",
+}
+
+_SENTENCE_END = re.compile(r"(?<=[.!?।॥])\s+|\n\s*\n|\n(?=\s*[-*•\d])")
+
+
+def estimate_tokens(text):
+    """Rough token count: ~4 characters per token for ASCII, ~2 for other scripts (Kannada)."""
+    text = str(text)
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) // 2 + 1
+
+
+def _words(text):
+    cleaned = "".join(" " if unicodedata.category(ch)[0] in "PSZC" else ch for ch in str(text).lower())
+    return [w for w in cleaned.split() if w not in STOPWORDS and len(w) > 1]
+
+
+def _trigram_vector(text):
+    """Sparse unit vector of hashed character trigrams (per word, with boundary marks)."""
+    counts = Counter()
+    for word in _words(text):
+        padded = f"#{word}#"
+        for i in range(max(1, len(padded) - 2)):
+            counts[zlib.crc32(padded[i:i + 3].encode("utf-8")) % HASH_DIMENSIONS] += 1
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {k: v / norm for k, v in counts.items()}
+
+
+def _cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+def split_sentences(text):
+    sentences = []
+    for part in _SENTENCE_END.split(str(text or "")):
+        sentence = " ".join(part.split())
+        letters = sum(1 for ch in sentence if ch.isalpha())
+        # PDF headers, page numbers and table debris
+        if len(sentence) >= MIN_SENTENCE_CHARS and letters >= 0.5 * len(sentence):
+            sentences.append(sentence)
+    return sentences
+
+
+def _bm25_scores(query_terms, sentence_terms):
+    n = len(sentence_terms)
+    avg_len = sum(len(t) for t in sentence_terms) / max(1, n)
+    df = Counter()
+    for terms in sentence_terms:
+        df.update(set(terms))
+    scores = []
+    for terms in sentence_terms:
+        tf = Counter(terms)
+        score = 0.0
+        for term in set(query_terms):
+            if term not in tf:
+                continue
+            idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+            f = tf[term]
+            score += idf * f * (BM25_K1 + 1) / (f + BM25_K1 * (1 - BM25_B + BM25_B * len(terms) / max(1.0, avg_len)))
+        scores.append(score)
+    return scores
+
+
+def _source_label(metadata):
+    source = str(metadata.get("source") or metadata.get("url") or "unknown")
+    if metadata.get("source_type") != "websearch":
+        source = os.path.basename(source)
+    page = metadata.get("page")
+    return f"{source}, p. {int(page) + 1}" if isinstance(page, (int, float)) else source
+
+
+class PackedContext:
+    def __init__(self, text, sources, tokens, tokens_before, sentences_kept, sentences_total):
+        self.text = text
+        self.sources = sources
+        self.tokens = tokens
+        self.tokens_before = tokens_before
+        self.sentences_kept = sentences_kept
+        self.sentences_total = sentences_total
+
+    def stats(self):
+        return {
+            "tokens": self.tokens,
+            "tokens_before": self.tokens_before,
+            "sentences_kept": self.sentences_kept,
+            "sentences_total": self.sentences_total,
+            "sources": len(self.sources),
+        }
+
+
+def pack(documents, query, budget=None):
+    """
+    Best sentences of documents for query within budget tokens, grouped by
+    source. Returns a PackedContext; .text goes into the prompt's {context}.
+    """
+    budget = CONTEXT_TOKEN_BUDGET if budget is None else budget
+    candidates = []  # (doc index, sentence index, sentence)
+    for d, doc in enumerate(documents or []):
+        content = getattr(doc, "page_content", None) or str(doc)
+        for s, sentence in enumerate(split_sentences(content)):
+            candidates.append((d, s, sentence))
+    # What the prompt cost before: the document list is rendered with its repr
+    tokens_before = estimate_tokens(documents) if documents else 0
+    if not candidates:
+        return PackedContext("", [], 0, tokens_before, 0, 0)
+
+    query_terms = _words(query)
+    sentence_terms = [_words(sentence) for _, _, sentence in candidates]
+    lexical = _bm25_scores(query_terms, sentence_terms)
+    top = max(lexical) or 1.0
+    query_vector = _trigram_vector(query)
+    vectors = [_trigram_vector(sentence) for _, _, sentence in candidates]
+    n_docs = len(documents)
+    scored = []
+    for i, (d, s, sentence) in enumerate(candidates):
+        score = CONTEXT_LEXICAL_WEIGHT * lexical[i] / top + (1 - CONTEXT_LEXICAL_WEIGHT) * _cosine(query_vector, vectors[i])
+        # Slight preference for what the retriever/grader ranked first
+        score += 0.05 * (1 - d / n_docs)
+        scored.append((score, i))
+    scored.sort(reverse=True)
+
+    kept, kept_vectors, used = [], [], 0
+    seen = set()
+    floor = scored[0][0] * CONTEXT_MIN_RELATIVE_SCORE
+    for score, i in scored:
+        if score < floor:
+            break
+        d, s, sentence = candidates[i]
+        key = " ".join(sentence_terms[i])
+        if key in seen or any(_cosine(vectors[i], v) >= CONTEXT_DUPLICATE_SIMILARITY for v in kept_vectors):
+            continue
+        cost = estimate_tokens(sentence)
+        if used + cost > budget:
+            continue
+        seen.add(key)
+        kept.append(i)
+        kept_vectors.append(vectors[i])
+        used += cost
+
+    by_doc = {}
+    for i in sorted(kept):
+        d, _, sentence = candidates[i]
+        by_doc.setdefault(d, []).append(sentence)
+    blocks, sources = [], []
+    for n, (d, sentences) in enumerate(sorted(by_doc.items()), start=1):
+        metadata = getattr(documents[d], "metadata", None) or {}
+        label = _source_label(metadata)
+        sources.append({"ref": n, "source": label, "sentences": len(sentences)})
+        blocks.append(f"[{n}] ({label})\n" + " ".join(sentences))
+    text = "\n\n".join(blocks)
+    return PackedContext(text, sources, estimate_tokens(text), tokens_before, len(kept), len(candidates))
+
+
+def trim_history(messages, budget=None):
+    """Most recent messages whose content fits budget tokens (always at least the last one)."""
+    budget = HISTORY_TOKEN_BUDGET if budget is None else budget
+    kept, used = [], 0
+    for message in reversed(messages or []):
+        cost = estimate_tokens(getattr(message, "content", message))
+        if kept and used + cost > budget:
+            break
+        kept.append(message)
+        used += cost
+    return list(reversed(kept))
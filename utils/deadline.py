@@ -0,0 +1,121 @@
+import os
+import time
+import logging
+import contextvars
+from contextlib import contextmanager
+
+from utils import metrics as pipeline_metrics
+
+logger = logging.getLogger(__name__)
+
+# End-to-end budget for one /chat turn. app.py stamps an absolute deadline
+# (time.time() based, so it survives the graph checkpointer) into AgentState;
+# workflow/graph.py binds it around every node so guard() in chains/rag_chain.py
+# and the nodes in Agents/ can see how much time is left. Optional stages
+# (rephrase, LLM classification, grading, refine loops, web search) are only
+# started while their expected cost still leaves GENERATE_RESERVE_S for the
+# answer; Agents/routing.py takes the cheaper edge otherwise. Keep
+# REQUEST_DEADLINE_S well under gunicorn's --timeout (120 s).
+REQUEST_DEADLINE_S = float(os.getenv("REQUEST_DEADLINE_S", "45"))
+GENERATE_RESERVE_S = float(os.getenv("DEADLINE_GENERATE_RESERVE_S", "8"))
+# Kept back from the graph for the EN->KN reply translation in /chat
+REPLY_RESERVE_S = float(os.getenv("DEADLINE_REPLY_RESERVE_S", "3"))
+
+# Expected seconds per stage until the node's own p95 (utils.metrics) is known
+STAGE_COSTS = {
+    "enhance": 2.0,
+    "classify": 1.5,
+    "retrieve": 1.0,
+    "grade": 4.0,           # whole retrieval_grader node
+    "grade_document": 0.8,  # one grader call
+    "refine": 2.0,
+    "web": 5.0,
+}
+STAGE_NODES = {
+    "enhance": "node.query_enhancer",
+    "classify": "node.query_classifier",
+    "retrieve": "node.retrieve",
+    "grade": "node.retrieval_grader",
+    "refine": "node.refine_query",
+    "web": "node.websearch",
+}
+
+_current = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """A stage was skipped because the turn's budget cannot cover it."""
+
+    def __init__(self, stage, remaining):
+        super().__init__(f"{stage} skipped, {remaining:.1f}s left in the request budget")
+        self.stage = stage
+        self.remaining = remaining
+
+
+def new(seconds=None):
+    """Absolute deadline (epoch seconds) for a turn starting now."""
+    return time.time() + (REQUEST_DEADLINE_S if seconds is None else seconds)
+
+
+@contextmanager
+def bound(deadline):
+    """Makes deadline the current one for the block (None: no deadline)."""
+    token = _current.set(deadline)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def remaining(deadline=None):
+    """Seconds left before deadline (default: the bound one), or None without a deadline."""
+    deadline = current() if deadline is None else deadline
+    return None if deadline is None else deadline - time.time()
+
+
+def expected(stage):
+    """Expected seconds for a stage: the p95 of its node when measured, else STAGE_COSTS."""
+    node = STAGE_NODES.get(stage)
+    if node:
+        series = pipeline_metrics.snapshot(node)["latency"].get(node, {})
+        if series.get("p95_ms") is not None and series.get("count", 0) >= 5:
+            return series["p95_ms"] / 1000
+    return STAGE_COSTS.get(stage, 1.0)
+
+
+def allows(*stages, deadline=None):
+    """True when the stages still fit in the budget next to the answer's reserve."""
+    left = remaining(deadline)
+    return left is None or left >= GENERATE_RESERVE_S + sum(expected(s) for s in stages)
+
+
+def degrade(reason, deadline=None):
+    """Counts a cheaper path taken for the budget."""
+    pipeline_metrics.incr("deadline.degraded")
+    pipeline_metrics.incr(f"deadline.degraded.{reason}")
+    logger.info(f"deadline: {reason} ({remaining(deadline) or 0:.1f}s left)")
+
+
+def require(stage):
+    """Raises DeadlineExceeded (and counts it) when an optional stage no longer fits."""
+    if not allows(stage):
+        degrade(f"skip_{stage}")
+        raise DeadlineExceeded(stage, remaining() or 0.0)
+
+
+def check(stage):
+    """Raises DeadlineExceeded once the budget is spent; used before every upstream call."""
+    left = remaining()
+    if left is not None and left <= 0:
+        pipeline_metrics.incr(f"deadline.expired.{stage}")
+        raise DeadlineExceeded(stage, left)
+
+
+def wait_timeout(default):
+    """A bulkhead/queue wait that does not outlive the deadline."""
+    left = remaining()
+    return default if left is None else max(0.0, min(default, left))
@@ -0,0 +1,249 @@
+import os
+import json
+import hashlib
+import unicodedata
+from collections import Counter
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+# Near-duplicate detection for corpus chunks and retrieved documents.
+# Texts become sets of 5-word shingles; a 64-value MinHash signature
+# estimates their Jaccard similarity, and LSH (16 bands of 4 rows) finds
+# candidate pairs without comparing every chunk with every other one. Short
+# fragments (a lone "TIME TO SEE THE DOCTOR" heading, a citation tail) are
+# caught by containment instead: most of their shingles already sit in a
+# kept chunk. Ingestion collapses near-duplicate chunks before embedding them; retrieval
+# fetches a few extra candidates, drops near-duplicates and picks the final
+# k with MMR so the grader does not spend one LLM call per copy of a passage.
+RETRIEVAL_DEDUP = os.getenv("RETRIEVAL_DEDUP", "1").strip().lower() not in ("0", "false", "no")
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.7"))
+# Share of a chunk's shingles found in one kept chunk that makes it a duplicate
+DEDUP_CONTAINMENT = float(os.getenv("DEDUP_CONTAINMENT", "0.8"))
+# MinHash signatures of indexed chunks, written by setup_database.py and
+# extended by update_database.py
+DEDUP_INDEX_PATH = os.getenv("DEDUP_INDEX_PATH", os.path.join("tmp", "ingest_signatures.json"))
+DEDUP_MMR_LAMBDA = float(os.getenv("DEDUP_MMR_LAMBDA", "0.7"))
+SHINGLE_WORDS = 5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_seed = hashlib.sha256(b"ayurwell-minhash").digest()
+_PERMS = []
+for i in range(NUM_PERM):
+    digest = hashlib.sha256(_seed + i.to_bytes(2, "big")).digest()
+    _PERMS.append((int.from_bytes(digest[:8], "big") % (_PRIME - 1) + 1, int.from_bytes(digest[8:16], "big") % _PRIME))
+
+
+def _normalized_words(text):
+    cleaned = "".join(" " if unicodedata.category(ch)[0] in "PSZC" else ch for ch in str(text).lower())
+    return cleaned.split()
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    """Set of 32-bit hashes of every `size`-word window (the whole text if shorter)."""
+    words = _normalized_words(text)
+    if len(words) < size:
+        windows = [" ".join(words)] if words else []
+    else:
+        windows = (" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+    return {int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=4).digest(), "big") for w in windows}
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def containment(a, b):
+    """Share of a's shingles that are also in b."""
+    return len(a & b) / len(a) if a else 1.0
+
+
+def minhash(shingle_set):
+    """NUM_PERM-value MinHash signature (tuple of ints) of a shingle set."""
+    if not shingle_set:
+        return (_MAX_HASH,) * NUM_PERM
+    if np is not None:
+        values = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+        a = np.array([p[0] for p in _PERMS], dtype=np.uint64)[:, None]
+        b = np.array([p[1] for p in _PERMS], dtype=np.uint64)[:, None]
+        # (a * x + b) mod 2^64, folded to 32 bits: a cheap universal hash family
+        hashed = ((a * values[None, :] + b) >> np.uint64(32)) & np.uint64(_MAX_HASH)
+        return tuple(int(v) for v in hashed.min(axis=1))
+    mask = (1 << 64) - 1
+    return tuple(min((((a * x + b) & mask) >> 32) for x in shingle_set) for a, b in _PERMS)
+
+
+def estimate_similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _bands(signature):
+    return [(band, signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+class NearDuplicateIndex:
+    """
+    MinHash LSH index of kept texts. add() returns the key of an already kept
+    near-duplicate or None after keeping the new text. Texts added in this
+    process are also checked for containment through a shingle posting list;
+    signatures loaded from disk only support the Jaccard estimate.
+    """
+
+    def __init__(self, threshold=None, containment=None):
+        self.threshold = DEDUP_THRESHOLD if threshold is None else threshold
+        self.containment = DEDUP_CONTAINMENT if containment is None else containment
+        self.signatures = {}  # key -> signature
+        self._shingles = {}   # key -> shingle set (not persisted)
+        self._buckets = {}
+        self._postings = {}
+
+    def _candidates(self, signature):
+        found = set()
+        for band in _bands(signature):
+            found.update(self._buckets.get(band, ()))
+        return found
+
+    def find(self, text):
+        """(key of the best near-duplicate or None, its similarity, shingles, signature)."""
+        shingle_set = shingles(text)
+        signature = minhash(shingle_set)
+        best, best_similarity = None, 0.0
+        for key in self._candidates(signature):
+            known = self._shingles.get(key)
+            if known is not None:
+                similarity = jaccard(shingle_set, known)
+            else:
+                similarity = estimate_similarity(signature, self.signatures[key])
+            if similarity >= self.threshold and similarity > best_similarity:
+                best, best_similarity = key, similarity
+        if best is None and shingle_set:
+            shared = Counter()
+            for shingle in shingle_set:
+                shared.update(self._postings.get(shingle, ()))
+            if shared:
+                key, count = shared.most_common(1)[0]
+                if count / len(shingle_set) >= self.containment:
+                    best, best_similarity = key, count / len(shingle_set)
+        return best, best_similarity, shingle_set, signature
+
+    def add(self, key, text):
+        duplicate_of, _, shingle_set, signature = self.find(text)
+        if duplicate_of is not None:
+            return duplicate_of
+        self.signatures[key] = signature
+        self._shingles[key] = shingle_set
+        for band in _bands(signature):
+            self._buckets.setdefault(band, []).append(key)
+        for shingle in shingle_set:
+            self._postings.setdefault(shingle, []).append(key)
+        return None
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def save(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"threshold": self.threshold, "num_perm": NUM_PERM,
+                       "signatures": {k: list(v) for k, v in self.signatures.items()}}, f)
+
+    @classmethod
+    def load(cls, path, threshold=None, containment=None):
+        index = cls(threshold, containment)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return index
+        if data.get("num_perm") != NUM_PERM:
+            return index
+        for key, signature in data.get("signatures", {}).items():
+            signature = tuple(signature)
+            index.signatures[key] = signature
+            for band in _bands(signature):
+                index._buckets.setdefault(band, []).append(key)
+        return index
+
+
+def chunk_key(doc):
+    """Stable id for an ingested chunk: source, page and a hash of the text."""
+    metadata = getattr(doc, "metadata", None) or {}
+    digest = hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()[:12]
+    return f"{os.path.basename(str(metadata.get('source', '')))}:{metadata.get('page', '')}:{digest}"
+
+
+def collapse_documents(docs, index=None, threshold=None, containment=None):
+    """
+    Drops chunks that nearly duplicate another chunk (or one already in index,
+    e.g. loaded from a previous ingestion). Longer chunks are indexed first so
+    a fragment collapses into the chunk that contains it. Returns (kept,
+    dropped) in input order; kept chunks count the copies they stand for in
+    metadata["duplicates"].
+    """
+    index = index if index is not None else NearDuplicateIndex(threshold, containment)
+    docs = list(docs)
+    order = sorted(range(len(docs)), key=lambda i: -len(docs[i].page_content))
+    kept, dropped, by_key = set(), set(), {}
+    for i in order:
+        key = chunk_key(docs[i])
+        duplicate_of = index.add(key, docs[i].page_content)
+        if duplicate_of is None:
+            kept.add(i)
+            by_key[key] = docs[i]
+        else:
+            dropped.add(i)
+            original = by_key.get(duplicate_of)
+            if original is not None:
+                original.metadata["duplicates"] = original.metadata.get("duplicates", 0) + 1
+    return [d for i, d in enumerate(docs) if i in kept], [d for i, d in enumerate(docs) if i in dropped]
+
+
+def mmr_select(query, documents, k, threshold=None, lambda_mult=None):
+    """
+    Up to k documents from a ranked candidate list: near-duplicates of an
+    already selected document (by Jaccard or containment) are skipped, the rest are picked by maximal
+    marginal relevance (relevance from retriever rank and query overlap,
+    redundancy as shingle Jaccard with the selection).
+    Returns (selected, candidate indexes skipped as near-duplicates).
+    """
+    threshold = DEDUP_THRESHOLD if threshold is None else threshold
+    contained = DEDUP_CONTAINMENT
+    lambda_mult = DEDUP_MMR_LAMBDA if lambda_mult is None else lambda_mult
+    if not documents:
+        return [], []
+    n = len(documents)
+    sets = [shingles(getattr(d, "page_content", d)) for d in documents]
+    query_words = set(_normalized_words(query))
+    relevance = []
+    for rank, doc in enumerate(documents):
+        words = set(_normalized_words(getattr(doc, "page_content", doc)))
+        overlap = len(query_words & words) / max(1, len(query_words))
+        relevance.append(0.7 * (1 - rank / n) + 0.3 * overlap)
+
+    selected, skipped = [], []
+    remaining = list(range(n))
+    while remaining and len(selected) < k:
+        best, best_score = None, None
+        for i in list(remaining):
+            redundancy = max((jaccard(sets[i], sets[j]) for j in selected), default=0.0)
+            if redundancy >= threshold or any(containment(sets[i], sets[j]) >= contained for j in selected):
+                remaining.remove(i)
+                skipped.append(i)
+                continue
+            score = lambda_mult * relevance[i] - (1 - lambda_mult) * redundancy
+            if best_score is None or score > best_score:
+                best, best_score = i, score
+        if best is None:
+            break
+        selected.append(best)
+        remaining.remove(best)
+    return [documents[i] for i in selected], sorted(skipped)
@@ -0,0 +1,228 @@
+import os
+import gzip
+import json
+import hashlib
+import mimetypes
+import threading
+import logging
+
+from flask import Response, request, url_for, abort
+
+from utils import metrics
+
+try:
+    # Optional: brotli compresses text ~15-20% smaller than gzip
+    import brotli
+except Exception:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Delivery layer: gzip/brotli for dynamic text responses (HTML, /chat JSON),
+# content-hashed static asset URLs (/assets/<name>.<hash>.<ext>) cached as
+# immutable, and weak ETags so revalidations of GET responses get a 304.
+# scripts/build_assets.py writes the hashed copies plus .gz/.br siblings and
+# a manifest at deploy time; without it the same is computed on first use.
+COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "512"))
+# Per-response levels are kept cheap; build_assets.py uses the maximum for static files
+GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+STATIC_DIR = os.getenv("STATIC_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static"))
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+COMPRESSIBLE = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def compressible(mimetype):
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE)
+
+
+def choose_encoding(accept_encoding):
+    """'br', 'gzip' or None for an Accept-Encoding header (brotli only when installed)."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        fields = [f.strip() for f in part.split(";")]
+        q = 1.0
+        for field in fields[1:]:
+            if field.startswith("q="):
+                try:
+                    q = float(field[2:])
+                except ValueError:
+                    q = 0.0
+        if fields[0]:
+            accepted[fields[0].lower()] = q
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def compress(data, encoding, best=False):
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if best else BROTLI_QUALITY)
+    # mtime=0 keeps the output (and so precompressed files) deterministic
+    return gzip.compress(data, compresslevel=9 if best else GZIP_LEVEL, mtime=0)
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def hashed_name(name, digest):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest}{ext}"
+
+
+def scan_static(static_dir=None):
+    """{logical name: (path, bytes)} for every file under static/ except the build output."""
+    static_dir = static_dir or STATIC_DIR
+    dist = os.path.join(static_dir, "dist")
+    files = {}
+    for root, dirs, names in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist]
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, static_dir).replace(os.sep, "/")] = (path, f.read())
+    return files
+
+
+class AssetStore:
+    """Hashed asset names and their (precompressed) bodies, from the build manifest or static/."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.by_logical = {}  # "style.css" -> "style.<hash>.css"
+        self.by_hashed = {}   # "style.<hash>.css" -> {"logical", "path", "digest", "encoded": {enc: path or bytes}}
+        self._bodies = {}     # (hashed, encoding) -> bytes
+
+    def _load(self):
+        if self._loaded:
+            return
+        manifest = None
+        try:
+            with open(MANIFEST_PATH, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if manifest:
+            for logical, entry in manifest.get("assets", {}).items():
+                hashed = entry["file"]
+                self.by_logical[logical] = hashed
+                self.by_hashed[hashed] = {
+                    "logical": logical,
+                    "path": os.path.join(DIST_DIR, hashed),
+                    "digest": entry["hash"],
+                    "encoded": {enc: os.path.join(DIST_DIR, f"{hashed}.{ext}")
+                                for enc, ext in (("gzip", "gz"), ("br", "br")) if entry.get(enc)},
+                }
+        else:
+            for logical, (path, data) in scan_static().items():
+                digest = content_hash(data)
+                hashed = hashed_name(logical, digest)
+                self.by_logical[logical] = hashed
+                self.by_hashed[hashed] = {"logical": logical, "path": path, "digest": digest, "encoded": {}}
+        self._loaded = True
+
+    def url(self, logical):
+        with self._lock:
+            self._load()
+            hashed = self.by_logical.get(logical)
+        if hashed is None:
+            return url_for("static", filename=logical)
+        return url_for("assets", name=hashed)
+
+    def body(self, hashed, encoding):
+        """(bytes, encoding actually used, digest) or None for an unknown name."""
+        with self._lock:
+            self._load()
+            entry = self.by_hashed.get(hashed)
+            if entry is None:
+                return None
+            mimetype = mimetypes.guess_type(entry["logical"])[0]
+            if encoding and not compressible(mimetype):
+                encoding = None
+            key = (hashed, encoding)
+            data = self._bodies.get(key)
+            if data is None:
+                if encoding and encoding in entry["encoded"]:
+                    with open(entry["encoded"][encoding], "rb") as f:
+                        data = f.read()
+                else:
+                    with open(entry["path"], "rb") as f:
+                        data = f.read()
+                    if encoding:
+                        # No build output for this encoding: compress once, keep it
+                        data = compress(data, encoding, best=True)
+                self._bodies[key] = data
+        return data, encoding, entry["digest"]
+
+
+assets = AssetStore()
+
+
+def serve_asset(name):
+    found = assets.body(name, choose_encoding(request.headers.get("Accept-Encoding")))
+    if found is None:
+        abort(404)
+    data, encoding, digest = found
+    mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    response = Response(data, mimetype=mimetype)
+    response.set_etag(digest + (f"-{encoding}" if encoding else ""))
+    response.headers["Cache-Control"] = f"public, max-age={ASSET_MAX_AGE}, immutable"
+    response.headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    metrics.incr("delivery.asset_bytes", len(data))
+    return response.make_conditional(request)
+
+
+def finalize(response):
+    """after_request: weak ETag + 304 for text GETs, then compress text bodies."""
+    if response.direct_passthrough or response.is_streamed or "Content-Encoding" in response.headers:
+        return response
+    if not compressible(response.mimetype):
+        return response
+    if request.method in ("GET", "HEAD") and response.status_code == 200:
+        response.add_etag(weak=True)
+        if response.mimetype == "text/html":
+            response.headers.setdefault("Cache-Control", "no-cache")
+        response.make_conditional(request)
+        if response.status_code == 304:
+            metrics.incr("delivery.not_modified")
+            return response
+    if not COMPRESS_ENABLED or response.status_code in (204, 304):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+    response.vary.add("Accept-Encoding")
+    if encoding is None:
+        return response
+    try:
+        compressed = compress(data, encoding)
+    except Exception as e:
+        logger.warning(f"{encoding} compression failed: {e}")
+        return response
+    if len(compressed) >= len(data):
+        return response
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    metrics.incr("delivery.bytes_in", len(data))
+    metrics.incr("delivery.bytes_out", len(compressed))
+    return response
+
+
+def init_app(app):
+    if COMPRESS_ENABLED and brotli is None:
+        logger.warning("delivery: Brotli not installed, responses and assets are gzip only")
+    app.add_url_rule("/assets/<path:name>", "assets", serve_asset)
+    app.jinja_env.globals["asset_url"] = assets.url
+    app.after_request(finalize)
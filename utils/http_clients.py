@@ -0,0 +1,149 @@
+import os
+import threading
+import logging
+import importlib.util
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    # Optional: httpx with the h2 extra gives HTTP/2 multiplexing for providers that support it
+    import httpx
+    HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+except Exception:
+    httpx = None
+    HTTP2_AVAILABLE = False
+
+try:
+    from google import genai
+except Exception:
+    genai = None
+
+logger = logging.getLogger(__name__)
+
+# One keep-alive pool per upstream host so DNS/TCP/TLS setup is paid once per
+# connection instead of once per call. Pool size defaults to the gunicorn
+# thread count so every thread can hold a warm connection.
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "8"))
+HTTP2_PROVIDERS = {
+    p.strip() for p in os.getenv("HTTP2_PROVIDERS", "groq").split(",") if p.strip()
+}
+# Callers of these send prepared requests.PreparedRequest objects
+# (client.session.send), which httpx cannot: they stay on requests
+REQUESTS_ONLY = {"gtts"}
+
+# provider -> (base url, default timeout in seconds)
+PROVIDERS = {
+    "groq": ("https://api.groq.com", 30),
+    "libretranslate": ("https://libretranslate.de", 15),
+    "libretranslate_tts": ("https://lt.vern.cc", 25),
+    "gtts": ("https://translate.google.com", 15),
+    "google_translate": ("https://translate.google.com", 15),
+}
+
+_registry = {}
+_registry_pid = None
+_registry_lock = threading.Lock()
+_thread_local = threading.local()
+
+
+class _Client:
+    """Thin wrapper that applies the provider's default timeout to every call."""
+
+    def __init__(self, name, session, timeout):
+        self.name = name
+        self.session = session
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        if httpx is not None and isinstance(self.session, httpx.Client):
+            # httpx has no stream= kwarg on plain requests and calls form bodies data=
+            kwargs.pop("stream", None)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+def _new_client(name):
+    _, timeout = PROVIDERS.get(name, (None, 30))
+    if name in HTTP2_PROVIDERS and name in REQUESTS_ONLY:
+        logger.warning(f"http_clients: {name} needs a requests session, ignoring it in HTTP2_PROVIDERS")
+    if name in HTTP2_PROVIDERS and HTTP2_AVAILABLE and name not in REQUESTS_ONLY:
+        session = httpx.Client(
+            http2=True,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_MAXSIZE,
+                max_keepalive_connections=HTTP_POOL_MAXSIZE,
+                keepalive_expiry=60,
+            ),
+        )
+        logger.info(f"http_clients: {name} using HTTP/2 pool")
+    else:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=1, pool_block=False)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+    return _Client(name, session, timeout)
+
+
+def _check_fork():
+    """Drop clients inherited from a parent process; sockets must not be shared across a fork."""
+    global _registry_pid
+    pid = os.getpid()
+    if _registry_pid != pid:
+        _registry.clear()
+        _registry_pid = pid
+
+
+def get_client(name):
+    """
+    Returns the shared, thread-safe pooled HTTP client for a provider
+    ('groq', 'libretranslate', 'libretranslate_tts' or any other name).
+    """
+    with _registry_lock:
+        _check_fork()
+        client = _registry.get(name)
+        if client is None:
+            client = _registry[name] = _new_client(name)
+        return client
+
+
+def get_genai_client():
+    """Shared google-genai client (one per process), or None if the SDK/key is missing."""
+    if genai is None:
+        return None
+    api_key = os.getenv("GOOGLE_GENAI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        return None
+    with _registry_lock:
+        _check_fork()
+        client = _registry.get("genai")
+        if client is None:
+            client = _registry["genai"] = genai.Client(api_key=api_key)
+        return client
+
+
+def get_googletrans():
+    """googletrans.Translator cached per thread."""
+    from googletrans import Translator
+
+    translator = getattr(_thread_local, "googletrans", None)
+    if translator is None or getattr(_thread_local, "googletrans_pid", None) != os.getpid():
+        translator = _thread_local.googletrans = Translator()
+        _thread_local.googletrans_pid = os.getpid()
+    return translator
+
+
+def pool_stats():
+    with _registry_lock:
+        return {
+            "pid": _registry_pid,
+            "http2_available": HTTP2_AVAILABLE,
+            "clients": sorted(_registry),
+        }
@@ -0,0 +1,267 @@
+import os
+import hashlib
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Re-sent photos are found by a hash of the upload bytes. Re-compressed or
+# resized copies hash to the same or nearly the same 64-bit dHash, so we can
+# reuse the Groq description, but only when the aspect ratio matches too:
+# different photos with a similar layout can share a dHash. The sqlite store is
+# shared between gunicorn workers and pruned by its own policy (rows unused
+# for IMAGE_CACHE_TTL_DAYS, then the least recently used beyond
+# IMAGE_CACHE_DB_MAX_ROWS); IMAGE_CACHE_SIZE only bounds each worker's memory.
+IMAGE_CACHE_ENABLED = os.getenv("IMAGE_CACHE_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+IMAGE_CACHE_PATH = os.getenv("IMAGE_CACHE_PATH", os.path.join("tmp", "image_desc_cache.sqlite3"))
+IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "2000"))
+IMAGE_CACHE_MAX_DISTANCE = int(os.getenv("IMAGE_CACHE_MAX_DISTANCE", "2"))
+IMAGE_CACHE_ASPECT_TOLERANCE = float(os.getenv("IMAGE_CACHE_ASPECT_TOLERANCE", "0.02"))
+IMAGE_CACHE_DB_MAX_ROWS = int(os.getenv("IMAGE_CACHE_DB_MAX_ROWS", "20000"))
+IMAGE_CACHE_TTL_DAYS = float(os.getenv("IMAGE_CACHE_TTL_DAYS", "30"))
+PRUNE_INTERVAL = 300
+
+
+def dhash(img, hash_size=8):
+    """
+    Difference hash of a PIL image: grayscale, shrink to (hash_size+1) x hash_size and
+    record whether each pixel is brighter than its right neighbour. Returns a 64-bit int.
+    """
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class ImageDescriptionCache:
+    """
+    Description cache keyed by upload digest, with near-duplicate lookup by
+    perceptual hash. Entries live in an in-memory LRU (scanned by Hamming
+    distance) backed by sqlite so they survive restarts and are shared
+    between gunicorn workers.
+    """
+
+    def __init__(self, path=IMAGE_CACHE_PATH, capacity=IMAGE_CACHE_SIZE, max_distance=IMAGE_CACHE_MAX_DISTANCE,
+                 aspect_tolerance=IMAGE_CACHE_ASPECT_TOLERANCE, max_rows=IMAGE_CACHE_DB_MAX_ROWS,
+                 ttl_days=IMAGE_CACHE_TTL_DAYS):
+        self.path = path
+        self.capacity = capacity
+        self.max_distance = max_distance
+        self.aspect_tolerance = aspect_tolerance
+        self.max_rows = max_rows
+        self.ttl_s = ttl_days * 86400
+        self._entries = OrderedDict()  # digest -> (dhash, aspect, description), oldest first
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        self._last_prune = 0.0
+        self.stats = {"lookups": 0, "hits": 0, "near_hits": 0, "rejected": 0, "misses": 0, "evictions": 0,
+                      "pruned": 0}
+        self._db = None
+        try:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # Rows of the dHash-only table cannot be verified: start over
+            self._db.execute("DROP TABLE IF EXISTS image_desc")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS image_descriptions ("
+                " digest TEXT PRIMARY KEY, hash TEXT NOT NULL, aspect REAL NOT NULL, description TEXT NOT NULL,"
+                " created REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS image_descriptions_hash ON image_descriptions (hash)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS image_descriptions_used ON image_descriptions (last_used)")
+            self._db.commit()
+            self._prune(time.time())
+            self._sync()
+        except Exception as e:
+            logger.warning(f"image cache: persistent store unavailable, using memory only: {e}")
+            self._db = None
+
+    def _remember(self, digest, image_hash, aspect, description):
+        self._entries[digest] = (image_hash, aspect, description)
+        self._entries.move_to_end(digest)
+
+    def _sync(self):
+        """Pull entries written by other workers since the last sync (caller holds the lock or is __init__)."""
+        if self._db is None:
+            return
+        rows = self._db.execute(
+            "SELECT digest, hash, aspect, description, created FROM image_descriptions"
+            " WHERE created > ? ORDER BY last_used",
+            (self._last_sync,),
+        ).fetchall()
+        for digest, key, aspect, description, created in rows:
+            self._remember(digest, int(key, 16), aspect, description)
+            self._last_sync = max(self._last_sync, created)
+        self._evict()
+
+    def _load(self, digest, image_hash):
+        """Rows for this upload or its exact dHash that this worker no longer holds in memory."""
+        if self._db is None:
+            return
+        rows = self._db.execute(
+            "SELECT digest, hash, aspect, description FROM image_descriptions WHERE digest = ? OR hash = ?",
+            (digest, f"{image_hash:016x}"),
+        ).fetchall()
+        for row_digest, key, aspect, description in rows:
+            self._remember(row_digest, int(key, 16), aspect, description)
+        self._evict()
+
+    def _evict(self):
+        """Bounds this worker's memory only; the sqlite store has its own policy (_prune)."""
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _prune(self, now):
+        """Drops rows unused for ttl_days, then the least recently used beyond max_rows."""
+        if self._db is None or now - self._last_prune < PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        expired = self._db.execute("DELETE FROM image_descriptions WHERE last_used < ?", (now - self.ttl_s,))
+        overflow = self._db.execute(
+            "DELETE FROM image_descriptions WHERE digest IN"
+            " (SELECT digest FROM image_descriptions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,),
+        )
+        self._db.commit()
+        self.stats["pruned"] += max(0, expired.rowcount) + max(0, overflow.rowcount)
+
+    def _aspect_matches(self, a, b):
+        return abs(a - b) <= self.aspect_tolerance * max(a, b)
+
+    def _nearest(self, digest, image_hash, aspect):
+        """(digest, distance) of the best verified entry, or (None, rejected) where rejected counts look-alikes."""
+        if digest in self._entries:
+            return digest, 0
+        best, best_distance, rejected = None, self.max_distance + 1, 0
+        for cached_digest, (cached_hash, cached_aspect, _) in self._entries.items():
+            distance = hamming(cached_hash, image_hash)
+            if distance >= best_distance:
+                continue
+            if not self._aspect_matches(cached_aspect, aspect):
+                rejected += 1
+                continue
+            best, best_distance = cached_digest, distance
+            if distance == 0:
+                break
+        return (best, best_distance) if best is not None else (None, rejected)
+
+    def get(self, image_hash, digest, aspect):
+        """
+        Description for the same upload bytes, else for the closest dHash within
+        max_distance whose aspect ratio matches; None if there is neither.
+        """
+        with self._lock:
+            self.stats["lookups"] += 1
+            best, distance = self._nearest(digest, image_hash, aspect)
+            if best is None:
+                try:
+                    self._sync()
+                    self._load(digest, image_hash)
+                except Exception as e:
+                    logger.debug(f"image cache: sync failed: {e}")
+                best, distance = self._nearest(digest, image_hash, aspect)
+            if best is None:
+                self.stats["misses"] += 1
+                self.stats["rejected"] += distance > 0
+                return None
+            self.stats["hits"] += 1
+            if best != digest:
+                self.stats["near_hits"] += 1
+            self._entries.move_to_end(best)
+            description = self._entries[best][2]
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "UPDATE image_descriptions SET last_used = ?, hits = hits + 1 WHERE digest = ?",
+                        (time.time(), best),
+                    )
+                    self._db.commit()
+                except Exception as e:
+                    logger.debug(f"image cache: could not touch entry: {e}")
+            return description
+
+    def put(self, image_hash, digest, aspect, description):
+        with self._lock:
+            self._remember(digest, image_hash, aspect, description)
+            self._evict()
+            if self._db is not None:
+                try:
+                    now = time.time()
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO image_descriptions"
+                        " (digest, hash, aspect, description, created, last_used, hits) VALUES (?, ?, ?, ?, ?, ?, 0)",
+                        (digest, f"{image_hash:016x}", aspect, description, now, now),
+                    )
+                    self._db.commit()
+                    self._prune(now)
+                except Exception as e:
+                    logger.debug(f"image cache: could not persist entry: {e}")
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        stats["hit_rate"] = round(stats["hits"] / stats["lookups"], 3) if stats["lookups"] else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache instance, created lazily (after gunicorn forks)."""
+    global _cache
+    if not IMAGE_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ImageDescriptionCache()
+        return _cache
+
+
+def fingerprint(image_content, img):
+    """(dhash, digest, aspect) of an upload: img is the decoded image, image_content its bytes."""
+    digest = hashlib.sha256(image_content).hexdigest()
+    return dhash(img), digest, round(img.width / max(1, img.height), 4)
+
+
+def cache_stats():
+    cache = get_cache()
+    return cache.snapshot() if cache is not None else {"enabled": False}
+
+
+if __name__ == "__main__":
+    # Hit-rate check over a folder of images (e.g. uploads/): each file is looked up, then stored.
+    import sys
+
+    folder = sys.argv[1] if len(sys.argv) > 1 else "uploads"
+    cache = ImageDescriptionCache(path=":memory:")
+    for name in sorted(os.listdir(folder)):
+        try:
+            path = os.path.join(folder, name)
+            with open(path, "rb") as f, Image.open(path) as img:
+                h, digest, aspect = fingerprint(f.read(), img)
+        except Exception:
+            continue
+        found = cache.get(h, digest, aspect)
+        print(f"{name:45s} {h:016x} {aspect:7.3f} {found if found else 'miss'}")
+        if not found:
+            cache.put(h, digest, aspect, name)
+    print(cache.snapshot())
@@ -1,10 +1,13 @@
 import base64
-import requests
 import io
-from PIL import Image
+import time
+from PIL import Image, ImageOps
 from dotenv import load_dotenv
 import os
 import logging
+from utils.image_cache import get_cache, fingerprint
+from utils.http_clients import get_client
+from utils.admission import limit, Overloaded
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -18,26 +21,179 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     logger.warning("GROQ API KEY is not set - image description will not work")
 
+# Intake limits. Uploads larger than IMAGE_MAX_UPLOAD_BYTES are rejected while
+# streaming; everything else is downscaled so the longest side is at most
+# IMAGE_MAX_SIDE pixels (the vision model does not use more detail than that)
+# and re-encoded to a compact JPEG/WebP before it is base64-encoded for Groq.
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1024"))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(50_000_000)))
+IMAGE_OUTPUT_FORMAT = os.getenv("IMAGE_OUTPUT_FORMAT", "JPEG").upper()
+IMAGE_OUTPUT_QUALITY = int(os.getenv("IMAGE_OUTPUT_QUALITY", "82"))
+ALLOWED_IMAGE_FORMATS = {"JPEG", "PNG", "WEBP", "GIF", "BMP", "TIFF", "MPO"}
+
+# Refuse decompression bombs instead of only warning about them
+Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+
+
+class ImageTooLarge(ValueError):
+    """Raised when an upload exceeds IMAGE_MAX_UPLOAD_BYTES."""
+
+
+def read_upload(stream, max_bytes=None, chunk_size=64 * 1024):
+    """
+    Reads an uploaded file stream into memory in chunks, aborting as soon as
+    the running total exceeds max_bytes so oversized uploads are never buffered whole.
+    """
+    max_bytes = IMAGE_MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    buf = io.BytesIO()
+    total = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise ImageTooLarge(f"Image exceeds the {max_bytes // (1024 * 1024)} MB upload limit")
+        buf.write(chunk)
+    return buf.getvalue()
+
+
+def load_image(image_content, max_side=None):
+    """
+    Decodes and validates raw image bytes into an EXIF-rotated RGB/L PIL image
+    no larger than max_side on its longest edge. Raises ValueError for bad input.
+    """
+    max_side = max_side or IMAGE_MAX_SIDE
+    try:
+        img = Image.open(io.BytesIO(image_content))
+        if img.format not in ALLOWED_IMAGE_FORMATS:
+            raise ValueError(f"unsupported image type {img.format}")
+        # draft() lets the JPEG decoder downscale by 1/2..1/8 while decoding,
+        # which is far cheaper than decoding full resolution and resizing.
+        if img.format in ("JPEG", "MPO"):
+            img.draft("RGB", (max_side, max_side))
+        img.load()
+    except Image.DecompressionBombError as e:
+        raise ValueError(f"Image dimensions too large: {e}")
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Invalid image format: {e}")
+
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ("RGB", "L"):
+        # Flatten transparency onto white so JPEG does not turn it black
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        else:
+            img = img.convert("RGB")
+    img.thumbnail((max_side, max_side), Image.LANCZOS)
+    return img
+
+
+def encode_image(img, fmt=None, quality=None):
+    """Re-encodes a PIL image as compact JPEG/WebP and returns (bytes, mime_type)."""
+    fmt = (fmt or IMAGE_OUTPUT_FORMAT).upper()
+    quality = quality or IMAGE_OUTPUT_QUALITY
+    out = io.BytesIO()
+    if fmt == "WEBP":
+        img.save(out, format="WEBP", quality=quality, method=4)
+        mime_type = "image/webp"
+    else:
+        img.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+        mime_type = "image/jpeg"
+    return out.getvalue(), mime_type
+
+
+def _pick_smaller(image_content, encoded, mime_type, max_side=None):
+    """
+    Keeps the original upload when it is already a small, upright JPEG/WebP/PNG that
+    re-encoding would only make bigger.
+    """
+    if len(encoded) < len(image_content):
+        return encoded, mime_type
+    try:
+        original = Image.open(io.BytesIO(image_content))
+        orientation = original.getexif().get(0x0112, 1)
+        if (
+            original.format in ("JPEG", "WEBP", "PNG")
+            and max(original.size) <= (max_side or IMAGE_MAX_SIDE)
+            and orientation == 1
+        ):
+            return image_content, Image.MIME[original.format]
+    except Exception:
+        pass
+    return encoded, mime_type
+
+
+def prepare_image(image_content, max_side=None, fmt=None, quality=None):
+    """
+    Validates raw image bytes and returns (encoded_bytes, mime_type) for the
+    vision call: EXIF-rotated, downscaled to max_side and re-encoded as JPEG/WebP.
+    Raises ValueError for unreadable or unsupported images.
+    """
+    encoded, mime_type = encode_image(load_image(image_content, max_side), fmt, quality)
+    return _pick_smaller(image_content, encoded, mime_type, max_side)
+
+
 def describe_image(image_path):
     """
     Takes an image file path and returns a 1–2 line description about the image
     focused on health-related topics, or a fallback response if not health-related.
     """
-    if not GROQ_API_KEY:
-        return {"error": "Image processing is not configured. GROQ_API_KEY is missing."}
-    
     try:
         with open(image_path, "rb") as image_file:
             image_content = image_file.read()
-            encoded_image = base64.b64encode(image_content).decode("utf-8")
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        return {"error": str(e)}
+    return describe_image_bytes(image_content)
+
 
-        # Check image validity
+def describe_image_bytes(image_content, prepare=True):
+    """
+    Same as describe_image, but works on in-memory upload bytes so nothing is written to disk.
+    The result carries a 'metrics' dict with upload/encoded sizes and encode/Groq timings.
+    prepare=False sends the original bytes untouched (used to benchmark the intake).
+    """
+    if not GROQ_API_KEY:
+        return {"error": "Image processing is not configured. GROQ_API_KEY is missing."}
+
+    metrics = {"upload_bytes": len(image_content)}
+    cache = get_cache() if prepare else None
+    key = None
+    try:
+        t0 = time.perf_counter()
         try:
-            img = Image.open(io.BytesIO(image_content))
-            img.verify()
+            if prepare:
+                img = load_image(image_content)
+                if cache is not None:
+                    key = fingerprint(image_content, img)
+                    cached = cache.get(*key)
+                    if cached is not None:
+                        metrics["cache"] = "hit"
+                        metrics["encode_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+                        logger.info(f"describe_image: cache hit for {key[0]:016x}")
+                        return {"description": cached, "metrics": metrics}
+                    metrics["cache"] = "miss"
+                encoded_content, mime_type = _pick_smaller(image_content, *encode_image(img))
+            else:
+                img = Image.open(io.BytesIO(image_content))
+                img.verify()
+                encoded_content, mime_type = image_content, Image.MIME.get(img.format, "image/jpeg")
+        except ValueError as e:
+            logger.error(f"Invalid image format: {str(e)}")
+            return {"error": str(e)}
         except Exception as e:
             logger.error(f"Invalid image format: {str(e)}")
             return {"error": f"Invalid image format: {str(e)}"}
+        encoded_image = base64.b64encode(encoded_content).decode("utf-8")
+        metrics["encoded_bytes"] = len(encoded_content)
+        metrics["encode_ms"] = round((time.perf_counter() - t0) * 1000, 1)
 
         # Vision prompt: keep response short and useful for chaining
         prompt_text = (
@@ -56,45 +212,66 @@ def describe_image(image_path):
                 "role": "user",
                 "content": [
                     {"type": "text", "text": prompt_text},
-                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{encoded_image}"}}
+                    {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{encoded_image}"}}
                 ]
             }
         ]
 
-        # Make the request to Groq API
-        response = requests.post(
-            GROQ_API_URL,
-            json={
-                "model": "meta-llama/llama-4-scout-17b-16e-instruct",
-                "messages": messages,
-                "max_tokens": 500
-            },
-            headers={
-                "Authorization": f"Bearer {GROQ_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            timeout=30
-        )
+        # Make the request to Groq API over the shared keep-alive pool
+        t0 = time.perf_counter()
+        with limit("vision"):
+            response = get_client("groq").post(
+                GROQ_API_URL,
+                json={
+                    "model": "meta-llama/llama-4-scout-17b-16e-instruct",
+                    "messages": messages,
+                    "max_tokens": 500
+                },
+                headers={
+                    "Authorization": f"Bearer {GROQ_API_KEY}",
+                    "Content-Type": "application/json"
+                },
+            )
+        metrics["groq_ms"] = round((time.perf_counter() - t0) * 1000, 1)
 
         response.raise_for_status()
         data = response.json()
         description = data.get("choices", [{}])[0].get("message", {}).get("content", "No description found.")
 
-        return {"description": description.strip()}
+        description = description.strip()
+        if cache is not None and key is not None and "choices" in data:
+            cache.put(*key, description)
+
+        logger.info(
+            "describe_image: upload=%d B encoded=%d B encode=%.1f ms groq=%.1f ms",
+            metrics["upload_bytes"], metrics["encoded_bytes"], metrics["encode_ms"], metrics["groq_ms"],
+        )
+        return {"description": description, "metrics": metrics}
 
+    except Overloaded:
+        raise
     except Exception as e:
         logger.error(f"Error: {str(e)}")
         return {"error": str(e)}
 
 # Run and test the function
 if __name__ == "__main__":
-    image_path = "c.jpeg"  # Replace with your test image
-    result = describe_image(image_path)
+    import sys
 
-    if "error" in result:
-        print("Error:", result["error"])
-    else:
-        query = result["description"]
-        print("Image Description:", query)
+    image_path = sys.argv[1] if len(sys.argv) > 1 else "c.jpeg"  # Replace with your test image
+    with open(image_path, "rb") as f:
+        raw = f.read()
+    t0 = time.perf_counter()
+    prepared, mime = prepare_image(raw)
+    print(f"Intake: {len(raw)} B -> {len(prepared)} B ({mime}) in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    # Before: original upload bytes; after: in-memory intake pipeline
+    for label, prepare in (("before", False), ("after", True)):
+        result = describe_image_bytes(raw, prepare=prepare)
+        if "error" in result:
+            print(f"[{label}] Error:", result["error"])
+        else:
+            print(f"[{label}] Image Description:", result["description"])
+            print(f"[{label}] Metrics:", result["metrics"])
         
-        # Create the input data for invoking the system
\ No newline at end of file
+        # Create the input data for invoking the system
@@ -0,0 +1,68 @@
+import os
+import json
+
+# Chunking, embedding model and retriever k shared by the ingestion scripts
+# (scripts/setup_database.py, scripts/update_database.py, Pinecone_load.py),
+# the offline corpus in benchmarks/ and chains/rag_chain.py, so the index is
+# built and queried the way scripts/eval_retrieval.py measured, with the same
+# embedding model on both sides (build_embeddings). --export on
+# that script rewrites config/ingestion.json; environment variables
+# (RETRIEVER_K, EMBEDDING_MODEL) still win over the file.
+INGESTION_CONFIG_PATH = os.getenv(
+    "INGESTION_CONFIG",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "ingestion.json"),
+)
+
+DEFAULTS = {
+    "chunk_size": 500,
+    "chunk_overlap": 50,
+    "retriever_k": 5,
+    "embedding_model": "sentence-transformers/all-MiniLM-L6-v2",
+}
+
+
+def load(path=None):
+    """DEFAULTS overlaid with config/ingestion.json (missing or broken file -> DEFAULTS)."""
+    values = dict(DEFAULTS)
+    try:
+        with open(path or INGESTION_CONFIG_PATH, encoding="utf-8") as f:
+            data = json.load(f)
+        values.update({k: data[k] for k in DEFAULTS if k in data})
+    except (OSError, ValueError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"ingestion_config: ignoring {path or INGESTION_CONFIG_PATH}: {e}")
+    return values
+
+
+def save(values, path=None, evaluation=None):
+    """Writes the DEFAULTS keys of values (plus an optional evaluation summary)."""
+    data = {k: values.get(k, DEFAULTS[k]) for k in DEFAULTS}
+    if evaluation:
+        data["evaluation"] = evaluation
+    path = path or INGESTION_CONFIG_PATH
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+    return data
+
+
+def embedding_model(values=None):
+    return os.getenv("EMBEDDING_MODEL") or (values or load())["embedding_model"]
+
+
+def build_embeddings(values=None):
+    """
+    LangChain embeddings for the configured model, used both to build the index
+    and to embed queries. "google:<model>" is a Google Generative AI model
+    (as in scripts/eval_retrieval.py); anything else a sentence-transformers one.
+    """
+    name = embedding_model(values)
+    if name.startswith("google:"):
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        return GoogleGenerativeAIEmbeddings(model=name.split(":", 1)[1])
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=name)
@@ -0,0 +1,55 @@
+import os
+
+# How /chat handles lang == 'kn'.
+#   translate (default): the translate sandwich - KN->EN before the graph,
+#       the whole English reply EN->KN after it.
+#   native: the Kannada question goes through the graph as is. Per node:
+#       retrieve        native = embed the Kannada query with the multilingual
+#                       model against MULTILINGUAL_INDEX_NAME (chains/rag_chain);
+#                       translate = translate only the short query to English
+#                       for the English index (automatic when no multilingual
+#                       index is configured)
+#       generate_answer native = rag_prompt_kn answers directly in Kannada;
+#                       translate = answer in English, /chat translates it back
+#       websearch       translate = English Tavily query (default), native =
+#                       the Kannada query
+# KANNADA_NODE_MODES overrides single nodes, e.g. "retrieve=translate".
+# The enhancer, classifier and grader read Kannada directly in native mode.
+KANNADA_MODE = os.getenv("KANNADA_MODE", "translate").strip().lower()
+NODES = ("retrieve", "generate_answer", "websearch")
+DEFAULT_NODE_MODES = {"retrieve": "native", "generate_answer": "native", "websearch": "translate"}
+
+
+def _parse(spec):
+    modes = {}
+    for part in (spec or "").split(","):
+        node, _, mode = part.partition("=")
+        node, mode = node.strip(), mode.strip().lower()
+        if node in NODES and mode in ("native", "translate"):
+            modes[node] = mode
+        elif part.strip():
+            print(f"kannada_mode: ignoring '{part.strip()}' in KANNADA_NODE_MODES")
+    return modes
+
+
+NODE_MODES = dict(DEFAULT_NODE_MODES, **_parse(os.getenv("KANNADA_NODE_MODES", "")))
+
+
+def native(lang):
+    """True when a turn in lang runs the graph without the translate sandwich."""
+    return lang == "kn" and KANNADA_MODE == "native"
+
+
+def node_mode(node, lang):
+    """'native' or 'translate' for a node in a native-mode turn, None otherwise."""
+    if not native(lang):
+        return None
+    return NODE_MODES.get(node, "translate")
+
+
+def kannada_ratio(text):
+    """Share of letters in text that are Kannada script (U+0C80-U+0CFF)."""
+    letters = [ch for ch in str(text) if ch.isalpha()]
+    if not letters:
+        return 0.0
+    return sum(1 for ch in letters if "ಀ" <= ch <= "೿") / len(letters)
@@ -0,0 +1,160 @@
+import os
+import math
+import collections
+
+from utils import metrics as pipeline_metrics
+
+# Local language/script detection for /chat, so translation is only paid for
+# when it is needed: the client's `lang` is the UI language, not necessarily
+# what the user typed. Kannada script is recognised by Unicode block
+# (U+0C80-U+0CFF); Latin text is scored against two small character-trigram
+# models, English and romanized Kannada ("Kanglish"), trained at import time
+# on the samples below. No network, ~20 us per question.
+LANGDETECT_ENABLED = os.getenv("LANGDETECT_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+# Below this confidence the client's lang is trusted
+LANGDETECT_MIN_CONFIDENCE = float(os.getenv("LANGDETECT_MIN_CONFIDENCE", "0.8"))
+# Share of letters in Kannada script for a text/segment to count as Kannada
+KANNADA_SCRIPT_RATIO = 0.8
+# Reply segments needing translation are sent in at most this many runs,
+# otherwise the whole reply goes in one call as before
+MAX_TRANSLATION_RUNS = int(os.getenv("LANGDETECT_MAX_RUNS", "2"))
+
+Detection = collections.namedtuple("Detection", "lang script confidence")
+
+ENGLISH_SAMPLE = """
+what is the ayurvedic remedy for common cold and a blocked nose
+how can i treat a dry cough with herbs at home
+which foods should i avoid for acidity and heartburn
+which herbs help control blood sugar in diabetes
+what causes hair fall and how do i stop it naturally
+i have pain in my knee joints every morning what should i do
+my stomach hurts after eating and i feel bloated
+how should fever be managed with diet and herbs
+is turmeric milk good for sleep and anxiety
+what lifestyle changes reduce obesity and excess weight
+can you suggest a diet plan for pitta dosha
+tell me about the benefits of ashwagandha and tulsi
+the patient should drink warm water with ginger and honey
+avoid spicy oily food and eat freshly cooked meals
+please explain the daily routine recommended in ayurveda
+thank you for the advice hello good morning
+"""
+
+KANGLISH_SAMPLE = """
+nanage tumba thale novu ide enu madbeku
+nange shita aagide mooge kattide yenu maddu
+kemmu kadime aagalu mane maddu helu
+hotte novu ide oota aada mele
+nanna kooduvu tumba uduruttide yaake
+jwara bandide enu tinnabeku
+sakkare kayile ide yava gida moolike olledu
+nidde barolla raatri enu madli
+naanu tumba dappa agiddini hege kadime madodu
+kaalu novu ide mandi novu jasti ide
+acidity ide edeyuri aagtide yenu tinbardu
+ayurveda dalli idakke parihara enu
+dinaa bisi neeru kudiri shunti jenu haaki
+swalpa heli namaskara hegiddira
+nimage dhanyavadagalu tumba upakara aaytu
+makkalige kemmu bandre enu kodbeku
+"""
+
+
+def _trigrams(text):
+    for word in text.lower().split():
+        padded = f"#{word}#"
+        for i in range(max(1, len(padded) - 2)):
+            yield padded[i:i + 3]
+
+
+class _TrigramModel:
+    """Add-one smoothed character-trigram log-probabilities."""
+
+    def __init__(self, sample):
+        self.counts = collections.Counter(_trigrams(sample))
+        self.total = sum(self.counts.values())
+        self.vocabulary = 28 ** 3
+
+    def log_prob(self, trigram):
+        return math.log((self.counts.get(trigram, 0) + 1) / (self.total + self.vocabulary))
+
+
+_MODELS = {"en": _TrigramModel(ENGLISH_SAMPLE), "kn": _TrigramModel(KANGLISH_SAMPLE)}
+
+
+def _latin_only(text):
+    return "".join(ch if "a" <= ch <= "z" else " " for ch in text.lower())
+
+
+def detect(text):
+    """
+    Detection(lang, script, confidence) for text: lang is 'en' or 'kn' (None
+    without letters), script 'kannada', 'latin' (English or Kanglish) or
+    'mixed'. confidence is in [0.5, 1].
+    """
+    text = str(text or "")
+    kannada = sum(1 for ch in text if "ಀ" <= ch <= "೿")
+    latin = sum(1 for ch in text if ch.isascii() and ch.isalpha())
+    letters = kannada + latin
+    if not letters:
+        return Detection(None, "none", 0.0)
+    ratio = kannada / letters
+    if ratio >= KANNADA_SCRIPT_RATIO:
+        return Detection("kn", "kannada", ratio)
+    if ratio > 1 - KANNADA_SCRIPT_RATIO:
+        # Kannada sentences with English herb/disease names: still Kannada
+        return Detection("kn" if ratio >= 0.5 else "en", "mixed", max(ratio, 1 - ratio))
+    grams = list(_trigrams(_latin_only(text)))
+    if not grams:
+        return Detection("en", "latin", 0.5)
+    margin = sum(_MODELS["en"].log_prob(g) - _MODELS["kn"].log_prob(g) for g in grams) / len(grams)
+    # Mean per-trigram log-likelihood ratio squashed to a probability; short
+    # inputs are pulled towards 0.5
+    p_en = 1 / (1 + math.exp(-4 * margin * min(1.0, len(grams) / 12)))
+    return Detection("en", "latin", p_en) if p_en >= 0.5 else Detection("kn", "latin", 1 - p_en)
+
+
+def in_language(text, lang, min_confidence=None):
+    """True when text is confidently already in lang (written in that language's own script)."""
+    d = detect(text)
+    if d.lang != lang:
+        return False
+    if lang == "kn":
+        # Kannada script, English names in brackets allowed; Kanglish still
+        # needs translating to reach Kannada script
+        return d.script in ("kannada", "mixed")
+    return d.confidence >= (LANGDETECT_MIN_CONFIDENCE if min_confidence is None else min_confidence)
+
+
+def request_language(text, client_lang):
+    """
+    (lang, detection) for a /chat question: the language the turn is
+    answered in. The client's lang stands unless the text is confidently
+    English (Kannada UI) or Kannada script (English UI).
+    """
+    if not LANGDETECT_ENABLED:
+        return client_lang, None
+    d = detect(text)
+    pipeline_metrics.incr(f"langdetect.{d.lang or 'none'}_{d.script}")
+    if d.confidence >= LANGDETECT_MIN_CONFIDENCE:
+        if client_lang == "kn" and d.lang == "en" and d.script == "latin":
+            return "en", d
+        if client_lang == "en" and d.lang == "kn" and d.script == "kannada":
+            return "kn", d
+    return client_lang, d
+
+
+def estimated_savings():
+    """Translation calls avoided and the latency that saved, at the mean observed translation latency."""
+    snap = pipeline_metrics.snapshot("translate.")["latency"]
+    counts = sum(s.get("count", 0) for s in snap.values())
+    mean_ms = (sum(s.get("mean_ms", 0) * s.get("count", 0) for s in snap.values()) / counts) if counts else None
+    counters = pipeline_metrics.snapshot("langdetect.")["counters"]
+    avoided = counters.get("langdetect.calls_avoided", 0)
+    return {
+        "enabled": LANGDETECT_ENABLED,
+        "calls_avoided": avoided,
+        "translate_mean_ms": mean_ms,
+        "latency_saved_s": round(avoided * mean_ms / 1000, 2) if mean_ms else None,
+        "counters": counters,
+    }
@@ -0,0 +1,161 @@
+import os
+import time
+import threading
+import logging
+
+from utils.admission import get_bulkhead
+from utils import metrics as pipeline_metrics
+
+logger = logging.getLogger(__name__)
+
+# Load-adaptive graph profile for /chat (workflow/graph.py compiles all three):
+#   full     current behaviour
+#   lean     no rephrase for standalone questions, local grading, no refine loop
+#   minimal  retrieve -> generate
+# Three signals, sampled per request in this process:
+#   pressure  (in flight + queued) / limit of the "chat" bulkhead, smoothed
+#   latency   seconds an "llm" bulkhead slot is held (EWMA kept by the bulkhead)
+#   errors    share of recent /chat turns that failed, were shed or missed their deadline
+# Any signal over a profile's "enter" threshold switches up at once; the
+# controller steps down one profile only when every signal is under the
+# current profile's "exit" threshold and the profile has held LOAD_MIN_DWELL_S.
+# Override with LOAD_<SIGNAL>_<PROFILE>=enter:exit, e.g. LOAD_LATENCY_LEAN=6:3.
+# LOAD_PROFILE pins a profile (as does POST /admin/load-profile).
+PROFILES = ("full", "lean", "minimal")
+THRESHOLDS = {
+    # signal: {profile: (enter, exit)}
+    "pressure": {"lean": (1.0, 0.6), "minimal": (1.4, 1.0)},
+    "latency": {"lean": (4.0, 2.5), "minimal": (8.0, 5.0)},
+    "errors": {"lean": (0.2, 0.05), "minimal": (0.5, 0.2)},
+}
+LOAD_CONTROL_ENABLED = os.getenv("LOAD_CONTROL_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+LOAD_PROFILE = os.getenv("LOAD_PROFILE", "").strip().lower() or None
+LOAD_MIN_DWELL_S = float(os.getenv("LOAD_MIN_DWELL_S", "20"))
+# Weight of the newest sample in the pressure and error averages
+LOAD_SMOOTHING = float(os.getenv("LOAD_SMOOTHING", "0.2"))
+
+
+def _thresholds():
+    values = {}
+    for signal, profiles in THRESHOLDS.items():
+        values[signal] = {}
+        for profile, default in profiles.items():
+            spec = os.getenv(f"LOAD_{signal.upper()}_{profile.upper()}")
+            try:
+                values[signal][profile] = tuple(float(x) for x in spec.split(":")) if spec else default
+            except ValueError:
+                logger.warning(f"load_control: ignoring LOAD_{signal.upper()}_{profile.upper()}={spec!r}")
+                values[signal][profile] = default
+    return values
+
+
+class LoadController:
+    def __init__(self, override=LOAD_PROFILE, min_dwell=LOAD_MIN_DWELL_S, smoothing=LOAD_SMOOTHING):
+        if override is not None and override not in PROFILES:
+            logger.warning(f"load_control: unknown LOAD_PROFILE {override!r}, using auto")
+            override = None
+        self.override = override
+        self.min_dwell = min_dwell
+        self.smoothing = smoothing
+        self.thresholds = _thresholds()
+        self.level = 0
+        self.signals = {"pressure": 0.0, "latency": 0.0, "errors": 0.0}
+        self.switches = []
+        self._since = time.monotonic()
+        self._seconds = {p: 0.0 for p in PROFILES}
+        self._lock = threading.Lock()
+
+    def _sample(self):
+        chat = get_bulkhead("chat").snapshot()
+        pressure = (chat["in_flight"] + chat["queue_depth"]) / max(1, chat["limit"])
+        a = self.smoothing
+        self.signals["pressure"] = (1 - a) * self.signals["pressure"] + a * pressure
+        self.signals["latency"] = get_bulkhead("llm").snapshot()["avg_hold_s"]
+
+    def _desired(self):
+        """Level the signals call for, with hysteresis around the current one."""
+        up = 0
+        for level in (1, 2):
+            profile = PROFILES[level]
+            if any(self.signals[s] >= t[profile][0] for s, t in self.thresholds.items()):
+                up = level
+        if up > self.level:
+            return up
+        if self.level and time.monotonic() - self._since >= self.min_dwell:
+            profile = PROFILES[self.level]
+            if all(self.signals[s] < t[profile][1] for s, t in self.thresholds.items()):
+                return self.level - 1
+        return self.level
+
+    def _switch(self, level, reason):
+        now = time.monotonic()
+        self._seconds[PROFILES[self.level]] += now - self._since
+        old, self.level, self._since = PROFILES[self.level], level, now
+        signals = {k: round(v, 3) for k, v in self.signals.items()}
+        self.switches = (self.switches + [{"at": time.time(), "from": old, "to": PROFILES[level],
+                                           "reason": reason, "signals": signals}])[-20:]
+        pipeline_metrics.incr("load.switches")
+        logger.warning(f"load_control: {old} -> {PROFILES[level]} ({reason}, {signals})")
+
+    def profile(self):
+        """Graph profile for a /chat turn starting now."""
+        with self._lock:
+            if self.override is not None:
+                profile = self.override
+            elif not LOAD_CONTROL_ENABLED:
+                profile = "full"
+            else:
+                self._sample()
+                level = self._desired()
+                if level != self.level:
+                    self._switch(level, "load" if level > self.level else "recovered")
+                profile = PROFILES[self.level]
+        pipeline_metrics.incr(f"load.requests.{profile}")
+        return profile
+
+    def observe(self, failed):
+        """Outcome of a finished /chat turn (failed: error, shed or deadline miss)."""
+        with self._lock:
+            a = self.smoothing
+            self.signals["errors"] = (1 - a) * self.signals["errors"] + a * (1.0 if failed else 0.0)
+
+    def set_override(self, profile):
+        """Pins a profile (None or 'auto' returns to automatic control)."""
+        profile = None if profile in (None, "", "auto") else profile
+        if profile is not None and profile not in PROFILES:
+            raise ValueError(f"profile must be one of {PROFILES + ('auto',)}")
+        with self._lock:
+            self.override = profile
+            if profile is not None and PROFILES.index(profile) != self.level:
+                self._switch(PROFILES.index(profile), "override")
+        return self.snapshot()
+
+    def snapshot(self):
+        with self._lock:
+            seconds = dict(self._seconds)
+            seconds[PROFILES[self.level]] += time.monotonic() - self._since
+            return {
+                "profile": self.override or PROFILES[self.level],
+                "mode": "override" if self.override else ("auto" if LOAD_CONTROL_ENABLED else "off"),
+                "level": self.level,
+                "signals": {k: round(v, 3) for k, v in self.signals.items()},
+                "thresholds": self.thresholds,
+                "seconds_in_profile": {k: round(v, 1) for k, v in seconds.items()},
+                "switches": list(self.switches),
+            }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_controller():
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = LoadController()
+        return _controller
+
+
+def snapshot():
+    return get_controller().snapshot()
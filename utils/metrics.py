@@ -0,0 +1,92 @@
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+# In-process latency samples and counters, reported on /metrics and by the
+# benchmark suite. Each series keeps its most recent SAMPLE_WINDOW samples.
+SAMPLE_WINDOW = 2048
+
+_series = {}
+_counters = {}
+_lock = threading.Lock()
+# Spans recorded while handling the current request, when someone is tracing it
+_trace = contextvars.ContextVar("metrics_trace", default=None)
+
+
+def record(name, seconds):
+    spans = _trace.get()
+    if spans is not None:
+        spans.append((name, seconds))
+    with _lock:
+        series = _series.get(name)
+        if series is None:
+            series = _series[name] = {"samples": deque(maxlen=SAMPLE_WINDOW), "count": 0, "total": 0.0}
+        series["samples"].append(seconds)
+        series["count"] += 1
+        series["total"] += seconds
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+@contextmanager
+def timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+@contextmanager
+def trace():
+    """Collects every (name, seconds) recorded in this context, e.g. the graph nodes one request ran."""
+    spans = []
+    token = _trace.set(spans)
+    try:
+        yield spans
+    finally:
+        _trace.reset(token)
+
+
+def percentile(samples, q):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * (len(ordered) - 1) + 0.5))]
+
+
+def summarize(samples):
+    """p50/p95/p99/mean in milliseconds for a list of seconds."""
+    samples = list(samples)
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "mean_ms": round(1000 * sum(samples) / len(samples), 2),
+        "p50_ms": round(1000 * percentile(samples, 0.50), 2),
+        "p95_ms": round(1000 * percentile(samples, 0.95), 2),
+        "p99_ms": round(1000 * percentile(samples, 0.99), 2),
+    }
+
+
+def snapshot(prefix=""):
+    with _lock:
+        latency = {
+            name: dict(summarize(s["samples"]), count=s["count"])
+            for name, s in _series.items() if name.startswith(prefix)
+        }
+        counters = {name: value for name, value in _counters.items() if name.startswith(prefix)}
+    return {"latency": latency, "counters": counters}
+
+
+def reset(prefix=""):
+    """Drops every series and counter whose name starts with prefix (default: all)."""
+    with _lock:
+        for store in (_series, _counters):
+            for name in [n for n in store if n.startswith(prefix)]:
+                del store[name]
@@ -0,0 +1,114 @@
+# Minimal MPEG audio frame parser: enough to read sample rate / channels /
+# duration of a TTS clip without spawning ffprobe, and to strip ID3 tags and
+# the Xing/Info header so clips can be concatenated frame by frame.
+
+BITRATES = {
+    # (version is MPEG-1, layer) -> kbps by index
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+class MP3FormatError(ValueError):
+    """Raised when bytes do not look like an MPEG audio stream."""
+
+
+def id3v2_size(data, offset=0):
+    """Length of an ID3v2 tag starting at offset (0 when there is none)."""
+    if data[offset:offset + 3] != b"ID3" or len(data) < offset + 10:
+        return 0
+    size = 0
+    for byte in data[offset + 6:offset + 10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[offset + 5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def parse_header(data, offset):
+    """Frame header at offset as a dict, or None if there is no valid frame there."""
+    if offset + 4 > len(data):
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    if data[offset] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version_bits = (b1 >> 3) & 0x03
+    layer_bits = (b1 >> 1) & 0x03
+    bitrate_index = (b2 >> 4) & 0x0F
+    rate_index = (b2 >> 2) & 0x03
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version_bits == 3
+    layer = 4 - layer_bits
+    bitrate = BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version_bits][rate_index]
+    padding = (b2 >> 1) & 0x01
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or mpeg1) else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+    return {
+        "sample_rate": sample_rate,
+        "channels": 1 if (b3 >> 6) == 3 else 2,
+        "bitrate": bitrate,
+        "samples": samples,
+        "length": length,
+        "mpeg1": mpeg1,
+    }
+
+
+def _is_info_frame(data, offset, header):
+    # Xing/Info/VBRI tag sits after the side information of the first frame
+    frame = data[offset:offset + header["length"]]
+    return b"Xing" in frame[:64] or b"Info" in frame[:64] or b"VBRI" in frame[:64]
+
+
+def iter_frames(data):
+    """Yields (offset, header) for each audio frame, skipping tags and the Xing/Info frame."""
+    offset = id3v2_size(data)
+    end = len(data)
+    if end >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+    first = True
+    while offset + 4 <= end:
+        header = parse_header(data, offset)
+        if header is None or header["length"] <= 0:
+            # Resync: scan forward to the next plausible frame
+            offset += 1
+            continue
+        if offset + header["length"] > end:
+            break
+        if not (first and _is_info_frame(data, offset, header)):
+            yield offset, header
+        first = False
+        offset += header["length"]
+
+
+def info(data):
+    """sample_rate, channels, frames, duration (seconds) and bitrate of an MP3 clip."""
+    frames = samples = 0
+    first = None
+    for _, header in iter_frames(data):
+        first = first or header
+        frames += 1
+        samples += header["samples"]
+    if first is None:
+        raise MP3FormatError("no MPEG audio frames found")
+    return {
+        "sample_rate": first["sample_rate"],
+        "channels": first["channels"],
+        "frames": frames,
+        "duration": samples / first["sample_rate"],
+        "bitrate": first["bitrate"],
+    }
+
+
+def audio_frames(data):
+    """Only the audio frames (no ID3 tags, no Xing/Info frame), ready to concatenate."""
+    return b"".join(data[offset:offset + header["length"]] for offset, header in iter_frames(data))
@@ -0,0 +1,244 @@
+import os
+import time
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+
+from utils import deadline
+from utils.admission import Overloaded
+
+try:
+    import redis
+except Exception:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Gemini quota shared by every gunicorn worker. Each call takes one request
+# and an estimated number of tokens from two token buckets that refill
+# continuously over GEMINI_RATE_PERIOD seconds. Buckets live in sqlite by
+# default (one file shared by all local processes); set RATE_LIMIT_URL to a
+# redis:// URL to share them across machines instead.
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "60"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "1000000"))
+GEMINI_RATE_PERIOD = float(os.getenv("GEMINI_RATE_PERIOD", "60"))
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL", os.path.join("tmp", "rate_limit.sqlite3"))
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+
+# Lower priorities may only spend the part of the bucket above their reserve,
+# so when quota runs short they wait/shed first and generate_answer still fits.
+# priority -> (fraction of capacity kept in reserve, max seconds to wait)
+PRIORITIES = {
+    "high": (0.0, 20.0),
+    "normal": (0.2, 5.0),
+    "low": (0.4, 2.0),
+}
+
+# Graph stage -> priority and a rough output-token allowance
+STAGES = {
+    "generate": ("high", 1024),
+    "enhance": ("normal", 64),
+    "classify": ("normal", 8),
+    "translate": ("normal", 1024),
+    "grade": ("low", 8),
+    "refine": ("low", 64),
+}
+
+
+class RateLimited(Overloaded):
+    """Raised when a call is shed because the shared quota cannot admit it in time."""
+
+
+def estimate_tokens(prompt, output_tokens=0):
+    """~4 characters per token for the prompt plus the expected output."""
+    return len(str(prompt)) // 4 + output_tokens
+
+
+class SqliteBucketStore:
+    """Token buckets in a sqlite file; BEGIN IMMEDIATE serialises all processes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._conn() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _conn(self):
+        db = getattr(self._local, "db", None)
+        if db is None or getattr(self._local, "pid", None) != os.getpid():
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def take(self, buckets, reserve):
+        """
+        buckets: [(name, capacity, refill_per_second, amount)]. Takes `amount`
+        from every bucket if each stays above reserve*capacity, atomically.
+        Returns 0.0 on success, otherwise the seconds to wait before retrying.
+        """
+        db = self._conn()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            levels, wait = [], 0.0
+            for name, capacity, rate, amount in buckets:
+                row = db.execute("SELECT level, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+                level = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+                levels.append(level)
+                need = amount + reserve * capacity - level
+                if need > 0:
+                    wait = max(wait, need / rate)
+            taken = wait == 0.0
+            for (name, capacity, rate, amount), level in zip(buckets, levels):
+                db.execute(
+                    "INSERT OR REPLACE INTO buckets (name, level, updated) VALUES (?, ?, ?)",
+                    (name, level - amount if taken else level, now),
+                )
+            db.execute("COMMIT")
+            return wait
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+
+class RedisBucketStore:
+    """Same buckets in Redis (or any Redis-compatible server) using one Lua script."""
+
+    SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local reserve = tonumber(ARGV[2])
+    local n = #KEYS
+    local levels = {}
+    local wait = 0
+    for i = 1, n do
+        local capacity = tonumber(ARGV[3 + (i - 1) * 3])
+        local rate = tonumber(ARGV[4 + (i - 1) * 3])
+        local amount = tonumber(ARGV[5 + (i - 1) * 3])
+        local state = redis.call('HMGET', KEYS[i], 'level', 'updated')
+        local level = capacity
+        if state[1] then
+            level = math.min(capacity, tonumber(state[1]) + (now - tonumber(state[2])) * rate)
+        end
+        levels[i] = level
+        local need = amount + reserve * capacity - level
+        if need > 0 then wait = math.max(wait, need / rate) end
+    end
+    for i = 1, n do
+        local amount = tonumber(ARGV[5 + (i - 1) * 3])
+        local level = levels[i]
+        if wait == 0 then level = level - amount end
+        redis.call('HSET', KEYS[i], 'level', tostring(level), 'updated', tostring(now))
+        redis.call('EXPIRE', KEYS[i], 3600)
+    end
+    return tostring(wait)
+    """
+
+    def __init__(self, url):
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def take(self, buckets, reserve):
+        args = [time.time(), reserve]
+        for _, capacity, rate, amount in buckets:
+            args += [capacity, rate, amount]
+        return float(self._script(keys=[f"ratelimit:{b[0]}" for b in buckets], args=args))
+
+
+class QuotaLimiter:
+    """Request- and token-aware limiter for one provider quota."""
+
+    def __init__(self, name, rpm, tpm, period=GEMINI_RATE_PERIOD, store=None):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.period = period
+        self.store = store
+        self._lock = threading.Lock()
+        self.stats = {p: {"admitted": 0, "shed": 0, "waited_s": 0.0} for p in PRIORITIES}
+
+    def acquire(self, priority="normal", tokens=0):
+        if priority not in PRIORITIES:
+            priority = "normal"
+        reserve, max_wait = PRIORITIES[priority]
+        # Never wait past the turn's deadline: shed now and let the node degrade
+        max_wait = deadline.wait_timeout(max_wait)
+        # A single call can never need more than the spendable part of the bucket
+        tokens = min(tokens, self.tpm * (1 - reserve))
+        buckets = [
+            (f"{self.name}:requests", self.rpm, self.rpm / self.period, 1),
+            (f"{self.name}:tokens", self.tpm, self.tpm / self.period, tokens),
+        ]
+        start = time.monotonic()
+        while True:
+            wait = self.store.take(buckets, reserve)
+            waited = time.monotonic() - start
+            if wait == 0.0:
+                with self._lock:
+                    self.stats[priority]["admitted"] += 1
+                    self.stats[priority]["waited_s"] += waited
+                return waited
+            if waited + wait > max_wait:
+                with self._lock:
+                    self.stats[priority]["shed"] += 1
+                raise RateLimited(f"{self.name} quota ({priority})", max(1, int(round(wait))))
+            time.sleep(min(wait, 0.5))
+
+    def snapshot(self):
+        with self._lock:
+            out = {p: dict(s, waited_s=round(s["waited_s"], 3)) for p, s in self.stats.items()}
+        return {"rpm": self.rpm, "tpm": self.tpm, "period_s": self.period, "priorities": out}
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _make_store(url):
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_URL points to Redis but the redis package is not installed")
+        return RedisBucketStore(url)
+    return SqliteBucketStore(url)
+
+
+def get_limiter(name="gemini"):
+    if not RATE_LIMIT_ENABLED:
+        return None
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            try:
+                limiter = QuotaLimiter(name, GEMINI_RPM, GEMINI_TPM, store=_make_store(RATE_LIMIT_URL))
+            except Exception as e:
+                logger.warning(f"rate limiter disabled: {e}")
+                return None
+            _limiters[name] = limiter
+        return limiter
+
+
+@contextmanager
+def gemini_quota(stage, prompt=""):
+    """Waits for (or sheds) Gemini quota for one call at the given graph stage."""
+    limiter = get_limiter("gemini")
+    if limiter is not None:
+        priority, output_tokens = STAGES.get(stage, ("normal", 256))
+        try:
+            limiter.acquire(priority, estimate_tokens(prompt, output_tokens))
+        except RateLimited:
+            raise
+        except Exception as e:
+            # Fail open: a broken limiter store must not take the chatbot down
+            logger.warning(f"rate limiter store error, admitting call: {e}")
+    yield
+
+
+def snapshot():
+    with _limiters_lock:
+        return {name: limiter.snapshot() for name, limiter in _limiters.items()}
@@ -0,0 +1,155 @@
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+import functools
+import contextvars
+import logging
+
+from utils import metrics
+from utils.admission import Overloaded
+
+logger = logging.getLogger(__name__)
+
+# Opt-in capture of real /chat, /tts and /translate traffic as JSONL, one
+# request per line, for offline replay (scripts/replay_traffic.py). Free text
+# is PII-scrubbed before it is written; the *_hash fields are taken from the
+# raw text so cache simulations still see exact repeats.
+TRAFFIC_CAPTURE = os.getenv("TRAFFIC_CAPTURE", "0").strip().lower() in ("1", "true", "yes")
+TRAFFIC_CAPTURE_SAMPLE = float(os.getenv("TRAFFIC_CAPTURE_SAMPLE", "1.0"))
+TRAFFIC_CAPTURE_PATH = os.getenv("TRAFFIC_CAPTURE_PATH", os.path.join("logs", "requests.jsonl"))
+# Text fields longer than this are truncated in the log (hashes cover the full text)
+TRAFFIC_CAPTURE_MAX_CHARS = int(os.getenv("TRAFFIC_CAPTURE_MAX_CHARS", "4000"))
+
+TEXT_FIELDS = ("question", "enhanced_query", "reply", "text", "retrieval_queries")
+
+PII_PATTERNS = [
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "<EMAIL>"),
+    (re.compile(r"https?://\S+"), "<URL>"),
+    (re.compile(r"\b\d{4}[ -]?\d{4}[ -]?\d{4}\b"), "<ID>"),             # Aadhaar-style
+    (re.compile(r"\b[A-Z]{5}\d{4}[A-Z]\b"), "<ID>"),                    # PAN
+    (re.compile(r"(?:\+?\d{1,3}[ -]?)?\b\d{5}[ -]?\d{5}\b"), "<PHONE>"),  # Indian mobile
+    (re.compile(r"\+?\d[\d ()-]{8,}\d"), "<PHONE>"),
+    (re.compile(r"\b([Mm]y name is|I am|I'm|[Tt]his is)\s+[A-Z][a-z]+(\s+[A-Z][a-z]+)?"), r"\1 <NAME>"),
+]
+
+_entry = contextvars.ContextVar("traffic_capture_entry", default=None)
+_write_lock = threading.Lock()
+
+
+def scrub(text):
+    """Masks e-mails, URLs, phone numbers, ID numbers and self-introduced names."""
+    if not isinstance(text, str):
+        return text
+    for pattern, replacement in PII_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def text_hash(text):
+    """Stable key for cache simulation: case- and whitespace-insensitive."""
+    normalized = " ".join(str(text).lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def describe_documents(documents):
+    """Source, page and content hash of retrieved documents (never their text)."""
+    out = []
+    for doc in documents or []:
+        meta = getattr(doc, "metadata", {}) or {}
+        content = getattr(doc, "page_content", str(doc))
+        out.append({
+            "source": meta.get("source"),
+            "page": meta.get("page"),
+            "source_type": meta.get("source_type", "pinecone"),
+            "chars": len(content),
+            "hash": text_hash(content),
+        })
+    return out
+
+
+def is_capturing():
+    return _entry.get() is not None
+
+
+def annotate(**fields):
+    """Adds fields to the entry of the request being captured; no-op otherwise."""
+    entry = _entry.get()
+    if entry is not None:
+        entry.update(fields)
+
+
+def note(field, value):
+    """Appends a value to a list field of the entry being captured."""
+    entry = _entry.get()
+    if entry is not None:
+        entry.setdefault(field, []).append(value)
+
+
+def _clip(value):
+    if isinstance(value, str):
+        return scrub(value)[:TRAFFIC_CAPTURE_MAX_CHARS]
+    if isinstance(value, list):
+        return [_clip(v) for v in value]
+    return value
+
+
+def _status_of(response):
+    if isinstance(response, tuple) and len(response) > 1 and isinstance(response[1], int):
+        return response[1]
+    return getattr(response, "status_code", 200)
+
+
+def _write(entry):
+    for field in TEXT_FIELDS:
+        if field in entry:
+            entry[field] = _clip(entry[field])
+    line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+    try:
+        with _write_lock:
+            if os.path.dirname(TRAFFIC_CAPTURE_PATH):
+                os.makedirs(os.path.dirname(TRAFFIC_CAPTURE_PATH), exist_ok=True)
+            # One write() per line on an O_APPEND file keeps lines whole across workers
+            with open(TRAFFIC_CAPTURE_PATH, "a", encoding="utf-8") as f:
+                f.write(line)
+    except Exception as e:
+        logger.warning(f"traffic capture write failed: {e}")
+
+
+def captured(endpoint):
+    """
+    Route decorator: when TRAFFIC_CAPTURE is on, a TRAFFIC_CAPTURE_SAMPLE share
+    of requests is logged with status, total time and the timed spans (graph
+    nodes etc.) it ran, plus whatever the handler adds via annotate()/note().
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not TRAFFIC_CAPTURE or random.random() >= TRAFFIC_CAPTURE_SAMPLE:
+                return fn(*args, **kwargs)
+            entry = {"ts": round(time.time(), 3), "endpoint": endpoint}
+            token = _entry.set(entry)
+            start = time.perf_counter()
+            status = 500
+            try:
+                with metrics.trace() as spans:
+                    response = fn(*args, **kwargs)
+                status = _status_of(response)
+                return response
+            except Overloaded:
+                status = 429
+                raise
+            finally:
+                _entry.reset(token)
+                entry["status"] = status
+                entry["total_ms"] = round(1000 * (time.perf_counter() - start), 1)
+                entry["route"] = [name[len("node."):] for name, _ in spans if name.startswith("node.")]
+                entry["timings_ms"] = {}
+                for name, seconds in spans:
+                    entry["timings_ms"][name] = round(entry["timings_ms"].get(name, 0) + 1000 * seconds, 1)
+                _write(entry)
+        return wrapper
+    return decorator
@@ -0,0 +1,174 @@
+import os
+import re
+import logging
+
+from utils.http_clients import get_client, get_genai_client, get_googletrans
+from utils.admission import limit
+from utils.rate_limiter import gemini_quota
+from utils import langdetect
+from utils import metrics as pipeline_metrics
+
+try:
+    from google.genai import types
+except Exception:
+    types = None
+
+try:
+    from bs4 import BeautifulSoup
+except Exception:
+    BeautifulSoup = None
+
+logger = logging.getLogger(__name__)
+
+TRANSLATION_MODEL = os.getenv("TRANSLATION_MODEL", "text-bison-001")
+LANGUAGE_NAMES = {"en": "English", "kn": "Kannada"}
+# Google Translate's mobile page (the endpoint deep_translator scrapes), fetched
+# here through the pooled "google_translate" client (deep_translator itself
+# calls the module-level requests.get, a new connection every time)
+GOOGLE_TRANSLATE_URL = "https://translate.google.com/m"
+GOOGLE_TRANSLATE_MAX_CHARS = 5000
+
+
+def _extract_text(resp):
+    """Pulls the first text block out of a google-genai response."""
+    text = getattr(resp, "text", None)
+    if text:
+        return text
+    try:
+        cand = resp.candidates[0]
+        # candidate.content may be a list of content blocks
+        c0 = cand.content[0]
+        if hasattr(c0, 'text') and c0.text:
+            return c0.text
+        if hasattr(c0, 'parts') and c0.parts:
+            for p in c0.parts:
+                if hasattr(p, 'text') and p.text:
+                    return p.text
+    except Exception:
+        pass
+    return None
+
+
+class GoogleTranslateMarkupChanged(ValueError):
+    """The page came back without the result element google_translate() looks for."""
+
+
+def google_translate(text, target, source="auto"):
+    """Translates text via Google Translate's mobile page on the pooled client; raises on failure."""
+    if BeautifulSoup is None:
+        raise RuntimeError("beautifulsoup4 is not installed")
+    text = str(text).strip()
+    if not text:
+        return text
+    if len(text) > GOOGLE_TRANSLATE_MAX_CHARS:
+        raise ValueError(f"text longer than {GOOGLE_TRANSLATE_MAX_CHARS} characters")
+    response = get_client("google_translate").get(GOOGLE_TRANSLATE_URL, params={"sl": source, "tl": target, "q": text})
+    response.raise_for_status()
+    soup = BeautifulSoup(response.text, "html.parser")
+    element = soup.find("div", {"class": "t0"}) or soup.find("div", {"class": "result-container"})
+    if element is None:
+        raise GoogleTranslateMarkupChanged("no div.t0 or div.result-container in the Google Translate page")
+    return element.get_text(strip=True)
+
+
+def translate_text(text, target, source="auto"):
+    """
+    Translates text using GenAI first, then Google Translate, then googletrans.
+    GenAI and Google Translate use the shared clients from utils.http_clients;
+    googletrans keeps its own connection pool per thread.
+    Returns the translated text, or None if every provider failed.
+    """
+    label = f"{source.upper()}->{target.upper()}"
+    client = get_genai_client()
+    if client is not None and types is not None:
+        try:
+            if source == "auto":
+                prompt = (
+                    f"Translate the following text to {LANGUAGE_NAMES.get(target, target)}. "
+                    f"Return only the translated text:\n\n{text}"
+                )
+            else:
+                prompt = (
+                    f"Translate the following {LANGUAGE_NAMES.get(source, source)} text to "
+                    f"{LANGUAGE_NAMES.get(target, target)}. Return only the translated text:\n\n{text}"
+                )
+            with gemini_quota("translate", prompt), limit("llm"):
+                resp = client.models.generate_content(
+                    model=TRANSLATION_MODEL, contents=prompt, config=types.GenerateContentConfig()
+                )
+            translated = _extract_text(resp)
+            if translated:
+                logger.info(f"Translated {label} via GenAI: {translated[:200]}")
+                return translated
+            logger.warning(f"GenAI {label} translation returned no text")
+        except Exception as te:
+            logger.warning(f"GenAI {label} translation failed: {te}")
+
+    # Fallback to Google Translate then googletrans if available
+    try:
+        translated = google_translate(text, target)
+        logger.info(f"Translated {label} via Google Translate: {translated[:200]}")
+        return translated
+    except GoogleTranslateMarkupChanged as de:
+        # Not a transient failure: the scraper needs updating, so make it visible
+        pipeline_metrics.incr("translate.google_markup_changed")
+        logger.warning(f"Google Translate {label} failed: {de}")
+    except Exception as de:
+        logger.debug(f"Google Translate {label} failed: {de}")
+    try:
+        translated = get_googletrans().translate(text, dest=target).text
+        logger.info(f"Translated {label} via googletrans: {translated[:200]}")
+        return translated
+    except Exception as e:
+        logger.warning(f"googletrans {label} failed: {e}")
+    return None
+
+
+# Sentence ends (including the Kannada danda) and line breaks, kept as separators
+_SEGMENT_BREAK = re.compile(r"((?<=[.!?\u0964])[ \t]+|\n+)")
+
+
+def translate_reply(text, target, source="auto"):
+    """
+    Translates a reply sentence by sentence as far as needed: segments
+    already in target (utils/langdetect.py) pass through, the rest are
+    translated in as few calls as possible (consecutive segments share one
+    call; more than langdetect.MAX_TRANSLATION_RUNS runs -> one call for the
+    whole reply). Returns the text, or None if a needed translation failed.
+    """
+    if not langdetect.LANGDETECT_ENABLED:
+        return translate_text(text, target, source)
+    parts = _SEGMENT_BREAK.split(str(text))
+    # Separators sit at odd indexes; segments without letters go along with their neighbours
+    lettered = [i % 2 == 0 and any(ch.isalpha() for ch in part) for i, part in enumerate(parts)]
+    passes = [has and langdetect.in_language(part, target) for has, part in zip(lettered, parts)]
+    # Runs [start, end) of parts to translate, split only by segments that pass through
+    runs = []
+    for i in range(0, len(parts), 2):
+        if not lettered[i] or passes[i]:
+            continue
+        if runs and not any(passes[runs[-1][1]:i]):
+            runs[-1] = (runs[-1][0], i + 1)
+        else:
+            runs.append((i, i + 1))
+    passed = sum(passes)
+    if not runs:
+        pipeline_metrics.incr("langdetect.reply_translations_skipped")
+        pipeline_metrics.incr("langdetect.calls_avoided")
+        pipeline_metrics.incr("langdetect.segments_passed", passed)
+        return text
+    if not passed or len(runs) > langdetect.MAX_TRANSLATION_RUNS:
+        return translate_text(text, target, source)
+
+    pipeline_metrics.incr("langdetect.segments_passed", passed)
+    pipeline_metrics.incr("langdetect.chars_passed", sum(len(p) for p, kept in zip(parts, passes) if kept))
+    out, position = [], 0
+    for start, end in runs:
+        out.append("".join(parts[position:start]))
+        translated = translate_text("".join(parts[start:end]), target, source)
+        if translated is None:
+            return None
+        out.append(translated)
+        position = end
+    out.append("".join(parts[position:]))
+    return "".join(out)
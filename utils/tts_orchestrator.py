@@ -0,0 +1,263 @@
+import os
+import time
+import threading
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+# Hedging: when the current provider has not answered within its recent p95
+# latency (clamped to [TTS_HEDGE_MIN_DELAY, TTS_HEDGE_MAX_DELAY]) the next
+# provider is started in parallel and the first successful result wins.
+TTS_HEDGE_MIN_DELAY = float(os.getenv("TTS_HEDGE_MIN_DELAY", "0.3"))
+TTS_HEDGE_MAX_DELAY = float(os.getenv("TTS_HEDGE_MAX_DELAY", "4.0"))
+TTS_HEDGE_DEFAULT_DELAY = float(os.getenv("TTS_HEDGE_DEFAULT_DELAY", "2.0"))
+TTS_TOTAL_TIMEOUT = float(os.getenv("TTS_TOTAL_TIMEOUT", "30"))
+TTS_BREAKER_FAILURES = int(os.getenv("TTS_BREAKER_FAILURES", "3"))
+TTS_BREAKER_COOLDOWN = float(os.getenv("TTS_BREAKER_COOLDOWN", "30"))
+# Threads for provider calls. Losers of a race keep theirs until the provider
+# returns, so no hedge is started while every thread is busy (it would only queue).
+TTS_HEDGE_WORKERS = int(os.getenv("TTS_HEDGE_WORKERS", "8"))
+
+DEFAULT_ORDER = {
+    "en": "edge,gemini,gtts,libre",
+    "kn": "edge,gtts,gemini,libre",
+}
+
+
+class TTSUnavailable(RuntimeError):
+    """Raised when every provider for a language failed or was circuit-broken."""
+
+
+class TTSProvider:
+    """
+    A named synthesis function fn(text, lang, cancel_event, **options) -> (audio_bytes, mimetype).
+    fn may raise to signal failure; long-running providers should poll cancel_event.
+    Options a provider does not understand must be ignored.
+    """
+
+    def __init__(self, name, fn, available=None):
+        self.name = name
+        self.fn = fn
+        self.available = available or (lambda: True)
+
+
+class ProviderHealth:
+    """Recent latencies plus a consecutive-failure circuit breaker for one provider."""
+
+    def __init__(self, window=50):
+        self.latencies = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.half_open_trial = False
+        self.counts = {"calls": 0, "wins": 0, "failures": 0, "hedged": 0, "cancelled": 0, "short_circuited": 0}
+
+    def percentile(self, q):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def allow(self, now):
+        """True when closed, or cooled down with no trial in flight; claims nothing (see claim)."""
+        if self.opened_at is None:
+            return True
+        return now - self.opened_at >= TTS_BREAKER_COOLDOWN and not self.half_open_trial
+
+    def claim(self, now):
+        """Called as a call is started: an open breaker lets exactly one half-open trial through."""
+        if not self.allow(now):
+            return False
+        if self.opened_at is not None:
+            self.half_open_trial = True
+        return True
+
+    def release_trial(self):
+        """The call ended without an outcome (cancelled): the next call may take the trial."""
+        self.half_open_trial = False
+
+    def record_success(self, seconds):
+        self.latencies.append(seconds)
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.half_open_trial = False
+
+    def record_failure(self, now):
+        self.counts["failures"] += 1
+        self.consecutive_failures += 1
+        if self.half_open_trial or self.consecutive_failures >= TTS_BREAKER_FAILURES:
+            self.opened_at = now
+            self.half_open_trial = False
+
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.half_open_trial else "open"
+
+
+class TTSOrchestrator:
+    """Picks TTS providers per language and races them with p95-based hedging."""
+
+    def __init__(self, providers, order=None, executor=None, clock=time.monotonic):
+        self.providers = {p.name: p for p in providers}
+        self.order = {lang: _parse_order(spec) for lang, spec in (order or DEFAULT_ORDER).items()}
+        self.health = {name: ProviderHealth() for name in self.providers}
+        self._lock = threading.Lock()
+        self._executor = executor or ThreadPoolExecutor(max_workers=TTS_HEDGE_WORKERS, thread_name_prefix="tts")
+        self._clock = clock
+        self.max_in_flight = TTS_HEDGE_WORKERS
+        self._in_flight = 0  # provider calls submitted and not finished, losers included
+        self.hedges_deferred = 0
+
+    def candidates(self, lang):
+        names = self.order.get(lang) or self.order.get("en") or list(self.providers)
+        now = self._clock()
+        picked = []
+        with self._lock:
+            for name in names:
+                provider = self.providers.get(name)
+                if provider is None or not provider.available():
+                    continue
+                if not self.health[name].allow(now):
+                    self.health[name].counts["short_circuited"] += 1
+                    continue
+                picked.append(provider)
+        return picked
+
+    def hedge_delay(self, name):
+        p95 = self.health[name].percentile(0.95)
+        if p95 is None:
+            return TTS_HEDGE_DEFAULT_DELAY
+        return min(TTS_HEDGE_MAX_DELAY, max(TTS_HEDGE_MIN_DELAY, p95))
+
+    def _run(self, provider, text, lang, cancel_event, options):
+        start = self._clock()
+        try:
+            audio, mimetype = provider.fn(text, lang, cancel_event, **options)
+            if not audio:
+                raise TTSUnavailable(f"{provider.name} returned no audio")
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+                if cancel_event.is_set():
+                    self.health[provider.name].counts["cancelled"] += 1
+                    self.health[provider.name].release_trial()
+                else:
+                    self.health[provider.name].record_failure(self._clock())
+            raise
+        with self._lock:
+            self._in_flight -= 1
+            # Losers that finish late still count towards latency stats
+            self.health[provider.name].record_success(self._clock() - start)
+        return audio, mimetype
+
+    def synthesize(self, text, lang="en", timeout=None, **options):
+        """
+        Returns (audio_bytes, mimetype, provider_name). Starts the best provider,
+        hedges to the next one after its p95 delay or immediately on failure, and
+        cancels whatever is still running once a provider succeeds.
+        Extra keyword options are forwarded to every provider.
+        """
+        queue = self.candidates(lang)
+        if not queue:
+            raise TTSUnavailable(f"No TTS provider available for lang={lang}")
+        deadline = self._clock() + (timeout or TTS_TOTAL_TIMEOUT)
+        running = {}  # future -> (provider, cancel_event)
+        errors = []
+
+        def launch(hedged):
+            while queue:
+                provider = queue.pop(0)
+                cancel_event = threading.Event()
+                with self._lock:
+                    health = self.health[provider.name]
+                    # The half-open trial is taken here, when the call really starts
+                    if not health.claim(self._clock()):
+                        health.counts["short_circuited"] += 1
+                        continue
+                    health.counts["calls"] += 1
+                    if hedged:
+                        health.counts["hedged"] += 1
+                    self._in_flight += 1
+                future = self._executor.submit(self._run, provider, text, lang, cancel_event, options)
+                running[future] = (provider, cancel_event)
+                return provider
+            return None
+
+        current = launch(hedged=False)
+        if current is None:
+            raise TTSUnavailable(f"No TTS provider available for lang={lang}")
+        try:
+            while running:
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    break
+                wait_for = min(remaining, self.hedge_delay(current.name)) if queue else remaining
+                done, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+                for future in done:
+                    provider, _ = running.pop(future)
+                    try:
+                        audio, mimetype = future.result()
+                    except Exception as e:
+                        logger.warning(f"TTS provider {provider.name} failed: {e}")
+                        errors.append(f"{provider.name}: {e}")
+                        continue
+                    with self._lock:
+                        self.health[provider.name].counts["wins"] += 1
+                    return audio, mimetype, provider.name
+                if queue:
+                    # Either the hedge delay elapsed or a provider failed: start the next one
+                    if not done:
+                        with self._lock:
+                            busy = self._in_flight >= self.max_in_flight
+                            self.hedges_deferred += busy
+                        if busy:
+                            continue
+                        logger.info(f"TTS hedging: {current.name} slower than {wait_for:.2f}s, starting {queue[0].name}")
+                    current = launch(hedged=bool(running)) or current
+        finally:
+            for future, (provider, cancel_event) in running.items():
+                cancel_event.set()
+                if future.cancel():
+                    # Never started: _run will not settle the call
+                    with self._lock:
+                        self._in_flight -= 1
+                        self.health[provider.name].counts["cancelled"] += 1
+                        self.health[provider.name].release_trial()
+        raise TTSUnavailable("All TTS providers failed or timed out: " + "; ".join(errors or ["timeout"]))
+
+    def snapshot(self):
+        with self._lock:
+            out = {}
+            for name, health in self.health.items():
+                p50, p95 = health.percentile(0.5), health.percentile(0.95)
+                out[name] = dict(
+                    health.counts,
+                    state=health.state(),
+                    p50_ms=round(p50 * 1000, 1) if p50 is not None else None,
+                    p95_ms=round(p95 * 1000, 1) if p95 is not None else None,
+                )
+            return {"order": self.order, "providers": out, "in_flight": self._in_flight,
+                    "max_in_flight": self.max_in_flight, "hedges_deferred": self.hedges_deferred}
+
+
+def _parse_order(spec):
+    if isinstance(spec, (list, tuple)):
+        return list(spec)
+    return [name.strip() for name in spec.split(",") if name.strip()]
+
+
+def order_from_env(preferred=None):
+    """
+    Provider order per language from TTS_ORDER_EN / TTS_ORDER_KN, with the
+    PREFERRED_TTS provider (if any) moved to the front.
+    """
+    order = {}
+    for lang, default in DEFAULT_ORDER.items():
+        names = _parse_order(os.getenv(f"TTS_ORDER_{lang.upper()}", default))
+        if preferred and preferred in names:
+            names.remove(preferred)
+            names.insert(0, preferred)
+        order[lang] = names
+    return order
@@ -0,0 +1,274 @@
+import os
+import time
+import random
+import threading
+import logging
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import audio_cache
+from utils import metrics as pipeline_metrics
+from utils.admission import get_bulkhead
+
+logger = logging.getLogger(__name__)
+
+# Speculative TTS: /chat hands the reply (markdown stripped the way
+# templates/ui.html does before calling /tts) to a small background pool that
+# synthesizes it into the audio cache, and returns its audio_id. /tts then
+# serves the cached audio, or waits on the synthesis still running for it,
+# instead of starting from scratch when the user taps the speaker icon.
+#
+# Waste policy: a prefetch that nobody fetches within TTS_PREFETCH_WINDOW_S
+# counts as wasted. Once more than TTS_PREFETCH_MAX_WASTE of the last
+# TTS_PREFETCH_HISTORY settled prefetches were wasted, only
+# TTS_PREFETCH_PROBE_RATE of replies are still prefetched (enough to notice
+# when users start listening again). Replies longer than
+# TTS_PREFETCH_MAX_CHARS, turns answered by a degraded graph profile, and
+# turns arriving while interactive /tts is saturated are never prefetched.
+#
+# Across gunicorn workers: the prefetching worker leaves a "prefetch" marker
+# (text, lang, done) next to the entry in the shared audio cache. /tts on
+# another worker resolves the audio_id from it and waits for the marker to be
+# done instead of synthesizing the reply a second time, then leaves a
+# "fetched" marker so the prefetching worker does not count it as wasted.
+# Without the audio cache (AUDIO_CACHE_ENABLED=0) nothing is shared: audio
+# stays in the prefetching worker, bounded by TTS_PREFETCH_MEMORY_BYTES.
+TTS_PREFETCH_ENABLED = os.getenv("TTS_PREFETCH_ENABLED", "0").strip().lower() not in ("0", "false", "no")
+TTS_PREFETCH_WORKERS = int(os.getenv("TTS_PREFETCH_WORKERS", "2"))
+# Jobs waiting for a worker beyond which new replies are not prefetched
+TTS_PREFETCH_QUEUE = int(os.getenv("TTS_PREFETCH_QUEUE", "4"))
+TTS_PREFETCH_MAX_CHARS = int(os.getenv("TTS_PREFETCH_MAX_CHARS", "1500"))
+TTS_PREFETCH_WINDOW_S = float(os.getenv("TTS_PREFETCH_WINDOW_S", "600"))
+TTS_PREFETCH_HISTORY = int(os.getenv("TTS_PREFETCH_HISTORY", "50"))
+TTS_PREFETCH_MAX_WASTE = float(os.getenv("TTS_PREFETCH_MAX_WASTE", "0.7"))
+TTS_PREFETCH_PROBE_RATE = float(os.getenv("TTS_PREFETCH_PROBE_RATE", "0.1"))
+# How long /tts waits on an in-flight prefetch before synthesizing itself
+TTS_PREFETCH_ATTACH_TIMEOUT = float(os.getenv("TTS_PREFETCH_ATTACH_TIMEOUT", "20"))
+# Audio held by prefetches when there is no audio cache to put it in
+TTS_PREFETCH_MEMORY_BYTES = int(os.getenv("TTS_PREFETCH_MEMORY_BYTES", str(16 * 1024 * 1024)))
+# Seconds between checks of another worker's prefetch marker
+MARKER_POLL_S = 0.1
+# Settled outcomes needed before the waste ratio is trusted
+MIN_HISTORY = 10
+# Prefetches remembered for /tts at most (oldest finished ones settle first)
+MAX_TRACKED = 512
+
+
+class _Job:
+    def __init__(self, text, lang):
+        self.text = text
+        self.lang = lang
+        self.submitted = time.monotonic()
+        self.done = threading.Event()
+        self.fetched = False
+        self.failed = False
+        # Kept only when the audio cache is off; otherwise the cache holds the bytes
+        self.result = None
+
+
+class Prefetcher:
+    def __init__(self, synthesize, workers=TTS_PREFETCH_WORKERS, queue=TTS_PREFETCH_QUEUE, enabled=TTS_PREFETCH_ENABLED):
+        """synthesize(text, lang) -> (audio_bytes, mimetype, provider), e.g. TTSOrchestrator.synthesize."""
+        self.synthesize = synthesize
+        self.workers = workers
+        self.queue = queue
+        self.enabled = enabled
+        self._jobs = OrderedDict()  # audio_id -> _Job, oldest first
+        self._outcomes = deque(maxlen=TTS_PREFETCH_HISTORY)  # True: fetched, False: wasted
+        self._active = 0
+        self._result_bytes = 0  # held in _Job.result (audio cache off only)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tts-prefetch")
+        return self._executor
+
+    def _settle(self, job, fetched):
+        self._outcomes.append(fetched)
+        if not fetched:
+            pipeline_metrics.incr("tts_prefetch.wasted")
+            pipeline_metrics.incr("tts_prefetch.wasted_chars", len(job.text))
+
+    def _expire(self):
+        """Settles prefetches nobody fetched within the window (caller holds the lock)."""
+        cutoff = time.monotonic() - TTS_PREFETCH_WINDOW_S
+        while self._jobs:
+            audio_id, job = next(iter(self._jobs.items()))
+            if (job.submitted > cutoff and len(self._jobs) <= MAX_TRACKED) or not job.done.is_set():
+                break
+            del self._jobs[audio_id]
+            if job.result is not None:
+                self._result_bytes -= len(job.result[0])
+                job.result = None
+            cache = audio_cache.get_cache()
+            if cache is not None:
+                # /tts on another worker leaves this marker when it serves the reply
+                fetched_elsewhere = cache.read_marker(audio_id, "fetched") is not None
+                cache.remove_markers(audio_id, "prefetch", "fetched")
+                if fetched_elsewhere and not job.fetched:
+                    job.fetched = True
+                    pipeline_metrics.incr("tts_prefetch.fetched_elsewhere")
+                    self._settle(job, fetched=True)
+            if not job.fetched:
+                self._settle(job, fetched=False)
+
+    def waste_ratio(self):
+        outcomes = list(self._outcomes)
+        if len(outcomes) < MIN_HISTORY:
+            return None
+        return outcomes.count(False) / len(outcomes)
+
+    def _skip_reason(self, text, profile):
+        if not self.enabled:
+            return "disabled"
+        if len(text) > TTS_PREFETCH_MAX_CHARS:
+            return "too_long"
+        if profile not in (None, "full"):
+            return "degraded"
+        tts = get_bulkhead("tts").snapshot()
+        if tts["in_flight"] >= tts["limit"]:
+            return "tts_busy"
+        if self._active >= self.workers + self.queue:
+            return "queue_full"
+        if audio_cache.get_cache() is None and self._result_bytes >= TTS_PREFETCH_MEMORY_BYTES:
+            return "memory_full"
+        ratio = self.waste_ratio()
+        if ratio is not None and ratio > TTS_PREFETCH_MAX_WASTE and random.random() >= TTS_PREFETCH_PROBE_RATE:
+            return "wasteful"
+        return None
+
+    def submit(self, text, lang, profile=None):
+        """
+        Starts background synthesis of a reply. Returns its audio_id (also when
+        the audio is cached or already being synthesized), or None when the
+        policy skipped it.
+        """
+        text = (text or "").strip()
+        if not text:
+            return None
+        audio_id = audio_cache.audio_key(text, lang)
+        with self._lock:
+            self._expire()
+            if audio_id in self._jobs:
+                pipeline_metrics.incr("tts_prefetch.joined")
+                return audio_id
+            reason = self._skip_reason(text, profile)
+            if reason is None and audio_cache.get(text, lang) is not None:
+                pipeline_metrics.incr("tts_prefetch.already_cached")
+                return audio_id
+            if reason is not None:
+                pipeline_metrics.incr(f"tts_prefetch.skipped.{reason}")
+                return None
+            job = self._jobs[audio_id] = _Job(text, lang)
+            self._active += 1
+        cache = audio_cache.get_cache()
+        if cache is not None:
+            cache.write_marker(audio_id, "prefetch", {"text": text, "lang": lang, "done": False})
+        pipeline_metrics.incr("tts_prefetch.submitted")
+        self._pool().submit(self._run, job)
+        return audio_id
+
+    def _run(self, job):
+        audio_id = audio_cache.audio_key(job.text, job.lang)
+        cache = audio_cache.get_cache()
+        try:
+            with pipeline_metrics.timed("tts_prefetch.synthesize"):
+                audio, mimetype, provider = self.synthesize(job.text, job.lang)
+            if cache is not None:
+                audio_cache.put(job.text, job.lang, audio, mimetype)
+                cache.write_marker(audio_id, "prefetch", {"text": job.text, "lang": job.lang, "done": True})
+            else:
+                with self._lock:
+                    if self._result_bytes + len(audio) <= TTS_PREFETCH_MEMORY_BYTES:
+                        job.result = (audio, mimetype)
+                        self._result_bytes += len(audio)
+                if job.result is None:
+                    # Over the memory budget: /tts synthesizes this one itself
+                    job.failed = True
+                    pipeline_metrics.incr("tts_prefetch.dropped_memory")
+            logger.info(f"tts_prefetch: {len(job.text)} chars ({job.lang}) ready from {provider}")
+        except Exception as e:
+            job.failed = True
+            pipeline_metrics.incr("tts_prefetch.failed")
+            logger.warning(f"tts_prefetch: synthesis failed: {e}")
+            if cache is not None:
+                # Workers waiting on the marker give up and synthesize themselves
+                cache.remove_markers(audio_id, "prefetch")
+        finally:
+            with self._lock:
+                self._active -= 1
+            job.done.set()
+
+    def lookup(self, audio_id):
+        """(text, lang) of a recent prefetch by any worker, or None."""
+        with self._lock:
+            job = self._jobs.get(audio_id)
+        if job is not None:
+            return job.text, job.lang
+        cache = audio_cache.get_cache()
+        marker = cache.read_marker(audio_id, "prefetch") if cache is not None and audio_id else None
+        if marker is None or not marker.get("text"):
+            return None
+        return marker["text"], marker.get("lang") or "en"
+
+    def fetch(self, text, lang, timeout=TTS_PREFETCH_ATTACH_TIMEOUT):
+        """
+        (audio_bytes, mimetype) of a prefetched reply, waiting up to timeout
+        for a synthesis still in flight. None when it was never prefetched,
+        failed, or is not ready in time; /tts then synthesizes as before.
+        """
+        audio_id = audio_cache.audio_key((text or "").strip(), lang)
+        with self._lock:
+            job = self._jobs.get(audio_id)
+            if job is not None and not job.fetched:
+                job.fetched = True
+                self._settle(job, fetched=True)
+        if job is None:
+            # Polls another worker's marker; must not hold the lock submit() and _run() need
+            return self._fetch_elsewhere(audio_id, text, lang, timeout)
+        waited = not job.done.is_set()
+        if not job.done.wait(timeout):
+            pipeline_metrics.incr("tts_prefetch.attach_timeout")
+            return None
+        if job.failed:
+            return None
+        pipeline_metrics.incr("tts_prefetch.attached" if waited else "tts_prefetch.ready")
+        return job.result or audio_cache.get(job.text, job.lang)
+
+    def _fetch_elsewhere(self, audio_id, text, lang, timeout):
+        """fetch() for a reply another worker is prefetching, found through its marker."""
+        cache = audio_cache.get_cache()
+        marker = cache.read_marker(audio_id, "prefetch") if cache is not None else None
+        if marker is None:
+            return None
+        cache.write_marker(audio_id, "fetched")
+        waited = not marker.get("done")
+        give_up = time.monotonic() + timeout
+        while not marker.get("done"):
+            if time.monotonic() >= give_up:
+                pipeline_metrics.incr("tts_prefetch.attach_timeout")
+                return None
+            time.sleep(MARKER_POLL_S)
+            marker = cache.read_marker(audio_id, "prefetch")
+            if marker is None:
+                # The prefetch failed (or expired)
+                return None
+        pipeline_metrics.incr("tts_prefetch.attached_elsewhere" if waited else "tts_prefetch.ready_elsewhere")
+        return audio_cache.get(text.strip(), lang)
+
+    def snapshot(self):
+        with self._lock:
+            self._expire()
+            ratio = self.waste_ratio()
+            return {
+                "enabled": self.enabled,
+                "workers": self.workers,
+                "active": self._active,
+                "result_bytes": self._result_bytes,
+                "tracked": len(self._jobs),
+                "waste_ratio": round(ratio, 3) if ratio is not None else None,
+                "throttled": ratio is not None and ratio > TTS_PREFETCH_MAX_WASTE,
+                "counters": pipeline_metrics.snapshot("tts_prefetch.")["counters"],
+            }
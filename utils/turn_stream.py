@@ -0,0 +1,37 @@
+import contextvars
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Progress of the /chat turn running in this context, for clients that watch
+# it live (the /ws/voice session in app.py). workflow/graph.py emits "node"
+# when a graph node starts; Agents/response_generation.py streams the answer
+# as "token" events when it is already in the reply language. Without a bound
+# sink nothing is emitted and the graph behaves exactly as for /chat.
+_sink = contextvars.ContextVar("turn_stream_sink", default=None)
+
+
+@contextmanager
+def bound(sink):
+    """Sends the events of the block to sink(kind, data)."""
+    token = _sink.set(sink)
+    try:
+        yield
+    finally:
+        _sink.reset(token)
+
+
+def active():
+    return _sink.get() is not None
+
+
+def emit(kind, **data):
+    sink = _sink.get()
+    if sink is None:
+        return
+    try:
+        sink(kind, data)
+    except Exception as e:
+        # A watcher going away must not fail the turn
+        logger.warning(f"turn_stream: dropping {kind} event: {e}")
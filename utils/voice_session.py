@@ -0,0 +1,378 @@
+import os
+import re
+import json
+import time
+import queue
+import threading
+import logging
+from collections import deque
+
+from utils import audio_cache, turn_stream
+from utils import metrics as pipeline_metrics
+from utils.admission import Overloaded
+
+logger = logging.getLogger(__name__)
+
+# One WebSocket per user for voice chat (/ws/voice in app.py, needs the
+# optional flask-sock package). Instead of POST /chat followed by POST /tts,
+# a turn streams over the open socket:
+#
+#   client -> {"type": "message", "text": "...", "lang": "en|kn", "image": "<base64, optional>"}
+#             {"type": "cancel"}  stop the current turn's audio
+#             {"type": "ping"}
+#   server -> {"type": "ready", "session_id": ...}
+#             {"type": "progress", "turn": n, "node": "retrieve"}      graph node started
+#             {"type": "token", "turn": n, "text": "..."}              answer as it is written
+#             {"type": "audio", "turn": n, "seq": k, "text": ..., "mimetype": ..., "bytes": size}
+#               followed by one binary frame with the audio of that sentence
+#             {"type": "reply", "turn": n, "reply": ..., "lang": ...}  same payload as /chat
+#             {"type": "audio_end", "turn": n, "sent": k, "dropped": d}
+#             {"type": "error", "error": ..., ...}
+#
+# Each finished sentence is synthesized (through the TTS orchestrator, Edge
+# voices first) while the rest of the answer is still being generated.
+# Replies that /chat translates after the graph (Kannada, translate mode)
+# are spoken sentence by sentence once translated.
+#
+# Backpressure: everything for a client goes through one SendQueue bounded
+# by WS_SEND_QUEUE_BYTES (a single larger frame is let through an empty
+# queue). Audio that does not fit is dropped, queued audio is evicted to
+# make room for text, and the rest of that turn's audio is not synthesized
+# (gaps show in "seq"; the client can fall back to /tts). Text frames wait
+# up to WS_SEND_TIMEOUT_S for room, after which the client is too slow and
+# the session is closed. Memory per session stays bounded whatever the
+# client's read rate.
+WS_SEND_QUEUE_BYTES = int(os.getenv("WS_SEND_QUEUE_BYTES", str(512 * 1024)))
+WS_SEND_TIMEOUT_S = float(os.getenv("WS_SEND_TIMEOUT_S", "10"))
+WS_IDLE_TIMEOUT_S = float(os.getenv("WS_IDLE_TIMEOUT_S", "300"))
+# Sentences shorter than this are spoken together with the next one
+WS_MIN_SENTENCE_CHARS = int(os.getenv("WS_MIN_SENTENCE_CHARS", "40"))
+WS_MAX_MESSAGE_BYTES = int(os.getenv("WS_MAX_MESSAGE_BYTES", str(14 * 1024 * 1024)))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?।])\s+|\n+")
+
+
+class SlowClient(Exception):
+    """The client has not read its frames within WS_SEND_TIMEOUT_S."""
+
+
+def split_sentences(text, min_chars=None):
+    """(finished sentences, unfinished tail) of streamed text."""
+    min_chars = WS_MIN_SENTENCE_CHARS if min_chars is None else min_chars
+    parts = _SENTENCE_END.split(text)
+    tail = parts.pop()
+    sentences, current = [], ""
+    for part in parts:
+        current = f"{current} {part.strip()}" if current else part.strip()
+        if len(current) >= min_chars:
+            sentences.append(current)
+            current = ""
+    if current:
+        tail = f"{current} {tail}"
+    return sentences, tail
+
+
+def _frame_size(frame):
+    return len(frame.encode("utf-8")) if isinstance(frame, str) else len(frame)
+
+
+class SendQueue:
+    """Bounded outbox drained to the socket by one writer thread (the only thread that sends)."""
+
+    def __init__(self, ws, max_bytes=WS_SEND_QUEUE_BYTES, max_wait=WS_SEND_TIMEOUT_S):
+        self.ws = ws
+        self.max_bytes = max_bytes
+        self.max_wait = max_wait
+        self.closed = False
+        self.queued_bytes = 0
+        self.peak_bytes = 0
+        self.sent_frames = 0
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._writer = threading.Thread(target=self._drain, name="ws-send", daemon=True)
+        self._writer.start()
+
+    def _fits(self, size):
+        return self.closed or not self._items or self.queued_bytes + size <= self.max_bytes
+
+    def _evict(self, size):
+        """Drops queued audio, newest first and never the frame being sent, until size fits."""
+        i = len(self._items) - 1
+        while i > 0 and not self._fits(size):
+            _, item_size, droppable = self._items[i]
+            if droppable:
+                del self._items[i]
+                self.queued_bytes -= item_size
+                self.dropped += 1
+            i -= 1
+
+    def put(self, *frames, droppable=False):
+        """
+        Queues frames to be sent back to back. Droppable (audio) frames are
+        refused when they do not fit, and evicted again to make room for text
+        frames. Returns False when dropped or closed; raises SlowClient when a
+        text frame found no room within max_wait.
+        """
+        size = sum(_frame_size(f) for f in frames)
+        with self._cond:
+            if self.closed:
+                return False
+            if droppable and not self._fits(size):
+                self.dropped += 1
+                return False
+            if not droppable:
+                self._evict(size)
+            if self._cond.wait_for(lambda: self._fits(size), timeout=self.max_wait):
+                if self.closed:
+                    return False
+                self._items.append((frames, size, droppable))
+                self.queued_bytes += size
+                self.peak_bytes = max(self.peak_bytes, self.queued_bytes)
+                self._cond.notify_all()
+                return True
+            self.closed = True
+            unread = self.queued_bytes
+            self._cond.notify_all()
+        try:
+            # Unblocks the session's receive loop as well
+            self.ws.close()
+        except Exception:
+            pass
+        raise SlowClient(f"client kept {unread} bytes unread for {self.max_wait:.0f}s")
+
+    def _drain(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._items or self.closed)
+                if not self._items:
+                    return
+                item = self._items[0]
+            frames, size, _ = item
+            try:
+                for frame in frames:
+                    self.ws.send(frame)
+            except Exception as e:
+                logger.info(f"voice_session: send failed, closing: {e}")
+                with self._cond:
+                    self.closed = True
+                    self._items.clear()
+                    self.queued_bytes = 0
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                if self._items and self._items[0] is item:  # close() may have cleared it meanwhile
+                    self._items.popleft()
+                    self.queued_bytes -= size
+                self.sent_frames += len(frames)
+                self._cond.notify_all()
+
+    def close(self, flush_timeout=0.0):
+        """Stops accepting frames; sends what is queued for up to flush_timeout seconds."""
+        with self._cond:
+            if flush_timeout > 0:
+                self._cond.wait_for(lambda: not self._items or self.closed, timeout=flush_timeout)
+            self.closed = True
+            self._items.clear()
+            self.queued_bytes = 0
+            self._cond.notify_all()
+
+
+class _TurnAudio:
+    """Synthesizes a turn's sentences in order on one thread and queues them for sending."""
+
+    def __init__(self, session, turn):
+        self.session = session
+        self.turn = turn
+        self.queued = 0
+        self.refused = 0
+        self._dropped_before = session.outbox.dropped
+        self.first_audio_s = None
+        self._started = time.perf_counter()
+        self._sentences = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="ws-tts", daemon=True)
+        self._thread.start()
+
+    def speak(self, sentence, lang):
+        self._sentences.put((sentence, lang))
+
+    @property
+    def dropped(self):
+        """This turn's audio frames refused or evicted by the send queue (turns do not overlap)."""
+        return self.session.outbox.dropped - self._dropped_before
+
+    @property
+    def sent(self):
+        return self.queued - (self.dropped - self.refused)
+
+    def finish(self, timeout):
+        self._sentences.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        seq = 0
+        while True:
+            item = self._sentences.get()
+            if item is None:
+                return
+            sentence, lang = item
+            text = audio_cache.strip_markdown(sentence).strip()
+            if self.session.cancelled.is_set() or not any(ch.isalpha() for ch in text):
+                continue
+            if self.dropped:
+                # The client already lost audio this turn: spare the synthesis
+                continue
+            try:
+                cached = audio_cache.get(text, lang)
+                if cached is None:
+                    audio, mimetype, _ = self.session.synthesize(text, lang)
+                    audio_cache.put(text, lang, audio, mimetype)
+                else:
+                    audio, mimetype = cached
+            except Exception as e:
+                logger.warning(f"voice_session: synthesis failed: {e}")
+                pipeline_metrics.incr("voice.audio_failed")
+                continue
+            header = json.dumps({"type": "audio", "turn": self.turn, "seq": seq, "text": text,
+                                 "lang": lang, "mimetype": mimetype, "bytes": len(audio)})
+            if self.session.outbox.put(header, audio, droppable=True):
+                seq += 1
+                self.queued += 1
+                pipeline_metrics.incr("voice.audio_frames")
+                if self.first_audio_s is None:
+                    self.first_audio_s = time.perf_counter() - self._started
+                    pipeline_metrics.record("voice.first_audio", self.first_audio_s)
+            else:
+                self.refused += 1
+
+
+class VoiceSession:
+    """
+    Serves one WebSocket. ws needs send(str|bytes), receive(timeout) -> str|bytes|None
+    (None on timeout; raising when closed) and close(). answer(text, image_bytes,
+    lang, session_id) -> (payload, profile) runs one chat turn (app.py's /chat
+    pipeline); synthesize(text, lang) -> (audio, mimetype, provider).
+    """
+
+    def __init__(self, ws, answer, synthesize, session_id, max_bytes=WS_SEND_QUEUE_BYTES, max_wait=WS_SEND_TIMEOUT_S):
+        self.ws = ws
+        self.answer = answer
+        self.synthesize = synthesize
+        self.session_id = session_id
+        self.outbox = SendQueue(ws, max_bytes=max_bytes, max_wait=max_wait)
+        self.cancelled = threading.Event()
+        self.turns = 0
+        self._turn_thread = None
+
+    def send(self, message):
+        return self.outbox.put(json.dumps(message, ensure_ascii=False))
+
+    def run(self):
+        pipeline_metrics.incr("voice.sessions")
+        self.send({"type": "ready", "session_id": self.session_id})
+        try:
+            while not self.outbox.closed:
+                try:
+                    data = self.ws.receive(timeout=WS_IDLE_TIMEOUT_S)
+                except Exception:
+                    break  # client went away
+                if data is None:
+                    self.send({"type": "error", "error": "idle_timeout"})
+                    break
+                if not self._handle(data):
+                    break
+        except SlowClient as e:
+            pipeline_metrics.incr("voice.slow_client_closed")
+            logger.warning(f"voice_session {self.session_id}: {e}")
+        finally:
+            self.cancelled.set()
+            busy = self._turn_thread is not None and self._turn_thread.is_alive()
+            self.outbox.close(flush_timeout=0.0 if busy else 2.0)
+
+    def _handle(self, data):
+        """Handles one client frame; False ends the session."""
+        if isinstance(data, bytes) or len(data) > WS_MAX_MESSAGE_BYTES:
+            self.send({"type": "error", "error": "expected a JSON text frame"})
+            return True
+        try:
+            message = json.loads(data)
+            kind = message.get("type")
+        except (ValueError, AttributeError):
+            self.send({"type": "error", "error": "invalid JSON"})
+            return True
+        if kind == "ping":
+            self.send({"type": "pong"})
+        elif kind == "cancel":
+            self.cancelled.set()
+        elif kind == "close":
+            return False
+        elif kind == "message":
+            if self._turn_thread is not None and self._turn_thread.is_alive():
+                self.send({"type": "error", "error": "busy", "detail": "wait for audio_end or send cancel"})
+                return True
+            self.turns += 1
+            self.cancelled.clear()
+            self._turn_thread = threading.Thread(target=self._turn, args=(self.turns, message),
+                                                 name="ws-turn", daemon=True)
+            self._turn_thread.start()
+        else:
+            self.send({"type": "error", "error": f"unknown message type {kind!r}"})
+        return True
+
+    def _turn(self, turn, message):
+        started = time.perf_counter()
+        audio = _TurnAudio(self, turn)
+        # Answer text streamed so far, and its part not yet handed to the synthesizer
+        streamed = {"text": "", "pending": "", "lang": None}
+
+        def on_event(kind, data):
+            if kind == "node":
+                self.send({"type": "progress", "turn": turn, "node": data["name"]})
+            elif kind == "token":
+                if not streamed["text"]:
+                    pipeline_metrics.record("voice.first_token", time.perf_counter() - started)
+                streamed["text"] += data["text"]
+                streamed["lang"] = data.get("lang")
+                self.send({"type": "token", "turn": turn, "text": data["text"]})
+                sentences, streamed["pending"] = split_sentences(streamed["pending"] + data["text"])
+                for sentence in sentences:
+                    audio.speak(sentence, streamed["lang"])
+
+        try:
+            image = message.get("image")
+            with turn_stream.bound(on_event):
+                payload, profile = self.answer((message.get("text") or "").strip(), image,
+                                               (message.get("lang") or "en").strip() or "en", self.session_id)
+            self.send(dict(payload, type="reply", turn=turn, profile=profile))
+            reply, lang = payload.get("reply", ""), payload.get("lang", "en")
+            if streamed["text"] and streamed["lang"] == lang and reply.split() == streamed["text"].split():
+                # The reply is what was streamed: only its unfinished tail is left to speak
+                rest = streamed["pending"]
+            else:
+                # Translated after the graph (or a fallback message): speak the reply
+                rest = reply
+            sentences, tail = split_sentences(rest)
+            for sentence in sentences + ([tail] if tail.strip() else []):
+                audio.speak(sentence, lang)
+            audio.finish(timeout=max(1.0, WS_IDLE_TIMEOUT_S))
+            self.send({"type": "audio_end", "turn": turn, "sent": audio.sent, "dropped": audio.dropped,
+                       "cancelled": self.cancelled.is_set()})
+            pipeline_metrics.incr("voice.audio_dropped", audio.dropped)
+            pipeline_metrics.incr("voice.turns")
+            pipeline_metrics.record("voice.turn", time.perf_counter() - started)
+        except Overloaded as e:
+            audio.finish(timeout=0)
+            self.send({"type": "error", "turn": turn, "error": "overloaded", "upstream": e.name,
+                       "retry_after": e.retry_after})
+        except SlowClient as e:
+            self.cancelled.set()
+            pipeline_metrics.incr("voice.slow_client_closed")
+            logger.warning(f"voice_session {self.session_id}: {e}")
+            try:
+                self.ws.close()
+            except Exception:
+                pass
+        except Exception as e:
+            logger.exception("voice_session: turn failed")
+            audio.finish(timeout=0)
+            self.send({"type": "error", "turn": turn, "error": type(e).__name__})
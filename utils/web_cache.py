@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+
+from utils.answer_store import normalize_question
+
+logger = logging.getLogger(__name__)
+
+# Tavily fallback results cached by the normalized standalone (enhanced)
+# query, so a repeated corpus gap does not cost another web round-trip within
+# WEB_CACHE_TTL. Web documents the grader accepts (graded in the background,
+# Agents/retrieval.py) are also written back to the Pinecone index under the
+# WEBSEARCH_NAMESPACE namespace with source_type=websearch and an expires_at
+# timestamp; retrieve() searches that namespace next to the corpus, so repeat
+# questions are answered on the local path. Written ids are tracked here and
+# deleted from Pinecone once they expire. Per-day counters (turns that reached
+# retrieval, Tavily calls, cache hits, answers from written-back documents)
+# keep the fallback rate over time across restarts and workers.
+WEB_CACHE_ENABLED = os.getenv("WEB_CACHE_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+WEB_CACHE_PATH = os.getenv("WEB_CACHE_PATH", os.path.join("tmp", "web_cache.sqlite3"))
+WEB_CACHE_TTL = float(os.getenv("WEB_CACHE_TTL", str(3 * 24 * 3600)))
+WEBSEARCH_WRITEBACK = os.getenv("WEBSEARCH_WRITEBACK", "1").strip().lower() not in ("0", "false", "no")
+WEBSEARCH_NAMESPACE = os.getenv("WEBSEARCH_NAMESPACE", "websearch")
+WEBSEARCH_WRITEBACK_TTL = float(os.getenv("WEBSEARCH_WRITEBACK_TTL", str(30 * 24 * 3600)))
+# Write-back batches (grading, embedding, upsert) waiting for the background thread
+WEBSEARCH_WRITEBACK_PENDING = int(os.getenv("WEBSEARCH_WRITEBACK_PENDING", "8"))
+# Written-back documents searched per query, next to the corpus retriever's k
+WEBSEARCH_LOCAL_K = int(os.getenv("WEBSEARCH_LOCAL_K", "2"))
+PRUNE_INTERVAL = 3600
+
+COUNTERS = ("turns", "tavily_calls", "cache_hits", "local_hits", "writebacks")
+
+
+def cache_key(query):
+    return normalize_question(query)
+
+
+def query_hash(query):
+    """What the shared write-back records keep of the query that found a document (never the text)."""
+    return hashlib.sha1(cache_key(query).encode("utf-8")).hexdigest()[:16]
+
+
+def document_id(url, content):
+    """Stable vector id for a written-back web document (re-writes upsert)."""
+    return "web#" + hashlib.sha1(f"{url}\n{content}".encode("utf-8")).hexdigest()[:24]
+
+
+class WebSearchCache:
+    def __init__(self, path=WEB_CACHE_PATH, ttl=WEB_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        self.stats = {"lookups": 0, "hits": 0, "misses": 0, "stores": 0}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS web_results ("
+            " key TEXT PRIMARY KEY, results TEXT NOT NULL, created REAL NOT NULL,"
+            " expires REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS web_writeback ("
+            " id TEXT PRIMARY KEY, url TEXT, query TEXT, created REAL NOT NULL, expires REAL NOT NULL)"
+        )
+        # query holds query_hash(); drop the plain text older builds stored
+        self._db.execute("UPDATE web_writeback SET query = NULL WHERE query GLOB '*[^0-9a-f]*'")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS web_fallback_daily ("
+            " day TEXT PRIMARY KEY, turns INTEGER NOT NULL DEFAULT 0, tavily_calls INTEGER NOT NULL DEFAULT 0,"
+            " cache_hits INTEGER NOT NULL DEFAULT 0, local_hits INTEGER NOT NULL DEFAULT 0,"
+            " writebacks INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.commit()
+
+    def get(self, *queries):
+        """Cached results [{"url", "content"}] for the first query with a live entry, or None."""
+        now = time.time()
+        keys = [k for k in dict.fromkeys(cache_key(q) for q in queries if q) if k]
+        with self._lock:
+            self.stats["lookups"] += 1
+            for key in keys:
+                row = self._db.execute(
+                    "SELECT results FROM web_results WHERE key = ? AND expires > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE web_results SET hits = hits + 1 WHERE key = ?", (key,))
+                    self._db.commit()
+                    self.stats["hits"] += 1
+                    return json.loads(row[0])
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, results, *queries):
+        now = time.time()
+        payload = json.dumps(results)
+        with self._lock:
+            for key in dict.fromkeys(cache_key(q) for q in queries if q):
+                if key:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO web_results (key, results, created, expires, hits) VALUES (?, ?, ?, ?, 0)",
+                        (key, payload, now, now + self.ttl),
+                    )
+            self._db.execute("DELETE FROM web_results WHERE expires <= ?", (now,))
+            self._db.commit()
+            self.stats["stores"] += 1
+
+    def count(self, field, amount=1):
+        """Adds to today's fallback counter (field in COUNTERS)."""
+        if field not in COUNTERS:
+            raise ValueError(field)
+        day = time.strftime("%Y-%m-%d")
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO web_fallback_daily (day) VALUES (?)", (day,))
+            self._db.execute(f"UPDATE web_fallback_daily SET {field} = {field} + ? WHERE day = ?", (amount, day))
+            self._db.commit()
+
+    def history(self, days=14):
+        """Per-day counters, newest first, with the share of turns that needed the web."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT day, {', '.join(COUNTERS)} FROM web_fallback_daily ORDER BY day DESC LIMIT ?", (days,)
+            ).fetchall()
+        history = []
+        for row in rows:
+            entry = dict(zip(("day",) + COUNTERS, row))
+            turns = entry["turns"] or 0
+            entry["fallback_rate"] = round((entry["tavily_calls"] + entry["cache_hits"]) / turns, 3) if turns else 0.0
+            entry["tavily_rate"] = round(entry["tavily_calls"] / turns, 3) if turns else 0.0
+            history.append(entry)
+        return history
+
+    def record_writeback(self, ids, urls, query_hash, expires):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO web_writeback (id, url, query, created, expires) VALUES (?, ?, ?, ?, ?)",
+                [(i, u, query_hash, now, expires) for i, u in zip(ids, urls)],
+            )
+            self._db.commit()
+
+    def take_expired(self, now=None, force=False):
+        """Ids of expired written-back documents (at most once per PRUNE_INTERVAL unless force)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if not force and now - self._last_prune < PRUNE_INTERVAL:
+                return []
+            self._last_prune = now
+            return [r[0] for r in self._db.execute("SELECT id FROM web_writeback WHERE expires <= ?", (now,))]
+
+    def forget(self, ids):
+        with self._lock:
+            self._db.executemany("DELETE FROM web_writeback WHERE id = ?", [(i,) for i in ids])
+            self._db.commit()
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            now = time.time()
+            stats["entries"] = self._db.execute("SELECT COUNT(*) FROM web_results WHERE expires > ?", (now,)).fetchone()[0]
+            stats["written_back"] = self._db.execute("SELECT COUNT(*) FROM web_writeback WHERE expires > ?", (now,)).fetchone()[0]
+        stats["history"] = self.history(days=7)
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache, or None when disabled or the sqlite file is unusable."""
+    global _cache
+    if not WEB_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = WebSearchCache()
+            except Exception as e:
+                logger.warning(f"web cache disabled: {e}")
+                return None
+        return _cache
+
+
+def count(field, amount=1):
+    cache = get_cache()
+    if cache is not None:
+        try:
+            cache.count(field, amount)
+        except Exception as e:
+            logger.debug(f"web cache: could not count {field}: {e}")
+
+
+def snapshot():
+    cache = _cache
+    return cache.snapshot() if cache is not None else {"enabled": WEB_CACHE_ENABLED}
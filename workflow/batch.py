@@ -0,0 +1,292 @@
+import os
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage
+from workflow.graph import PROFILES, _timed, topology
+from utils import answer_store, kannada_mode, langdetect, translation
+from utils.admission import Overloaded
+from utils import metrics as pipeline_metrics
+
+logger = logging.getLogger(__name__)
+
+# Stage-batched answering for /chat/batch (app.py). Questions are
+# deduplicated by normalized text and language, then walk the nodes of the
+# current load profile's graph (workflow.graph.topology, see
+# utils/load_control.py) with one bounded pool per stage: every question
+# waiting at a stage is processed together (classified together, retrieved
+# concurrently, graded together, generated with bounded concurrency) while
+# questions that finished a stage move on without waiting for the rest.
+# Results are delivered one by one as questions finish. Questions with a
+# session_id run in order per session against the shared conversation
+# history; sessionless ones are never rephrased (there is no history), so the
+# enhancer costs nothing. Per-stage pool sizes: BATCH_CONCURRENCY_<STAGE>.
+STAGE_CONCURRENCY = {
+    "prepare": 4,           # language detection, FAQ answers, KN->EN translation
+    "query_passthrough": 4,  # "minimal" profile entry
+    "query_enhancer": 4,
+    "query_classifier": 4,
+    "retrieve": 8,
+    "retrieval_grader": 2,  # up to RETRIEVER_K grader calls each
+    "local_grader": 4,      # "lean" profile: lexical, no LLM
+    "refine_query": 2,
+    "websearch": 2,
+    "generate_answer": 2,
+    "finish": 4,            # EN->KN reply translation
+}
+BATCH_MAX_RETRIES = int(os.getenv("BATCH_MAX_RETRIES", "3"))
+BATCH_MAX_QUESTION_CHARS = int(os.getenv("BATCH_MAX_QUESTION_CHARS", "2000"))
+
+# Per profile: (entry, timed nodes, edges), the same definition build_workflow compiles
+_TOPOLOGIES = {}
+for _profile in PROFILES:
+    _entry, _nodes, _edges = topology(_profile)
+    _TOPOLOGIES[_profile] = (_entry, {name: _timed(name, node) for name, node in _nodes.items()}, _edges)
+
+
+def _concurrency():
+    return {stage: int(os.getenv(f"BATCH_CONCURRENCY_{stage.upper()}", n)) for stage, n in STAGE_CONCURRENCY.items()}
+
+
+def normalize(text):
+    """Question text as sent to the graph: single-spaced and capped at BATCH_MAX_QUESTION_CHARS."""
+    return " ".join(str(text or "").split())[:BATCH_MAX_QUESTION_CHARS]
+
+
+def parse_questions(raw):
+    """
+    Items from a request body list: strings or {"text"/"question", "lang",
+    "session_id", "id"}. Returns (items, errors) where errors lists the
+    indexes of entries without text.
+    """
+    items, errors = [], []
+    for index, entry in enumerate(raw):
+        if isinstance(entry, str):
+            entry = {"text": entry}
+        if not isinstance(entry, dict):
+            errors.append(index)
+            continue
+        text = normalize(entry.get("text") or entry.get("question"))
+        if not text:
+            errors.append(index)
+            continue
+        items.append({
+            "index": index,
+            "id": entry.get("id"),
+            "text": text,
+            "lang": (str(entry.get("lang") or "en")).strip().lower() or "en",
+            "session_id": str(entry["session_id"]).strip() if entry.get("session_id") else None,
+        })
+    return items, errors
+
+
+class _Turn:
+    """One unique question in flight."""
+
+    def __init__(self, item, history=None):
+        self.item = item
+        self.lang = item["lang"]
+        self.source_lang = "kn"
+        self.state = None
+        self.history = history or []
+        self.route = []
+        self.retries = 0
+        self.started = time.perf_counter()
+
+
+class BatchRun:
+    """
+    Answers parsed items, calling on_result(result) from worker threads as
+    each finishes (duplicates get the result of the question they repeat,
+    with "duplicate_of"). profile is the load profile whose nodes are walked;
+    graph is its compiled graph, whose checkpointer holds conversations for
+    items with a session_id (None: ignore sessions).
+    """
+
+    def __init__(self, items, on_result, graph=None, concurrency=None, profile="full"):
+        if profile not in _TOPOLOGIES:
+            raise ValueError(f"unknown graph profile: {profile}")
+        self.items = items
+        self.on_result = on_result
+        self.graph = graph
+        self.profile = profile
+        self._entry, self._nodes, self._edges = _TOPOLOGIES[profile]
+        self.concurrency = dict(_concurrency(), **(concurrency or {}))
+        self.cancelled = threading.Event()
+        self.summary = {"total": len(items), "unique": 0, "duplicates": 0, "errors": 0, "answer_store": 0}
+        self._pools = {}
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._done = threading.Event()
+        self._duplicates = {}  # canonical index -> [duplicate items]
+        self._sessions = {}    # session_id -> [items still to run, in order]
+
+    def _submit(self, stage, fn, turn, *args):
+        if self.cancelled.is_set():
+            self._abandon(turn)
+            return
+        pool = self._pools.get(stage)
+        if pool is None:
+            pool = self._pools[stage] = ThreadPoolExecutor(max_workers=max(1, self.concurrency.get(stage, 2)),
+                                                           thread_name_prefix=f"batch-{stage}")
+        pool.submit(fn, turn, *args)
+
+    def run(self, wait=True):
+        """Starts every question; with wait, blocks until all are delivered and returns the summary."""
+        started = time.perf_counter()
+        canonical = {}
+        first_turns = []
+        for item in self.items:
+            if item["session_id"]:
+                # Follow-ups depend on the previous answer: one at a time per session
+                queue = self._sessions.setdefault(item["session_id"], [])
+                queue.append(item)
+                if len(queue) == 1:
+                    first_turns.append(item)
+                continue
+            key = (item["lang"], answer_store.normalize_question(item["text"]) or item["text"])
+            if key in canonical:
+                self._duplicates.setdefault(canonical[key]["index"], []).append(item)
+                self.summary["duplicates"] += 1
+                continue
+            canonical[key] = item
+            first_turns.append(item)
+        self.summary["unique"] = len(canonical) + sum(len(q) for q in self._sessions.values())
+        pipeline_metrics.incr("batch.questions", len(self.items))
+        pipeline_metrics.incr("batch.duplicates", self.summary["duplicates"])
+        self._outstanding = self.summary["unique"]
+        if not self._outstanding:
+            self._done.set()
+        for item in first_turns:
+            self._submit("prepare", self._prepare, _Turn(item))
+        if wait:
+            self._done.wait()
+            self.shutdown()
+            self.summary["elapsed_s"] = round(time.perf_counter() - started, 3)
+        return self.summary
+
+    def shutdown(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=False)
+
+    def _settle(self):
+        """One unique question is finished (or abandoned)."""
+        with self._lock:
+            self._outstanding -= 1
+            if self._outstanding <= 0:
+                self._done.set()
+
+    def _abandon(self, turn):
+        """Cancelled: settles this question and the turns of its session still queued behind it."""
+        count = 1
+        session_id = turn.item["session_id"]
+        if session_id:
+            with self._lock:
+                # The head of the session queue is this turn
+                queue = self._sessions.get(session_id) or []
+                count = max(1, len(queue))
+                queue.clear()
+        for _ in range(count):
+            self._settle()
+
+    def _deliver(self, turn, reply=None, error=None, source="graph"):
+        item = turn.item
+        result = {
+            "index": item["index"], "id": item["id"], "question": item["text"], "lang": turn.lang,
+            "reply": reply, "route": turn.route, "source": source,
+            "elapsed_s": round(time.perf_counter() - turn.started, 3),
+        }
+        if error is not None:
+            result["error"] = error
+            with self._lock:
+                self.summary["errors"] += 1
+            pipeline_metrics.incr("batch.errors")
+        elif source == "answer_store":
+            with self._lock:
+                self.summary["answer_store"] += 1
+        for target in [item] + self._duplicates.get(item["index"], []):
+            self.on_result(result if target is item else dict(result, index=target["index"], id=target["id"],
+                                                               duplicate_of=item["index"]))
+        self._next_in_session(item)
+        self._settle()
+
+    def _next_in_session(self, item):
+        if not item["session_id"]:
+            return
+        with self._lock:
+            queue = self._sessions[item["session_id"]]
+            if queue:
+                queue.pop(0)
+            following = queue[0] if queue else None
+        if following is not None:
+            self._submit("prepare", self._prepare, _Turn(following))
+
+    def _prepare(self, turn):
+        try:
+            item = turn.item
+            query = item["text"]
+            turn.lang, detected = langdetect.request_language(query, item["lang"])
+            if detected is not None and detected.lang == "kn" and detected.script == "latin":
+                turn.source_lang = "auto"
+            hit = answer_store.lookup(query, turn.lang) if not item["session_id"] else None
+            if hit is None and turn.lang == "kn" and not kannada_mode.native(turn.lang):
+                with pipeline_metrics.timed("translate.kn_to_en"):
+                    query = translation.translate_text(query, target="en", source=turn.source_lang) or query
+                if not item["session_id"]:
+                    hit = answer_store.lookup(query, turn.lang)
+            if hit is not None:
+                pipeline_metrics.incr("answer_store.hit")
+                self._deliver(turn, reply=hit["answer"], source="answer_store")
+                return
+            if item["session_id"] and self.graph is not None:
+                config = {"configurable": {"thread_id": item["session_id"]}}
+                turn.history = list(self.graph.get_state(config).values.get("messages") or [])
+            turn.state = {"question": HumanMessage(content=query), "messages": list(turn.history),
+                          "lang": turn.lang, "deadline": None}
+            self._submit(self._entry, self._step, turn, self._entry)
+        except Exception as e:
+            logger.exception("batch: prepare failed")
+            self._deliver(turn, error=type(e).__name__)
+
+    def _step(self, turn, node):
+        try:
+            turn.route.append(node)
+            turn.state = self._nodes[node](turn.state) or turn.state
+            edge = self._edges[node]
+            following = edge[0](turn.state) if isinstance(edge, tuple) else edge
+        except Overloaded as e:
+            # Shed by a bulkhead or the Gemini quota: this stage again a little later
+            turn.route.pop()
+            turn.retries += 1
+            if turn.retries > BATCH_MAX_RETRIES:
+                self._deliver(turn, error="overloaded")
+                return
+            pipeline_metrics.incr("batch.retries")
+            time.sleep(min(float(e.retry_after), 5.0))
+            self._submit(node, self._step, turn, node)
+            return
+        except Exception as e:
+            logger.exception(f"batch: node {node} failed")
+            self._deliver(turn, error=type(e).__name__)
+            return
+        if following is None:
+            self._submit("finish", self._finish, turn)
+        else:
+            self._submit(following, self._step, turn, following)
+
+    def _finish(self, turn):
+        try:
+            messages = turn.state.get("messages") or []
+            reply = messages[-1].content if messages else "Sorry, I'm unable to generate a response right now."
+            if turn.lang == "kn" and turn.state.get("answer_lang") != turn.lang:
+                with pipeline_metrics.timed("translate.en_to_kn"):
+                    reply = translation.translate_reply(reply, target="kn", source="en") or reply
+            if turn.item["session_id"] and self.graph is not None:
+                config = {"configurable": {"thread_id": turn.item["session_id"]}}
+                self.graph.update_state(config, {"messages": messages}, as_node="generate_answer")
+            self._deliver(turn, reply=reply)
+        except Exception as e:
+            logger.exception("batch: finish failed")
+            self._deliver(turn, error=type(e).__name__)
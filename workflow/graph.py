@@ -2,40 +2,168 @@ from langgraph.graph import StateGraph, END
 from Agents.state import AgentState
 from Agents import query_processing, routing, retrieval, response_generation
 from langgraph.checkpoint.memory import MemorySaver
+from utils import deadline, metrics, turn_stream
+from collections import OrderedDict
+import functools
+import os
+import threading
+import time
 
-def build_workflow():
+# Conversation threads live in process memory and clients choose their ids,
+# so the checkpointer forgets threads idle for CONVERSATION_TTL_S and keeps at
+# most CONVERSATION_MAX_THREADS (least recently used go first, in batches).
+CONVERSATION_TTL_S = float(os.getenv("CONVERSATION_TTL_S", str(6 * 3600)))
+CONVERSATION_MAX_THREADS = int(os.getenv("CONVERSATION_MAX_THREADS", "5000"))
+SWEEP_INTERVAL = 60
+
+
+class BoundedMemorySaver(MemorySaver):
+    """MemorySaver that evicts idle and least recently used conversation threads."""
+
+    def __init__(self, ttl=CONVERSATION_TTL_S, max_threads=CONVERSATION_MAX_THREADS, clock=time.monotonic):
+        super().__init__()
+        self.ttl = ttl
+        self.max_threads = max_threads
+        self._clock = clock
+        self._used = OrderedDict()  # thread_id -> last use, oldest first
+        self._lock = threading.RLock()
+        self._last_sweep = 0.0
+
+    def _touch(self, config):
+        thread_id = (config.get("configurable") or {}).get("thread_id")
+        if thread_id is None:
+            return
+        now = self._clock()
+        with self._lock:
+            self._used[thread_id] = now
+            self._used.move_to_end(thread_id)
+            over = len(self._used) - self.max_threads
+            if over <= 0 and now - self._last_sweep < SWEEP_INTERVAL:
+                return
+            self._last_sweep = now
+            # Over the cap: drop a tenth more than needed so eviction runs rarely
+            evict = max(0, over + self.max_threads // 10) if over > 0 else 0
+            victims = []
+            for old_id, used in self._used.items():
+                if old_id == thread_id or (len(victims) >= evict and now - used < self.ttl):
+                    break
+                victims.append(old_id)
+            for old_id in victims:
+                self.delete_thread(old_id)
+        if victims:
+            metrics.incr("conversations.evicted", len(victims))
+
+    def get_tuple(self, config):
+        # Reading an unknown thread (a new conversation) does not register it
+        if (config.get("configurable") or {}).get("thread_id") in self.storage:
+            self._touch(config)
+        return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        self._touch(config)
+        return super().put(config, checkpoint, metadata, new_versions)
+
+    def delete_thread(self, thread_id):
+        with self._lock:
+            self._used.pop(thread_id, None)
+            super().delete_thread(thread_id)
+
+    def thread_count(self):
+        with self._lock:
+            return len(self._used)
+
+
+def _timed(name, node):
+    """Records each node's latency under 'node.<name>' in utils.metrics and binds the turn's deadline."""
+    @functools.wraps(node)
+    def wrapper(state):
+        turn_stream.emit("node", name=name)
+        with metrics.timed(f"node.{name}"), deadline.bound(state.get("deadline")):
+            return node(state)
+    return wrapper
+
+
+PROFILES = ("full", "lean", "minimal")
+
+
+def topology(profile="full"):
+    """
+    (entry, nodes, edges) of a load profile (see utils/load_control.py):
+      full     enhance -> classify -> retrieve -> LLM grading, refine loop, websearch -> generate
+      lean     rephrase only follow-ups that need it, local (lexical) grading, no refine loop
+      minimal  retrieve -> generate
+    nodes maps name -> node function; edges maps name -> next node, None (end),
+    or (router, [possible next nodes]). build_workflow compiles it and
+    workflow/batch.py walks it stage by stage, so both run the same graph.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"unknown graph profile: {profile}")
+    if profile == "minimal":
+        nodes = {
+            "query_passthrough": query_processing.query_passthrough,
+            "retrieve": retrieval.retrieve,
+            "generate_answer": response_generation.generate_answer,
+        }
+        edges = {"query_passthrough": "retrieve", "retrieve": "generate_answer", "generate_answer": None}
+        return "query_passthrough", nodes, edges
+
+    lean = profile == "lean"
+    nodes = {
+        "query_enhancer": query_processing.query_enhancer_lean if lean else query_processing.query_enhancer,
+        "query_classifier": query_processing.query_classifier,
+        "off_topic_response": response_generation.off_topic_response,
+        "retrieve": retrieval.retrieve,
+        "generate_answer": response_generation.generate_answer,
+        "websearch": retrieval.websearch,
+        "greeting_response": response_generation.greeting_response,
+        "best_documents": retrieval.best_documents,
+    }
+    edges = {
+        "query_enhancer": "query_classifier",
+        "query_classifier": (routing.on_topic_router, ["retrieve", "off_topic_response", "greeting_response"]),
+        "greeting_response": "generate_answer",
+        "generate_answer": None,
+        "websearch": "generate_answer",
+        "best_documents": "generate_answer",
+        "off_topic_response": "generate_answer",
+    }
+    if lean:
+        nodes["local_grader"] = retrieval.local_grader
+        edges["retrieve"] = "local_grader"
+        edges["local_grader"] = (routing.proceed_router_lean, ["generate_answer", "websearch", "best_documents"])
+    else:
+        nodes["retrieval_grader"] = retrieval.retrieval_grader
+        nodes["refine_query"] = query_processing.refine_query
+        edges["retrieve"] = "retrieval_grader"
+        edges["retrieval_grader"] = (routing.proceed_router,
+                                     ["generate_answer", "refine_query", "websearch", "best_documents"])
+        edges["refine_query"] = "retrieve"
+    return "query_enhancer", nodes, edges
+
+
+def build_workflow(profile="full", checkpointer=None):
+    """
+    Compiles the graph for a load profile (see topology).
+    Pass one checkpointer to every profile so conversations survive a switch.
+    """
+    entry, nodes, edges = topology(profile)
     workflow = StateGraph(AgentState)
-    checkpointer = MemorySaver()
-
-    # Register nodes
-    workflow.add_node("query_enhancer", query_processing.query_enhancer)
-    workflow.add_node("query_classifier", query_processing.query_classifier)
-    workflow.add_node("off_topic_response", response_generation.off_topic_response)
-    workflow.add_node("retrieve", retrieval.retrieve)
-    workflow.add_node("retrieval_grader", retrieval.retrieval_grader)
-    workflow.add_node("generate_answer", response_generation.generate_answer)
-    workflow.add_node("refine_query", query_processing.refine_query)
-    workflow.add_node("websearch", retrieval.websearch)
-    workflow.add_node("greeting_response", response_generation.greeting_response)
-
-    # Connect edges
-    workflow.add_edge("query_enhancer", "query_classifier")
-    workflow.add_conditional_edges("query_classifier", routing.on_topic_router, {
-        "retrieve": "retrieve",
-        "off_topic_response": "off_topic_response",
-        "greeting_response": "greeting_response",
-    })
-    workflow.add_edge("retrieve", "retrieval_grader")
-    workflow.add_conditional_edges("retrieval_grader", routing.proceed_router, {
-        "generate_answer": "generate_answer",
-        "refine_query": "refine_query",
-        "websearch": "websearch",
-    })
-    workflow.add_edge("greeting_response", "generate_answer")
-    workflow.add_edge("refine_query", "retrieve")
-    workflow.add_edge("generate_answer", END)
-    workflow.add_edge("websearch", "generate_answer")
-    workflow.add_edge("off_topic_response", "generate_answer")
-
-    workflow.set_entry_point("query_enhancer")
+    checkpointer = checkpointer or BoundedMemorySaver()
+    for name, node in nodes.items():
+        workflow.add_node(name, _timed(name, node))
+    for name, edge in edges.items():
+        if edge is None:
+            workflow.add_edge(name, END)
+        elif isinstance(edge, tuple):
+            router, targets = edge
+            workflow.add_conditional_edges(name, router, {target: target for target in targets})
+        else:
+            workflow.add_edge(name, edge)
+    workflow.set_entry_point(entry)
     return workflow.compile(checkpointer=checkpointer)
+
+
+def build_workflows():
+    """Every profile compiled over one shared checkpointer, keyed by profile name."""
+    checkpointer = BoundedMemorySaver()
+    return {profile: build_workflow(profile, checkpointer) for profile in PROFILES}